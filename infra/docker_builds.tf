@@ -31,6 +31,11 @@ resource "null_resource" "docker_images" {
     orchestrator_dockerfile = filesha256("${path.module}/../docker/orchestrator/Dockerfile")
     sagemaker_dockerfile    = filesha256("${path.module}/../sagemaker/Dockerfile")
 
+    # 이미지로 배포되는 Vision 워커 핸들러와 공통 모듈 변경 감지
+    detect_skew_handler = filesha256("${path.module}/../workers/2_image_processing/detect_skew/main.py")
+    process_ocr_handler = filesha256("${path.module}/../workers/2_image_processing/process_ocr/main.py")
+    common_modules      = sha256(join("", [for f in sort(fileset("${path.module}/../workers/common", "*.py")) : filesha256("${path.module}/../workers/common/${f}")]))
+
     # 빌드 스크립트 변경 감지
     build_script_hash = filesha256("${path.module}/../scripts/commands.sh")
 
@@ -63,6 +63,10 @@ resource "aws_dynamodb_table" "state_tracking" {
     enabled = true
   }
 
+  # 완료 집계기가 페이지 상태 변화(이전/새 이미지)로 진행 카운터를 증분 갱신
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   tags = {
     Name        = "${var.project_name}-state-tracking"
     Environment = var.environment
@@ -6,51 +6,6 @@ resource "aws_cloudwatch_event_bus" "main" {
   }
 }
 
-resource "aws_cloudwatch_event_rule" "orchestration_trigger" {
-  name           = "${var.project_name}-orchestration-trigger"
-  event_bus_name = aws_cloudwatch_event_bus.main.name
-  description    = "오케스트레이션 트리거 규칙"
-
-  event_pattern = jsonencode({
-    source      = ["book-scan.orchestration"]
-    detail-type = ["Batch Processing Complete"]
-    detail = {
-      status = ["COMPLETED"]
-    }
-  })
-
-  tags = {
-    Name = "${var.project_name}-orchestration-trigger"
-  }
-}
-
-resource "aws_cloudwatch_event_target" "orchestration_target" {
-  rule           = aws_cloudwatch_event_rule.orchestration_trigger.name
-  event_bus_name = aws_cloudwatch_event_bus.main.name
-  arn            = aws_lambda_function.orchestrator.arn
-  target_id      = "OrchestratorTarget"
-
-  input_transformer {
-    input_paths = {
-      "run_id" = "$.detail.run_id"
-    }
-    input_template = jsonencode({
-      "run_id"        = "<run_id>"
-      "input_bucket"  = var.input_bucket_name
-      "temp_bucket"   = var.temp_bucket_name
-      "output_bucket" = var.output_bucket_name
-    })
-  }
-}
-
-resource "aws_lambda_permission" "orchestration_event_invoke" {
-  statement_id  = "AllowExecutionFromEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.orchestrator.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.orchestration_trigger.arn
-}
-
 resource "aws_cloudwatch_event_rule" "batch_completion" {
   name           = "${var.project_name}-batch-completion"
   event_bus_name = aws_cloudwatch_event_bus.main.name
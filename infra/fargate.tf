@@ -35,9 +35,16 @@ resource "aws_ecs_task_definition" "skew_corrector" {
 
   container_definitions = jsonencode([
     {
-      name      = "consolidated-processor"  # Step Functions에서 참조하는 이름과 일치
+      name      = "consolidated-processor"
       image     = "${aws_ecr_repository.fargate_processor.repository_url}:latest"
       essential = true
+      # 단계 큐 작업자 설정 (페이지별 버킷 정보는 큐 메시지로 전달)
+      environment = concat([
+        { name = "DYNAMODB_STATE_TABLE", value = aws_dynamodb_table.state_tracking.name },
+        { name = "TEMP_BUCKET", value = aws_s3_bucket.temp.id },
+        { name = "PROFILE_SAMPLE_RATE", value = tostring(var.profile_sample_rate) },
+        { name = "PROFILER", value = var.profiler }
+      ], [for name, url in local.stage_queue_urls : { name = name, value = url }])
       logConfiguration = {
         logDriver = "awslogs"
         options = {
@@ -55,6 +62,148 @@ resource "aws_ecs_task_definition" "skew_corrector" {
   ]
 }
 
+# 기울기 보정 큐 작업자 서비스 (작업 수는 큐 깊이에 따라 자동 조정)
+resource "aws_ecs_service" "skew_corrector" {
+  name            = "${var.project_name}-skew-corrector"
+  cluster         = aws_ecs_cluster.main.id
+  task_definition = aws_ecs_task_definition.skew_corrector.arn
+  desired_count   = 0
+
+  capacity_provider_strategy {
+    capacity_provider = "FARGATE"
+    weight            = 100
+  }
+
+  network_configuration {
+    subnets          = aws_subnet.private[*].id
+    security_groups  = [aws_security_group.main.id]
+    assign_public_ip = false
+  }
+
+  lifecycle {
+    ignore_changes = [desired_count]
+  }
+
+  depends_on = [aws_ecs_cluster_capacity_providers.main]
+}
+
+resource "aws_appautoscaling_target" "skew_corrector" {
+  service_namespace  = "ecs"
+  resource_id        = "service/${aws_ecs_cluster.main.name}/${aws_ecs_service.skew_corrector.name}"
+  scalable_dimension = "ecs:service:DesiredCount"
+  min_capacity       = 0
+  max_capacity       = var.skew_corrector_max_tasks
+}
+
+# 대기 메시지 수 구간별 작업 수: 1~9개 1개, 10~49개 절반, 50개 이상 최대
+resource "aws_appautoscaling_policy" "skew_corrector_scale_out" {
+  name               = "${var.project_name}-skew-corrector-scale-out"
+  service_namespace  = aws_appautoscaling_target.skew_corrector.service_namespace
+  resource_id        = aws_appautoscaling_target.skew_corrector.resource_id
+  scalable_dimension = aws_appautoscaling_target.skew_corrector.scalable_dimension
+  policy_type        = "StepScaling"
+
+  step_scaling_policy_configuration {
+    adjustment_type         = "ExactCapacity"
+    cooldown                = 60
+    metric_aggregation_type = "Maximum"
+
+    step_adjustment {
+      metric_interval_lower_bound = 0
+      metric_interval_upper_bound = 9
+      scaling_adjustment          = 1
+    }
+    step_adjustment {
+      metric_interval_lower_bound = 9
+      metric_interval_upper_bound = 49
+      scaling_adjustment          = max(1, ceil(var.skew_corrector_max_tasks / 2))
+    }
+    step_adjustment {
+      metric_interval_lower_bound = 49
+      scaling_adjustment          = var.skew_corrector_max_tasks
+    }
+  }
+}
+
+resource "aws_appautoscaling_policy" "skew_corrector_scale_in" {
+  name               = "${var.project_name}-skew-corrector-scale-in"
+  service_namespace  = aws_appautoscaling_target.skew_corrector.service_namespace
+  resource_id        = aws_appautoscaling_target.skew_corrector.resource_id
+  scalable_dimension = aws_appautoscaling_target.skew_corrector.scalable_dimension
+  policy_type        = "StepScaling"
+
+  step_scaling_policy_configuration {
+    adjustment_type         = "ExactCapacity"
+    cooldown                = 300
+    metric_aggregation_type = "Maximum"
+
+    step_adjustment {
+      metric_interval_upper_bound = 0
+      scaling_adjustment          = 0
+    }
+  }
+}
+
+resource "aws_cloudwatch_metric_alarm" "skew_corrector_backlog" {
+  alarm_name          = "${var.project_name}-skew-corrector-backlog"
+  alarm_description   = "기울기 보정 큐 대기 메시지에 따라 작업 수 확장"
+  comparison_operator = "GreaterThanOrEqualToThreshold"
+  evaluation_periods  = 1
+  metric_name         = "ApproximateNumberOfMessagesVisible"
+  namespace           = "AWS/SQS"
+  period              = 60
+  statistic           = "Maximum"
+  threshold           = 1
+  alarm_actions       = [aws_appautoscaling_policy.skew_corrector_scale_out.arn]
+
+  dimensions = {
+    QueueName = aws_sqs_queue.stage["skew_correction"].name
+  }
+}
+
+# 대기 중이거나 처리 중인 메시지가 5분간 없으면 작업 수를 0으로 축소
+resource "aws_cloudwatch_metric_alarm" "skew_corrector_idle" {
+  alarm_name          = "${var.project_name}-skew-corrector-idle"
+  alarm_description   = "기울기 보정 큐가 비면 작업 수 축소"
+  comparison_operator = "LessThanThreshold"
+  evaluation_periods  = 5
+  threshold           = 1
+  alarm_actions       = [aws_appautoscaling_policy.skew_corrector_scale_in.arn]
+
+  metric_query {
+    id          = "backlog"
+    expression  = "visible + in_flight"
+    label       = "SkewCorrectionBacklog"
+    return_data = true
+  }
+
+  metric_query {
+    id = "visible"
+    metric {
+      metric_name = "ApproximateNumberOfMessagesVisible"
+      namespace   = "AWS/SQS"
+      period      = 60
+      stat        = "Maximum"
+      dimensions = {
+        QueueName = aws_sqs_queue.stage["skew_correction"].name
+      }
+    }
+  }
+
+  metric_query {
+    id = "in_flight"
+    metric {
+      metric_name = "ApproximateNumberOfMessagesNotVisible"
+      namespace   = "AWS/SQS"
+      period      = 60
+      stat        = "Maximum"
+      dimensions = {
+        QueueName = aws_sqs_queue.stage["skew_correction"].name
+      }
+    }
+  }
+}
+
 resource "aws_cloudwatch_log_group" "fargate_logs" {
   name              = "/ecs/${var.project_name}-skew-corrector"
   retention_in_days = 7
@@ -72,6 +72,7 @@ resource "aws_iam_policy" "base_policy" {
           "s3:PutObject",
           "s3:DeleteObject",
           "s3:ListBucket",
+          "s3:AbortMultipartUpload",
           "s3:PutLifecycleConfiguration",
           "s3:DeleteLifecycleConfiguration",
           "sagemaker:DeleteEndpoint",
@@ -80,6 +81,7 @@ resource "aws_iam_policy" "base_policy" {
           "ecs:UpdateService",
           "ecs:DeregisterTaskDefinition",
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
@@ -118,6 +120,32 @@ resource "aws_iam_policy" "base_policy" {
         ],
         Resource = "*"
       },
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ],
+        Resource = "${aws_dynamodb_table.state_tracking.arn}/stream/*"
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "cloudwatch:PutMetricData",
+          "cloudwatch:GetMetricStatistics"
+        ],
+        Resource = "*"
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "states:SendTaskSuccess",
+          "states:SendTaskFailure"
+        ],
+        Resource = "*"
+      },
       {
         Effect = "Allow",
         Action = [
@@ -212,39 +240,11 @@ resource "aws_iam_policy" "step_functions_policy" {
         Resource = [
           aws_lambda_function.initialize_state.arn,
           aws_lambda_function.orchestrator.arn,
-          aws_lambda_function.detect_skew.arn,
-          aws_lambda_function.process_ocr.arn,
-          aws_lambda_function.upscaler.arn,
+          aws_lambda_function.completion_aggregator.arn,
           aws_lambda_function.pdf_generator.arn,
           aws_lambda_function.summary_generator.arn
         ]
       },
-      {
-        Effect = "Allow",
-        Action = [
-          "ecs:RunTask"
-        ],
-        Resource = [
-          aws_ecs_task_definition.skew_corrector.arn
-        ]
-      },
-      {
-        Effect = "Allow",
-        Action = [
-          "ecs:StopTask",
-          "ecs:DescribeTasks"
-        ],
-        Resource = "*"
-      },
-      {
-        Effect = "Allow",
-        Action = [
-          "iam:PassRole"
-        ],
-        Resource = [
-          aws_iam_role.lambda_fargate_base_role.arn
-        ]
-      },
       {
         Effect = "Allow",
         Action = [
@@ -1,10 +1,54 @@
-# Layer 인프라 완전 제거 - 모든 함수가 기본 런타임 또는 컨테이너 사용
+# 컨테이너 함수는 이미지에 공통 모듈을 포함하고, zip 함수는 공통 모듈 레이어(/opt/python/common)를 사용
+
+# 공통 모듈 레이어: workers/common + 공통 모듈 의존성 (arm64, python3.12 휠)
+resource "null_resource" "common_layer" {
+  triggers = {
+    common_modules = sha256(join("", [for f in sort(fileset("${path.module}/../workers/common", "*.py")) : filesha256("${path.module}/../workers/common/${f}")]))
+    requirements   = filesha256("${path.module}/../workers/common/requirements.txt")
+  }
+
+  provisioner "local-exec" {
+    command = <<-EOF
+      set -e
+      cd "${path.module}/.."
+      rm -rf dist/common_layer
+      mkdir -p dist/common_layer/python
+      pip install -r workers/common/requirements.txt -t dist/common_layer/python \
+        --platform manylinux2014_aarch64 --implementation cp --python-version 3.12 \
+        --only-binary=:all: --upgrade --quiet
+      cp -r workers/common dist/common_layer/python/common
+      rm -f dist/common_layer/python/common/requirements.txt
+      find dist/common_layer -name "__pycache__" -type d -prune -exec rm -rf {} +
+    EOF
+  }
+}
+
+data "archive_file" "common_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/../dist/common_layer"
+  output_path = "${path.module}/../dist/common_layer.zip"
+  depends_on  = [null_resource.common_layer]
+}
+
+resource "aws_lambda_layer_version" "common" {
+  layer_name               = "${var.project_name}-common"
+  filename                 = data.archive_file.common_layer.output_path
+  source_code_hash         = data.archive_file.common_layer.output_base64sha256
+  compatible_runtimes      = ["python3.12"]
+  compatible_architectures = ["arm64"]
+}
 
 data "archive_file" "initialize_state" {
   type        = "zip"
   source_dir  = "${path.module}/../workers/1_orchestration/initialize_state"
   output_path = "${path.module}/../dist/initialize_state.zip"
 }
+data "archive_file" "completion_aggregator" {
+  type        = "zip"
+  source_dir  = "${path.module}/../workers/1_orchestration/completion_aggregator"
+  output_path = "${path.module}/../dist/completion_aggregator.zip"
+  excludes    = ["local_harness.py"]
+}
 data "archive_file" "upscaler" {
   type        = "zip"
   source_dir  = "${path.module}/../workers/2_image_processing/upscaler"
@@ -18,13 +62,14 @@ data "archive_file" "summary_generator" {
 
 resource "aws_cloudwatch_log_group" "lambda_logs" {
   for_each = {
-    initialize_state  = "initialize_state"
-    orchestrator      = "orchestrator"
-    upscaler          = "upscaler"
-    pdf_generator     = "pdf_generator"
-    summary_generator = "summary_generator"
-    detect_skew       = "detect_skew"
-    process_ocr       = "process_ocr"
+    initialize_state      = "initialize_state"
+    orchestrator          = "orchestrator"
+    completion_aggregator = "completion_aggregator"
+    upscaler              = "upscaler"
+    pdf_generator         = "pdf_generator"
+    summary_generator     = "summary_generator"
+    detect_skew           = "detect_skew"
+    process_ocr           = "process_ocr"
   }
   name              = "/aws/lambda/${var.project_name}-${each.value}"
   retention_in_days = 7
@@ -41,9 +86,14 @@ resource "aws_lambda_function" "initialize_state" {
   memory_size      = 256
   filename         = data.archive_file.initialize_state.output_path
   source_code_hash = data.archive_file.initialize_state.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
   environment {
     variables = {
       DYNAMODB_STATE_TABLE        = aws_dynamodb_table.state_tracking.name
+      OUTPUT_BUCKET               = aws_s3_bucket.output.id
+      PROFILE_SAMPLE_RATE          = var.profile_sample_rate
+      PROFILER                     = var.profiler
+      PROFILE_BUCKET               = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE = "BookScan/Processing"
     }
   }
@@ -59,13 +109,17 @@ resource "aws_lambda_function" "orchestrator" {
   timeout          = 60
   memory_size      = 256
   environment {
-    variables = {
+    # 단계 큐 URL ({STAGE}_QUEUE_URL)
+    variables = merge(local.stage_queue_urls, {
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
-      EVENT_BUS_NAME                = aws_cloudwatch_event_bus.main.name
-      MAX_BATCH_SIZE                = var.max_batch_size
-      MIN_BATCH_SIZE                = var.min_batch_size
+      MAX_DISPATCH_PAGES            = var.max_dispatch_pages
+      SCHEDULER_CAPACITY            = var.scheduler_capacity
+      SCHEDULER_STALE_SECONDS       = var.scheduler_stale_seconds
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
-    }
+    })
   }
   depends_on = [
     aws_cloudwatch_log_group.lambda_logs["orchestrator"],
@@ -74,6 +128,41 @@ resource "aws_lambda_function" "orchestrator" {
   ]
 }
 
+resource "aws_lambda_function" "completion_aggregator" {
+  function_name    = "${var.project_name}-completion-aggregator"
+  role             = aws_iam_role.lambda_fargate_base_role.arn
+  handler          = "main.handler"
+  runtime          = "python3.12"
+  architectures    = ["arm64"]
+  timeout          = 60
+  memory_size      = 256
+  filename         = data.archive_file.completion_aggregator.output_path
+  source_code_hash = data.archive_file.completion_aggregator.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+  environment {
+    variables = {
+      DYNAMODB_STATE_TABLE         = aws_dynamodb_table.state_tracking.name
+      PROFILE_SAMPLE_RATE          = var.profile_sample_rate
+      PROFILER                     = var.profiler
+      PROFILE_BUCKET               = aws_s3_bucket.temp.id
+      POWERTOOLS_METRICS_NAMESPACE = "BookScan/Processing"
+    }
+  }
+  depends_on = [aws_cloudwatch_log_group.lambda_logs["completion_aggregator"]]
+}
+
+# 상태 테이블 스트림 -> 완료 집계기 (실패한 레코드부터 재시도)
+resource "aws_lambda_event_source_mapping" "state_stream" {
+  event_source_arn                   = aws_dynamodb_table.state_tracking.stream_arn
+  function_name                      = aws_lambda_function.completion_aggregator.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 0
+  maximum_retry_attempts             = 10
+  bisect_batch_on_function_error     = false
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
 resource "aws_lambda_function" "upscaler" {
   function_name                  = "${var.project_name}-upscaler"
   role                           = aws_iam_role.lambda_fargate_base_role.arn
@@ -85,15 +174,25 @@ resource "aws_lambda_function" "upscaler" {
   reserved_concurrent_executions = 25
   filename                       = data.archive_file.upscaler.output_path
   source_code_hash               = data.archive_file.upscaler.output_base64sha256
+  layers                         = [aws_lambda_layer_version.common.arn]
 
   environment {
-    variables = {
+    # 단계 큐 URL ({STAGE}_QUEUE_URL)
+    variables = merge(local.stage_queue_urls, {
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
       SAGEMAKER_ENDPOINT_NAME       = aws_sagemaker_endpoint.realesrgan.name
+      RATE_LIMIT_SAGEMAKER_RPS      = var.sagemaker_rate_limit_rps
+      HEDGE_BUDGET                  = var.hedge_budget
+      HEDGE_QUANTILE                = var.hedge_quantile
+      CACHE_TTL_SECONDS             = var.cache_ttl_seconds
+      CACHE_STALE_SECONDS           = var.cache_stale_seconds
       LOG_LEVEL                     = "INFO"
       POWERTOOLS_SERVICE_NAME       = "upscaler"
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
-    }
+    })
   }
 
   tracing_config {
@@ -119,13 +218,25 @@ resource "aws_lambda_function" "pdf_generator" {
   timeout          = 300
   memory_size      = 1536
 
+  # 선형화 전 문서를 /tmp에 기록하므로 임시 스토리지 확장
+  ephemeral_storage {
+    size = 4096
+  }
+
   environment {
     variables = {
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
       OUTPUT_BUCKET                 = aws_s3_bucket.output.id
       TEMP_BUCKET                   = aws_s3_bucket.temp.id
+      PDF_MODE                      = var.pdf_mode
+      PDF_CHUNK_PAGES               = var.pdf_chunk_pages
+      PDF_LINEARIZE                 = tostring(var.pdf_linearize)
+      PDF_OUTPUT_PROFILE            = var.pdf_output_profile
       LOG_LEVEL                     = "INFO"
       POWERTOOLS_SERVICE_NAME       = "pdf-generator"
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
     }
   }
@@ -155,10 +266,14 @@ resource "aws_lambda_function" "summary_generator" {
   memory_size      = 256
   filename         = data.archive_file.summary_generator.output_path
   source_code_hash = data.archive_file.summary_generator.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
   environment {
     variables = {
       OUTPUT_BUCKET                 = aws_s3_bucket.output.id
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
     }
   }
@@ -176,13 +291,23 @@ resource "aws_lambda_function" "detect_skew" {
   reserved_concurrent_executions = 50
 
   environment {
-    variables = {
+    # 단계 큐 URL ({STAGE}_QUEUE_URL)
+    variables = merge(local.stage_queue_urls, {
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
       GOOGLE_SECRET_NAME            = aws_secretsmanager_secret.google_credentials.name
+      RATE_LIMIT_VISION_RPS         = var.vision_rate_limit_rps
+      VISION_CLIENT                 = var.vision_client
+      HEDGE_BUDGET                  = var.hedge_budget
+      HEDGE_QUANTILE                = var.hedge_quantile
+      CACHE_TTL_SECONDS             = var.cache_ttl_seconds
+      CACHE_STALE_SECONDS           = var.cache_stale_seconds
       LOG_LEVEL                     = "INFO"
       POWERTOOLS_SERVICE_NAME       = "detect-skew"
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
-    }
+    })
   }
 
   tracing_config {
@@ -211,13 +336,23 @@ resource "aws_lambda_function" "process_ocr" {
   reserved_concurrent_executions = 30
 
   environment {
-    variables = {
+    # 단계 큐 URL ({STAGE}_QUEUE_URL)
+    variables = merge(local.stage_queue_urls, {
       DYNAMODB_STATE_TABLE          = aws_dynamodb_table.state_tracking.name
       GOOGLE_SECRET_NAME            = aws_secretsmanager_secret.google_credentials.name
+      RATE_LIMIT_VISION_RPS         = var.vision_rate_limit_rps
+      VISION_CLIENT                 = var.vision_client
+      HEDGE_BUDGET                  = var.hedge_budget
+      HEDGE_QUANTILE                = var.hedge_quantile
+      CACHE_TTL_SECONDS             = var.cache_ttl_seconds
+      CACHE_STALE_SECONDS           = var.cache_stale_seconds
       LOG_LEVEL                     = "INFO"
       POWERTOOLS_SERVICE_NAME       = "process-ocr"
+      PROFILE_SAMPLE_RATE           = var.profile_sample_rate
+      PROFILER                      = var.profiler
+      PROFILE_BUCKET                = aws_s3_bucket.temp.id
       POWERTOOLS_METRICS_NAMESPACE  = "BookScan/Processing"
-    }
+    })
   }
 
   tracing_config {
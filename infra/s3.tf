@@ -83,3 +83,18 @@ resource "aws_s3_bucket_lifecycle_configuration" "temp_bucket_lifecycle" {
     }
   }
 }
+
+resource "aws_s3_bucket_lifecycle_configuration" "output_bucket_lifecycle" {
+  bucket = aws_s3_bucket.output.id
+
+  rule {
+    id     = "abort_incomplete_pdf_uploads"
+    status = "Enabled"
+    filter {}
+
+    # 실패한 PDF 스트리밍 업로드의 파트 정리
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
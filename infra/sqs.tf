@@ -26,6 +26,61 @@ resource "aws_sqs_queue" "retry_queue" {
   }
 }
 
+# 페이지 처리 단계별 큐: 단계마다 동시성/배치 크기를 따로 두고 큐 깊이로 확장
+# 가시성 제한 시간은 소비자 처리 시간(Lambda 제한 시간의 6배, Fargate 작업 처리 시간)보다 길게 설정
+locals {
+  stage_queues = {
+    detect_skew     = { visibility_timeout = 180 }
+    skew_correction = { visibility_timeout = 600 }
+    upscale         = { visibility_timeout = 1800 }
+    ocr             = { visibility_timeout = 360 }
+    render_page     = { visibility_timeout = 1800 }
+  }
+
+  stage_queue_urls = { for stage, queue in aws_sqs_queue.stage : "${upper(stage)}_QUEUE_URL" => queue.id }
+
+  # Lambda로 소비하는 단계 (skew_correction은 Fargate 서비스가 폴링)
+  stage_consumers = {
+    detect_skew = aws_lambda_function.detect_skew.arn
+    upscale     = aws_lambda_function.upscaler.arn
+    ocr         = aws_lambda_function.process_ocr.arn
+    render_page = aws_lambda_function.pdf_generator.arn
+  }
+}
+
+resource "aws_sqs_queue" "stage" {
+  for_each = local.stage_queues
+
+  name                       = "${var.project_name}-${replace(each.key, "_", "-")}-queue"
+  visibility_timeout_seconds = each.value.visibility_timeout
+  message_retention_seconds  = 345600
+  receive_wait_time_seconds  = 20
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.dlq.arn
+    maxReceiveCount     = var.stage_max_receive_count
+  })
+
+  tags = {
+    Name        = "${var.project_name}-${replace(each.key, "_", "-")}-queue"
+    Environment = var.environment
+    Purpose     = "Page processing stage queue (${each.key})"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "stage" {
+  for_each = local.stage_consumers
+
+  event_source_arn        = aws_sqs_queue.stage[each.key].arn
+  function_name           = each.value
+  batch_size              = var.stage_batch_size[each.key]
+  function_response_types = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.stage_concurrency[each.key]
+  }
+}
+
 data "archive_file" "dlq_processor" {
   type        = "zip"
   source_dir  = "${path.module}/../workers/dlq_processor"
@@ -42,11 +97,16 @@ resource "aws_lambda_function" "dlq_processor" {
   memory_size      = 256
   filename         = data.archive_file.dlq_processor.output_path
   source_code_hash = data.archive_file.dlq_processor.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
-      SNS_TOPIC_ARN = var.sns_topic_arn
-      LOG_LEVEL     = "INFO"
+      SNS_TOPIC_ARN        = var.sns_topic_arn
+      DYNAMODB_STATE_TABLE = aws_dynamodb_table.state_tracking.name
+      LOG_LEVEL            = "INFO"
+      PROFILE_SAMPLE_RATE  = var.profile_sample_rate
+      PROFILER             = var.profiler
+      PROFILE_BUCKET       = aws_s3_bucket.temp.id
     }
   }
 
@@ -40,14 +40,179 @@ variable "output_bucket_name" {
   default     = ""
 }
 
-variable "max_batch_size" {
-  description = "동적 배치 크기의 최대값 (L40S 48GB VRAM 최적화)."
+variable "max_dispatch_pages" {
+  description = "오케스트레이터가 한 번에 단계 큐로 배정할 최대 페이지 수."
   type        = number
-  default     = 80
+  default     = 10000
 }
 
-variable "min_batch_size" {
-  description = "동적 배치 크기의 최소값 (L40S 48GB VRAM 최적화)."
+variable "scheduler_capacity" {
+  description = "모든 실행이 나눠 쓰는 동시 처리 페이지 수 (실행별 우선순위/가중치에 따라 배분)."
+  type        = number
+  default     = 200
+}
+
+variable "scheduler_stale_seconds" {
+  description = "오케스트레이터가 이 시간 동안 호출되지 않은 실행은 용량 배분에서 제외 (중단된 실행)."
+  type        = number
+  default     = 900
+}
+
+variable "stage_concurrency" {
+  description = "단계 큐 Lambda 이벤트 소스 매핑의 최대 동시 실행 수 (단계별, 예약 동시성 이하로 설정)."
+  type        = map(number)
+  default = {
+    detect_skew = 40
+    upscale     = 20
+    ocr         = 25
+    render_page = 10
+  }
+}
+
+variable "stage_batch_size" {
+  description = "단계 큐 Lambda 한 번의 호출에 전달할 최대 메시지 수 (단계별)."
+  type        = map(number)
+  default = {
+    detect_skew = 1
+    upscale     = 1
+    ocr         = 1
+    render_page = 1
+  }
+}
+
+variable "stage_max_receive_count" {
+  description = "단계 큐 메시지를 DLQ로 보내기 전 최대 수신 횟수 (단계 재시도 예산 3회보다 크게)."
+  type        = number
+  default     = 5
+}
+
+variable "skew_corrector_max_tasks" {
+  description = "기울기 보정 큐 깊이에 따라 늘릴 Fargate 작업 수의 최대값."
   type        = number
   default     = 10
 }
+
+variable "vision_rate_limit_rps" {
+  description = "Google Vision API 전역 초당 요청 한도 (모든 Lambda 공유)."
+  type        = number
+  default     = 20
+}
+
+variable "sagemaker_rate_limit_rps" {
+  description = "SageMaker 엔드포인트 전역 초당 요청 한도 (모든 Lambda 공유)."
+  type        = number
+  default     = 8
+}
+
+variable "pdf_mode" {
+  description = "기본 PDF 출력 방식 (standard | mrc). 실행 입력의 pdf_mode로 실행별 변경 가능."
+  type        = string
+  default     = "standard"
+
+  validation {
+    condition     = contains(["standard", "mrc"], var.pdf_mode)
+    error_message = "pdf_mode는 standard 또는 mrc여야 합니다."
+  }
+}
+
+variable "pdf_chunk_pages" {
+  description = "이 페이지 수를 넘는 실행은 페이지 범위별로 병렬 렌더링 후 병합 (0이면 사용 안 함)"
+  type        = number
+  default     = 100
+}
+
+variable "pdf_linearize" {
+  description = "기본으로 선형화(Fast Web View) PDF와 페이지 바이트 범위 색인 출력. 실행 입력의 linearize로 실행별 변경 가능."
+  type        = bool
+  default     = false
+}
+
+variable "pdf_output_profile" {
+  description = "PDF 이미지 출력 프로필 (screen: 150dpi, print: 300dpi, archive: 원본 유지). 실행 입력의 output_profile로 실행별 변경 가능."
+  type        = string
+  default     = "archive"
+
+  validation {
+    condition     = contains(["screen", "print", "archive"], var.pdf_output_profile)
+    error_message = "pdf_output_profile은 screen, print, archive 중 하나여야 합니다."
+  }
+}
+
+variable "vision_client" {
+  description = "Vision API 클라이언트 구현 (rest: 경량 REST 클라이언트, grpc: google-cloud-vision)"
+  type        = string
+  default     = "rest"
+
+  validation {
+    condition     = contains(["rest", "grpc"], var.vision_client)
+    error_message = "vision_client는 rest 또는 grpc여야 합니다."
+  }
+}
+
+variable "cache_ttl_seconds" {
+  description = "자격증명/API 클라이언트 캐시 신선 기간 (초, 이후 백그라운드 갱신)"
+  type        = number
+  default     = 900
+}
+
+variable "cache_stale_seconds" {
+  description = "캐시 만료 후 갱신 중 기존 값을 계속 제공하는 기간 (초)"
+  type        = number
+  default     = 3600
+}
+
+variable "completion_wait_timeout_seconds" {
+  description = "배치 완료 대기(작업 토큰) 최대 시간(초), 초과 시 오케스트레이터가 상태 테이블에서 직접 확인"
+  type        = number
+  default     = 120
+}
+
+variable "completion_retry_delay_seconds" {
+  description = "배치 완료 대기가 실패한 뒤 오케스트레이터가 다시 확인하기 전 대기 시간(초)"
+  type        = number
+  default     = 10
+}
+
+variable "hedge_budget" {
+  description = "Vision/SageMaker 헤지 요청 예산 (전체 호출 대비 추가 호출 비율 상한, 0이면 비활성)"
+  type        = number
+  default     = 0.05
+
+  validation {
+    condition     = var.hedge_budget >= 0 && var.hedge_budget <= 1
+    error_message = "hedge_budget는 0과 1 사이여야 합니다."
+  }
+}
+
+variable "hedge_quantile" {
+  description = "헤지 요청을 보낼 지연 분위수 (최근 호출 소요 시간 기준)"
+  type        = number
+  default     = 0.95
+
+  validation {
+    condition     = var.hedge_quantile > 0 && var.hedge_quantile < 1
+    error_message = "hedge_quantile은 0과 1 사이여야 합니다."
+  }
+}
+
+variable "profile_sample_rate" {
+  description = "핸들러 프로파일링 샘플 비율 (0이면 비활성, 결과는 임시 버킷 profiles/ 접두사)"
+  type        = number
+  default     = 0
+
+  validation {
+    condition     = var.profile_sample_rate >= 0 && var.profile_sample_rate <= 1
+    error_message = "profile_sample_rate는 0과 1 사이여야 합니다."
+  }
+}
+
+variable "profiler" {
+  description = "CPU 프로파일러 (cprofile: 결정적, sampling: 저오버헤드 스택 샘플링)"
+  type        = string
+  default     = "cprofile"
+
+  validation {
+    condition     = contains(["cprofile", "sampling"], var.profiler)
+    error_message = "profiler는 cprofile 또는 sampling이어야 합니다."
+  }
+}
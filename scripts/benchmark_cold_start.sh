@@ -0,0 +1,48 @@
+#!/bin/bash
+set -e
+
+# --- 로깅 함수 ---
+log_info() { echo "[정보] $1"; }
+log_warn() { echo "[경고] $1"; }
+
+ROOT_DIR=$(cd "$(dirname "$0")/.." && pwd)
+RUNS=${RUNS:-5}
+FONT_PATH=${FONT_PATH:-"$ROOT_DIR/config/NotoSansKR-Regular.ttf"}
+
+# 새 인터프리터에서 임포트 시간(ms)을 RUNS회 측정하여 중앙값 출력
+measure_import() {
+    local label=$1
+    local statement=$2
+    local result
+    result=$(PYTHONPATH="$ROOT_DIR/workers:$ROOT_DIR/workers/common:$ROOT_DIR/workers/3_finalization/pdf_generator" python - "$RUNS" "$statement" <<'EOF'
+import statistics, subprocess, sys
+runs, statement = int(sys.argv[1]), sys.argv[2]
+code = f"import time; started = time.perf_counter(); {statement}; print((time.perf_counter() - started) * 1000)"
+samples = []
+for _ in range(runs):
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        print('N/A (' + completed.stderr.strip().splitlines()[-1] + ')')
+        sys.exit(0)
+    samples.append(float(completed.stdout.strip()))
+print(f"{statistics.median(samples):.1f}ms")
+EOF
+)
+    printf "  %-40s %s\n" "$label" "$result"
+}
+
+main() {
+    log_info "콜드 스타트 임포트 시간 (중앙값, ${RUNS}회)"
+    measure_import "Vision REST 클라이언트" "import vision_client"
+    measure_import "Vision gRPC 클라이언트 (google-cloud-vision)" "from google.cloud import vision; from google.oauth2 import service_account"
+    measure_import "PDF 생성기 글꼴 서비스" "import font_cache"
+
+    if [ -f "$FONT_PATH" ]; then
+        log_info "텍스트 레이어 글꼴 벤치마크 ($FONT_PATH)"
+        python "$ROOT_DIR/workers/3_finalization/pdf_generator/font_cache.py" benchmark "$FONT_PATH"
+    else
+        log_warn "글꼴 파일이 없어 글꼴 벤치마크를 건너뜁니다: $FONT_PATH"
+    fi
+}
+
+main "$@"
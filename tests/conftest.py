@@ -0,0 +1,31 @@
+import pytest
+import boto3
+import os
+import sys
+from moto import mock_aws
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.join(os.path.dirname(__file__), '../workers'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../workers/3_finalization/pdf_generator'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../workers/1_orchestration/completion_aggregator'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+@pytest.fixture
+def state_table():
+    """moto 기반 상태 추적 테이블"""
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        table = dynamodb.create_table(
+            TableName='test-state-tracking',
+            KeySchema=[
+                {'AttributeName': 'run_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'image_key', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'run_id', 'AttributeType': 'S'},
+                {'AttributeName': 'image_key', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield table
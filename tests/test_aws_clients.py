@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from common import aws_clients
+from common.aws_clients import client_config, get_client, get_resource, reset_clients
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    reset_clients()
+    yield
+    reset_clients()
+
+class TestAwsClients:
+
+    def test_clients_are_shared_per_service_and_overrides(self):
+        s3 = get_client('s3')
+        assert get_client('s3') is s3
+        assert get_client('s3', max_pool_connections=64) is not s3
+        assert get_client('s3', max_pool_connections=64) is get_client('s3', max_pool_connections=64)
+        assert get_resource('dynamodb') is get_resource('dynamodb')
+
+    def test_service_tuning_is_applied(self):
+        config = get_client('s3').meta.config
+        assert config.max_pool_connections == aws_clients.SERVICE_CLIENT_CONFIGS['s3']['max_pool_connections']
+        assert config.tcp_keepalive is True
+        assert config.retries['mode'] == 'adaptive'
+
+        sagemaker = client_config('sagemaker-runtime')
+        assert (sagemaker.read_timeout, sagemaker.connect_timeout) == (300, 60)
+        # 설정이 없는 서비스는 기본값
+        assert client_config('sns').max_pool_connections == aws_clients.DEFAULT_CLIENT_CONFIG['max_pool_connections']
+
+    def test_concurrent_first_use_creates_one_client(self):
+        results = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            results.append(get_client('cloudwatch'))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(client) for client in results}) == 1
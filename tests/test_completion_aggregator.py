@@ -0,0 +1,134 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from common.aws_clients import reset_clients
+from common.run_progress import RunProgress, page_state
+from local_harness import LocalCompletionHarness
+
+TABLE = 'test-progress'
+RUN_ID = 'run-1'
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        reset_clients()
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        table = dynamodb.create_table(
+            TableName=TABLE,
+            KeySchema=[
+                {'AttributeName': 'run_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'image_key', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'run_id', 'AttributeType': 'S'},
+                {'AttributeName': 'image_key', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST',
+            StreamSpecification={'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
+        )
+        table.put_item(Item={'run_id': RUN_ID, 'image_key': 'workflow_status', 'job_status': 'INITIALIZED',
+                             'total_images': 3, 'skipped_images': 1})
+        for name, is_cover in (('001.jpg', False), ('002.jpg', False), ('z.jpg', True)):
+            table.put_item(Item={'run_id': RUN_ID, 'image_key': name, 'job_status': 'INITIALIZED',
+                                 'is_cover': is_cover, 'stages': {}})
+        yield table
+    reset_clients()
+
+def set_page(table, image_key, status, stage=None):
+    expression = 'SET job_status = :status'
+    values = {':status': status}
+    if stage:
+        expression += ', stages.#stage = :record'
+        values[':record'] = {'status': 'COMPLETED'}
+    kwargs = {'ExpressionAttributeNames': {'#stage': stage}} if stage else {}
+    table.update_item(Key={'run_id': RUN_ID, 'image_key': image_key}, UpdateExpression=expression,
+                      ExpressionAttributeValues=values, **kwargs)
+
+def counters(table):
+    item = table.get_item(Key={'run_id': RUN_ID, 'image_key': 'workflow_status'})['Item']
+    return tuple(int(item.get(field, 0)) for field in ('pages_done', 'pages_failed', 'pages_in_flight')), item
+
+class TestCompletionAggregator:
+
+    def test_page_state_only_counts_final_stage_as_done(self):
+        page = {'run_id': RUN_ID, 'image_key': 'a.jpg', 'job_status': 'COMPLETED',
+                'stages': {'detect_skew': {'status': 'COMPLETED'}}}
+        assert page_state(page) == (0, 0, 1)
+        page['stages']['ocr'] = {'status': 'COMPLETED'}
+        assert page_state(page) == (1, 0, 0)
+        assert page_state({**page, 'reused_page_index': 3, 'stages': {}}) == (1, 0, 0)
+        assert page_state({**page, 'is_cover': True}) == (0, 0, 0)
+        # 단계 큐가 다시 전달할 페이지는 처리 중으로 유지
+        assert page_state({**page, 'job_status': 'FAILED_RETRYABLE', 'stages': {}}) == (0, 0, 1)
+        assert page_state({'run_id': RUN_ID, 'image_key': 'workflow_status', 'job_status': 'COMPLETED'}) == (0, 0, 0)
+
+    def test_waiter_resumed_by_stream_when_last_page_finishes(self, table):
+        harness = LocalCompletionHarness(TABLE)
+        for name in ('001.jpg', '002.jpg', 'z.jpg'):
+            set_page(table, name, 'PROCESSING')
+        harness.pump_once()
+        assert harness.wait(RUN_ID, 'token-1', batch_size=2) == {'run_id': RUN_ID, 'resolved': False}
+
+        set_page(table, '001.jpg', 'COMPLETED', stage='detect_skew')
+        set_page(table, '001.jpg', 'PROCESSING')
+        set_page(table, '001.jpg', 'COMPLETED', stage='ocr')
+        harness.pump_once()
+        assert harness.result('token-1') is None
+        assert counters(table)[0] == (1, 0, 1)
+
+        set_page(table, '002.jpg', 'COMPLETED', stage='ocr')
+        harness.pump_once()
+        result = harness.result('token-1')
+        assert result['is_work_done'] is True
+        assert (result['pages_done'], result['pages_expected'], result['pages_in_flight']) == (2, 2, 0)
+        assert 'completion_token' not in counters(table)[1]
+
+    def test_progress_callback_reports_pages_in_flight(self, table):
+        reported = []
+        harness = LocalCompletionHarness(TABLE)
+        harness.progress = RunProgress(TABLE, sfn_client=harness.sfn,
+                                       on_progress=lambda run_id, item: reported.append(int(item['pages_in_flight'])))
+        set_page(table, '001.jpg', 'PROCESSING')
+        harness.pump_once()
+        set_page(table, '002.jpg', 'PROCESSING')
+        set_page(table, '001.jpg', 'COMPLETED', stage='ocr')
+        harness.pump_once()
+        # 한 배치 안의 같은 실행 레코드는 한 번에 반영
+        assert reported == [1, 1]
+
+    def test_waiter_resolved_immediately_when_batch_already_settled(self, table):
+        harness = LocalCompletionHarness(TABLE)
+        set_page(table, '001.jpg', 'PROCESSING')
+        set_page(table, '001.jpg', 'FAILED_PERMANENT')
+        set_page(table, '002.jpg', 'PROCESSING')
+        set_page(table, '002.jpg', 'FAILED')
+        harness.pump_once()
+
+        assert harness.wait(RUN_ID, 'token-2', batch_size=2)['resolved'] is True
+        result = harness.result('token-2')
+        assert (result['is_work_done'], result['pages_failed'], result['pages_in_flight']) == (False, 1, 0)
+        # 빈 배치 뒤에는 완료 전까지 재개하지 않음
+        assert harness.wait(RUN_ID, 'token-3', batch_size=0)['resolved'] is False
+
+    def test_failed_segment_redelivered_without_double_counting(self, table, monkeypatch):
+        harness = LocalCompletionHarness(TABLE)
+        other = 'run-2'
+        table.put_item(Item={'run_id': other, 'image_key': 'workflow_status', 'total_images': 1, 'skipped_images': 0})
+        set_page(table, '001.jpg', 'PROCESSING')
+        table.put_item(Item={'run_id': other, 'image_key': '001.jpg', 'job_status': 'PROCESSING'})
+
+        original = RunProgress.apply
+        calls = []
+        def flaky_apply(self, run_id, deltas):
+            calls.append(run_id)
+            if run_id == other and calls.count(other) == 1:
+                raise RuntimeError('throttled')
+            return original(self, run_id, deltas)
+        monkeypatch.setattr(RunProgress, 'apply', flaky_apply)
+
+        harness.pump_once()
+        assert counters(table)[0] == (0, 0, 1)
+        other_item = table.get_item(Key={'run_id': other, 'image_key': 'workflow_status'})['Item']
+        assert int(other_item['pages_in_flight']) == 1
+        assert calls == [RUN_ID, other, other]
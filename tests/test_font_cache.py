@@ -0,0 +1,92 @@
+import os
+import re
+import zlib
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+import font_cache
+from font_cache import BookFont, FontMetrics, load_font_metrics
+from pdf_objects import PdfReader, StreamingPdfWriter
+from test_pdf_objects import make_pdf
+from text_layer import invisible_text_layer
+
+FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+pytestmark = pytest.mark.skipif(not os.path.exists(FONT_PATH), reason="테스트 폰트 없음")
+
+def text_page(metrics, words):
+    layer = invisible_text_layer(
+        words, np.array([[10, 10 + 12 * i, 30, 20 + 12 * i] for i in range(len(words))]), metrics, 40, 60, 40, 60
+    )
+    return PdfReader(make_pdf(['white'])), layer
+
+def write_book(metrics, pages):
+    buffer = BytesIO()
+    writer = StreamingPdfWriter(buffer, text_font=BookFont(metrics))
+    for words in pages:
+        reader, layer = text_page(metrics, words)
+        writer.add_pages(reader, text_layer=layer)
+    writer.close()
+    return buffer.getvalue(), writer
+
+def font_objects(data):
+    reader = PdfReader(data)
+    return [num for num in reader.offsets if num and b'/BookScanFont' in reader.object_dict(num)]
+
+class TestFontCache:
+
+    def test_cache_round_trip_and_tmp_reuse(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(font_cache, 'FONT_CACHE_DIR', str(tmp_path))
+        monkeypatch.setattr(font_cache, '_metrics_cache', {})
+
+        parsed = load_font_metrics(FONT_PATH)
+        assert parsed.source == 'parsed'
+        assert list(tmp_path.glob('*' + font_cache.CACHE_EXTENSION))
+
+        monkeypatch.setattr(font_cache, '_metrics_cache', {})
+        cached = load_font_metrics(FONT_PATH)
+        assert cached.source == 'tmp'
+        codepoints = np.array([ord(c) for c in 'Ab가\u0000'])
+        for left, right in zip(parsed.lookup(codepoints), cached.lookup(codepoints)):
+            assert np.array_equal(left, right)
+
+    def test_missing_glyph_maps_to_notdef(self):
+        metrics = FontMetrics.parse(FONT_PATH)
+        glyph_ids, widths = metrics.lookup(np.array([ord('A'), 0x10FFFF]))
+        assert glyph_ids[0] > 0 and glyph_ids[1] == 0
+        assert widths[1] == metrics.missing_width
+
+    def test_book_embeds_one_subset_font(self):
+        metrics = FontMetrics.parse(FONT_PATH)
+        data, writer = write_book(metrics, [['hello'], ['world'], ['hello']])
+
+        reader = PdfReader(data)
+        assert len(reader.page_refs()) == 3
+        fonts = font_objects(data)
+        assert len(fonts) == 1
+        assert data.count(b'/FontFile2') == 1
+        chars = re.search(rb'/BookScanChars <([0-9A-F]*)>', reader.object_dict(fonts[0])).group(1)
+        assert font_cache.decode_codepoints(chars) == sorted(set(map(ord, 'helloworld')))
+
+        descriptor = re.search(rb'/FontFile2 (\d+) 0 R', data).group(1)
+        subset = zlib.decompress(reader.split_object(int(descriptor))[1])
+        assert len(subset) < os.path.getsize(FONT_PATH) / 5
+        assert writer.text_font.stats['glyphs'] == len(set('helloworld'))
+
+    def test_merging_books_adopts_existing_fonts(self):
+        metrics = FontMetrics.parse(FONT_PATH)
+        first, _ = write_book(metrics, [['abc']])
+        second, _ = write_book(metrics, [['xyz']])
+
+        buffer = BytesIO()
+        writer = StreamingPdfWriter(buffer, text_font=BookFont(metrics))
+        writer.add_pages(PdfReader(first))
+        writer.add_pages(PdfReader(second))
+        writer.close()
+
+        merged = buffer.getvalue()
+        assert len(font_objects(merged)) == 1
+        assert merged.count(b'/FontFile2') == 1
+        assert writer.text_font.codepoints == set(map(ord, 'abcxyz'))
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from common.hedging import HedgedCaller, LatencyTracker
+from common.rate_limiter import DistributedRateLimiter
+
+class Recorder:
+    """발행된 헤지 메트릭 기록"""
+
+    def __init__(self):
+        self.published = []
+        self.event = threading.Event()
+
+    def __call__(self, name, metrics):
+        self.published.append((name, {metric['MetricName']: metric['Value'] for metric in metrics}))
+        self.event.set()
+
+class SlowFirst:
+    """첫 호출은 release될 때까지 멈추고 이후 호출은 바로 응답"""
+
+    def __init__(self, fail_first=False, fail_rest=False):
+        self.calls = 0
+        self.release = threading.Event()
+        self.fail_first = fail_first
+        self.fail_rest = fail_rest
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            self.release.wait(5)
+            if self.fail_first:
+                raise RuntimeError("원 요청 실패")
+            return f"primary:{value}"
+        if self.fail_rest:
+            raise RuntimeError("헤지 요청 실패")
+        return f"hedge:{value}"
+
+def warmed_caller(budget=0.5, samples=4, admit=None):
+    recorder = Recorder()
+    caller = HedgedCaller('test', budget=budget, min_samples=samples, admit=admit, publish=recorder)
+    for _ in range(samples):
+        caller.call(lambda: None)
+    return caller, recorder
+
+class TestHedging:
+
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(window=100, quantile=0.95, min_samples=5)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.record(seconds)
+        assert tracker.percentile() is None
+        for i in range(96):
+            tracker.record(1.0 + i)
+        assert tracker.percentile() == pytest.approx(92.0)
+
+    def test_slow_call_is_hedged_and_saving_reported(self):
+        caller, recorder = warmed_caller()
+        slow = SlowFirst()
+
+        assert caller.call(slow, 'x') == 'hedge:x'
+        assert slow.calls == 2
+        # 절약 시간은 원 요청이 끝난 뒤에 기록
+        assert recorder.published == []
+        slow.release.set()
+        assert recorder.event.wait(5)
+
+        name, metrics = recorder.published[0]
+        assert name == 'test'
+        assert metrics['HedgedRequests'] == 1 and metrics['HedgeWins'] == 1
+        assert metrics['HedgeLatencySaved'] > 0
+        stats = caller.stats()
+        assert stats['hedges'] == 1 and stats['hedge_wins'] == 1
+        assert stats['hedge_rate'] == pytest.approx(1 / 5)
+
+    def test_budget_limits_extra_calls(self):
+        caller, _ = warmed_caller(budget=0.05, samples=19)
+        first, second = SlowFirst(), SlowFirst()
+
+        # 20번째 호출에서 토큰 1개가 적립되어 헤지, 다음 느린 호출은 예산 부족으로 원 요청만 기다림
+        assert caller.call(first, 'a') == 'hedge:a'
+        threading.Timer(0.05, second.release.set).start()
+        assert caller.call(second, 'b') == 'primary:b'
+        assert second.calls == 1
+        first.release.set()
+        assert caller.stats()['hedges'] == 1
+
+    def test_hedge_is_not_sent_once_rate_limit_is_exhausted(self, state_table):
+        limiter = DistributedRateLimiter('test-state-tracking', buckets={'vision': (0.001, 1.0)}, lease_size=1)
+        caller, recorder = warmed_caller(admit=lambda: limiter.try_acquire('vision'))
+        first, second = SlowFirst(), SlowFirst()
+
+        # 요청 한도 토큰 1개로 첫 헤지만 전송, 두 번째는 헤지 예산이 남아도 원 요청만 기다림
+        assert caller.call(first, 'a') == 'hedge:a'
+        threading.Timer(0.05, second.release.set).start()
+        assert caller.call(second, 'b') == 'primary:b'
+        assert second.calls == 1
+        first.release.set()
+
+        stats = caller.stats()
+        assert stats['hedges'] == 1 and stats['hedges_skipped'] == 1
+        assert ('test', {'HedgeSkipped': 1}) in recorder.published
+
+    def test_failures_fall_back_to_other_request(self):
+        caller, _ = warmed_caller()
+        slow = SlowFirst(fail_rest=True)
+        threading.Timer(0.05, slow.release.set).start()
+        assert caller.call(slow, 'x') == 'primary:x'
+
+        caller, _ = warmed_caller()
+        slow = SlowFirst(fail_first=True, fail_rest=True)
+        threading.Timer(0.05, slow.release.set).start()
+        with pytest.raises(RuntimeError, match="헤지 요청 실패"):
+            caller.call(slow, 'x')
+
+    def test_zero_budget_calls_directly(self):
+        caller, recorder = warmed_caller(budget=0)
+        assert caller.hedge_delay() is None
+        assert caller.call(lambda value: value * 2, 21) == 42
+        assert caller.stats()['hedges'] == 0 and recorder.published == []
@@ -0,0 +1,65 @@
+import re
+from io import BytesIO
+
+from pdf_objects import PdfReader, StreamingPdfWriter
+from linearize import linearize
+
+from test_pdf_objects import make_pdf, page_image
+
+def merged_document(outline=None):
+    """청크 병합 결과와 같은 구조 (여러 페이지 조각 + 목차 + 문서 정보)"""
+    sink = BytesIO()
+    writer = StreamingPdfWriter(sink)
+    for colors in (['red', 'green', 'blue'], ['white'], ['yellow', 'black']):
+        writer.add_pages(PdfReader(make_pdf(colors)))
+    writer.close(info={'Title': '테스트 책'}, outline=outline)
+    return PdfReader(sink.getvalue())
+
+def linearization_dict(data):
+    match = re.search(rb'<< /Linearized 1 (.*?)>>', data[:1024], re.S)
+    values = dict(re.findall(rb'/([A-Z]) (\d+)', match.group(1)))
+    hint = re.search(rb'/H \[(\d+) (\d+)\]', match.group(1))
+    return {key.decode(): int(value) for key, value in values.items()}, (int(hint.group(1)), int(hint.group(2)))
+
+class TestLinearize:
+
+    def test_output_is_readable_and_keeps_streams(self):
+        source = merged_document()
+        sink = BytesIO()
+        linearize(source, sink)
+
+        reader = PdfReader(sink.getvalue())
+        assert len(reader.page_refs()) == 6
+        for index in range(6):
+            assert page_image(reader, index) == page_image(source, index)
+
+    def test_linearization_parameters_match_layout(self):
+        sink = BytesIO()
+        index = linearize(merged_document(outline=[('처음', 0), ('끝', 5)]), sink)
+        data = sink.getvalue()
+        params, (hint_offset, hint_length) = linearization_dict(data)
+
+        assert params['L'] == len(data) == index['file_length']
+        assert params['N'] == 6
+        assert params['E'] == index['first_page_end']
+        assert re.match(rb'\d+ 0 obj\n<<\n/S \d+', data[hint_offset:])
+        assert data[hint_offset + hint_length - 7:hint_offset + hint_length] == b'endobj\n'
+        # /T 는 주 xref 첫 항목 바로 앞의 공백 문자
+        assert data[params['T']:params['T'] + 21] == b'\n0000000000 65535 f \n'
+        assert data.startswith(b'%d 0 obj' % params['O'], index['pages'][0]['start'])
+
+    def test_page_index_ranges_are_contiguous(self):
+        sink = BytesIO()
+        index = linearize(merged_document(), sink)
+        data = sink.getvalue()
+
+        pages = index['pages']
+        assert [page['page_index'] for page in pages] == list(range(6))
+        for previous, page in zip(pages, pages[1:]):
+            assert previous['end'] <= page['start']
+        for page in pages:
+            num, offset, length = page['objects'][0]
+            assert num == page['object']
+            assert offset == page['start']
+            assert data[offset:offset + length].startswith(b'%d 0 obj' % num)
+            assert data[offset:offset + length].endswith(b'endobj\n')
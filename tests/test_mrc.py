@@ -0,0 +1,76 @@
+import re
+from io import BytesIO
+
+from fpdf import FPDF
+from PIL import Image, ImageDraw
+
+from mrc import encode_mrc_page, mrc_underlay, otsu_threshold, text_mask
+from pdf_objects import PdfReader, StreamingPdfWriter
+
+def make_text_page(width=1200, height=1600):
+    """밝은 종이 위 어두운 글자 줄을 흉내낸 페이지"""
+    image = Image.new('RGB', (width, height), (245, 240, 230))
+    draw = ImageDraw.Draw(image)
+    for y in range(100, height - 100, 40):
+        for x in range(100, width - 200, 120):
+            draw.rectangle([x, y, x + 80, y + 18], fill=(20, 20, 30))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+class TestMrc:
+
+    def test_otsu_separates_bimodal_histogram(self):
+        image = Image.new('L', (100, 100), 230)
+        image.paste(20, (0, 0, 50, 100))
+        threshold = otsu_threshold(image)
+        assert 20 <= threshold < 230
+
+    def test_bilevel_page_mask_covers_dark_pixels(self):
+        # 이진화된 스캔은 어두운 픽셀이 모두 임계값과 같은 값
+        for dark, light, mode in ((0, 255, '1'), (10, 236, 'L')):
+            image = Image.new('L', (120, 80), light)
+            image.paste(dark, (10, 10, 60, 40))
+            gray = image.convert(mode).convert('L')
+            mask = text_mask(gray, otsu_threshold(gray))
+            assert mask.convert('L').histogram()[255] == 50 * 30
+            assert mask.getbbox() == (10, 10, 60, 40)
+
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        assert encode_mrc_page(buffer.getvalue())['foreground_color'] == (10, 10, 10)
+
+    def test_encode_compresses_text_page(self):
+        img_data = make_text_page()
+        layers = encode_mrc_page(img_data)
+
+        assert (layers['width'], layers['height']) == (1200, 1600)
+        assert layers['stats']['compression_ratio'] > 5
+        assert layers['stats']['encode_ms'] > 0
+        assert max(layers['foreground_color']) < 80
+        # 배경은 축소 해상도, 마스크는 전체 해상도
+        assert layers['background_size'][0] < layers['width']
+
+    def test_underlay_is_drawn_beneath_text_layer(self):
+        layers = encode_mrc_page(make_text_page(400, 600))
+        pdf = FPDF(unit='pt')
+        pdf.add_page(format=(400, 600))
+        page = PdfReader(bytes(pdf.output()))
+
+        sink = BytesIO()
+        writer = StreamingPdfWriter(sink)
+        writer.add_pages(page, underlay=mrc_underlay(layers, 400, 600))
+        writer.close()
+
+        reader = PdfReader(sink.getvalue())
+        page_dict = reader.object_dict(reader.page_refs()[0])
+        contents = re.search(rb'/Contents \[(\d+) 0 R (\d+) 0 R\]', page_dict)
+        assert contents
+        underlay_dict, underlay_stream = reader.split_object(int(contents.group(1)))
+        assert b'/MrcBg Do' in underlay_stream and b'/MrcFg Do' in underlay_stream
+
+        resources = reader.object_dict(int(re.search(rb'/Resources (\d+) 0 R', page_dict).group(1)))
+        mask_num = int(re.search(rb'/MrcFg (\d+) 0 R', resources).group(1))
+        mask_dict, mask_stream = reader.split_object(mask_num)
+        assert b'/ImageMask true' in mask_dict and b'/CCITTFaxDecode' in mask_dict
+        assert mask_stream == layers['mask_g4']
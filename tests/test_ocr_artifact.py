@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+
+from common.ocr_artifact import columns_from_annotation, encode_ocr_artifact, decode_ocr_artifact
+
+def vision_word(text, x0, y0, x1, y1, confidence=0.9, break_type=None):
+    symbols = [{'text': c, 'confidence': confidence, 'property': {}} for c in text]
+    if break_type:
+        symbols[-1]['property'] = {'detectedBreak': {'type': break_type}}
+    return {
+        'boundingBox': {'vertices': [{'x': x0, 'y': y0}, {'x': x1, 'y': y0}, {'x': x1, 'y': y1}, {'x': x0, 'y': y1}]},
+        'symbols': symbols,
+        'confidence': confidence
+    }
+
+def vision_response(blocks, width=1000, height=1400):
+    return {'fullTextAnnotation': {'pages': [{'width': width, 'height': height, 'blocks': blocks}]}}
+
+class TestOcrArtifact:
+
+    def test_columns_track_lines_and_blocks(self):
+        response = vision_response([
+            {'paragraphs': [{'words': [
+                vision_word('첫', 10, 10, 30, 30, break_type='SPACE'),
+                vision_word('줄', 40, 10, 60, 30, break_type='LINE_BREAK'),
+                vision_word('둘째', 10, 40, 60, 60)
+            ]}]},
+            {'paragraphs': [{'words': [vision_word('블록', 10, 100, 60, 120)]}]}
+        ])
+
+        columns = columns_from_annotation(response)
+
+        assert columns['text'] == ['첫', '줄', '둘째', '블록']
+        assert columns['line_id'].tolist()[0] == columns['line_id'].tolist()[1]
+        assert len(set(columns['line_id'].tolist())) == 3
+        assert columns['block_id'].tolist() == [0, 0, 0, 1]
+        assert columns['boxes'][2].tolist() == [10, 40, 60, 60]
+        assert (columns['width'], columns['height']) == (1000, 1400)
+
+    def test_missing_zero_coordinates_default_to_zero(self):
+        word = vision_word('가', 0, 0, 40, 10)
+        word['boundingBox']['vertices'] = [{}, {'x': 40}, {'x': 40, 'y': 10}, {'y': 10}]
+
+        columns = columns_from_annotation(vision_response([{'paragraphs': [{'words': [word]}]}]))
+
+        assert columns['boxes'][0].tolist() == [0, 0, 40, 10]
+
+    def test_round_trip_and_size(self):
+        words = [
+            vision_word(f'단어{i}', i % 20 * 50, i // 20 * 40, i % 20 * 50 + 45, i // 20 * 40 + 30, break_type='SPACE')
+            for i in range(600)
+        ]
+        response = vision_response([{'paragraphs': [{'words': words}]}])
+        columns = columns_from_annotation(response)
+
+        data = encode_ocr_artifact(columns)
+        decoded = decode_ocr_artifact(data)
+
+        assert decoded['text'] == columns['text']
+        assert np.array_equal(decoded['boxes'], columns['boxes'])
+        assert np.allclose(decoded['confidence'], columns['confidence'])
+        assert len(data) * 10 < len(json.dumps(response).encode('utf-8'))
+
+    def test_empty_response(self):
+        columns = columns_from_annotation({})
+        decoded = decode_ocr_artifact(encode_ocr_artifact(columns))
+
+        assert decoded['text'] == []
+        assert decoded['boxes'].shape == (0, 4)
+
@@ -0,0 +1,112 @@
+import re
+import pytest
+from io import BytesIO
+
+from fpdf import FPDF
+from PIL import Image
+
+from pdf_objects import PdfReader, PdfObjectError, StreamingPdfWriter, incremental_update
+
+def make_pdf(colors):
+    pdf = FPDF(unit='pt')
+    for color in colors:
+        buffer = BytesIO()
+        Image.new('RGB', (40, 60), color).save(buffer, 'JPEG')
+        pdf.add_page(format=(40, 60))
+        pdf.image(BytesIO(buffer.getvalue()), x=0, y=0, w=40, h=60)
+    return bytes(pdf.output())
+
+def page_image(reader, page_index):
+    """페이지의 이미지 XObject 스트림 (페이지 식별용)"""
+    page = reader.object_dict(reader.page_refs()[page_index])
+    resources = reader.object_dict(int(re.search(rb'/Resources (\d+) 0 R', page).group(1)))
+    image = int(re.search(rb'/XObject <</I\d+ (\d+) 0 R', resources).group(1))
+    return reader.split_object(image)[1]
+
+class TestPdfObjects:
+
+    def test_reads_page_tree(self):
+        reader = PdfReader(make_pdf(['red', 'green', 'blue']))
+        assert len(reader.page_refs()) == 3
+
+    def test_incremental_update_replaces_and_appends_pages(self):
+        base_bytes = make_pdf(['red', 'green', 'blue'])
+        base = PdfReader(base_bytes)
+        fragment = PdfReader(make_pdf(['yellow', 'white']))
+
+        updated = incremental_update(base, [
+            ('base', None, 0),
+            ('fragment', fragment, 0),
+            ('base', None, 2),
+            ('fragment', fragment, 1)
+        ])
+
+        # 기존 바이트는 변경 없이 앞부분에 유지
+        assert updated.startswith(base_bytes)
+        reader = PdfReader(updated)
+        pages = reader.page_refs()
+        assert len(pages) == 4
+        assert pages[0] == base.page_refs()[0]
+        assert pages[2] == base.page_refs()[2]
+        for page in pages:
+            assert reader.page_parent(page) == reader.pages_root
+        assert page_image(reader, 1) == page_image(fragment, 0)
+        assert page_image(reader, 3) == page_image(fragment, 1)
+
+    def test_update_chain_is_readable(self):
+        base = PdfReader(make_pdf(['red', 'green']))
+        first = PdfReader(incremental_update(base, [('base', None, 1)]))
+        fragment = PdfReader(make_pdf(['blue']))
+        second = PdfReader(incremental_update(first, [('fragment', fragment, 0), ('base', None, 0)]))
+
+        assert len(second.page_refs()) == 2
+        assert second.page_refs()[1] == base.page_refs()[1]
+
+    def test_rejects_non_pdf(self):
+        with pytest.raises(PdfObjectError):
+            PdfReader(b'not a pdf')
+
+    def test_streaming_writer_emits_readable_document(self):
+        sink = BytesIO()
+        writer = StreamingPdfWriter(sink)
+        for color in ['red', 'green', 'blue']:
+            writer.add_pages(PdfReader(make_pdf([color])))
+        total = writer.close(info={'Title': '테스트 책'})
+
+        data = sink.getvalue()
+        assert total == len(data)
+        reader = PdfReader(data)
+        assert len(reader.page_refs()) == 3
+        assert b'/Info' in reader.trailer
+        for page in reader.page_refs():
+            assert reader.page_parent(page) == reader.pages_root
+
+    def test_merging_chunks_keeps_streams_and_adds_outline(self):
+        chunks = []
+        for colors in (['red', 'green'], ['blue', 'yellow'], ['white']):
+            buffer = BytesIO()
+            writer = StreamingPdfWriter(buffer)
+            for color in colors:
+                writer.add_pages(PdfReader(make_pdf([color])))
+            writer.close()
+            chunks.append(PdfReader(buffer.getvalue()))
+
+        sink = BytesIO()
+        merged = StreamingPdfWriter(sink)
+        outline = []
+        for index, chunk in enumerate(chunks):
+            outline.append((f"청크 {index}", merged.page_count))
+            merged.add_pages(chunk)
+        merged.close(info={'Title': 'run'}, outline=outline)
+
+        reader = PdfReader(sink.getvalue())
+        assert len(reader.page_refs()) == 5
+        # 이미지 스트림은 재인코딩 없이 그대로 복사
+        assert page_image(reader, 2) == page_image(chunks[1], 0)
+        assert page_image(reader, 4) == page_image(chunks[2], 0)
+
+        catalog = reader.object_dict(reader.root)
+        outlines = reader.object_dict(int(re.search(rb'/Outlines (\d+) 0 R', catalog).group(1)))
+        assert b'/Count 3' in outlines
+        last = reader.object_dict(int(re.search(rb'/Last (\d+) 0 R', outlines).group(1)))
+        assert b'/Dest [%d 0 R /Fit]' % reader.page_refs()[4] in last
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from prefetch import prefetch
+
+class TestPrefetch:
+
+    def test_preserves_order_with_concurrent_fetches(self):
+        def fetch(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 10
+
+        results = list(prefetch(range(5), fetch, depth=3))
+
+        assert results == [(i, i * 10) for i in range(5)]
+
+    def test_in_flight_requests_are_bounded(self):
+        lock = threading.Lock()
+        state = {'started': 0, 'consumed': 0, 'max_ahead': 0}
+
+        def fetch(item):
+            with lock:
+                state['started'] += 1
+                state['max_ahead'] = max(state['max_ahead'], state['started'] - state['consumed'])
+            return item
+
+        for _ in prefetch(range(20), fetch, depth=4):
+            time.sleep(0.002)
+            with lock:
+                state['consumed'] += 1
+
+        # 미리 요청한 depth개 + 현재 소비 중인 1개
+        assert state['max_ahead'] <= 5
+
+    def test_fetch_error_is_raised_at_item(self):
+        def fetch(item):
+            if item == 2:
+                raise ValueError("누락")
+            return item
+
+        seen = []
+        with pytest.raises(ValueError):
+            for item, _ in prefetch(range(5), fetch, depth=2):
+                seen.append(item)
+
+        assert seen == [0, 1]
@@ -0,0 +1,71 @@
+import marshal
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from common import profiling
+from common.aws_clients import reset_clients
+from common.profiling import profiled
+
+def busy_handler(event, context):
+    blocks = [bytearray(64 * 1024) for _ in range(16)]
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return len(blocks)
+
+class FakeContext:
+    aws_request_id = 'req-1'
+
+@pytest.fixture
+def profile_bucket(monkeypatch):
+    with mock_aws():
+        reset_clients()
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='temp')
+        monkeypatch.setenv('PROFILE_BUCKET', 'temp')
+        yield s3
+    reset_clients()
+
+def written(s3):
+    return {
+        obj['Key']: s3.get_object(Bucket='temp', Key=obj['Key'])['Body'].read()
+        for obj in s3.list_objects_v2(Bucket='temp').get('Contents', [])
+    }
+
+class TestProfiling:
+
+    def test_disabled_by_default(self, profile_bucket, monkeypatch):
+        monkeypatch.delenv('PROFILE_SAMPLE_RATE', raising=False)
+        assert profiled('ocr')(busy_handler)({'run_id': 'r1'}, FakeContext()) == 16
+        assert written(profile_bucket) == {}
+
+    def test_cprofile_and_memory_reports(self, profile_bucket, monkeypatch):
+        monkeypatch.setenv('PROFILE_SAMPLE_RATE', '1')
+        monkeypatch.setenv('PROFILER', 'cprofile')
+
+        assert profiled('ocr')(busy_handler)({'run_id': 'r1'}, FakeContext()) == 16
+
+        reports = written(profile_bucket)
+        assert all(key.startswith('profiles/r1/ocr/') and '-req-1.' in key for key in reports)
+        by_extension = {key.split('.', 1)[1]: body for key, body in reports.items()}
+        assert set(by_extension) == {'prof', 'txt', 'memory.txt'}
+        stats = marshal.loads(by_extension['prof'])
+        assert any(function[2] == 'busy_handler' for function in stats)
+        peak = int(by_extension['memory.txt'].decode().split('peak_traced_bytes: ')[1].split()[0])
+        assert peak >= 16 * 64 * 1024
+
+    def test_sampling_profiler_collapses_stacks(self, profile_bucket, monkeypatch):
+        monkeypatch.setenv('PROFILE_SAMPLE_RATE', '1')
+        monkeypatch.setenv('PROFILER', 'sampling')
+        monkeypatch.setenv('RUN_ID', 'fargate-run')
+
+        profiled('skew_correction')(lambda: busy_handler({}, None))()
+
+        reports = written(profile_bucket)
+        collapsed = next(body for key, body in reports.items() if key.endswith('.collapsed')).decode()
+        assert next(iter(reports)).startswith('profiles/fargate-run/skew_correction/')
+        assert 'busy_handler' in collapsed
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed.splitlines())
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from common.rate_limiter import (
+    DistributedRateLimiter,
+    RateLimitExceededError,
+    RATE_LIMITER_PARTITION
+)
+
+class TestDistributedRateLimiter:
+
+    def test_lease_batching_amortizes_round_trips(self, state_table):
+        limiter = DistributedRateLimiter(
+            'test-state-tracking',
+            buckets={'vision': (0.001, 100.0)},
+            lease_size=10
+        )
+
+        for _ in range(30):
+            limiter.acquire('vision')
+
+        # 첫 임대는 생성(get+put) 포함, 이후 임대당 get+update 2회
+        assert limiter.round_trips < 30
+        item = state_table.get_item(
+            Key={'run_id': RATE_LIMITER_PARTITION, 'image_key': 'vision'}
+        )['Item']
+        assert float(item['tokens']) <= 70
+
+    def test_buckets_are_shared_between_limiters(self, state_table):
+        first = DistributedRateLimiter('test-state-tracking', buckets={'vision': (0.001, 5.0)}, lease_size=5)
+        second = DistributedRateLimiter('test-state-tracking', buckets={'vision': (0.001, 5.0)}, lease_size=5, max_wait=0.01)
+
+        first.acquire('vision')
+
+        with pytest.raises(RateLimitExceededError):
+            second.acquire('vision')
+
+    def test_dependencies_have_independent_buckets(self, state_table):
+        limiter = DistributedRateLimiter(
+            'test-state-tracking',
+            buckets={'vision': (0.001, 1.0), 'sagemaker': (0.001, 1.0)},
+            lease_size=1,
+            max_wait=0.01
+        )
+
+        limiter.acquire('vision')
+        limiter.acquire('sagemaker')
+
+        with pytest.raises(RateLimitExceededError):
+            limiter.acquire('vision')
+
+    def test_try_acquire_does_not_wait(self, state_table):
+        limiter = DistributedRateLimiter(
+            'test-state-tracking',
+            buckets={'vision': (0.001, 2.0)},
+            lease_size=1,
+            max_wait=5.0
+        )
+
+        assert limiter.try_acquire('vision')
+        assert limiter.try_acquire('vision')
+        assert not limiter.try_acquire('vision')
+
+    def test_waiting_for_one_bucket_does_not_block_others(self, state_table):
+        limiter = DistributedRateLimiter(
+            'test-state-tracking',
+            buckets={'vision': (0.001, 5.0), 'sagemaker': (2.0, 1.0)},
+            lease_size=1,
+            max_wait=5.0
+        )
+        limiter.acquire('sagemaker')
+        # 빈 sagemaker 버킷 보충(약 0.5초)을 기다리는 스레드
+        waiter = threading.Thread(target=limiter.acquire, args=('sagemaker',))
+        waiter.start()
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        limiter.acquire('vision')
+        assert limiter.try_acquire('vision')
+        assert not limiter.try_acquire('sagemaker')
+        assert time.monotonic() - started < 0.3
+        assert waiter.is_alive()
+        waiter.join()
+
+    def test_expired_lease_is_not_used(self, state_table):
+        limiter = DistributedRateLimiter(
+            'test-state-tracking',
+            buckets={'vision': (0.001, 2.0)},
+            lease_size=2,
+            lease_ttl=0.0,
+            max_wait=0.01
+        )
+
+        limiter.acquire('vision')
+
+        with pytest.raises(RateLimitExceededError):
+            limiter.acquire('vision')
+
+    def test_unknown_dependency_rejected(self, state_table):
+        limiter = DistributedRateLimiter('test-state-tracking', buckets={'vision': (1.0, 1.0)})
+
+        with pytest.raises(ValueError):
+            limiter.acquire('unknown')
@@ -0,0 +1,49 @@
+from io import BytesIO
+
+from PIL import Image
+
+from resample import prepare_page_image, source_dpi
+
+def make_scan(width=2400, height=3600, dpi=None, fmt='JPEG'):
+    image = Image.new('RGB', (width, height), (240, 236, 228))
+    buffer = BytesIO()
+    if dpi:
+        image.save(buffer, fmt, dpi=(dpi, dpi))
+    else:
+        image.save(buffer, fmt)
+    return buffer.getvalue()
+
+class TestResample:
+
+    def test_page_size_follows_physical_dimensions(self):
+        # 1200dpi 업스케일 이미지 2400x3600 = 2x3 인치
+        prepared = prepare_page_image(make_scan(dpi=1200), 'archive', 300)
+        assert prepared['page_size'] == (144.0, 216.0)
+        assert prepared['source_size'] == (2400, 3600)
+
+    def test_archive_keeps_original_bytes(self):
+        img_data = make_scan(dpi=1200)
+        prepared = prepare_page_image(img_data, 'archive', 300)
+        assert prepared['image'] is img_data
+        assert not prepared['resampled']
+
+    def test_screen_profile_downsamples_to_target_dpi(self):
+        prepared = prepare_page_image(make_scan(dpi=1200), 'screen', 300)
+        assert prepared['resampled']
+        assert prepared['pixel_size'] == (300, 450)
+        assert prepared['page_size'] == (144.0, 216.0)
+        with Image.open(BytesIO(prepared['image'])) as image:
+            assert image.size == (300, 450)
+            assert image.format == 'JPEG'
+
+    def test_profile_above_source_dpi_is_not_upsampled(self):
+        img_data = make_scan(width=600, height=900, dpi=150)
+        prepared = prepare_page_image(img_data, 'print', 300)
+        assert not prepared['resampled']
+        assert prepared['image'] is img_data
+
+    def test_untrusted_metadata_uses_fallback_dpi(self):
+        with Image.open(BytesIO(make_scan(dpi=72, fmt='PNG'))) as image:
+            assert source_dpi(image, 1200) == 1200.0
+        with Image.open(BytesIO(make_scan(fmt='PNG'))) as image:
+            assert source_dpi(image, 300) == 300.0
@@ -0,0 +1,104 @@
+import time
+from decimal import Decimal
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from common.aws_clients import reset_clients
+from common.run_progress import RunProgress, completion_decision
+from common.run_scheduler import RunScheduler, allocate, parse_priority, SCHEDULER_PARTITION
+
+TABLE = 'test-scheduler'
+
+def run(run_id, demand, priority=1, weight=1.0):
+    return {'run_id': run_id, 'demand': demand, 'priority': priority, 'weight': weight}
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        reset_clients()
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        table = dynamodb.create_table(
+            TableName=TABLE,
+            KeySchema=[
+                {'AttributeName': 'run_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'image_key', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'run_id', 'AttributeType': 'S'},
+                {'AttributeName': 'image_key', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield table
+    reset_clients()
+
+def put_status(table, run_id, total, in_flight=0, done=0, **extra):
+    table.put_item(Item={'run_id': run_id, 'image_key': 'workflow_status', 'total_images': total,
+                         'skipped_images': 0, 'pages_in_flight': in_flight, 'pages_done': done, **extra})
+
+class TestAllocate:
+
+    def test_urgent_small_run_gets_full_demand_and_rest_goes_to_archive(self):
+        allocation = allocate(100, [run('archive', 5000, priority=2), run('rush', 50, priority=0)])
+        assert allocation == {'archive': 50, 'rush': 50}
+
+    def test_equal_priority_shares_by_weight_and_redistributes_unused_share(self):
+        allocation = allocate(90, [run('a', 1000, weight=2), run('b', 1000), run('c', 10)])
+        assert allocation['c'] == 10
+        assert allocation['a'] + allocation['b'] == 80
+        assert allocation['a'] == pytest.approx(2 * allocation['b'], abs=2)
+
+    def test_every_waiting_run_keeps_one_page_and_capacity_is_not_exceeded(self):
+        allocation = allocate(10, [run('urgent', 1000, priority=0), run('bulk', 1000, priority=2), run('idle', 0)])
+        assert allocation == {'urgent': 9, 'bulk': 1, 'idle': 0}
+        assert allocate(3, [run(str(i), 5, weight=i + 1) for i in range(5)]) == {'0': 1, '1': 1, '2': 1, '3': 0, '4': 0}
+
+    def test_priority_names(self):
+        assert parse_priority('urgent') < parse_priority(None) < parse_priority('bulk')
+        assert parse_priority(5) == 5
+        with pytest.raises(ValueError):
+            parse_priority('asap')
+
+class TestRunScheduler:
+
+    def test_quota_accounts_for_other_runs_and_own_in_flight(self, table):
+        scheduler = RunScheduler(TABLE, capacity=100)
+        put_status(table, 'archive', 5000, in_flight=60)
+        put_status(table, 'rush', 50)
+        scheduler.register('archive', priority=2)
+        scheduler.register('rush', priority=0)
+
+        rush = scheduler.quota('rush', table.get_item(Key={'run_id': 'rush', 'image_key': 'workflow_status'})['Item'])
+        assert rush == {'allocation': 50, 'in_flight': 0, 'quota': 50, 'active_runs': 2}
+
+        archive = scheduler.quota('archive', table.get_item(Key={'run_id': 'archive', 'image_key': 'workflow_status'})['Item'])
+        # 긴급 실행이 끝날 때까지 보관 실행은 새 페이지를 배정하지 않음
+        assert (archive['allocation'], archive['quota']) == (50, 0)
+
+    def test_stale_runs_are_ignored_and_unregistered_runs_are_registered(self, table):
+        scheduler = RunScheduler(TABLE, capacity=100, stale_seconds=60)
+        put_status(table, 'abandoned', 1000)
+        scheduler.register('abandoned')
+        table.update_item(Key={'run_id': SCHEDULER_PARTITION, 'image_key': 'abandoned'},
+                          UpdateExpression='SET last_seen = :t',
+                          ExpressionAttributeValues={':t': Decimal(str(time.time() - 3600))})
+
+        status = {'run_id': 'legacy', 'total_images': 500, 'skipped_images': 0, 'priority': 'urgent'}
+        assert scheduler.quota('legacy', status)['allocation'] == 100
+        registered = table.get_item(Key={'run_id': SCHEDULER_PARTITION, 'image_key': 'legacy'})['Item']
+        assert int(registered['priority']) == 0
+
+class TestRefill:
+
+    def test_run_resumes_when_in_flight_drops_to_refill_threshold(self):
+        item = {'run_id': 'r', 'total_images': 100, 'skipped_images': 0, 'pages_in_flight': 25, 'refill_below': 20}
+        assert completion_decision(item) is None
+        assert completion_decision({**item, 'pages_in_flight': 20})['is_work_done'] is False
+
+    def test_dispatch_not_yet_on_stream_keeps_waiter_registered(self):
+        item = {'pages_done': 3, 'pages_failed': 0, 'settled_at_dispatch': 2}
+        assert RunProgress.unreflected_dispatch(item, 40) == 39
+        assert RunProgress.unreflected_dispatch(item, 0) == 0
+        assert RunProgress.unreflected_dispatch({'pages_done': 3}, 40) == 0
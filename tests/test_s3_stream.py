@@ -0,0 +1,45 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_stream import MultipartUploadSink, MIN_PART_SIZE
+
+@pytest.fixture
+def s3_bucket():
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='test-output-bucket')
+        yield s3
+
+class TestMultipartUploadSink:
+
+    def test_small_document_uses_single_put(self, s3_bucket):
+        with MultipartUploadSink(s3_bucket, 'test-output-bucket', 'small.pdf', part_size=MIN_PART_SIZE) as sink:
+            sink.write(b'%PDF-1.4 small')
+
+        assert sink.upload_id is None
+        body = s3_bucket.get_object(Bucket='test-output-bucket', Key='small.pdf')['Body'].read()
+        assert body == b'%PDF-1.4 small'
+
+    def test_large_document_is_uploaded_in_parts(self, s3_bucket):
+        chunk = b'x' * (1024 * 1024)
+        with MultipartUploadSink(s3_bucket, 'test-output-bucket', 'large.pdf', part_size=MIN_PART_SIZE) as sink:
+            for _ in range(12):
+                sink.write(chunk)
+            # 파트 크기를 넘는 데이터만 메모리에 남지 않음
+            assert len(sink.buffer) < MIN_PART_SIZE
+
+        assert len(sink.parts) == 3
+        head = s3_bucket.head_object(Bucket='test-output-bucket', Key='large.pdf')
+        assert head['ContentLength'] == 12 * len(chunk)
+
+    def test_failure_aborts_upload(self, s3_bucket):
+        with pytest.raises(RuntimeError):
+            with MultipartUploadSink(s3_bucket, 'test-output-bucket', 'broken.pdf', part_size=MIN_PART_SIZE) as sink:
+                sink.write(b'x' * (MIN_PART_SIZE + 1))
+                raise RuntimeError("렌더링 실패")
+
+        uploads = s3_bucket.list_multipart_uploads(Bucket='test-output-bucket')
+        assert not uploads.get('Uploads')
+        with pytest.raises(s3_bucket.exceptions.ClientError):
+            s3_bucket.head_object(Bucket='test-output-bucket', Key='broken.pdf')
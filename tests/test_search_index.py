@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from common.search_index import SearchIndex, build_search_index, tokenize
+
+def columns(words, width=1000, height=1400):
+    boxes = np.asarray([(i * 10, 0, i * 10 + 9, 20) for i in range(len(words))], dtype=np.int32).reshape(-1, 4)
+    return {'text': words, 'boxes': boxes, 'width': width, 'height': height}
+
+@pytest.fixture
+def book_index():
+    pages = [
+        (0, None),
+        (1, columns(['학교에서', '공부를', '했다.'])),
+        (2, columns(['우리', '학교는', 'AI기반', '교육'])),
+        (3, columns(['교학', 'PDF'], width=800, height=1200))
+    ]
+    return SearchIndex(build_search_index(pages, page_count=4))
+
+class TestSearchIndex:
+
+    def test_tokenize_splits_hangul_into_syllable_grams(self):
+        assert tokenize('학교에') == ['학', '교', '에', '학교', '교에']
+        assert tokenize('AI기반,') == ['ai', '기', '반', '기반']
+
+    def test_finds_word_with_attached_particle(self, book_index):
+        hits = book_index.search('학교')
+
+        assert [hit['page_index'] for hit in hits] == [1, 2]
+        assert hits[0]['words'] == ['학교에서']
+        assert hits[0]['boxes'] == [[0, 0, 9, 20]]
+        assert (hits[0]['width'], hits[0]['height']) == (1000, 1400)
+
+    def test_bigram_order_is_verified(self, book_index):
+        # '교학'의 2-gram은 '학교' 검색 후보가 아니며, '학교'만 포함하는 단어도 '교학'과 일치하지 않음
+        assert [hit['words'] for hit in book_index.search('교학')] == [['교학']]
+
+    def test_all_query_words_must_be_on_page(self, book_index):
+        hits = book_index.search('학교 공부')
+
+        assert [hit['page_index'] for hit in hits] == [1]
+        assert hits[0]['words'] == ['학교에서', '공부를']
+
+    def test_latin_tokens_are_case_insensitive(self, book_index):
+        assert [hit['page_index'] for hit in book_index.search('pdf')] == [3]
+        assert [hit['words'] for hit in book_index.search('ai')] == [['AI기반']]
+
+    def test_missing_terms_return_nothing(self, book_index):
+        assert book_index.search('없음') == []
+        assert book_index.search('...') == []
+
+    def test_open_uses_memory_map(self, tmp_path):
+        path = tmp_path / 'book.search.idx'
+        path.write_bytes(build_search_index([(0, columns(['검색']))], page_count=1))
+
+        with SearchIndex.open(str(path)) as index:
+            assert [hit['page_index'] for hit in index.search('검색')] == [0]
+
+    def test_rejects_other_files(self):
+        with pytest.raises(ValueError):
+            SearchIndex(b'not an index file at all, definitely')
@@ -0,0 +1,43 @@
+import time
+
+from common.stage_cache import StageCache, STAGE_CACHE_PARTITION
+
+class TestStageCache:
+
+    def test_cache_key_depends_on_stage_input_and_params(self):
+        base = StageCache.cache_key('upscale', 'etag-1', {'endpoint_name': 'a'})
+
+        assert base == StageCache.cache_key('upscale', 'etag-1', {'endpoint_name': 'a'})
+        assert base != StageCache.cache_key('ocr', 'etag-1', {'endpoint_name': 'a'})
+        assert base != StageCache.cache_key('upscale', 'etag-2', {'endpoint_name': 'a'})
+        assert base != StageCache.cache_key('upscale', 'etag-1', {'endpoint_name': 'b'})
+
+    def test_artifact_key_is_content_addressed(self):
+        key = StageCache.artifact_key('skew_correction', 'abc', '.jpg')
+        assert key == 'corrected/abc.jpg'
+
+    def test_fingerprint_strips_etag_quotes(self):
+        assert StageCache.fingerprint({'ETag': '"d41d8cd9"'}) == 'd41d8cd9'
+
+    def test_store_then_lookup_hits(self, state_table):
+        cache = StageCache('test-state-tracking')
+
+        assert cache.lookup('detect_skew', 'etag-1', {}) is None
+        cache.store('detect_skew', 'etag-1', {}, {'skew_angle': 1.5})
+        entry = cache.lookup('detect_skew', 'etag-1', {})
+
+        assert entry['result'] == {'skew_angle': 1.5}
+        assert cache.hit_rate('detect_skew') == 0.5
+
+    def test_expired_entry_is_a_miss(self, state_table):
+        cache = StageCache('test-state-tracking')
+        cache.store('upscale', 'etag-1', {}, {'upscaled_image_key': 'upscaled/x.jpg'}, artifact_key='upscaled/x.jpg')
+
+        key = StageCache.cache_key('upscale', 'etag-1', {})
+        state_table.update_item(
+            Key={'run_id': STAGE_CACHE_PARTITION, 'image_key': key},
+            UpdateExpression="SET expires_at = :e",
+            ExpressionAttributeValues={':e': int(time.time()) - 1}
+        )
+
+        assert cache.lookup('upscale', 'etag-1', {}) is None
@@ -0,0 +1,95 @@
+import json
+from decimal import Decimal
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from common.aws_clients import reset_clients
+from common.stage_queue import consume, poll, send_to_stage
+
+STAGES = ('detect_skew', 'skew_correction', 'upscale')
+
+@pytest.fixture
+def queues(monkeypatch):
+    with mock_aws():
+        reset_clients()
+        sqs = boto3.client('sqs', region_name='us-east-1')
+        urls = {}
+        for stage in STAGES:
+            urls[stage] = sqs.create_queue(QueueName=f"test-{stage}")['QueueUrl']
+            monkeypatch.setenv(f"{stage.upper()}_QUEUE_URL", urls[stage])
+        yield sqs, urls
+    reset_clients()
+
+def receive_all(sqs, url):
+    bodies = []
+    while True:
+        messages = sqs.receive_message(QueueUrl=url, MaxNumberOfMessages=10).get('Messages', [])
+        if not messages:
+            return bodies
+        for message in messages:
+            bodies.append(json.loads(message['Body']))
+            sqs.delete_message(QueueUrl=url, ReceiptHandle=message['ReceiptHandle'])
+
+def sqs_event(*bodies):
+    return {'Records': [
+        {'messageId': f"m{i}", 'eventSource': 'aws:sqs', 'body': json.dumps(body)} for i, body in enumerate(bodies)
+    ]}
+
+def page(image_key, **extra):
+    return {'run_id': 'run-1', 'image_key': image_key, 'input_bucket': 'in', 'temp_bucket': 'tmp', **extra}
+
+class TestStageQueue:
+
+    def test_send_batches_and_serializes_state_values(self, queues):
+        sqs, urls = queues
+        pages = [page(f"{i:03d}.jpg", job_output={'detect_skew': {'skew_angle': Decimal('1.5')}}) for i in range(23)]
+        assert send_to_stage('skew_correction', pages) == 23
+
+        bodies = receive_all(sqs, urls['skew_correction'])
+        assert sorted(body['image_key'] for body in bodies) == [f"{i:03d}.jpg" for i in range(23)]
+        assert all(body['stage'] == 'skew_correction' for body in bodies)
+        assert bodies[0]['job_output']['detect_skew']['skew_angle'] == 1.5
+
+    def test_consume_hands_off_and_reports_only_failures(self, queues):
+        sqs, urls = queues
+
+        def detect(message):
+            if message['image_key'] == 'bad.jpg':
+                raise RuntimeError("Vision 오류")
+            if message['image_key'] == 'gone.jpg':
+                return {'status': 'FAILED_PERMANENT', 'image_key': 'gone.jpg'}
+            return {'skew_angle': 2.0}
+
+        response = consume(sqs_event(page('ok.jpg'), page('bad.jpg'), page('gone.jpg')), 'detect_skew', detect)
+
+        assert response == {'batchItemFailures': [{'itemIdentifier': 'm1'}]}
+        handed_off = receive_all(sqs, urls['skew_correction'])
+        assert [body['image_key'] for body in handed_off] == ['ok.jpg']
+        assert handed_off[0]['job_output'] == {'detect_skew': {'skew_angle': 2.0}}
+        assert handed_off[0]['stage'] == 'skew_correction'
+
+    def test_poll_deletes_processed_and_keeps_failed_messages(self, queues):
+        sqs, urls = queues
+        send_to_stage('skew_correction', [
+            page('a.jpg', job_output={'detect_skew': {'skew_angle': 1.0}}),
+            page('b.jpg', job_output={'detect_skew': {'skew_angle': 1.0}})
+        ])
+
+        def correct(message):
+            if message['image_key'] == 'b.jpg':
+                raise RuntimeError("보정 실패")
+            return {'corrected_image_key': f"corrected/{message['image_key']}"}
+
+        processed = poll('skew_correction', correct, max_messages=10, wait_seconds=0, idle_exit_seconds=0)
+
+        assert processed == 1
+        upscale = receive_all(sqs, urls['upscale'])
+        assert [body['job_output'] for body in upscale] == [
+            {'detect_skew': {'skew_angle': 1.0}, 'skew_correction': {'corrected_image_key': 'corrected/a.jpg'}}
+        ]
+        # 실패한 메시지는 삭제되지 않고 가시성 제한 시간 후 다시 전달됨
+        attributes = sqs.get_queue_attributes(QueueUrl=urls['skew_correction'],
+                                              AttributeNames=['ApproximateNumberOfMessagesNotVisible'])
+        assert attributes['Attributes']['ApproximateNumberOfMessagesNotVisible'] == '1'
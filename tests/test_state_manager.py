@@ -0,0 +1,134 @@
+import pytest
+
+from common.state_manager import (
+    StateManager,
+    JobStatus,
+    TRANSITIONS,
+    STAGE_ORDER,
+    is_valid_transition,
+    first_incomplete_stage,
+    InvalidStateTransitionError,
+    MaxAttemptsExceededError,
+    StateUpdateError
+)
+
+class TestTransitionTable:
+
+    @pytest.mark.parametrize('current, target, expected', [
+        (JobStatus.INITIALIZED, JobStatus.PROCESSING, True),
+        (JobStatus.PROCESSING, JobStatus.PROCESSING, True),
+        (JobStatus.COMPLETED, JobStatus.PROCESSING, True),
+        (JobStatus.FAILED_RETRYABLE, JobStatus.PROCESSING, True),
+        (JobStatus.PROCESSING, JobStatus.COMPLETED, True),
+        (JobStatus.PROCESSING, JobStatus.FAILED_RETRYABLE, True),
+        (JobStatus.FAILED_RETRYABLE, JobStatus.FAILED_PERMANENT, True),
+        (JobStatus.INITIALIZED, JobStatus.COMPLETED, False),
+        (JobStatus.COMPLETED, JobStatus.COMPLETED, False),
+        (JobStatus.FAILED_PERMANENT, JobStatus.PROCESSING, False),
+        (JobStatus.COMPLETED, JobStatus.FAILED_PERMANENT, False),
+        (None, JobStatus.PROCESSING, False)
+    ])
+    def test_transition_table(self, current, target, expected):
+        assert is_valid_transition(current, target) is expected
+
+    def test_permanent_failure_is_terminal(self):
+        assert all(JobStatus.FAILED_PERMANENT not in sources for sources in TRANSITIONS.values())
+
+class TestResumePoint:
+
+    def _completed(self, *stages):
+        return {'stages': {stage: {'status': JobStatus.COMPLETED} for stage in stages}}
+
+    def test_fresh_item_starts_at_first_stage(self):
+        assert first_incomplete_stage({}) == STAGE_ORDER[0]
+        assert first_incomplete_stage({'stages': {}}) == STAGE_ORDER[0]
+
+    def test_resumes_after_last_completed_stage(self):
+        item = self._completed('detect_skew', 'skew_correction', 'upscale')
+        assert first_incomplete_stage(item) == 'ocr'
+
+    def test_gap_in_stages_resumes_at_gap(self):
+        item = self._completed('detect_skew', 'upscale')
+        assert first_incomplete_stage(item) == 'skew_correction'
+
+    def test_all_stages_completed(self):
+        assert first_incomplete_stage(self._completed(*STAGE_ORDER)) is None
+
+class TestStateManagerTransitions:
+
+    def _put(self, table, status, attempts=0):
+        table.put_item(Item={
+            'run_id': 'run-1',
+            'image_key': 'page1.jpg',
+            'job_status': status,
+            'attempts': attempts,
+            'job_output': {},
+            'stages': {}
+        })
+
+    def test_stage_lifecycle_uses_two_requests(self, state_table, mocker):
+        self._put(state_table, JobStatus.PROCESSING)
+        manager = StateManager('test-state-tracking')
+        update_spy = mocker.spy(manager.table, 'update_item')
+        get_spy = mocker.spy(manager.table, 'get_item')
+
+        started = manager.begin_stage('run-1', 'page1.jpg', 'detect_skew')
+        completed = manager.complete_stage('run-1', 'page1.jpg', 'detect_skew', {'skew_angle': 1})
+
+        assert started['job_status'] == JobStatus.PROCESSING
+        assert started['current_stage'] == 'detect_skew'
+        assert completed['job_status'] == JobStatus.COMPLETED
+        assert completed['job_output']['detect_skew'] == {'skew_angle': 1}
+        assert update_spy.call_count == 2
+        assert get_spy.call_count == 0
+
+    def test_begin_stage_marks_permanent_failure_when_budget_spent(self, state_table):
+        self._put(state_table, JobStatus.FAILED_RETRYABLE, attempts=3)
+        manager = StateManager('test-state-tracking')
+
+        with pytest.raises(MaxAttemptsExceededError):
+            manager.begin_stage('run-1', 'page1.jpg', 'ocr')
+
+        item = state_table.get_item(Key={'run_id': 'run-1', 'image_key': 'page1.jpg'})['Item']
+        assert item['job_status'] == JobStatus.FAILED_PERMANENT
+
+    def test_invalid_transition_rejected(self, state_table):
+        self._put(state_table, JobStatus.INITIALIZED)
+        manager = StateManager('test-state-tracking')
+
+        with pytest.raises(InvalidStateTransitionError):
+            manager.complete_stage('run-1', 'page1.jpg', 'ocr', {'ocr_output_key': 'x'})
+
+    def test_fail_stage_increments_attempts(self, state_table):
+        self._put(state_table, JobStatus.PROCESSING, attempts=1)
+        manager = StateManager('test-state-tracking')
+
+        item = manager.fail_stage('run-1', 'page1.jpg', 'upscale', '일시 오류')
+
+        assert item['job_status'] == JobStatus.FAILED_RETRYABLE
+        assert item['attempts'] == 2
+
+    def test_missing_item_raises(self, state_table):
+        manager = StateManager('test-state-tracking')
+
+        with pytest.raises(StateUpdateError):
+            manager.begin_stage('run-1', 'missing.jpg', 'detect_skew')
+
+    def test_complete_stage_records_resumable_stage(self, state_table):
+        self._put(state_table, JobStatus.PROCESSING)
+        manager = StateManager('test-state-tracking')
+
+        item = manager.complete_stage(
+            'run-1', 'page1.jpg', 'skew_correction',
+            {'corrected_image_key': 'corrected/page1.jpg'},
+            artifact_key='corrected/page1.jpg',
+            input_checksum='"etag-1"',
+            params={'skew_angle': 1.25}
+        )
+
+        record = item['stages']['skew_correction']
+        assert record['status'] == JobStatus.COMPLETED
+        assert record['artifact_key'] == 'corrected/page1.jpg'
+        assert record['input_checksum'] == '"etag-1"'
+        assert float(record['params']['skew_angle']) == 1.25
+        assert first_incomplete_stage(item) == 'detect_skew'
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from font_cache import FontMetrics
+from text_layer import layout_words, invisible_text_layer
+
+FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+class TestTextLayer:
+
+    def test_horizontal_scale_fits_box_width(self):
+        texts = ['ab', 'abcd']
+        boxes = np.array([[0, 0, 100, 20], [0, 40, 50, 60]])
+        char_widths = np.full(6, 500.0)
+
+        size_x, size_y, x, baseline = layout_words(texts, boxes, char_widths, 100, 1.0, 1.0, -200)
+
+        # 자연 폭(글자 수 * 0.5em * 크기)에 가로 배율을 곱하면 박스 폭과 같아야 함
+        assert np.allclose(size_x * np.array([1.0, 2.0]), [100, 50])
+        assert np.allclose(size_y, [20, 20])
+        assert np.allclose(baseline, [100 - 20 + 4, 100 - 60 + 4])
+
+    @pytest.mark.skipif(not os.path.exists(FONT_PATH), reason="테스트 폰트 없음")
+    def test_invisible_text_layer_operators(self):
+        metrics = FontMetrics.parse(FONT_PATH)
+
+        layer = invisible_text_layer(['hello'], np.array([[10, 10, 60, 22]]), metrics, 200, 300, 200, 300)
+
+        content = layer['content'].decode('ascii')
+        assert layer['words'] == 1
+        assert 'BT 3 Tr /FOCR 1 Tf' in content
+        assert content.count(' Tm ') == 1
+        # 원본 글리프 번호 2바이트 x 5글자
+        glyph_ids, _ = metrics.lookup(np.array([ord(c) for c in 'hello']))
+        assert '<%s> Tj' % ''.join(f'{gid:04X}' for gid in glyph_ids.tolist()) in content
+        assert sorted(layer['codepoints']) == sorted(set(map(ord, 'hello')))
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from common.ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+        self.gate = None
+
+    def __call__(self, key):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError('load failed')
+        self.calls.append(key)
+        return f"{key}-{len(self.calls)}"
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+class TestTTLCache:
+
+    def test_hit_until_ttl_then_synchronous_after_stale_window(self, clock):
+        loader = CountingLoader()
+        cache = TTLCache(loader, ttl=10, stale_ttl=5, clock=clock)
+
+        assert cache.get('a') == 'a-1'
+        clock.now = 9
+        assert cache.get('a') == 'a-1'
+
+        clock.now = 16
+        assert cache.get('a') == 'a-2'
+        assert cache.stats()['a'] == {
+            'hits': 1, 'stale_hits': 0, 'misses': 2, 'refreshes': 0, 'refresh_errors': 0, 'evictions': 0
+        }
+
+    def test_stale_value_served_while_refreshing_in_background(self, clock):
+        loader = CountingLoader()
+        cache = TTLCache(loader, ttl=10, stale_ttl=100, clock=clock)
+        cache.get('a')
+
+        loader.gate = threading.Event()
+        clock.now = 11
+        # 갱신이 끝나지 않아도 기존 값을 즉시 반환하고 갱신은 한 번만 시작
+        assert cache.get('a') == 'a-1'
+        assert cache.get('a') == 'a-1'
+        loader.gate.set()
+        cache.wait_for_refresh(5)
+
+        assert cache.get('a') == 'a-2'
+        stats = cache.stats()['a']
+        assert (stats['stale_hits'], stats['refreshes'], stats['hits']) == (2, 1, 1)
+
+    def test_failed_refresh_keeps_stale_value(self, clock):
+        loader = CountingLoader()
+        cache = TTLCache(loader, ttl=10, stale_ttl=100, clock=clock)
+        cache.get('a')
+
+        loader.fail = True
+        clock.now = 20
+        assert cache.get('a') == 'a-1'
+        cache.wait_for_refresh(5)
+        assert cache.get('a') == 'a-1'
+        assert cache.stats()['a']['refresh_errors'] == 1
+
+        clock.now = 200
+        with pytest.raises(RuntimeError):
+            cache.get('a')
+
+    def test_lru_eviction_and_load_callback(self, clock):
+        loads = []
+        cache = TTLCache(CountingLoader(), ttl=10, max_size=2, clock=clock,
+                         on_load=lambda key, seconds, background: loads.append((key, background)))
+
+        cache.get('a')
+        cache.get('b')
+        cache.get('a')
+        cache.get('c')
+
+        assert len(cache) == 2
+        assert cache.stats()['b']['evictions'] == 1
+        assert loads == [('a', False), ('b', False), ('c', False)]
@@ -0,0 +1,108 @@
+import base64
+import json
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+import common.vision_client as vision_client
+from common.vision_client import (
+    ServiceAccountJwt, VisionApiError, VisionRestClient, normalize_response, response_error, word_vertices
+)
+
+def service_account_info():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode('ascii')
+    return key, {
+        'type': 'service_account',
+        'project_id': 'test',
+        'private_key_id': 'kid-1',
+        'private_key': pem,
+        'client_email': 'ocr@test.iam.gserviceaccount.com'
+    }
+
+def decode_segment(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+class FakeResponse:
+    def __init__(self, status, payload):
+        self.status = status
+        self.data = json.dumps(payload).encode('utf-8')
+
+class FakePool:
+    """요청 본문을 기록하고 준비된 응답을 순서대로 반환"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, body=None, headers=None):
+        self.requests.append((method, url, json.loads(body), headers))
+        response = self.responses.pop(0)
+        if callable(response):
+            return response(json.loads(body))
+        return response
+
+def echo_responses(body):
+    return FakeResponse(200, {'responses': [{'fullTextAnnotation': {'text': str(i)}} for i, _ in enumerate(body['requests'])]})
+
+class TestVisionClient:
+
+    def test_jwt_is_signed_and_cached(self):
+        key, info = service_account_info()
+        jwt = ServiceAccountJwt(info)
+
+        token = jwt.token(now=1000)
+        header, payload, signature = token.split('.')
+        key.public_key().verify(
+            decode_segment(signature), f"{header}.{payload}".encode('ascii'), padding.PKCS1v15(), hashes.SHA256()
+        )
+        claims = json.loads(decode_segment(payload))
+        assert claims['aud'] == vision_client.VISION_AUDIENCE
+        assert claims['exp'] - claims['iat'] == vision_client.TOKEN_LIFETIME
+        assert json.loads(decode_segment(header))['kid'] == 'kid-1'
+
+        # 만료 여유 시간 전에는 같은 토큰, 이후에는 다시 서명
+        assert jwt.token(now=1000 + 3000) == token
+        assert jwt.token(now=1000 + 3400) != token
+
+    def test_normalize_fills_omitted_coordinates(self):
+        raw = {'fullTextAnnotation': {'pages': [{'blocks': [{'paragraphs': [{'words': [
+            {'boundingBox': {'vertices': [{'y': 5}, {'x': 10, 'y': 5}, {'x': 10}, {}]}}
+        ]}]}]}]}}
+        response = normalize_response(raw)
+        assert list(word_vertices(response)) == [
+            [{'x': 0, 'y': 5}, {'x': 10, 'y': 5}, {'x': 10, 'y': 0}, {'x': 0, 'y': 0}]
+        ]
+        assert response_error(response) is None
+        assert response_error({'error': {'code': 3, 'message': 'bad image'}}) == 'bad image'
+
+    def test_batch_requests_are_split_and_ordered(self):
+        _, info = service_account_info()
+        client = VisionRestClient(info)
+        client._http = FakePool([echo_responses, echo_responses])
+
+        responses = client.batch_document_text_detection([b'img%d' % i for i in range(20)])
+
+        assert len(responses) == 20
+        assert [len(request[2]['requests']) for request in client._http.requests] == [16, 4]
+        first = client._http.requests[0]
+        assert first[3]['Authorization'].startswith('Bearer ')
+        assert first[2]['requests'][0]['features'] == [{'type': 'DOCUMENT_TEXT_DETECTION'}]
+        assert base64.b64decode(first[2]['requests'][1]['image']['content']) == b'img1'
+
+    def test_retries_transient_errors_only(self, monkeypatch):
+        monkeypatch.setattr(vision_client.time, 'sleep', lambda seconds: None)
+        _, info = service_account_info()
+        client = VisionRestClient(info)
+
+        client._http = FakePool([FakeResponse(503, {'error': {'message': 'busy'}}), echo_responses])
+        assert client.document_text_detection(b'x') == {'fullTextAnnotation': {'text': '0'}}
+
+        client._http = FakePool([FakeResponse(400, {'error': {'message': 'invalid'}})])
+        with pytest.raises(VisionApiError) as error:
+            client.document_text_detection(b'x')
+        assert error.value.status == 400
+        assert 'invalid' in str(error.value)
@@ -0,0 +1,138 @@
+"""
+이미지로 배포되는 Vision 워커 핸들러(workers/2_image_processing/process_ocr/main.py) 동작 확인
+"""
+import importlib.util
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from common.aws_clients import reset_clients
+from common.rate_limiter import DistributedRateLimiter
+from common.run_progress import record_deltas
+from common.stage_cache import StageCache
+from common.state_manager import StateManager
+from local_harness import LocalStreamPump
+
+TABLE = 'test-vision-workers'
+BUCKET = 'test-temp'
+RUN_ID = 'run-1'
+WORKERS = os.path.join(os.path.dirname(__file__), '../workers/2_image_processing')
+
+VISION_RESPONSE = {
+    'fullTextAnnotation': {'text': '가나', 'pages': [{'width': 100, 'height': 100, 'blocks': [{'paragraphs': [{'words': [
+        {'boundingBox': {'vertices': [{'x': 10, 'y': 10}, {'x': 40, 'y': 10}, {'x': 40, 'y': 30}, {'x': 10, 'y': 30}]},
+         'symbols': [{'text': '가'}, {'text': '나'}]}
+    ]}]}]}]}
+}
+
+class FakeVision:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def document_text_detection(self, content):
+        self.calls.append(('vision', content))
+        return VISION_RESPONSE
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('DYNAMODB_STATE_TABLE', TABLE)
+    with mock_aws():
+        reset_clients()
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        table = dynamodb.create_table(
+            TableName=TABLE,
+            KeySchema=[
+                {'AttributeName': 'run_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'image_key', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'run_id', 'AttributeType': 'S'},
+                {'AttributeName': 'image_key', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST',
+            StreamSpecification={'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
+        )
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=BUCKET)
+        yield table, s3
+    reset_clients()
+
+@pytest.fixture
+def ocr_worker(aws, monkeypatch):
+    """process_ocr 핸들러 모듈 (싱글톤은 이 테스트의 테이블로 교체, Vision 호출은 기록)"""
+    spec = importlib.util.spec_from_file_location('process_ocr_main', os.path.join(WORKERS, 'process_ocr/main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    calls = []
+    limiter = DistributedRateLimiter(TABLE, buckets={'vision': (100.0, 100.0), 'sagemaker': (1.0, 1.0)})
+    original_acquire = limiter.acquire
+
+    def acquire(dependency, tokens=1):
+        calls.append(('acquire', dependency))
+        return original_acquire(dependency, tokens)
+
+    monkeypatch.setattr(limiter, 'acquire', acquire)
+    monkeypatch.setattr(module, 'state_manager', StateManager(TABLE))
+    monkeypatch.setattr(module, 'rate_limiter', limiter)
+    monkeypatch.setattr(module, 'stage_cache', StageCache(TABLE))
+    monkeypatch.setattr(module, 'get_vision_client', lambda: FakeVision(calls))
+    module.calls = calls
+    return module
+
+def put_page(aws, image_key='001.jpg', body=b'upscaled-image'):
+    table, s3 = aws
+    upscaled_key = f"upscaled/{image_key}"
+    s3.put_object(Bucket=BUCKET, Key=upscaled_key, Body=body)
+    table.put_item(Item={'run_id': RUN_ID, 'image_key': image_key, 'job_status': 'PROCESSING',
+                         'attempts': 0, 'job_output': {}, 'stages': {}})
+    return {'run_id': RUN_ID, 'image_key': image_key, 'temp_bucket': BUCKET, 'image_key_for_ocr': upscaled_key}
+
+class TestVisionWorkers:
+
+    def test_ocr_takes_vision_rate_limit_token_before_calling_vision(self, aws, ocr_worker):
+        ocr_worker.handler(put_page(aws), None)
+
+        assert [call[0] for call in ocr_worker.calls] == ['acquire', 'vision']
+        assert ocr_worker.calls[0] == ('acquire', 'vision')
+
+    def test_ocr_state_changes_take_two_round_trips(self, aws, ocr_worker, monkeypatch):
+        table = ocr_worker.state_manager.table
+        requests = []
+        for operation in ('get_item', 'put_item', 'update_item'):
+            original = getattr(table, operation)
+            monkeypatch.setattr(table, operation,
+                                lambda *args, _op=operation, _original=original, **kwargs:
+                                requests.append(_op) or _original(*args, **kwargs))
+
+        ocr_worker.handler(put_page(aws), None)
+
+        # 재시도 예산 확인 + PROCESSING 전이, COMPLETED 전이 + 단계 기록
+        assert requests == ['update_item', 'update_item']
+
+    def test_same_input_reuses_cached_ocr_without_vision_call(self, aws, ocr_worker):
+        table, _ = aws
+        ocr_worker.handler(put_page(aws, '001.jpg'), None)
+        # 같은 내용(ETag)의 다른 페이지는 단계 캐시의 결과를 재사용
+        ocr_worker.handler(put_page(aws, '002.jpg'), None)
+
+        assert [call for call in ocr_worker.calls if call[0] == 'vision'] == [('vision', b'upscaled-image')]
+        first = table.get_item(Key={'run_id': RUN_ID, 'image_key': '001.jpg'})['Item']
+        second = table.get_item(Key={'run_id': RUN_ID, 'image_key': '002.jpg'})['Item']
+        assert second['stages']['ocr']['status'] == 'COMPLETED'
+        assert second['stages']['ocr']['artifact_key'] == first['stages']['ocr']['artifact_key']
+
+    def test_ocr_completion_is_counted_by_stream_aggregator(self, aws, ocr_worker):
+        pump = LocalStreamPump(TABLE)
+        ocr_worker.handler(put_page(aws), None)
+
+        deltas = []
+        pump.drain(lambda event: deltas.extend(filter(None, map(record_deltas, event['Records']))))
+
+        # 배정(처리 중 +1) 후 OCR 단계 기록과 함께 완료 (완료 +1, 처리 중 -1)
+        assert deltas == [
+            (RUN_ID, {'pages_done': 0, 'pages_failed': 0, 'pages_in_flight': 1}),
+            (RUN_ID, {'pages_done': 1, 'pages_failed': 0, 'pages_in_flight': -1})
+        ]
@@ -0,0 +1,129 @@
+"""
+완료 집계기 로컬 대체 실행 환경
+Lambda 이벤트 소스 매핑과 Step Functions 없이 상태 테이블 스트림(DynamoDB Local 또는 moto)을 직접 폴링하여
+Lambda와 같은 형태의 레코드 배치로 집계기에 전달하고, 작업 토큰 재개 호출은 메모리에 기록
+
+    AWS_ENDPOINT_URL_DYNAMODB=http://localhost:8000 python local_harness.py --table <상태 테이블>
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from common.aws_clients import get_client
+from common.run_progress import RunProgress
+
+class RecordingStepFunctions:
+    """send_task_success 호출을 기록하는 Step Functions 대체 (같은 토큰을 두 번 재개하면 TaskTimedOut)"""
+
+    def __init__(self):
+        self.successes: Dict[str, Dict[str, Any]] = {}
+
+    def send_task_success(self, taskToken: str, output: str) -> Dict[str, Any]:
+        if taskToken in self.successes:
+            raise ClientError({'Error': {'Code': 'TaskTimedOut', 'Message': 'Task Timed Out'}}, 'SendTaskSuccess')
+        self.successes[taskToken] = json.loads(output)
+        return {}
+
+class LocalStreamPump:
+    """
+    테이블 스트림의 모든 샤드를 폴링하여 배치 단위로 핸들러에 전달
+    핸들러가 batchItemFailures를 반환하면 Lambda와 같이 실패한 레코드부터 다시 전달
+    """
+
+    def __init__(self, table_name: str, batch_size: int = 100, starting_position: str = 'TRIM_HORIZON'):
+        self.batch_size = batch_size
+        self.streams = get_client('dynamodbstreams')
+        self.stream_arn = get_client('dynamodb').describe_table(TableName=table_name)['Table']['LatestStreamArn']
+        shards = self.streams.describe_stream(StreamArn=self.stream_arn)['StreamDescription']['Shards']
+        self._iterators = {
+            shard['ShardId']: self.streams.get_shard_iterator(
+                StreamArn=self.stream_arn, ShardId=shard['ShardId'], ShardIteratorType=starting_position
+            )['ShardIterator']
+            for shard in shards
+        }
+        self._pending: List[Dict[str, Any]] = []
+
+    def poll(self) -> int:
+        """새 레코드를 대기열에 추가하고 추가된 수 반환"""
+        added = 0
+        for shard_id, iterator in list(self._iterators.items()):
+            if iterator is None:
+                continue
+            response = self.streams.get_records(ShardIterator=iterator)
+            records = response.get('Records', [])
+            for record in records:
+                record['eventSourceARN'] = self.stream_arn
+            self._pending.extend(records)
+            self._iterators[shard_id] = response.get('NextShardIterator')
+            added += len(records)
+        return added
+
+    def drain(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]], max_attempts: int = 3) -> int:
+        """대기열의 레코드를 모두 전달하고 처리된 레코드 수 반환 (같은 레코드가 연속 실패하면 중단)"""
+        self.poll()
+        processed = 0
+        attempts = 0
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            failures = (handler({'Records': batch}) or {}).get('batchItemFailures', [])
+            if not failures:
+                del self._pending[:len(batch)]
+                processed += len(batch)
+                attempts = 0
+                continue
+            failed_sequence = failures[0]['itemIdentifier']
+            index = next(i for i, record in enumerate(batch) if record['dynamodb']['SequenceNumber'] == failed_sequence)
+            del self._pending[:index]
+            processed += index
+            attempts += 1
+            if attempts >= max_attempts:
+                break
+        return processed
+
+class LocalCompletionHarness:
+    """스트림 폴링 + 진행 집계 + 기록용 Step Functions를 묶은 로컬 실행 환경"""
+
+    def __init__(self, table_name: str, batch_size: int = 100, sfn_client=None):
+        self.sfn = sfn_client or RecordingStepFunctions()
+        self.progress = RunProgress(table_name, sfn_client=self.sfn)
+        self.pump = LocalStreamPump(table_name, batch_size=batch_size)
+
+    def wait(self, run_id: str, task_token: str, batch_size: int) -> Dict[str, Any]:
+        """AwaitRunProgress 상태와 같은 대기 등록"""
+        return self.progress.register_waiter(run_id, task_token, batch_size)
+
+    def pump_once(self) -> int:
+        return self.pump.drain(lambda event: self.progress.handle_stream_records(event['Records']))
+
+    def result(self, task_token: str) -> Optional[Dict[str, Any]]:
+        """재개된 작업 토큰의 출력 (아직 대기 중이면 None)"""
+        return getattr(self.sfn, 'successes', {}).get(task_token)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="상태 테이블 스트림으로 완료 집계기를 로컬 실행")
+    parser.add_argument('--table', required=True)
+    parser.add_argument('--interval', type=float, default=1.0)
+    args = parser.parse_args()
+
+    harness = LocalCompletionHarness(args.table)
+    print(f"스트림 폴링 시작: {harness.pump.stream_arn}")
+    reported = set()
+    while True:
+        processed = harness.pump_once()
+        if processed:
+            print(f"레코드 {processed}개 반영")
+        for token, output in harness.sfn.successes.items():
+            if token not in reported:
+                reported.add(token)
+                print(f"재개: {token} -> {json.dumps(output, ensure_ascii=False)}")
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from aws_lambda_powertools import Logger, Metrics, Tracer
+
+# 공통 모듈 경로 설정
+sys.path.append('/opt/python')
+
+from common.run_progress import RunProgress, PROGRESS_FIELDS
+from common.aws_clients import get_client
+from common.profiling import profiled
+
+logger = Logger()
+metrics = Metrics(namespace="BookScan/Processing")
+tracer = Tracer()
+
+cloudwatch = get_client('cloudwatch')
+
+PROGRESS_METRICS = {
+    'pages_done': 'PagesDone',
+    'pages_failed': 'PagesFailed',
+    'pages_in_flight': 'PagesInFlight'
+}
+
+def put_progress_metrics(run_id: str, item: dict) -> None:
+    """실행별 진행 카운터 기록 (PagesInFlight가 실제 동시 처리 페이지 수)"""
+    cloudwatch.put_metric_data(
+        Namespace='BookScan/Processing',
+        MetricData=[
+            {
+                'MetricName': PROGRESS_METRICS[field],
+                'Dimensions': [{'Name': 'RunId', 'Value': run_id}],
+                'Value': int(item.get(field, 0)),
+                'Unit': 'Count'
+            }
+            for field in PROGRESS_FIELDS
+        ]
+    )
+
+progress = RunProgress(os.environ['DYNAMODB_STATE_TABLE'], on_progress=put_progress_metrics)
+
+@logger.inject_lambda_context
+@metrics.log_metrics
+@tracer.capture_lambda_handler
+@profiled('completion_aggregator')
+def handler(event: dict, context: LambdaContext) -> dict:
+    """
+    실행 완료 집계기
+    - DynamoDB Streams 이벤트: 페이지 상태 변화를 workflow_status 진행 카운터에 반영하고 대기 중인 실행 재개
+    - action=await (waitForTaskToken): Step Functions 작업 토큰 등록, 이미 조건을 만족하면 즉시 재개
+    """
+    if event.get('action') == 'await':
+        run_id = event.get('run_id')
+        if not run_id or not event.get('task_token'):
+            raise ValueError("run_id와 task_token은 필수입니다.")
+        result = progress.register_waiter(run_id, event['task_token'], int(event.get('batch_size', 0)))
+        logger.info(f"완료 대기 등록: {run_id}, 즉시 재개={result['resolved']}")
+        return result
+
+    records = event.get('Records', [])
+    response = progress.handle_stream_records(records)
+    metrics.add_metric(name="ProgressRecords", unit="Count", value=len(records))
+    if response['batchItemFailures']:
+        metrics.add_metric(name="ProgressAggregationFailures", unit="Count", value=1)
+    return response
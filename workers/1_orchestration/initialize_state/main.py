@@ -1,23 +1,34 @@
 import os
+import sys
 import json
-import boto3
 import uuid
+import hashlib
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools import Logger, Metrics, Tracer
 
+# Lambda 레이어 경로 설정
+sys.path.append('/opt/python')
+
+from common.aws_clients import get_client, get_resource
+from common.profiling import profiled
+from common.run_scheduler import get_run_scheduler, parse_priority, parse_weight
+
 logger = Logger()
 metrics = Metrics(namespace="BookScan/Processing")
 tracer = Tracer()
 
-dynamodb = boto3.resource('dynamodb')
-s3_client = boto3.client('s3')
+dynamodb = get_resource('dynamodb')
+s3_client = get_client('s3')
+
+MANIFEST_PREFIX = 'manifests'
 
 @tracer.capture_method
 def get_image_keys_from_s3(bucket_name, run_id, input_prefix):
     """
-    S3 버킷에서 이미지 키 목록을 가져옵니다.
+    S3 버킷에서 이미지 객체 목록(Key, ETag, Size)을 가져옵니다.
     """
     image_keys = []
     paginator = s3_client.get_paginator('list_objects_v2')
@@ -28,12 +39,45 @@ def get_image_keys_from_s3(bucket_name, run_id, input_prefix):
             for obj in page['Contents']:
                 # 폴더 자체는 제외하고 이미지 파일만 포함
                 if not obj['Key'].endswith('/') and obj['Key'].lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                    image_keys.append(obj['Key'])
+                    image_keys.append({
+                        'Key': obj['Key'],
+                        'ETag': obj.get('ETag', '').strip('"'),
+                        'Size': obj.get('Size', 0)
+                    })
     return image_keys
 
+def get_manifest_key(bucket_name, input_prefix):
+    """같은 입력 접두사의 실행들이 공유하는 매니페스트 키"""
+    prefix_id = hashlib.sha256(f"{bucket_name}/{input_prefix}".encode('utf-8')).hexdigest()[:16]
+    return f"{MANIFEST_PREFIX}/{prefix_id}.json"
+
+@tracer.capture_method
+def load_previous_manifest(output_bucket, manifest_key):
+    """이전 실행의 페이지 매니페스트 로드, 없으면 None"""
+    try:
+        response = s3_client.get_object(Bucket=output_bucket, Key=manifest_key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+    except s3_client.exceptions.NoSuchKey:
+        logger.info(f"이전 매니페스트 없음, 전체 처리: {manifest_key}")
+    except Exception as e:
+        logger.warning(f"이전 매니페스트 로드 실패, 전체 처리: {e}")
+    return None
+
+def find_reusable_page(previous_manifest, obj):
+    """ETag와 크기가 같은 이전 페이지 항목 반환"""
+    if not previous_manifest:
+        return None
+    previous = previous_manifest.get('pages', {}).get(os.path.basename(obj['Key']))
+    if not previous or previous.get('pdf_page_index') is None:
+        return None
+    if previous.get('etag') == obj['ETag'] and int(previous.get('size', -1)) == int(obj['Size']):
+        return previous
+    return None
+
 @logger.inject_lambda_context(log_event=True)
 @metrics.log_metrics(capture_cold_start_metric=True)
 @tracer.capture_lambda_handler
+@profiled('initialize_state')
 def handler(event: dict, context: LambdaContext) -> dict:
     """
     워크플로우 초기 상태를 설정하고 DynamoDB에 이미지 정보를 기록합니다.
@@ -41,6 +85,13 @@ def handler(event: dict, context: LambdaContext) -> dict:
     # Step Functions에서 전달받는 파라미터 처리
     s3_bucket = event.get('s3_bucket')
     s3_prefix = event.get('s3_prefix', '')
+    execution_input = event.get('execution_input') or {}
+    output_bucket = event.get('output_bucket') or execution_input.get('output_bucket') or os.environ.get('OUTPUT_BUCKET')
+    # 증분 모드: 이전 실행 매니페스트와 비교하여 변경된 페이지만 처리
+    incremental = bool(event.get('incremental', execution_input.get('incremental', False)))
+    # 실행 간 공유 용량 배분: 우선순위 등급(urgent | normal | bulk 또는 정수, 작을수록 먼저)과 가중치
+    run_priority = parse_priority(event.get('priority', execution_input.get('priority')))
+    run_weight = parse_weight(event.get('weight', execution_input.get('weight')))
     
     # run_id 자체 생성 (Step Functions에서 전달하지 않으므로)
     run_id = f"scan-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{str(uuid.uuid4())[:8]}"
@@ -82,48 +133,85 @@ def handler(event: dict, context: LambdaContext) -> dict:
             's3_prefix': s3_prefix
         }
 
-    # DynamoDB에 이미지 정보 배치 쓰기
-    with table.batch_writer() as batch:
-        total_images = len(image_keys)
-        skipped_images_count = 0
+    manifest_key = get_manifest_key(s3_bucket, s3_prefix)
+    previous_manifest = None
+    if incremental and output_bucket:
+        previous_manifest = load_previous_manifest(output_bucket, manifest_key)
+    
+    # 페이지 항목 구성
+    page_items = []
+    total_images = len(image_keys)
+    skipped_images_count = 0
+    reused_images_count = 0
+    
+    for i, obj in enumerate(image_keys):
+        key = obj['Key']
+        # ~.jpg와 z.jpg는 표지로 간주하여 처리 대상에서 제외합니다.
+        is_cover = key.endswith('~.jpg') or key.endswith('z.jpg')
+        if is_cover:
+            skipped_images_count += 1
         
-        for i, key in enumerate(image_keys):
-            # ~.jpg와 z.jpg는 표지로 간주하여 처리 대상에서 제외합니다.
-            is_cover = key.endswith('~.jpg') or key.endswith('z.jpg')
-            if is_cover:
-                skipped_images_count += 1
-            
-            # 샤드 ID 생성 (분산 처리를 위한)
-            shard_id = f"{run_id}#{i % 10}"  # 10개 샤드로 분산
-            
-            batch.put_item(
-                Item={
-                    'run_id': run_id,
-                    'image_key': os.path.basename(key), # 파일 이름만 저장
-                    'job_status': 'INITIALIZED',
-                    'priority': i, # 순서 유지를 위한 우선순위
-                    'is_cover': is_cover,
-                    'shard_id': shard_id,  # 샤드 ID 추가
-                    'full_s3_key': key,  # 전체 S3 키 저장
-                    'initialized_at': datetime.utcnow().isoformat(),
-                    'expires_at': int((datetime.utcnow() + timedelta(days=7)).timestamp()) # 7일 후 만료
-                }
-            )
+        # 샤드 ID 생성 (분산 처리를 위한)
+        shard_id = f"{run_id}#{i % 10}"  # 10개 샤드로 분산
         
-        # 워크플로우 전체 상태 기록
-        batch.put_item(
-            Item={
-                'run_id': run_id,
-                'image_key': 'workflow_status',
-                'job_status': 'INITIALIZED',
-                'total_images': total_images,
-                'skipped_images': skipped_images_count,
-                'initialized_at': datetime.utcnow().isoformat(),
-                'expires_at': int((datetime.utcnow() + timedelta(days=7)).timestamp())
-            }
-        )
+        item = {
+            'run_id': run_id,
+            'image_key': os.path.basename(key), # 파일 이름만 저장
+            'job_status': 'INITIALIZED',
+            'priority': i, # 순서 유지를 위한 우선순위
+            'is_cover': is_cover,
+            'shard_id': shard_id,  # 샤드 ID 추가
+            'full_s3_key': key,  # 전체 S3 키 저장
+            'source_etag': obj['ETag'],
+            'source_size': obj['Size'],
+            'job_output': {},
+            'stages': {},  # 단계별 재개 기록
+            'initialized_at': datetime.utcnow().isoformat(),
+            'expires_at': int((datetime.utcnow() + timedelta(days=7)).timestamp()) # 7일 후 만료
+        }
+        
+        previous = find_reusable_page(previous_manifest, obj)
+        if previous:
+            # 변경 없는 페이지는 이전 결과를 이어받아 완료 상태로 시작
+            item['job_status'] = 'COMPLETED'
+            item['job_output'] = json.loads(json.dumps(previous.get('job_output', {})), parse_float=Decimal)
+            item['reused_page_index'] = int(previous['pdf_page_index'])
+            item['reused_from_run'] = previous_manifest.get('run_id', '')
+            reused_images_count += 1
+        
+        page_items.append(item)
+    
+    # 워크플로우 전체 상태를 페이지보다 먼저 기록
+    # (스트림 집계기가 페이지 변경을 이 항목의 진행 카운터에 더하므로 나중에 덮어쓰면 집계가 사라짐)
+    workflow_item = {
+        'run_id': run_id,
+        'image_key': 'workflow_status',
+        'job_status': 'INITIALIZED',
+        'total_images': total_images,
+        'skipped_images': skipped_images_count,
+        'reused_images': reused_images_count,
+        'manifest_key': manifest_key,
+        'priority': run_priority,
+        'weight': Decimal(str(run_weight)),
+        'initialized_at': datetime.utcnow().isoformat(),
+        'expires_at': int((datetime.utcnow() + timedelta(days=7)).timestamp())
+    }
+    if reused_images_count:
+        workflow_item['incremental_base'] = {
+            'run_id': previous_manifest.get('run_id', ''),
+            'pdf_output_key': previous_manifest['pdf_output_key']
+        }
+    table.put_item(Item=workflow_item)
+    
+    # DynamoDB에 이미지 정보 배치 쓰기
+    with table.batch_writer() as batch:
+        for item in page_items:
+            batch.put_item(Item=item)
+    
+    get_run_scheduler(state_table_name).register(run_id, run_priority, run_weight)
 
-    logger.info(f"Run ID: {run_id}, 총 {total_images}개의 이미지 상태가 초기화되었습니다. {skipped_images_count}개 이미지 스킵.")
+    logger.info(f"Run ID: {run_id}, 총 {total_images}개의 이미지 상태가 초기화되었습니다. {skipped_images_count}개 이미지 스킵, {reused_images_count}개 이미지 재사용.")
+    metrics.add_metric(name="ReusedImages", unit="Count", value=reused_images_count)
     
     return {
         'run_id': run_id,
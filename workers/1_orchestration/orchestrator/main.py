@@ -1,79 +1,46 @@
 import os
-import json
-import boto3
+import sys
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from datetime import datetime
+from decimal import Decimal
 import backoff
 from typing import Dict, List, Any
 
+# 공통 모듈 경로 설정
+sys.path.append('/opt/python')
+
+from common.state_manager import first_incomplete_stage, STAGE_ORDER
+from common.run_progress import completion_decision
+from common.aws_clients import get_resource
+from common.profiling import profiled
+from common.stage_queue import send_to_stage
+from common.run_scheduler import get_run_scheduler
+
 logger = Logger()
 metrics = Metrics(namespace="BookScan/Processing")
 tracer = Tracer()
 
-dynamodb = boto3.resource('dynamodb')
-events_client = boto3.client('events')
-cloudwatch = boto3.client('cloudwatch')
+dynamodb = get_resource('dynamodb')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
-EVENT_BUS_NAME = os.environ['EVENT_BUS_NAME']
-MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '50'))
-MIN_BATCH_SIZE = int(os.environ.get('MIN_BATCH_SIZE', '5'))
+# 한 번의 디스패치에 배정할 최대 페이지 수
+MAX_DISPATCH_PAGES = int(os.environ.get('MAX_DISPATCH_PAGES', '10000'))
 
+run_scheduler = get_run_scheduler(DYNAMODB_TABLE_NAME)
 
-@tracer.capture_method
-def calculate_dynamic_batch_size(run_id: str) -> int:
-    """CloudWatch 메트릭 기반 배치 크기 계산"""
-    try:
-        # CloudWatch 메트릭 조회
-        response = cloudwatch.get_metric_statistics(
-            Namespace='BookScan/Processing',
-            MetricName='ProcessingLatency',
-            Dimensions=[
-                {'Name': 'RunId', 'Value': run_id}
-            ],
-            StartTime=datetime.utcnow().replace(minute=0, second=0, microsecond=0),
-            EndTime=datetime.utcnow(),
-            Period=300,
-            Statistics=['Average']
-        )
-        
-        # 기본 배치 크기 계산
-        if not response['Datapoints']:
-            base_size = MIN_BATCH_SIZE
-        else:
-            avg_latency = response['Datapoints'][-1]['Average']
-            if avg_latency > 60:
-                base_size = MIN_BATCH_SIZE
-            elif avg_latency < 10:
-                base_size = MAX_BATCH_SIZE
-            else:
-                factor = (60 - avg_latency) / 50
-                base_size = MIN_BATCH_SIZE + int((MAX_BATCH_SIZE - MIN_BATCH_SIZE) * factor)
-        
-        batch_size = base_size
-            
-        # 배치 크기 메트릭 기록
-        cloudwatch.put_metric_data(
-            Namespace='BookScan/Processing',
-            MetricData=[
-                {
-                    'MetricName': 'BatchSizeAdjusted',
-                    'Dimensions': [
-                        {'Name': 'RunId', 'Value': run_id}
-                    ],
-                    'Value': batch_size,
-                    'Unit': 'Count'
-                }
-            ]
-        )
-        
-        return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, batch_size))
-        
-    except Exception as e:
-        logger.warning(f"배치 크기 계산 실패, 기본값 사용: {e}")
-        return MIN_BATCH_SIZE
+def query_all(state_table, limit: int, **kwargs) -> List[Dict[str, Any]]:
+    """LastEvaluatedKey를 따라가며 limit개까지 쿼리 (표지 제외)"""
+    items: List[Dict[str, Any]] = []
+    while len(items) < limit:
+        response = state_table.query(Limit=limit - len(items), **kwargs)
+        items.extend(item for item in response.get('Items', []) if not item.get('is_cover', False))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
 
 @backoff.on_exception(
     backoff.expo,
@@ -83,33 +50,26 @@ def calculate_dynamic_batch_size(run_id: str) -> int:
     max_value=30,
     logger=logger
 )
-def query_pending_tasks(run_id: str, batch_size: int) -> List[Dict[str, Any]]:
+def query_pending_tasks(run_id: str, limit: int) -> List[Dict[str, Any]]:
     """DynamoDB 샤딩을 통한 분산 쿼리로 처리 대기 이미지 목록 가져오기"""
     state_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
     
     # 샤드 기반 분산 쿼리
-    shard_count = min(10, batch_size // 5 + 1)  # 동적 샤드 수
+    shard_count = min(10, limit // 5 + 1)  # 동적 샤드 수
     all_images = []
     
     for shard_index in range(shard_count):
         shard_id = f"{run_id}#{shard_index}"
         
         try:
-            # 샤드별 INITIALIZED 상태 이미지
-            shard_response = state_table.query(
-                IndexName='shard-status-index',
-                KeyConditionExpression=Key('shard_id').eq(shard_id) & Key('job_status').eq('INITIALIZED'),
-                Limit=batch_size // shard_count + 1
-            )
-            all_images.extend([item for item in shard_response.get('Items', []) if not item.get('is_cover', False)])
-            
-            # 샤드별 FAILED 상태 이미지
-            failed_response = state_table.query(
-                IndexName='shard-status-index',
-                KeyConditionExpression=Key('shard_id').eq(shard_id) & Key('job_status').eq('FAILED'),
-                Limit=batch_size // shard_count + 1
-            )
-            all_images.extend([item for item in failed_response.get('Items', []) if not item.get('is_cover', False)])
+            # 샤드별 INITIALIZED / FAILED 상태 이미지
+            for status in ('INITIALIZED', 'FAILED'):
+                all_images.extend(query_all(
+                    state_table,
+                    limit // shard_count + 1,
+                    IndexName='shard-status-index',
+                    KeyConditionExpression=Key('shard_id').eq(shard_id) & Key('job_status').eq(status)
+                ))
             
         except Exception as e:
             logger.warning(f"샤드 {shard_id} 쿼리 실패: {e}")
@@ -147,8 +107,30 @@ def query_pending_tasks(run_id: str, batch_size: int) -> List[Dict[str, Any]]:
                 logger.error(f"스캔 쿼리도 실패: {scan_e}")
                 all_images = []
     
-    # 우선순위 정렬 후 배치 크기만큼 반환
-    return sorted(all_images, key=lambda x: x.get('priority', 0))[:batch_size]
+    # 우선순위 정렬 후 최대 limit개 반환
+    return sorted(all_images, key=lambda x: x.get('priority', 0))[:limit]
+
+def build_resume_payload(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    완료된 단계 기록으로 재개 지점과 이전 단계 결과를 구성
+    각 단계 작업자가 참조하는 단계 큐 메시지의 job_output 형태와 동일하게 채움
+    모든 단계가 완료로 기록된 페이지는 resume_from이 None (재처리 없이 완료 표시)
+    """
+    resume_from = first_incomplete_stage(task)
+    stages = task.get('stages') or {}
+    job_output: Dict[str, Any] = {}
+    for stage in STAGE_ORDER:
+        record = stages.get(stage) or {}
+        if record.get('status') == 'COMPLETED':
+            job_output[stage] = {
+                k: float(v) if isinstance(v, Decimal) else v for k, v in (record.get('output') or {}).items()
+            }
+
+    if resume_from is None:
+        logger.info(f"{task['image_key']} 모든 단계 완료 기록, 재처리 없이 완료 표시")
+    elif resume_from != 'detect_skew':
+        logger.info(f"{task['image_key']} 재개 지점: {resume_from}")
+    return {'resume_from': resume_from, 'job_output': job_output}
 
 @tracer.capture_method
 def get_workflow_status(run_id: str) -> Dict[str, Any]:
@@ -160,39 +142,84 @@ def get_workflow_status(run_id: str) -> Dict[str, Any]:
     return response.get('Item', {})
 
 @tracer.capture_method
-def update_image_status(run_id: str, image_key: str, status: str):
-    """이미지 상태를 DynamoDB에 업데이트합니다."""
+def record_schedule(run_id: str, workflow_status_item: Dict[str, Any], allocation: int) -> None:
+    """
+    할당 결과를 workflow_status에 기록
+    처리 중 페이지가 할당량의 절반 이하로 줄면 완료 집계기가 실행을 재개하여 다음 페이지를 배정하고,
+    배정 시점의 완료+실패 수로 스트림에 아직 반영되지 않은 배정분을 추정
+    """
     state_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
     state_table.update_item(
-        Key={'run_id': run_id, 'image_key': image_key},
-        UpdateExpression="SET job_status = :status",
-        ExpressionAttributeValues={':status': status}
+        Key={'run_id': run_id, 'image_key': 'workflow_status'},
+        UpdateExpression="SET scheduled_allocation = :a, refill_below = :r, settled_at_dispatch = :s",
+        ExpressionAttributeValues={
+            ':a': allocation,
+            ':r': allocation // 2,
+            ':s': int(workflow_status_item.get('pages_done', 0)) + int(workflow_status_item.get('pages_failed', 0))
+        }
     )
 
 @tracer.capture_method
-def publish_completion_event(run_id: str, is_complete: bool):
-    """EventBridge 완료 이벤트 발행"""
+def set_page_status(run_id: str, image_key: str, status: str, expected: str) -> bool:
+    """
+    페이지 상태를 expected에서 status로 조건부 전환 (다른 호출이 먼저 바꿨으면 False)
+    작업자가 이미 단계를 진행한 페이지를 되돌리지 않도록 조건을 둠
+    """
+    state_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
     try:
-        events_client.put_events(
-            Entries=[
-                {
-                    'Source': 'book-scan.orchestration',
-                    'DetailType': 'Batch Processing Complete',
-                    'Detail': json.dumps({
-                        'run_id': run_id,
-                        'status': 'COMPLETED' if is_complete else 'PENDING',
-                        'timestamp': datetime.utcnow().isoformat()
-                    }),
-                    'EventBusName': EVENT_BUS_NAME
-                }
-            ]
+        state_table.update_item(
+            Key={'run_id': run_id, 'image_key': image_key},
+            UpdateExpression="SET job_status = :status, last_updated = :ts",
+            ConditionExpression="job_status = :expected",
+            ExpressionAttributeValues={
+                ':status': status,
+                ':expected': expected,
+                ':ts': datetime.utcnow().isoformat()
+            }
         )
-    except Exception as e:
-        logger.warning(f"이벤트 발행 실패: {e}")
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+@tracer.capture_method
+def dispatch_pages(run_id: str, pages: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    재개 지점별로 페이지를 해당 단계 큐에 전송
+    전송 전에 PROCESSING으로 표시하여 진행 카운터가 배정된 페이지를 처리 중으로 집계하게 하고,
+    전송에 실패한 페이지는 원래 상태로 되돌려 다음 오케스트레이터 호출이 다시 배정
+    모든 단계가 이미 완료된 페이지(resume_from=None)는 전송하지 않고 COMPLETED로 표시
+    (OCR 결과가 있는 페이지에 Vision 호출을 다시 하지 않도록)
+    """
+    by_stage: Dict[str, List[Any]] = {}
+    completed = 0
+    for page in pages:
+        previous_status = page.pop('previous_status')
+        stage = page.pop('resume_from')
+        if stage is None:
+            completed += int(set_page_status(run_id, page['image_key'], 'COMPLETED', previous_status))
+            continue
+        if set_page_status(run_id, page['image_key'], 'PROCESSING', previous_status):
+            by_stage.setdefault(stage, []).append((previous_status, page))
+    if completed:
+        logger.info(f"모든 단계가 완료된 페이지 {completed}개를 재처리 없이 완료 표시")
+
+    dispatched: Dict[str, int] = {}
+    for stage, entries in by_stage.items():
+        try:
+            dispatched[stage] = send_to_stage(stage, [page for _, page in entries])
+        except Exception as e:
+            logger.error(f"{stage} 큐 전송 실패, {len(entries)}개 페이지 상태 복구: {e}")
+            for previous_status, page in entries:
+                set_page_status(run_id, page['image_key'], previous_status, 'PROCESSING')
+            raise
+    return dispatched
 
 @logger.inject_lambda_context(log_event=True)
 @metrics.log_metrics(capture_cold_start_metric=True)
 @tracer.capture_lambda_handler
+@profiled('orchestrator')
 def handler(event: dict, context: LambdaContext) -> dict:
     run_id = event.get('run_id')
     input_bucket = event.get('input_bucket')
@@ -206,19 +233,6 @@ def handler(event: dict, context: LambdaContext) -> dict:
     try:
         workflow_status_item = get_workflow_status(run_id)
         
-        # check_only 플래그 처리 (EventBridge 완료 확인용)
-        if event.get('check_only', False):
-            if not workflow_status_item:
-                logger.warning(f"check_only 모드: 워크플로우 상태 없음. run_id={run_id}")
-                return {
-                    'run_id': run_id,
-                    'is_work_done': False,
-                    'batch_to_process': [],
-                    'input_bucket': input_bucket,
-                    'temp_bucket': temp_bucket,
-                    'output_bucket': output_bucket
-                }
-        
         total_initialized_images = workflow_status_item.get('total_images', 0)
         
         # CRITICAL: TriggerPipeline 완료 대기 로직 개선
@@ -227,7 +241,7 @@ def handler(event: dict, context: LambdaContext) -> dict:
             return {
                 'run_id': run_id,
                 'is_work_done': False,
-                'batch_to_process': [],
+                'dispatch_count': 0,
                 'input_bucket': input_bucket,
                 'temp_bucket': temp_bucket,
                 'output_bucket': output_bucket
@@ -243,72 +257,86 @@ def handler(event: dict, context: LambdaContext) -> dict:
                 return {
                     'run_id': run_id,
                     'is_work_done': False,
-                    'batch_to_process': [],
+                    'dispatch_count': 0,
                     'input_bucket': input_bucket,
                     'temp_bucket': temp_bucket,
                     'output_bucket': output_bucket
                 }
         
-        batch_size = calculate_dynamic_batch_size(run_id)
-        logger.info(f"run_id {run_id} 오케스트레이션 시작. 배치 크기: {batch_size}")
-        
-        tasks_to_process = query_pending_tasks(run_id, batch_size)
+        # 동시에 진행 중인 실행들과 공유 용량을 나눈 이 실행의 할당량
+        schedule = run_scheduler.quota(run_id, workflow_status_item)
+        tasks_to_process = query_pending_tasks(run_id, min(MAX_DISPATCH_PAGES, max(schedule['quota'], 1)))
         
         if not tasks_to_process:
-            # 처리할 작업이 없는 경우, 모든 이미지가 처리되었는지 확인
-            completed_count_response = dynamodb.Table(DYNAMODB_TABLE_NAME).query(
-                IndexName='run-status-index',
-                KeyConditionExpression=Key('run_id').eq(run_id) & Key('job_status').eq('COMPLETED')
-            )
-            completed_images = [item for item in completed_count_response.get('Items', []) if not item.get('is_cover', False)]
-            
-            expected_completed_count = total_initialized_images - workflow_status_item.get('skipped_images', 0)
+            # 처리할 작업이 없는 경우, 스트림 집계기가 유지하는 진행 카운터로 모든 이미지가 처리되었는지 확인
+            progress = completion_decision(workflow_status_item) or {}
             
-            if len(completed_images) == expected_completed_count and expected_completed_count > 0:
+            if progress.get('is_work_done'):
                 logger.info("모든 이미지가 성공적으로 처리되었습니다. PDF 생성을 시작합니다.")
-                publish_completion_event(run_id, True)
+                run_scheduler.deregister(run_id)
                 return {
                     'run_id': run_id,
                     'is_work_done': True,
-                    'batch_to_process': None,
+                    'dispatch_count': 0,
                     'input_bucket': input_bucket,
                     'temp_bucket': temp_bucket,
                     'output_bucket': output_bucket
                 }
             else:
-                logger.info(f"처리 대기 중인 이미지는 없지만, 아직 모든 이미지가 처리되지 않았습니다. 처리완료={len(completed_images)}, 예상={expected_completed_count}")
-                publish_completion_event(run_id, False)
+                logger.info(f"처리 대기 중인 이미지는 없지만, 아직 모든 이미지가 처리되지 않았습니다. 처리완료={workflow_status_item.get('pages_done', 0)}, 예상={total_initialized_images - workflow_status_item.get('skipped_images', 0)}")
                 return {
                     'run_id': run_id,
                     'is_work_done': False,
-                    'batch_to_process': [],
+                    'dispatch_count': 0,
                     'input_bucket': input_bucket,
                     'temp_bucket': temp_bucket,
                     'output_bucket': output_bucket
                 }
         
-        batch_to_process = []
-        for task in tasks_to_process:
-            batch_to_process.append({
+        record_schedule(run_id, workflow_status_item, schedule['allocation'])
+        metrics.add_metric(name="ScheduledAllocation", unit="Count", value=schedule['allocation'])
+        if schedule['quota'] == 0:
+            # 할당량을 모두 사용 중: 처리 중 페이지가 줄어들거나 대기 시간이 지나면 다시 확인
+            logger.info(f"할당량 소진, 배정 보류: 할당량={schedule['allocation']}, 처리 중={schedule['in_flight']}")
+            return {
                 'run_id': run_id,
-                'image_key': task['image_key'],
+                'is_work_done': False,
+                'dispatch_count': 0,
                 'input_bucket': input_bucket,
                 'temp_bucket': temp_bucket,
                 'output_bucket': output_bucket
+            }
+        
+        pages = []
+        resumed_count = 0
+        for task in tasks_to_process[:schedule['quota']]:
+            resume_payload = build_resume_payload(task)
+            if resume_payload['resume_from'] not in ('detect_skew', None):
+                resumed_count += 1
+            pages.append({
+                'run_id': run_id,
+                'image_key': task['image_key'],
+                'input_bucket': input_bucket,
+                'temp_bucket': temp_bucket,
+                'output_bucket': output_bucket,
+                'execution_input': event.get('execution_input') or {},
+                'previous_status': task['job_status'],
+                **resume_payload
             })
-            # 처리할 이미지의 상태를 'PROCESSING'으로 업데이트
-            update_image_status(run_id, task['image_key'], 'PROCESSING')
+        dispatched = dispatch_pages(run_id, pages)
+        dispatch_count = sum(dispatched.values())
 
-        logger.info(f"배치 처리 시작: {len(tasks_to_process)}개 작업")
+        logger.info(f"페이지 디스패치: {dispatch_count}개, 단계별 {dispatched}")
         
         # 메트릭 기록
-        metrics.add_metric(name="BatchSize", unit="Count", value=len(tasks_to_process))
+        metrics.add_metric(name="DispatchedPages", unit="Count", value=dispatch_count)
+        metrics.add_metric(name="ResumedPages", unit="Count", value=resumed_count)
         metrics.add_dimension(name="RunId", value=run_id)
         
         return {
             'run_id': run_id,
             'is_work_done': False,
-            'batch_to_process': batch_to_process,
+            'dispatch_count': dispatch_count,
             'input_bucket': input_bucket,
             'temp_bucket': temp_bucket,
             'output_bucket': output_bucket
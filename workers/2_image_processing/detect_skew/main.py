@@ -1,5 +1,4 @@
 import json
-import boto3
 import os
 import sys
 import logging
@@ -7,8 +6,6 @@ import math
 import statistics
 from datetime import datetime
 from typing import Dict, Any
-from google.cloud import vision
-from google.oauth2 import service_account
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
 import backoff
@@ -16,105 +13,95 @@ import backoff
 # Lambda 레이어 경로 설정
 sys.path.append('/opt/python')
 
-from common.secrets_cache import get_cached_secret, SecretsRetrievalError, SecretsValidationError
-from common.state_manager import get_state_manager, StateUpdateError
+from common.secrets_cache import load_secret, SecretsRetrievalError, SecretsValidationError
+from common.state_manager import get_state_manager, StateUpdateError, MaxAttemptsExceededError, JobStatus
+from common.rate_limiter import get_rate_limiter
+from common.stage_cache import get_stage_cache, StageCache
+from common.vision_client import create_vision_client, response_error, word_vertices
+from common.hedging import get_hedger
+from common.ttl_cache import TTLCache
+from common.aws_clients import get_client
+from common.profiling import profiled
+from common.stage_queue import consume, is_queue_event
 
 import time
 
 logger = Logger(service="detect-skew")
 tracer = Tracer(service="detect-skew")
 
-cloudwatch_client = boto3.client('cloudwatch')
+s3_client = get_client('s3')
+cloudwatch_client = get_client('cloudwatch')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 GOOGLE_SECRET_NAME = os.environ.get('GOOGLE_SECRET_NAME')
 MAX_RETRIES = 3
 
 state_manager = get_state_manager(DYNAMODB_TABLE_NAME)
+rate_limiter = get_rate_limiter(DYNAMODB_TABLE_NAME)
+# 헤지 요청도 Vision 요청 한도 안에서만 전송
+get_hedger('vision', admit=lambda: rate_limiter.try_acquire('vision'))
+stage_cache = get_stage_cache(DYNAMODB_TABLE_NAME)
 
-vision_client = None
-credentials_cache = {}
-last_refresh = 0
-CACHE_TTL = 3600
+DETECT_SKEW_PARAMS = {'feature': 'DOCUMENT_TEXT_DETECTION'}
 
-import functools
+def load_vision_client(secret_name: str):
+    """자격증명을 새로 읽어 Vision 클라이언트 생성 (VISION_CLIENT=rest(기본)면 gRPC 라이브러리를 임포트하지 않음)"""
+    logger.info("Vision 클라이언트 초기화/갱신")
+    try:
+        credentials = load_secret(secret_name)
+        return create_vision_client(credentials)
+    except (SecretsRetrievalError, SecretsValidationError) as e:
+        logger.error(f"자격증명 처리 실패: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Vision 클라이언트 초기화 실패: {e}")
+        raise
+
+def put_secrets_metrics(secret_name: str, seconds: float, background: bool) -> None:
+    """자격증명 로드 메트릭 (백그라운드 갱신은 캐시 미스로 집계하지 않음)"""
+    cloudwatch_client.put_metric_data(
+        Namespace='BookScan/Security',
+        MetricData=[
+            {
+                'MetricName': 'SecretsCacheMissRate',
+                'Dimensions': [
+                    {'Name': 'SecretName', 'Value': secret_name}
+                ],
+                'Value': 0 if background else 1,
+                'Unit': 'Count'
+            },
+            {
+                'MetricName': 'SecretsFetchLatency',
+                'Dimensions': [
+                    {'Name': 'SecretName', 'Value': secret_name}
+                ],
+                'Value': seconds * 1000,
+                'Unit': 'Milliseconds'
+            }
+        ]
+    )
+
+vision_clients = TTLCache(load_vision_client, max_size=2, name='vision-client', on_load=put_secrets_metrics)
 
-@functools.lru_cache(maxsize=1)
 def get_vision_client():
-    """최적화된 Vision 클라이언트 with 보안 자격증명 처리"""
-    global vision_client, credentials_cache, last_refresh
-    
-    current_time = time.time()
-    
-    if (vision_client is None or 
-        current_time - last_refresh > CACHE_TTL):
-        
-        logger.info("Vision 클라이언트 초기화/갱신")
-        start_time = time.time()
-        
-        try:
-            if GOOGLE_SECRET_NAME not in credentials_cache or current_time - last_refresh > CACHE_TTL:
-                credentials = get_cached_secret(GOOGLE_SECRET_NAME)
-                credentials_cache[GOOGLE_SECRET_NAME] = credentials
-                last_refresh = current_time
-                cache_miss = 1
-            else:
-                credentials = credentials_cache[GOOGLE_SECRET_NAME]
-                cache_miss = 0
-                
-            end_time = time.time()
-            
-            cloudwatch_client.put_metric_data(
-                Namespace='BookScan/Security',
-                MetricData=[
-                    {
-                        'MetricName': 'SecretsCacheMissRate',
-                        'Dimensions': [
-                            {'Name': 'SecretName', 'Value': GOOGLE_SECRET_NAME}
-                        ],
-                        'Value': cache_miss,
-                        'Unit': 'Count'
-                    },
-                    {
-                        'MetricName': 'SecretsFetchLatency',
-                        'Dimensions': [
-                            {'Name': 'SecretName', 'Value': GOOGLE_SECRET_NAME}
-                        ],
-                        'Value': (end_time - start_time) * 1000,
-                        'Unit': 'Milliseconds'
-                    }
-                ]
-            )
-            
-            creds = service_account.Credentials.from_service_account_info(credentials)
-            vision_client = vision.ImageAnnotatorClient(credentials=creds)
-            
-        except (SecretsRetrievalError, SecretsValidationError) as e:
-            logger.error(f"자격증명 처리 실패: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Vision 클라이언트 초기화 실패: {e}")
-            raise
-            
-    return vision_client
+    """최적화된 Vision 클라이언트 with 보안 자격증명 처리 (TTL 만료 시 백그라운드 갱신)"""
+    return vision_clients.get(GOOGLE_SECRET_NAME)
 
 def detect_image_skew(image_content: bytes) -> float:
     """Google Vision API 호출 with 개선된 오류 처리"""
     try:
         client = get_vision_client()
-        image = vision.Image(content=image_content)
         
-        response = client.document_text_detection(image=image)
-        if response.error.message:
-            raise Exception(f"Vision API 오류: {response.error.message}")
+        rate_limiter.acquire('vision')
+        response = client.document_text_detection(image_content)
+        error_message = response_error(response)
+        if error_message:
+            raise Exception(f"Vision API 오류: {error_message}")
 
         angles = [
-            math.atan2(word.bounding_box.vertices[1].y - word.bounding_box.vertices[0].y,
-                       word.bounding_box.vertices[1].x - word.bounding_box.vertices[0].x) * 180 / math.pi
-            for page in response.full_text_annotation.pages
-            for block in page.blocks
-            for paragraph in block.paragraphs
-            for word in paragraph.words if len(word.bounding_box.vertices) >= 2
+            math.atan2(vertices[1]['y'] - vertices[0]['y'],
+                       vertices[1]['x'] - vertices[0]['x']) * 180 / math.pi
+            for vertices in word_vertices(response) if len(vertices) >= 2
         ]
         
         return statistics.median(angles) if angles else 0.0
@@ -125,8 +112,15 @@ def detect_image_skew(image_content: bytes) -> float:
 
 @tracer.capture_lambda_handler
 @logger.inject_lambda_context
+@profiled('detect_skew')
 def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
-    """개선된 이미지 기울기 감지 핸들러"""
+    """이미지 기울기 감지 핸들러 (단계 큐 배치 또는 단일 페이지 호출)"""
+    if is_queue_event(event):
+        return consume(event, 'detect_skew', detect_page)
+    return detect_page(event)
+
+def detect_page(event: Dict[str, Any]) -> Dict[str, Any]:
+    """페이지 하나의 기울기 감지"""
     run_id = event['run_id']
     image_key = event['image_key']
     input_bucket = event['input_bucket']
@@ -134,38 +128,48 @@ def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
     logger.append_keys(run_id=run_id, image_key=image_key)
     
     try:
-        if state_manager.check_max_attempts(run_id, image_key):
-            logger.warning(f"최대 재시도 횟수 초과: {image_key}")
-            state_manager.mark_permanent_failure(run_id, image_key, "최대 재시도 횟수 도달")
-            return {'status': 'FAILED_PERMANENT', 'image_key': image_key}
-
-        state_manager.update_job_status(run_id, image_key, 'PROCESSING')
+        try:
+            state_manager.begin_stage(run_id, image_key, 'detect_skew')
+        except MaxAttemptsExceededError:
+            return {'status': JobStatus.FAILED_PERMANENT, 'image_key': image_key}
 
         start_time = time.time()
         
         with tracer.subsegment("fetch_s3_image"):
-            s3_client = boto3.client('s3')
-            image_content = s3_client.get_object(Bucket=input_bucket, Key=image_key)['Body'].read()
+            s3_response = s3_client.get_object(Bucket=input_bucket, Key=image_key)
+            input_hash = StageCache.fingerprint(s3_response)
+            # 본문을 읽기 전에 캐시 확인 (적중 시 다운로드와 Vision 호출 생략)
+            cached = stage_cache.lookup('detect_skew', input_hash, DETECT_SKEW_PARAMS)
+            if cached:
+                s3_response['Body'].close()
+            else:
+                image_content = s3_response['Body'].read()
         
-        with tracer.subsegment("detect_skew"):
-            skew_angle = detect_image_skew(image_content)
+        if cached:
+            skew_angle = float(cached['result']['skew_angle'])
+        else:
+            with tracer.subsegment("detect_skew"):
+                skew_angle = detect_image_skew(image_content)
         
         logger.info(f"기울기 각도: {skew_angle:.2f}도")
         
         result = {'skew_angle': skew_angle}
         
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='COMPLETED',
-            output=result,
-            stage='detect_skew'
+        if not cached:
+            stage_cache.store('detect_skew', input_hash, DETECT_SKEW_PARAMS, result)
+        
+        state_manager.complete_stage(
+            run_id, image_key, 'detect_skew', result,
+            artifact_key=image_key,
+            input_checksum=input_hash,
+            params=DETECT_SKEW_PARAMS
         )
         
         tracer.put_annotation("skew_angle", skew_angle)
+        tracer.put_annotation("stage_cache_hit", bool(cached))
         tracer.put_metadata("processing_details", {
             "input_bucket": input_bucket,
-            "image_size": len(image_content)
+            "image_size": s3_response.get('ContentLength', 0)
         })
         
         end_time = time.time()
@@ -190,13 +194,7 @@ def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
 
     except (SecretsRetrievalError, SecretsValidationError) as e:
         logger.error(f"자격증명 오류: {e}")
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='FAILED_RETRYABLE',
-            error=str(e),
-            increment_attempts=True
-        )
+        state_manager.fail_stage(run_id, image_key, 'detect_skew', str(e))
         raise
         
     except StateUpdateError as e:
@@ -205,11 +203,5 @@ def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
         
     except Exception as e:
         logger.error(f"기울기 감지 실패: {e}")
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='FAILED_RETRYABLE',
-            error=str(e),
-            increment_attempts=True
-        )
+        state_manager.fail_stage(run_id, image_key, 'detect_skew', str(e))
         raise
@@ -1,53 +1,78 @@
 import json
-import boto3
 import os
 import sys
 import logging
 from datetime import datetime
-from google.cloud import vision
-from google.oauth2 import service_account
 from aws_lambda_powertools import Logger
 import time
 
 # Lambda 레이어 경로 설정
 sys.path.append('/opt/python')
 
-from common.secrets_cache import get_cached_secret, SecretsRetrievalError, SecretsValidationError
-from common.state_manager import get_state_manager, StateUpdateError
+from common.secrets_cache import load_secret, SecretsRetrievalError, SecretsValidationError
+from common.state_manager import get_state_manager, StateUpdateError, MaxAttemptsExceededError, JobStatus
+from common.rate_limiter import get_rate_limiter
+from common.stage_cache import get_stage_cache, StageCache
+from common.ocr_artifact import columns_from_annotation, encode_ocr_artifact, ARTIFACT_EXTENSION
+from common.vision_client import create_vision_client, response_error
+from common.hedging import get_hedger
+from common.ttl_cache import TTLCache
+from common.aws_clients import get_client
+from common.profiling import profiled
+from common.stage_queue import consume, is_queue_event
 
 logger = Logger(service="process-ocr")
 
-s3_client = boto3.client('s3')
-cloudwatch_client = boto3.client('cloudwatch')
+s3_client = get_client('s3')
+cloudwatch_client = get_client('cloudwatch')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 GOOGLE_SECRET_NAME = os.environ.get('GOOGLE_SECRET_NAME')
 MAX_RETRIES = 3
 
 state_manager = get_state_manager(DYNAMODB_TABLE_NAME)
+rate_limiter = get_rate_limiter(DYNAMODB_TABLE_NAME)
+# 헤지 요청도 Vision 요청 한도 안에서만 전송
+get_hedger('vision', admit=lambda: rate_limiter.try_acquire('vision'))
+stage_cache = get_stage_cache(DYNAMODB_TABLE_NAME)
 
-vision_client = None
+OCR_PARAMS = {'feature': 'DOCUMENT_TEXT_DETECTION'}
+
+def load_vision_client(secret_name: str):
+    """자격증명을 새로 읽어 Vision 클라이언트 생성"""
+    logger.info("Vision 클라이언트 보안 캐싱 초기화/갱신")
+    try:
+        credentials = load_secret(secret_name)
+        if not credentials:
+            raise Exception("Google 자격 증명 가져오기 실패")
+        # VISION_CLIENT=rest(기본)면 gRPC 라이브러리를 임포트하지 않음
+        return create_vision_client(credentials)
+    except (SecretsRetrievalError, SecretsValidationError) as e:
+        logger.error(f"자격증명 처리 실패: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Vision 클라이언트 초기화 실패: {e}")
+        raise
+
+vision_clients = TTLCache(load_vision_client, max_size=2, name='vision-client')
 
 def get_vision_client():
-    """Google Vision 클라이언트 보안 캐싱 초기화"""
-    global vision_client
-    if vision_client is None:
-        logger.info("Vision 클라이언트 보안 캐싱 초기화")
-        try:
-            credentials = get_cached_secret(GOOGLE_SECRET_NAME)
-            if not credentials:
-                raise Exception("Google 자격 증명 가져오기 실패")
-            creds = service_account.Credentials.from_service_account_info(credentials)
-            vision_client = vision.ImageAnnotatorClient(credentials=creds)
-        except (SecretsRetrievalError, SecretsValidationError) as e:
-            logger.error(f"자격증명 처리 실패: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Vision 클라이언트 초기화 실패: {e}")
-            raise
-    return vision_client
+    """Google Vision 클라이언트 보안 캐싱 (TTL 만료 시 기존 클라이언트로 응답하며 백그라운드 갱신)"""
+    return vision_clients.get(GOOGLE_SECRET_NAME)
 
+@profiled('ocr')
 def handler(event, context):
+    """OCR 핸들러 (단계 큐 배치 또는 단일 페이지 호출)"""
+    if is_queue_event(event):
+        return consume(event, 'ocr', ocr_message)
+    return process_page(event)
+
+def ocr_message(message):
+    """단계 큐 메시지: 업스케일 단계 결과 이미지를 OCR"""
+    upscaled_image_key = message['job_output']['upscale']['upscaled_image_key']
+    return process_page({**message, 'image_key_for_ocr': upscaled_image_key})
+
+def process_page(event):
     """Google Vision API를 사용하여 이미지에 대해 OCR을 수행하고 텍스트를 S3에 저장"""
     run_id = event['run_id']
     image_key = event['image_key']
@@ -55,39 +80,57 @@ def handler(event, context):
     image_key_for_ocr = event['image_key_for_ocr'] 
 
     try:
-        if state_manager.check_max_attempts(run_id, image_key):
-            logger.warning(f"최대 재시도 횟수 초과: {image_key}")
-            state_manager.mark_permanent_failure(run_id, image_key, "최대 재시도 횟수 도달")
-            return {'status': 'FAILED_PERMANENT', 'image_key': image_key}
-
-        state_manager.update_job_status(run_id, image_key, 'PROCESSING')
+        try:
+            state_manager.begin_stage(run_id, image_key, 'ocr')
+        except MaxAttemptsExceededError:
+            return {'status': JobStatus.FAILED_PERMANENT, 'image_key': image_key}
 
         start_time = time.time()
         
         try:
-            client = get_vision_client()
-            image_content = s3_client.get_object(Bucket=temp_bucket, Key=image_key_for_ocr)['Body'].read()
-            image = vision.Image(content=image_content)
-
-            response = client.document_text_detection(image=image)
-            if response.error.message:
-                raise Exception(f"Vision API 오류: {response.error.message}")
-
-            full_text_annotation_json = vision.AnnotateImageResponse.to_json(response)
+            s3_response = s3_client.get_object(Bucket=temp_bucket, Key=image_key_for_ocr)
+            input_hash = StageCache.fingerprint(s3_response)
+            cached = stage_cache.lookup('ocr', input_hash, OCR_PARAMS)
+
+            if cached:
+                s3_response['Body'].close()
+                result = cached['result']
+                ocr_output_key = result['ocr_output_key']
+                logger.info(f"{image_key_for_ocr} OCR 캐시 적중: {ocr_output_key}")
+            else:
+                client = get_vision_client()
+                image_content = s3_response['Body'].read()
+
+                rate_limiter.acquire('vision')
+                response = client.document_text_detection(image_content)
+                error_message = response_error(response)
+                if error_message:
+                    raise Exception(f"Vision API 오류: {error_message}")
+
+                full_text_annotation_json = json.dumps(response, ensure_ascii=False)
+                
+                cache_key = StageCache.cache_key('ocr', input_hash or StageCache.fingerprint_bytes(image_content), OCR_PARAMS)
+                ocr_output_key = StageCache.artifact_key('ocr', cache_key, '.json')
+                s3_client.put_object(Bucket=temp_bucket, Key=ocr_output_key, Body=full_text_annotation_json.encode('utf-8'))
+                
+                # PDF 생성/검색 색인용 단어 열 배열 산출물 (전체 JSON 대비 크기와 파싱 시간 절감)
+                ocr_compact_key = StageCache.artifact_key('ocr', cache_key, ARTIFACT_EXTENSION)
+                compact_artifact = encode_ocr_artifact(columns_from_annotation(response))
+                s3_client.put_object(Bucket=temp_bucket, Key=ocr_compact_key, Body=compact_artifact)
+                
+                logger.info(
+                    f"{image_key_for_ocr}에 대한 OCR 처리 성공, {ocr_output_key}에 저장됨 "
+                    f"(압축 산출물 {len(compact_artifact)} / {len(full_text_annotation_json)} 바이트)"
+                )
+
+                result = {'ocr_output_key': ocr_output_key, 'ocr_compact_key': ocr_compact_key}
+                stage_cache.store('ocr', input_hash, OCR_PARAMS, result, artifact_key=ocr_output_key)
             
-            ocr_output_key = f"ocr-results/{os.path.basename(image_key_for_ocr)}.json"
-            s3_client.put_object(Bucket=temp_bucket, Key=ocr_output_key, Body=full_text_annotation_json.encode('utf-8'))
-            
-            logger.info(f"{image_key_for_ocr}에 대한 OCR 처리 성공, {ocr_output_key}에 저장됨")
-
-            result = {'ocr_output_key': ocr_output_key}
-            
-            state_manager.update_job_status(
-                run_id=run_id,
-                image_key=image_key,
-                status='COMPLETED',
-                output=result,
-                stage='ocr'
+            state_manager.complete_stage(
+                run_id, image_key, 'ocr', result,
+                artifact_key=ocr_output_key,
+                input_checksum=input_hash,
+                params=OCR_PARAMS
             )
             
             end_time = time.time()
@@ -112,24 +155,12 @@ def handler(event, context):
 
         except (SecretsRetrievalError, SecretsValidationError) as e:
             logger.error(f"자격증명 오류: {e}")
-            state_manager.update_job_status(
-                run_id=run_id,
-                image_key=image_key,
-                status='FAILED_RETRYABLE',
-                error=str(e),
-                increment_attempts=True
-            )
+            state_manager.fail_stage(run_id, image_key, 'ocr', str(e))
             raise
             
         except Exception as e:
             logger.error(f"{image_key}에 대한 OCR 처리 실패: {e}")
-            state_manager.update_job_status(
-                run_id=run_id,
-                image_key=image_key,
-                status='FAILED_RETRYABLE',
-                error=str(e),
-                increment_attempts=True
-            )
+            state_manager.fail_stage(run_id, image_key, 'ocr', str(e))
             raise
 
     except StateUpdateError as e:
@@ -1,50 +1,30 @@
 import os
+import sys
 import json
-import boto3
 import cv2
 import numpy as np
 import logging
-from datetime import datetime
+import signal
+import threading
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# 공통 모듈 경로 설정
+sys.path.append('/opt/python')
 
-DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
-MAX_RETRIES = 3
+from common.state_manager import get_state_manager, MaxAttemptsExceededError, JobStatus
+from common.stage_cache import get_stage_cache, StageCache
+from common.aws_clients import get_client
+from common.profiling import profiled
+from common.stage_queue import poll
 
-def update_job_status(run_id, image_key, status, **kwargs):
-    """DynamoDB의 작업 상태를 업데이트합니다."""
-    state_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-    
-    update_expression = "SET job_status = :s, last_updated = :ts"
-    expression_values = {
-        ':s': status,
-        ':ts': datetime.utcnow().isoformat()
-    }
-    
-    if 'output' in kwargs:
-        update_expression += ", job_output.skew_correction = :o"
-        expression_values[':o'] = kwargs['output']
-        
-    if 'error' in kwargs:
-        update_expression += ", error_message = :e"
-        expression_values[':e'] = str(kwargs['error'])
+s3_client = get_client('s3')
 
-    if status == 'FAILED_RETRYABLE':
-        update_expression += " ADD attempts :inc"
-        expression_values[':inc'] = 1
+DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 
-    try:
-        state_table.update_item(
-            Key={'run_id': run_id, 'image_key': image_key},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_values
-        )
-    except Exception as e:
-        logger.error(f"치명적 오류: {image_key}에 대한 DynamoDB 업데이트 실패: {e}")
+state_manager = get_state_manager(DYNAMODB_TABLE_NAME)
+stage_cache = get_stage_cache(DYNAMODB_TABLE_NAME)
 
 def correct_skew(image_content, angle):
     """OpenCV를 사용하여 이미지 기울기를 보정합니다."""
@@ -73,47 +53,84 @@ def correct_skew(image_content, angle):
         raise RuntimeError("보정된 이미지 인코딩 실패.")
     return buffer.tobytes()
 
-def main():
-    """기울기 보정 작업을 실행합니다."""
-    run_id = os.environ['RUN_ID']
-    image_key = os.environ['IMAGE_KEY']
-    skew_angle = float(os.environ['SKEW_ANGLE'])
-    input_bucket = os.environ['INPUT_BUCKET']
-    temp_bucket = os.environ['TEMP_BUCKET']
+@profiled('skew_correction')
+def correct_page(page):
+    """페이지 하나의 기울기를 보정하고 결과를 반환합니다."""
+    run_id = page['run_id']
+    image_key = page['image_key']
+    skew_angle = float(page['skew_angle'])
+    input_bucket = page['input_bucket']
+    temp_bucket = page['temp_bucket']
     
-    state_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-    item = state_table.get_item(Key={'run_id': run_id, 'image_key': image_key}).get('Item', {})
-    attempts = item.get('attempts', 0)
-
-    if attempts >= MAX_RETRIES:
-        logger.warning(f"최대 재시도 횟수 초과: {image_key}. 영구 실패로 표시합니다.")
-        update_job_status(run_id, image_key, 'FAILED_PERMANENT', error="최대 재시도 횟수 도달.")
-        print(json.dumps({'status': 'FAILED_PERMANENT', 'image_key': image_key}))
-        return
-
-    update_job_status(run_id, image_key, 'PROCESSING')
+    try:
+        state_manager.begin_stage(run_id, image_key, 'skew_correction')
+    except MaxAttemptsExceededError:
+        return {'status': JobStatus.FAILED_PERMANENT, 'image_key': image_key}
 
     try:
         logger.info(f"{image_key}에 대한 기울기 보정 시작 (각도: {skew_angle:.2f})")
         
         response = s3_client.get_object(Bucket=input_bucket, Key=image_key)
-        original_content = response['Body'].read()
-
-        corrected_content = correct_skew(original_content, skew_angle)
-
-        output_key = f"corrected/{os.path.basename(image_key)}"
-        s3_client.put_object(Bucket=temp_bucket, Key=output_key, Body=corrected_content)
-        
-        result = {'corrected_image_key': output_key}
-        update_job_status(run_id, image_key, 'COMPLETED', output=result)
+        input_hash = StageCache.fingerprint(response)
+        params = {'skew_angle': round(skew_angle, 4)}
+        cached = stage_cache.lookup('skew_correction', input_hash, params)
+
+        if cached:
+            response['Body'].close()
+            result = cached['result']
+            output_key = result['corrected_image_key']
+        else:
+            original_content = response['Body'].read()
+
+            corrected_content = correct_skew(original_content, skew_angle)
+
+            cache_key = StageCache.cache_key('skew_correction', input_hash or StageCache.fingerprint_bytes(original_content), params)
+            output_key = StageCache.artifact_key('skew_correction', cache_key, '.jpg')
+            s3_client.put_object(Bucket=temp_bucket, Key=output_key, Body=corrected_content)
+            
+            result = {'corrected_image_key': output_key}
+            stage_cache.store('skew_correction', input_hash, params, result, artifact_key=output_key)
+
+        state_manager.complete_stage(
+            run_id, image_key, 'skew_correction', result,
+            artifact_key=output_key,
+            input_checksum=input_hash,
+            params=params
+        )
         
         logger.info(f"{image_key} 기울기 보정 성공, 출력 경로: {output_key}")
-        print(json.dumps(result))
+        return result
 
     except Exception as e:
         logger.error(f"Fargate 작업 실패: {image_key}: {e}", exc_info=True)
-        update_job_status(run_id, image_key, 'FAILED_RETRYABLE', error=e)
+        state_manager.fail_stage(run_id, image_key, 'skew_correction', str(e))
         raise
 
+def correct_message(message):
+    """단계 큐 메시지: 기울기 감지 단계 결과 각도로 보정합니다."""
+    return correct_page({**message, 'skew_angle': message['job_output']['detect_skew']['skew_angle']})
+
+def main():
+    """
+    기울기 보정 작업을 실행합니다.
+    IMAGE_KEY가 설정되면 해당 페이지 하나만 처리하고, 아니면 단계 큐 작업자로 동작합니다.
+    (큐 깊이에 따라 서비스 작업 수가 조정되며, 축소 시 SIGTERM을 받으면 처리 중인 메시지까지만 마칩니다)
+    """
+    if os.environ.get('IMAGE_KEY'):
+        result = correct_page({
+            'run_id': os.environ['RUN_ID'],
+            'image_key': os.environ['IMAGE_KEY'],
+            'skew_angle': os.environ['SKEW_ANGLE'],
+            'input_bucket': os.environ['INPUT_BUCKET'],
+            'temp_bucket': os.environ['TEMP_BUCKET']
+        })
+        print(json.dumps(result))
+        return
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    processed = poll('skew_correction', correct_message, should_stop=stopping.is_set)
+    logger.info(f"단계 큐 작업자 종료, 처리한 메시지: {processed}")
+
 if __name__ == "__main__":
     main()
@@ -1,32 +1,43 @@
-import boto3
 import os
 import sys
 import json
-import boto3
 import logging
 import time
 from datetime import datetime
 from botocore.exceptions import ClientError
-from botocore.config import Config
 from aws_lambda_powertools import Logger
 
 # Lambda 레이어 경로 설정
 sys.path.append('/opt/python')
 
-from common.state_manager import get_state_manager, StateUpdateError
-from common.sagemaker_client import get_sagemaker_client, SageMakerInferenceError
+from common.state_manager import get_state_manager, StateUpdateError, MaxAttemptsExceededError
+from common.sagemaker_client import get_sagemaker_client, hedger_name, SageMakerInferenceError
+from common.hedging import get_hedger
+from common.rate_limiter import get_rate_limiter, RateLimitExceededError
+from common.stage_cache import get_stage_cache, StageCache
+from common.aws_clients import get_client, prewarm
+from common.profiling import profiled
+from common.stage_queue import consume, is_queue_event
 
 logger = Logger(service="upscaler")
 
-s3_client = boto3.client('s3')
-cloudwatch_client = boto3.client('cloudwatch')
+s3_client = get_client('s3')
+cloudwatch_client = get_client('cloudwatch')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 SAGEMAKER_ENDPOINT_NAME = os.environ['SAGEMAKER_ENDPOINT_NAME']
 MAX_RETRIES = 3
 
 state_manager = get_state_manager(DYNAMODB_TABLE_NAME)
-sagemaker_client = get_sagemaker_client(SAGEMAKER_ENDPOINT_NAME)
+rate_limiter = get_rate_limiter(DYNAMODB_TABLE_NAME)
+# 헤지 요청도 SageMaker 요청 한도 안에서만 전송
+get_hedger(hedger_name(SAGEMAKER_ENDPOINT_NAME), admit=lambda: rate_limiter.try_acquire('sagemaker'))
+stage_cache = get_stage_cache(DYNAMODB_TABLE_NAME)
+
+# SageMaker 런타임 클라이언트는 첫 호출 때 생성되므로 초기화 단계에서 미리 생성
+prewarm('sagemaker-runtime')
+
+UPSCALE_PARAMS = {'endpoint_name': SAGEMAKER_ENDPOINT_NAME}
 
 class ProcessingError(Exception):
     pass
@@ -37,7 +48,20 @@ class PermanentError(ProcessingError):
 class RetryableError(ProcessingError):
     pass
 
+@profiled('upscale')
 def handler(event, context):
+    if is_queue_event(event):
+        return consume(event, 'upscale', upscale_message)
+    return upscale_page(event)
+
+def upscale_message(message):
+    """단계 큐 메시지 처리: 영구 실패는 상태에 기록되었으므로 재전달하지 않고 메시지 삭제"""
+    try:
+        return upscale_page(message)
+    except PermanentError:
+        return {'status': 'FAILED_PERMANENT', 'image_key': message['image_key']}
+
+def upscale_page(event):
     run_id = event['run_id']
     image_key = event['image_key']
     temp_bucket = event['temp_bucket']
@@ -45,19 +69,17 @@ def handler(event, context):
     corrected_image_key = event['job_output']['skew_correction']['corrected_image_key']
 
     try:
-        if state_manager.check_max_attempts(run_id, image_key):
-            logger.warning(f"최대 재시도 횟수 초과: {image_key}")
-            state_manager.mark_permanent_failure(run_id, image_key, "최대 재시도 횟수 도달")
-            raise PermanentError("최대 재시도 횟수 도달")
+        state_manager.begin_stage(run_id, image_key, 'upscale')
+    except MaxAttemptsExceededError:
+        raise PermanentError("최대 재시도 횟수 도달")
 
-        state_manager.update_job_status(run_id, image_key, 'PROCESSING')
+    try:
         logger.info(f"{corrected_image_key} 업스케일링 시작")
         
         start_time = time.time()
         
         try:
             response = s3_client.get_object(Bucket=temp_bucket, Key=corrected_image_key)
-            image_bytes = response['Body'].read()
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
             if error_code == 'NoSuchKey':
@@ -65,37 +87,53 @@ def handler(event, context):
             else:
                 raise RetryableError(f"S3 접근 오류: {e}")
 
-        try:
-            upscaled_image_bytes = sagemaker_client.invoke_inference(
-                image_content=image_bytes,
-                run_id=run_id,
-                image_key=image_key
-            )
-        except SageMakerInferenceError as e:
-            if "재시도 가능" in str(e) or "스로틀링" in str(e):
-                raise RetryableError(f"SageMaker 재시도 가능 오류: {e}")
-            else:
-                raise PermanentError(f"SageMaker 치명적 오류: {e}")
-        
-        upscaled_image_key = f"upscaled/{os.path.basename(image_key)}"
-        try:
-            s3_client.put_object(
-                Bucket=temp_bucket,
-                Key=upscaled_image_key,
-                Body=upscaled_image_bytes,
-                ContentType='image/jpeg'
-            )
-        except ClientError as e:
-            raise RetryableError(f"S3 업로드 오류: {e}")
-        
-        result = {'upscaled_image_key': upscaled_image_key}
+        input_hash = StageCache.fingerprint(response)
+        cached = stage_cache.lookup('upscale', input_hash, UPSCALE_PARAMS)
+
+        if cached:
+            response['Body'].close()
+            result = cached['result']
+            upscaled_image_key = result['upscaled_image_key']
+        else:
+            image_bytes = response['Body'].read()
+
+            try:
+                rate_limiter.acquire('sagemaker')
+            except RateLimitExceededError as e:
+                raise RetryableError(f"SageMaker 요청 한도 대기 초과: {e}")
+
+            try:
+                upscaled_image_bytes = get_sagemaker_client(SAGEMAKER_ENDPOINT_NAME).invoke_inference(
+                    image_content=image_bytes,
+                    run_id=run_id,
+                    image_key=image_key
+                )
+            except SageMakerInferenceError as e:
+                if "재시도 가능" in str(e) or "스로틀링" in str(e):
+                    raise RetryableError(f"SageMaker 재시도 가능 오류: {e}")
+                else:
+                    raise PermanentError(f"SageMaker 치명적 오류: {e}")
+            
+            cache_key = StageCache.cache_key('upscale', input_hash or StageCache.fingerprint_bytes(image_bytes), UPSCALE_PARAMS)
+            upscaled_image_key = StageCache.artifact_key('upscale', cache_key, '.jpg')
+            try:
+                s3_client.put_object(
+                    Bucket=temp_bucket,
+                    Key=upscaled_image_key,
+                    Body=upscaled_image_bytes,
+                    ContentType='image/jpeg'
+                )
+            except ClientError as e:
+                raise RetryableError(f"S3 업로드 오류: {e}")
+            
+            result = {'upscaled_image_key': upscaled_image_key}
+            stage_cache.store('upscale', input_hash, UPSCALE_PARAMS, result, artifact_key=upscaled_image_key)
         
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='COMPLETED',
-            output=result,
-            stage='upscale'
+        state_manager.complete_stage(
+            run_id, image_key, 'upscale', result,
+            artifact_key=upscaled_image_key,
+            input_checksum=input_hash,
+            params=UPSCALE_PARAMS
         )
         
         end_time = time.time()
@@ -121,23 +159,12 @@ def handler(event, context):
 
     except PermanentError as e:
         logger.error(f"{image_key} 영구 실패: {e}")
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='FAILED_PERMANENT',
-            error=str(e)
-        )
+        state_manager.fail_stage(run_id, image_key, 'upscale', str(e), permanent=True)
         raise
         
     except RetryableError as e:
         logger.warning(f"{image_key} 재시도 가능한 실패: {e}")
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='FAILED_RETRYABLE',
-            error=str(e),
-            increment_attempts=True
-        )
+        state_manager.fail_stage(run_id, image_key, 'upscale', str(e))
         raise
         
     except StateUpdateError as e:
@@ -146,11 +173,5 @@ def handler(event, context):
         
     except Exception as e:
         logger.error(f"{image_key} 예상치 못한 오류: {e}", exc_info=True)
-        state_manager.update_job_status(
-            run_id=run_id,
-            image_key=image_key,
-            status='FAILED_RETRYABLE',
-            error=f"예상치 못한 오류: {e}",
-            increment_attempts=True
-        )
+        state_manager.fail_stage(run_id, image_key, 'upscale', f"예상치 못한 오류: {e}")
         raise RetryableError(f"예상치 못한 오류: {e}")
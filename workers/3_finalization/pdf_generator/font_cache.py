@@ -0,0 +1,403 @@
+"""
+텍스트 레이어 글꼴 서비스
+TTF는 한 번만 파싱하여 글리프 지표(cmap, 폭, 서체 정보)를 numpy 캐시로 직렬화하고
+(이미지 빌드 시 글꼴 옆에 굽거나 실행 중 /tmp에 기록) 이후에는 캐시만 읽음
+
+페이지 내용 스트림은 원본 글리프 번호(Identity-H)로 기록하므로 부분 집합 구성과 무관하며,
+책 하나에서 실제로 사용한 글자를 모아 문서를 닫을 때 한 번만 부분 집합 글꼴을 만들어 공유
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CACHE_VERSION = 1
+CACHE_EXTENSION = '.metrics.npz'
+FONT_CACHE_DIR = os.environ.get('FONT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'font-cache'))
+
+# 페이지 리소스에서 텍스트 레이어 글꼴을 가리키는 이름
+FONT_RESOURCE = 'FOCR'
+
+# 공유 글꼴 식별용 비공개 키 (글꼴 파일 지문, 사용 글자 코드포인트)
+FONT_MARKER = re.compile(rb'/BookScanFont\s*/(\w+)')
+CHARS_MARKER = re.compile(rb'/BookScanChars\s*<([0-9A-Fa-f]*)>')
+
+# 프로세스 안에서 글꼴 경로별 지표 재사용
+_metrics_cache: Dict[str, 'FontMetrics'] = {}
+
+def font_fingerprint(font_path: str) -> str:
+    """글꼴 파일 지문 (크기 + 앞부분 해시) - 캐시 유효성과 글리프 번호 호환성 확인용"""
+    digest = hashlib.sha1()
+    digest.update(str(os.path.getsize(font_path)).encode())
+    with open(font_path, 'rb') as handle:
+        digest.update(handle.read(65536))
+    return digest.hexdigest()[:16]
+
+class FontMetrics:
+    """코드포인트 정렬 배열 기반 글리프 번호/폭 조회 (폭은 1/1000 em)"""
+
+    def __init__(self, font_path: str, codepoints: np.ndarray, glyph_ids: np.ndarray,
+                 widths: np.ndarray, header: dict):
+        self.font_path = font_path
+        self.codepoints = codepoints
+        self.glyph_ids = glyph_ids
+        self.widths = widths
+        self.header = header
+        self.fingerprint = header['fingerprint']
+        self.descent = header['descent']
+        self.missing_width = header['missing_width']
+        # 지표를 얻은 경로 (image | tmp | parsed) 와 소요 시간
+        self.source = 'parsed'
+        self.load_ms = 0.0
+
+    @classmethod
+    def parse(cls, font_path: str) -> 'FontMetrics':
+        """fontTools로 TTF/OTF를 파싱하여 지표 추출 (콜드 스타트에서 가장 비싼 단계)"""
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(font_path, lazy=True)
+        scale = 1000.0 / font['head'].unitsPerEm
+        glyph_order = font.getGlyphOrder()
+        glyph_index = {name: gid for gid, name in enumerate(glyph_order)}
+        advances = font['hmtx'].metrics
+        cmap = font.getBestCmap()
+
+        codepoints = np.array(sorted(cmap), dtype=np.int32)
+        glyph_ids = np.array([glyph_index[cmap[cp]] for cp in codepoints.tolist()], dtype=np.uint16)
+        widths = np.array([round(advances[cmap[cp]][0] * scale) for cp in codepoints.tolist()], dtype=np.int32)
+
+        head, hhea, post = font['head'], font['hhea'], font['post']
+        os2 = font['OS/2'] if 'OS/2' in font else None
+        cap_height = getattr(os2, 'sCapHeight', 0) if os2 is not None else 0
+        name = font['name'].getDebugName(6) or os.path.splitext(os.path.basename(font_path))[0]
+        header = {
+            'version': CACHE_VERSION,
+            'fingerprint': font_fingerprint(font_path),
+            'font_name': re.sub(r'[^A-Za-z0-9-]', '', name),
+            'outline': 'glyf' if 'glyf' in font else 'cff',
+            'ascent': round(hhea.ascent * scale),
+            'descent': round(hhea.descent * scale),
+            'cap_height': round((cap_height or hhea.ascent) * scale),
+            'bbox': [round(value * scale) for value in (head.xMin, head.yMin, head.xMax, head.yMax)],
+            'italic_angle': float(post.italicAngle),
+            'missing_width': round(advances[glyph_order[0]][0] * scale)
+        }
+        font.close()
+        return cls(font_path, codepoints, glyph_ids, widths, header)
+
+    def save(self, cache_path: str) -> None:
+        """임시 파일에 기록 후 교체 (동시 실행 중인 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록)"""
+        directory = os.path.dirname(cache_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                np.savez(
+                    handle,
+                    codepoints=self.codepoints,
+                    glyph_ids=self.glyph_ids,
+                    widths=self.widths,
+                    header=np.frombuffer(json.dumps(self.header).encode('utf-8'), dtype=np.uint8)
+                )
+            # 이미지 빌드(root)와 Lambda 실행 사용자가 달라도 읽을 수 있도록
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, font_path: str, cache_path: str, fingerprint: str) -> Optional['FontMetrics']:
+        """캐시 파일 로드, 없거나 버전/지문이 다르면 None"""
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                header = json.loads(data['header'].tobytes().decode('utf-8'))
+                if header.get('version') != CACHE_VERSION or header.get('fingerprint') != fingerprint:
+                    return None
+                return cls(font_path, data['codepoints'], data['glyph_ids'], data['widths'], header)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def lookup(self, codepoints: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """코드포인트 배열의 (글리프 번호, 폭), 글꼴에 없는 글자는 .notdef(0)"""
+        position = np.searchsorted(self.codepoints, codepoints)
+        position = np.minimum(position, len(self.codepoints) - 1)
+        found = self.codepoints[position] == codepoints
+        glyph_ids = np.where(found, self.glyph_ids[position], 0).astype(np.uint16)
+        widths = np.where(found, self.widths[position], self.missing_width).astype(np.float64)
+        return glyph_ids, widths
+
+def cache_paths(font_path: str, fingerprint: str) -> List[Tuple[str, str]]:
+    """(출처, 캐시 경로) 조회 순서: 이미지에 구운 캐시 -> /tmp 캐시"""
+    name = os.path.basename(font_path)
+    return [
+        ('image', font_path + CACHE_EXTENSION),
+        ('tmp', os.path.join(FONT_CACHE_DIR, f"{name}.{fingerprint}{CACHE_EXTENSION}"))
+    ]
+
+def load_font_metrics(font_path: str) -> FontMetrics:
+    """
+    글꼴 지표 로드 (프로세스 메모리 -> 이미지 캐시 -> /tmp 캐시 -> 파싱 후 /tmp에 기록)
+    """
+    metrics = _metrics_cache.get(font_path)
+    if metrics is not None:
+        return metrics
+
+    started = time.perf_counter()
+    fingerprint = font_fingerprint(font_path)
+    for source, cache_path in cache_paths(font_path, fingerprint):
+        metrics = FontMetrics.load(font_path, cache_path, fingerprint)
+        if metrics is not None:
+            metrics.source = source
+            break
+    else:
+        metrics = FontMetrics.parse(font_path)
+        try:
+            metrics.save(cache_paths(font_path, fingerprint)[1][1])
+        except OSError:
+            # 캐시 기록 실패는 다음 콜드 스타트가 다시 파싱할 뿐이므로 무시
+            pass
+
+    metrics.load_ms = (time.perf_counter() - started) * 1000
+    _metrics_cache[font_path] = metrics
+    return metrics
+
+def encode_codepoints(codepoints: Iterable[int]) -> bytes:
+    return ''.join(f'{cp:06X}' for cp in sorted(codepoints)).encode('ascii')
+
+def decode_codepoints(hex_text: bytes) -> List[int]:
+    return [int(hex_text[i:i + 6], 16) for i in range(0, len(hex_text), 6)]
+
+def _pdf_font_objects(
+    metrics: FontMetrics,
+    font_num: int,
+    allocate: Callable[[], int],
+    codepoints: List[int],
+    font_file: bytes
+) -> List[Tuple[int, bytes, Optional[bytes]]]:
+    """Type0 + CIDFont + FontDescriptor + 글꼴 파일 + ToUnicode 객체 목록"""
+    header = metrics.header
+    glyph_ids, widths = metrics.lookup(np.asarray(codepoints, dtype=np.int32))
+    # 같은 글리프에 여러 글자가 대응하면 첫 글자를 ToUnicode에 사용
+    glyphs: Dict[int, Tuple[int, int]] = {}
+    for cp, gid, width in zip(codepoints, glyph_ids.tolist(), widths.tolist()):
+        if gid and gid not in glyphs:
+            glyphs[gid] = (cp, int(width))
+
+    tag = ''.join(
+        chr(ord('A') + byte % 26) for byte in hashlib.sha1(repr(sorted(glyphs)).encode()).digest()[:6]
+    )
+    base_font = f"{tag}+{header['font_name']}".encode('ascii')
+    cid_num, descriptor_num, file_num, to_unicode_num = allocate(), allocate(), allocate(), allocate()
+
+    # /W 배열: 연속된 글리프 번호를 묶어 gid [w1 w2 ...]
+    runs: List[List[Tuple[int, int]]] = []
+    for gid in sorted(glyphs):
+        if runs and runs[-1][-1][0] + 1 == gid:
+            runs[-1].append((gid, glyphs[gid][1]))
+        else:
+            runs.append([(gid, glyphs[gid][1])])
+    width_array = b' '.join(
+        b'%d [%s]' % (run[0][0], b' '.join(b'%d' % width for _, width in run)) for run in runs
+    )
+
+    type0 = (
+        b'<<\n/Type /Font\n/Subtype /Type0\n/BaseFont /%s\n/Encoding /Identity-H\n'
+        b'/DescendantFonts [%d 0 R]\n/ToUnicode %d 0 R\n/BookScanFont /%s\n/BookScanChars <%s>\n>>'
+        % (base_font, cid_num, to_unicode_num, metrics.fingerprint.encode('ascii'), encode_codepoints(codepoints))
+    )
+    if header['outline'] == 'glyf':
+        cid_font = b'/CIDFontType2\n/CIDToGIDMap /Identity'
+        file_key = b'FontFile2'
+        file_dict = b'<<\n/Length %d\n/Length1 %d\n/Filter /FlateDecode\n>>'
+    else:
+        cid_font = b'/CIDFontType0'
+        file_key = b'FontFile3'
+        file_dict = b'<<\n/Subtype /OpenType\n/Length %d\n/Filter /FlateDecode\n>>'
+    cid = (
+        b'<<\n/Type /Font\n/Subtype %s\n/BaseFont /%s\n'
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >>\n'
+        b'/FontDescriptor %d 0 R\n/DW %d\n/W [%s]\n>>'
+        % (cid_font, base_font, descriptor_num, metrics.missing_width, width_array)
+    )
+    descriptor = (
+        b'<<\n/Type /FontDescriptor\n/FontName /%s\n/Flags 4\n/FontBBox [%d %d %d %d]\n/ItalicAngle %d\n'
+        b'/Ascent %d\n/Descent %d\n/CapHeight %d\n/StemV 80\n/%s %d 0 R\n>>'
+        % (base_font, *header['bbox'], round(header['italic_angle']), header['ascent'], header['descent'],
+           header['cap_height'], file_key, file_num)
+    )
+    compressed = zlib.compress(font_file, 6)
+    if header['outline'] == 'glyf':
+        file_dict = file_dict % (len(compressed), len(font_file))
+    else:
+        file_dict = file_dict % len(compressed)
+
+    to_unicode = _to_unicode_cmap({gid: cp for gid, (cp, _) in glyphs.items()})
+    return [
+        (font_num, type0, None),
+        (cid_num, cid, None),
+        (descriptor_num, descriptor, None),
+        (file_num, file_dict, compressed),
+        (to_unicode_num, b'<<\n/Length %d\n>>' % len(to_unicode), to_unicode)
+    ]
+
+def _to_unicode_cmap(glyph_to_codepoint: Dict[int, int]) -> bytes:
+    """글리프 번호 -> 유니코드 (복사/검색용) CMap"""
+    entries = []
+    for gid in sorted(glyph_to_codepoint):
+        utf16 = chr(glyph_to_codepoint[gid]).encode('utf-16-be').hex().upper()
+        entries.append(f'<{gid:04X}> <{utf16}>')
+    lines = [
+        '/CIDInit /ProcSet findresource begin', '12 dict begin', 'begincmap',
+        '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def',
+        '/CMapName /Adobe-Identity-UCS def', '/CMapType 2 def',
+        '1 begincodespacerange', '<0000> <FFFF>', 'endcodespacerange'
+    ]
+    # bfchar 블록은 최대 100개 항목
+    for start in range(0, len(entries), 100):
+        block = entries[start:start + 100]
+        lines.append(f'{len(block)} beginbfchar')
+        lines.extend(block)
+        lines.append('endbfchar')
+    lines += ['endcmap', 'CMapName currentdict /CMap defineresource pop', 'end', 'end']
+    return '\n'.join(lines).encode('ascii')
+
+def subset_font_file(font_path: str, glyph_ids: Iterable[int]) -> bytes:
+    """원본 글리프 번호를 유지한 부분 집합 글꼴 (내용 스트림을 다시 쓰지 않아도 되도록 retain_gids)"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.retain_gids = True
+    options.notdef_outline = True
+    options.hinting = False
+    options.layout_features = []
+    options.name_IDs = []
+    options.drop_tables += ['GSUB', 'GPOS', 'GDEF', 'kern', 'DSIG', 'FFTM']
+
+    font = TTFont(font_path, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(gids=sorted(set(glyph_ids) | {0}))
+    subsetter.subset(font)
+    buffer = BytesIO()
+    font.save(buffer)
+    font.close()
+    return buffer.getvalue()
+
+class BookFont:
+    """
+    책 하나(작성기 하나)에서 사용한 글자를 모아 닫을 때 공유 글꼴 객체를 만드는 수집기
+    같은 글꼴 파일로 만든 다른 문서(페이지 조각, 청크)의 공유 글꼴도 흡수하여 글꼴을 하나로 합침
+    """
+
+    resource_name = FONT_RESOURCE
+
+    def __init__(self, metrics: FontMetrics):
+        self.metrics = metrics
+        self.codepoints: set = set()
+        self.stats: Dict[str, object] = {}
+
+    def add_codepoints(self, codepoints: Iterable[int]) -> None:
+        self.codepoints.update(codepoints)
+
+    def adopt(self, font_dict: bytes) -> bool:
+        """같은 글꼴 파일로 만든 공유 글꼴이면 사용 글자를 합치고 True"""
+        marker = FONT_MARKER.search(font_dict)
+        if not marker or marker.group(1).decode('ascii') != self.metrics.fingerprint:
+            return False
+        chars = CHARS_MARKER.search(font_dict)
+        if chars:
+            self.add_codepoints(decode_codepoints(chars.group(1)))
+        return True
+
+    def pdf_objects(self, font_num: int, allocate: Callable[[], int]) -> List[Tuple[int, bytes, Optional[bytes]]]:
+        """부분 집합을 만들고 font_num(Type0)부터 시작하는 글꼴 객체 목록 반환"""
+        started = time.perf_counter()
+        codepoints = sorted(self.codepoints)
+        glyph_ids, _ = self.metrics.lookup(np.asarray(codepoints, dtype=np.int32))
+        font_file = subset_font_file(self.metrics.font_path, glyph_ids.tolist())
+        objects = _pdf_font_objects(self.metrics, font_num, allocate, codepoints, font_file)
+        self.stats = {
+            'metrics_source': self.metrics.source,
+            'metrics_load_ms': round(self.metrics.load_ms, 1),
+            'glyphs': int(np.count_nonzero(np.unique(glyph_ids))),
+            'font_bytes': len(objects[3][2]),
+            'subset_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        return objects
+
+def _benchmark(font_path: str, pages: int) -> None:
+    """fpdf2 페이지별 글꼴 등록 방식과 지표 캐시 + 책 단위 부분 집합 방식 비교"""
+    from fpdf import FPDF
+
+    started = time.perf_counter()
+    metrics = FontMetrics.parse(font_path)
+    parse_ms = (time.perf_counter() - started) * 1000
+
+    # 글꼴에 있는 글자 중 한글 음절 우선, 없으면 앞쪽 글자로 OCR 단어 흉내
+    available = metrics.codepoints[metrics.codepoints >= 0x21]
+    hangul = available[(available >= 0xAC00) & (available <= 0xD7A3)]
+    sample = [chr(cp) for cp in (hangul if len(hangul) else available)[:600].tolist()]
+    words = [''.join(sample[(i * 7 + j) % len(sample)] for j in range(3)) for i in range(200)]
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        pdf = FPDF(unit='pt')
+        pdf.add_font('Text', '', font_path)
+        pdf.add_page(format=(600, 800))
+        pdf.set_font('Text', '', 10)
+        pdf.text(10, 20, ' '.join(words))
+        pdf.output()
+    fpdf_ms = (time.perf_counter() - started) * 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'bench' + CACHE_EXTENSION)
+        metrics.save(cache_path)
+        started = time.perf_counter()
+        metrics = FontMetrics.load(font_path, cache_path, font_fingerprint(font_path))
+        cache_ms = (time.perf_counter() - started) * 1000
+
+    book_font = BookFont(metrics)
+    started = time.perf_counter()
+    for _ in range(pages):
+        codepoints = np.fromiter(map(ord, ''.join(words)), dtype=np.int32)
+        metrics.lookup(codepoints)
+        book_font.add_codepoints(codepoints.tolist())
+    lookup_ms = (time.perf_counter() - started) * 1000
+    counter = iter(range(2, 10))
+    book_font.pdf_objects(1, lambda: next(counter))
+
+    print(json.dumps({
+        'font': os.path.basename(font_path),
+        'pages': pages,
+        'fpdf2_per_page_font_ms': round(fpdf_ms, 1),
+        'metrics_parse_ms': round(parse_ms, 1),
+        'metrics_cache_load_ms': round(cache_ms, 1),
+        'text_lookup_ms': round(lookup_ms, 1),
+        'book_subset_ms': book_font.stats['subset_ms'],
+        'book_font_bytes': book_font.stats['font_bytes']
+    }, indent=2))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="텍스트 레이어 글꼴 지표 캐시")
+    parser.add_argument('command', choices=['build', 'benchmark'])
+    parser.add_argument('font_path')
+    parser.add_argument('--pages', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        # 이미지 빌드 시 글꼴 옆에 캐시를 구워 콜드 스타트에서 파싱 생략
+        FontMetrics.parse(args.font_path).save(args.font_path + CACHE_EXTENSION)
+    else:
+        _benchmark(args.font_path, args.pages)
@@ -0,0 +1,445 @@
+"""
+PDF 선형화 (Fast Web View, PDF 1.7 부록 F)
+완성된 PDF의 객체를 첫 페이지 / 나머지 페이지 / 공유 객체 순서로 다시 배치하고
+힌트 스트림과 페이지별 바이트 범위 색인을 함께 작성
+이미지/폰트 스트림은 바이트 그대로 복사 (재인코딩 없음)
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from pdf_objects import (
+    PdfReader,
+    PdfObjectError,
+    REF_PATTERN,
+    _dict_ref,
+    rewrite_refs,
+    serialize_object,
+    xref_table
+)
+
+PDF_HEADER = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+
+# 선형화 사전/첫 페이지 트레일러 숫자 자리 (고정 폭으로 예약 후 실제 값 기록)
+NUMBER_WIDTH = 10
+
+PARENT_PATTERN = re.compile(rb'/Parent\s+\d+\s+\d+\s+R')
+
+class _BitWriter:
+    """힌트 테이블용 비트 단위 기록기 (상위 비트부터)"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.current = 0
+        self.bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        for shift in range(bits - 1, -1, -1):
+            self.current = (self.current << 1) | ((value >> shift) & 1)
+            self.bits += 1
+            if self.bits == 8:
+                self.buffer.append(self.current)
+                self.current = 0
+                self.bits = 0
+
+    def flush(self) -> None:
+        """바이트 경계까지 0으로 채움 (항목 배열마다 바이트 정렬)"""
+        if self.bits:
+            self.buffer.append(self.current << (8 - self.bits))
+            self.current = 0
+            self.bits = 0
+
+    def getvalue(self) -> bytes:
+        self.flush()
+        return bytes(self.buffer)
+
+def _bits(value: int) -> int:
+    return max(0, value).bit_length()
+
+class _Layout:
+    """원본 객체를 선형화 파일의 구역(part)별로 분류"""
+
+    def __init__(self, reader: PdfReader):
+        self.reader = reader
+        self.pages = reader.page_refs()
+        if not self.pages:
+            raise PdfObjectError("페이지 없는 문서는 선형화할 수 없음")
+        self.page_set = set(self.pages)
+        self.page_nodes = self._page_tree_nodes()
+
+        self.page_objects = [self._closure(page) for page in self.pages]
+        usage: Dict[int, int] = {}
+        for objects in self.page_objects:
+            for num in objects:
+                usage[num] = usage.get(num, 0) + 1
+        self.shared = {num for num, count in usage.items() if count > 1}
+
+        # 6부: 첫 페이지와 첫 페이지가 참조하는 모든 객체
+        self.first_page = list(self.page_objects[0])
+        assigned = set(self.first_page)
+
+        # 목차를 열어 두는 문서(/PageMode /UseOutlines)는 목차도 첫 페이지 구역에 배치
+        catalog = reader.object_dict(reader.root)
+        outlines_root = _dict_ref(catalog, b'Outlines')
+        self.outlines: List[int] = []
+        if outlines_root is not None and re.search(rb'/PageMode\s*/UseOutlines\b', catalog):
+            self.outlines = self._closure(outlines_root, stop=assigned)
+            self.first_page.extend(self.outlines)
+            assigned.update(self.outlines)
+
+        # 4부: 카탈로그와 문서 수준 객체 (목차 포함)
+        self.document = self._closure(reader.root, stop=assigned)
+        assigned.update(self.document)
+
+        # 7부: 두 번째 페이지부터 페이지별 전용 객체
+        self.other_pages: List[List[int]] = []
+        for objects in self.page_objects[1:]:
+            own = [num for num in objects if num not in self.shared and num not in assigned]
+            assigned.update(own)
+            self.other_pages.append(own)
+
+        # 8부: 여러 페이지가 공유하는 객체 (첫 페이지 구역에 이미 있는 객체 제외)
+        self.shared_section = []
+        for objects in self.page_objects[1:]:
+            for num in objects:
+                if num in self.shared and num not in assigned:
+                    assigned.add(num)
+                    self.shared_section.append(num)
+
+        # 9부: 페이지 트리 노드, 문서 정보 등 나머지
+        self.remainder: List[int] = []
+        for node in sorted(self.page_nodes):
+            for num in self._closure(node, stop=assigned):
+                assigned.add(num)
+                self.remainder.append(num)
+        if reader.info is not None:
+            for num in self._closure(reader.info, stop=assigned):
+                assigned.add(num)
+                self.remainder.append(num)
+
+    def _page_tree_nodes(self) -> Set[int]:
+        nodes = set()
+        pending = [self.reader.pages_root]
+        while pending:
+            num = pending.pop()
+            if num in nodes:
+                continue
+            node = self.reader.object_dict(num)
+            if re.search(rb'/Type\s*/Pages\b', node):
+                nodes.add(num)
+                kids = re.search(rb'/Kids\s*\[([^\]]*)\]', node)
+                pending.extend(int(kid.group(1)) for kid in REF_PATTERN.finditer(kids.group(1) if kids else b''))
+        return nodes
+
+    def refs(self, num: int) -> List[int]:
+        """객체 사전이 참조하는 객체 번호 (페이지의 /Parent 제외)"""
+        dict_part = self.reader.split_object(num)[0]
+        if num in self.page_set:
+            dict_part = PARENT_PATTERN.sub(b'', dict_part)
+        return [
+            int(match.group(1)) for match in REF_PATTERN.finditer(dict_part)
+            if self.reader.offsets.get(int(match.group(1)), -1) >= 0
+        ]
+
+    def _closure(self, start: int, stop: Optional[Set[int]] = None) -> List[int]:
+        """start에서 도달 가능한 객체 (다른 페이지/페이지 트리 노드/stop 집합에서 중단)"""
+        stop = stop or set()
+        boundary = self.page_set | self.page_nodes
+        ordered: List[int] = []
+        seen = {start}
+        pending = [start]
+        while pending:
+            num = pending.pop(0)
+            ordered.append(num)
+            for ref in self.refs(num):
+                if ref in seen or ref in stop or ref in boundary:
+                    continue
+                seen.add(ref)
+                pending.append(ref)
+        return ordered
+
+def _object_parts(reader: PdfReader, num: int, mapping: Dict[int, int]) -> Tuple[bytes, Optional[bytes]]:
+    dict_part, stream = reader.split_object(num)
+    return rewrite_refs(dict_part, mapping), stream
+
+def _object_length(new_num: int, dict_part: bytes, stream: Optional[bytes]) -> int:
+    """serialize_object 결과 길이 (큰 스트림을 복사하지 않고 계산)"""
+    length = len(b'%d 0 obj\n' % new_num) + len(dict_part) + len(b'\nendobj\n')
+    if stream is not None:
+        length += len(b'\nstream\n') + len(stream) + len(b'\nendstream')
+    return length
+
+def _padded(body: bytes, width: int) -> bytes:
+    """예약한 고정 폭에 맞추어 사전 끝('>>' 앞)을 공백으로 채움"""
+    if len(body) > width:
+        raise PdfObjectError("선형화 고정 폭 초과")
+    return body[:-2] + b' ' * (width - len(body)) + b'>>'
+
+def _hint_stream(layout, new_nums, lengths, adjusted_offsets) -> Tuple[bytes, int, Optional[int]]:
+    """
+    페이지 오프셋 / 공유 객체 / (목차가 있으면) 목차 힌트 테이블 작성
+    (테이블 바이트, 공유 테이블 위치, 목차 테이블 위치 또는 None) 반환
+    """
+    shared_groups = layout.first_page + layout.shared_section
+    shared_ids = {num: index for index, num in enumerate(shared_groups)}
+
+    page_lengths = [sum(lengths[num] for num in layout.first_page)]
+    object_counts = [len(layout.first_page)]
+    shared_refs: List[List[int]] = [[]]
+    for index, own in enumerate(layout.other_pages, start=1):
+        page_lengths.append(sum(lengths[num] for num in own))
+        object_counts.append(len(own))
+        shared_refs.append([
+            shared_ids[num] for num in layout.page_objects[index]
+            if num in layout.shared and num in shared_ids
+        ])
+
+    min_objects = min(object_counts)
+    min_length = min(page_lengths)
+    bits_objects = _bits(max(object_counts) - min_objects)
+    bits_length = _bits(max(page_lengths) - min_length)
+    bits_shared_count = _bits(max(len(refs) for refs in shared_refs))
+    bits_shared_id = _bits(len(shared_groups) - 1)
+
+    writer = _BitWriter()
+    # 페이지 오프셋 힌트 테이블 헤더 (표 F.3)
+    writer.write(min_objects, 32)
+    writer.write(adjusted_offsets[layout.pages[0]], 32)
+    writer.write(bits_objects, 16)
+    writer.write(min_length, 32)
+    writer.write(bits_length, 16)
+    # 콘텐츠 스트림 위치 항목은 뷰어가 사용하지 않으므로 페이지 길이와 같은 값으로 기록
+    writer.write(0, 32)
+    writer.write(0, 16)
+    writer.write(min_length, 32)
+    writer.write(bits_length, 16)
+    writer.write(bits_shared_count, 16)
+    writer.write(bits_shared_id, 16)
+    writer.write(0, 16)
+    writer.write(1, 16)
+
+    # 페이지별 항목 (표 F.4), 항목 배열마다 바이트 정렬
+    for count in object_counts:
+        writer.write(count - min_objects, bits_objects)
+    writer.flush()
+    for length in page_lengths:
+        writer.write(length - min_length, bits_length)
+    writer.flush()
+    for refs in shared_refs:
+        writer.write(len(refs), bits_shared_count)
+    writer.flush()
+    for refs in shared_refs:
+        for shared_id in refs:
+            writer.write(shared_id, bits_shared_id)
+    writer.flush()
+    # 분수 위치(항목 5)와 콘텐츠 스트림 오프셋(항목 6)은 0비트이므로 기록할 값 없음
+    for length in page_lengths:
+        writer.write(length - min_length, bits_length)
+    writer.flush()
+
+    page_table = writer.getvalue()
+
+    group_lengths = [lengths[num] for num in shared_groups]
+    min_group = min(group_lengths)
+    bits_group = _bits(max(group_lengths) - min_group)
+
+    writer = _BitWriter()
+    # 공유 객체 힌트 테이블 헤더 (표 F.5)
+    if layout.shared_section:
+        first_shared = layout.shared_section[0]
+        writer.write(new_nums[first_shared], 32)
+        writer.write(adjusted_offsets[first_shared], 32)
+    else:
+        writer.write(0, 32)
+        writer.write(0, 32)
+    writer.write(len(layout.first_page), 32)
+    writer.write(len(shared_groups), 32)
+    writer.write(0, 16)
+    writer.write(min_group, 32)
+    writer.write(bits_group, 16)
+
+    # 그룹별 항목 (표 F.6): 길이, 서명 없음, 그룹당 객체 1개
+    for length in group_lengths:
+        writer.write(length - min_group, bits_group)
+    writer.flush()
+    for _ in shared_groups:
+        writer.write(0, 1)
+    writer.flush()
+
+    shared_table = writer.getvalue()
+    if not layout.outlines:
+        return page_table + shared_table, len(page_table), None
+
+    # 목차 힌트 테이블 (표 F.11 일반 힌트 테이블)
+    writer = _BitWriter()
+    writer.write(new_nums[layout.outlines[0]], 32)
+    writer.write(adjusted_offsets[layout.outlines[0]], 32)
+    writer.write(len(layout.outlines), 32)
+    writer.write(sum(lengths[num] for num in layout.outlines), 32)
+    return page_table + shared_table + writer.getvalue(), len(page_table), len(page_table) + len(shared_table)
+
+def linearize(reader: PdfReader, sink) -> Dict:
+    """
+    reader의 문서를 선형화하여 sink에 기록하고 페이지 바이트 범위 색인 반환
+    출력 순서: 헤더, 선형화 사전, 첫 페이지 xref, 문서 수준 객체, 힌트 스트림,
+    첫 페이지, 나머지 페이지, 공유 객체, 기타 객체, 주 xref
+    """
+    layout = _Layout(reader)
+
+    # 주 xref 구역(7~9부)은 1번부터, 첫 페이지 구역은 그 뒤 번호 사용
+    main_objects = [num for own in layout.other_pages for num in own] + layout.shared_section + layout.remainder
+    new_nums: Dict[int, int] = {old: index for index, old in enumerate(main_objects, start=1)}
+    main_size = len(main_objects) + 1
+
+    lin_num = main_size
+    next_num = lin_num + 1
+    for old in layout.document:
+        new_nums[old] = next_num
+        next_num += 1
+    hint_num = next_num
+    next_num += 1
+    for old in layout.first_page:
+        new_nums[old] = next_num
+        next_num += 1
+    total_size = next_num
+
+    lengths: Dict[int, int] = {}
+    for old, new in new_nums.items():
+        dict_part, stream = _object_parts(reader, old, new_nums)
+        lengths[old] = _object_length(new, dict_part, stream)
+
+    file_id = re.search(rb'/ID\s*\[[^\]]*\]', reader.trailer)
+    if file_id:
+        file_id = file_id.group(0)
+    else:
+        digest = hashlib.md5(reader.data[:1024] + b'%d' % len(reader.data)).hexdigest().encode('ascii')
+        file_id = b'/ID [<%s> <%s>]' % (digest, digest)
+
+    placeholder = b'9' * NUMBER_WIDTH
+    lin_template = (
+        b'<< /Linearized 1 /L %s /H [%s %s] /O %d /E %s /N %d /T %s >>'
+        % (placeholder, placeholder, placeholder, new_nums[layout.pages[0]], placeholder,
+           len(layout.pages), placeholder)
+    )
+    lin_width = len(lin_template)
+    lin_length = _object_length(lin_num, lin_template, None)
+
+    first_xref_entries = total_size - lin_num
+    first_xref_length = len(b'xref\n%d %d\n' % (lin_num, first_xref_entries)) + 20 * first_xref_entries
+    trailer_template = b'trailer\n<<\n/Size %d\n/Root %d 0 R\n' % (total_size, new_nums[reader.root])
+    if reader.info is not None:
+        trailer_template += b'/Info %d 0 R\n' % new_nums[reader.info]
+    trailer_template += file_id + b'\n/Prev %s\n>>' % placeholder
+    trailer_width = len(trailer_template)
+    trailer_tail = b'\nstartxref\n0\n%%EOF\n'
+
+    # 힌트 스트림 없이 계산한 오프셋 (힌트 테이블 값은 힌트 스트림이 없는 것으로 가정)
+    position = len(PDF_HEADER) + lin_length
+    first_xref_offset = position
+    position += first_xref_length + trailer_width + len(trailer_tail)
+    offsets: Dict[int, int] = {}
+    for old in layout.document:
+        offsets[old] = position
+        position += lengths[old]
+    hint_offset = position
+    adjusted: Dict[int, int] = {}
+    for old in layout.first_page + main_objects:
+        adjusted[old] = position
+        position += lengths[old]
+
+    hint_data, shared_table_offset, outline_table_offset = _hint_stream(layout, new_nums, lengths, adjusted)
+    hint_dict = b'<<\n/S %d\n' % shared_table_offset
+    if outline_table_offset is not None:
+        hint_dict += b'/O %d\n' % outline_table_offset
+    hint_dict += b'/Length %d\n>>' % len(hint_data)
+    hint_length = _object_length(hint_num, hint_dict, hint_data)
+
+    for old, offset in adjusted.items():
+        offsets[old] = offset + hint_length
+    first_page_end = offsets[layout.first_page[-1]] + lengths[layout.first_page[-1]]
+    main_xref_offset = position + hint_length
+
+    main_xref = xref_table(
+        [(new_nums[old], offsets[old]) for old in main_objects],
+        include_free_head=True
+    )
+    main_trailer = b'trailer\n<<\n/Size %d\n>>\nstartxref\n%d\n%%%%EOF\n' % (main_size, first_xref_offset)
+    file_length = main_xref_offset + len(main_xref) + len(main_trailer)
+    main_first_entry = main_xref_offset + len(b'xref\n0 %d\n' % main_size) - 1
+
+    lin_dict = _padded(
+        b'<< /Linearized 1 /L %d /H [%d %d] /O %d /E %d /N %d /T %d >>'
+        % (file_length, hint_offset, hint_length, new_nums[layout.pages[0]], first_page_end,
+           len(layout.pages), main_first_entry),
+        lin_width
+    )
+    first_trailer = _padded(trailer_template.replace(b'/Prev %s' % placeholder, b'/Prev %d' % main_xref_offset),
+                            trailer_width)
+
+    first_section = [(lin_num, len(PDF_HEADER))]
+    first_section += [(new_nums[old], offsets[old]) for old in layout.document]
+    first_section += [(hint_num, hint_offset)]
+    first_section += [(new_nums[old], offsets[old]) for old in layout.first_page]
+
+    written = 0
+
+    def emit(data: bytes) -> None:
+        nonlocal written
+        sink.write(data)
+        written += len(data)
+
+    def emit_object(old: int) -> None:
+        if written != offsets[old]:
+            raise PdfObjectError(f"선형화 오프셋 불일치: {old}")
+        dict_part, stream = _object_parts(reader, old, new_nums)
+        emit(serialize_object(new_nums[old], dict_part, stream))
+
+    emit(PDF_HEADER)
+    emit(serialize_object(lin_num, lin_dict))
+    first_xref = xref_table(first_section)
+    if len(first_xref) != first_xref_length:
+        raise PdfObjectError("첫 페이지 xref 길이 불일치")
+    emit(first_xref)
+    emit(first_trailer + trailer_tail)
+    for old in layout.document:
+        emit_object(old)
+    emit(serialize_object(hint_num, hint_dict, hint_data))
+    for old in layout.first_page + main_objects:
+        emit_object(old)
+    emit(main_xref)
+    emit(main_trailer)
+    if written != file_length:
+        raise PdfObjectError("선형화 파일 길이 불일치")
+
+    return _page_index(layout, new_nums, offsets, lengths, file_length, first_page_end)
+
+def _page_index(layout, new_nums, offsets, lengths, file_length, first_page_end) -> Dict:
+    """페이지별 바이트 범위와 객체 오프셋 색인 (S3 범위 요청용, end는 포함하지 않는 끝)"""
+    shared_objects = {
+        str(new_nums[old]): [offsets[old], lengths[old]]
+        for old in layout.first_page + layout.shared_section
+        if old in layout.shared
+    }
+    pages = []
+    for index, page in enumerate(layout.pages):
+        own = layout.first_page if index == 0 else layout.other_pages[index - 1]
+        start = offsets[own[0]]
+        pages.append({
+            'page_index': index,
+            'object': new_nums[page],
+            'start': start,
+            'end': start + sum(lengths[old] for old in own),
+            'objects': [[new_nums[old], offsets[old], lengths[old]] for old in own],
+            'shared_objects': [
+                new_nums[old] for old in layout.page_objects[index]
+                if old in layout.shared and old not in own
+            ]
+        })
+    return {
+        'linearized': True,
+        'file_length': file_length,
+        'first_page_end': first_page_end,
+        'page_count': len(pages),
+        'pages': pages,
+        'shared_objects': shared_objects
+    }
@@ -1,28 +1,43 @@
-import boto3
 import os
 import json
 import logging
+import mmap
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime
+from decimal import Decimal
 from botocore.exceptions import ClientError
-from botocore.config import Config
 
 # fpdf2 및 Pillow 임포트
 from fpdf import FPDF
-from PIL import Image
 from io import BytesIO
 
+from pdf_objects import PdfReader, PdfObjectError, StreamingPdfWriter, incremental_update
+from s3_stream import MultipartUploadSink, DEFAULT_PART_SIZE
+from prefetch import prefetch
+from mrc import encode_mrc_page, mrc_underlay
+from text_layer import invisible_text_layer
+from font_cache import BookFont, load_font_metrics
+from resample import prepare_page_image, OUTPUT_PROFILES
+from linearize import linearize
+from aws_clients import get_client, get_resource
+from profiling import profiled
+from stage_queue import consume, is_queue_event
+from ocr_artifact import columns_from_annotation, decode_ocr_artifact
+from search_index import build_search_index, INDEX_EXTENSION
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-retry_config = Config(
-    retries={
-        'max_attempts': 3,
-        'mode': 'adaptive'
-    }
-)
+# 페이지 자원 선행 로드 깊이와 동시 요청 수
+PREFETCH_DEPTH = int(os.environ.get('PDF_PREFETCH_DEPTH', 8))
+PREFETCH_WORKERS = int(os.environ.get('PDF_PREFETCH_WORKERS', 8))
+
+# 선행 로드 스레드 수보다 커야 연결 풀 대기가 발생하지 않음
+S3_POOL_CONNECTIONS = max(32, PREFETCH_WORKERS * 2)
 
-s3_client = boto3.client('s3', config=retry_config)
-dynamodb = boto3.resource('dynamodb', config=retry_config)
+s3_client = get_client('s3', max_pool_connections=S3_POOL_CONNECTIONS)
+dynamodb = get_resource('dynamodb')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 OUTPUT_BUCKET = os.environ['OUTPUT_BUCKET']
@@ -30,6 +45,35 @@ TEMP_BUCKET = os.environ['TEMP_BUCKET']
 
 # 한글 폰트 경로 (컨테이너 환경변수 또는 기본값)
 FONT_PATH = os.environ.get('FONT_PATH', "/opt/python/fonts/NotoSansKR-Regular.ttf")
+FALLBACK_FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSansCondensed.ttf'
+
+# 출력 모드: standard(원본 JPEG 삽입) 또는 mrc(텍스트 마스크 + 축소 배경)
+PDF_MODE_STANDARD = 'standard'
+PDF_MODE_MRC = 'mrc'
+PDF_MODES = (PDF_MODE_STANDARD, PDF_MODE_MRC)
+DEFAULT_PDF_MODE = os.environ.get('PDF_MODE', PDF_MODE_STANDARD)
+
+# 출력 프로필: screen(150dpi) / print(300dpi) / archive(원본 픽셀 유지)
+DEFAULT_OUTPUT_PROFILE = os.environ.get('PDF_OUTPUT_PROFILE', 'archive')
+# 메타데이터가 없을 때 물리 크기 계산에 쓰는 스캔 해상도와 업스케일 배율 (Real-ESRGAN x4)
+SCAN_DPI = float(os.environ.get('PDF_SCAN_DPI', 300))
+UPSCALE_FACTOR = float(os.environ.get('PDF_UPSCALE_FACTOR', 4))
+
+# 멀티파트 업로드 파트 크기 (MB)
+UPLOAD_PART_SIZE = int(os.environ.get('PDF_UPLOAD_PART_SIZE_MB', DEFAULT_PART_SIZE // (1024 * 1024))) * 1024 * 1024
+
+# 청크 모드: 페이지 수가 이 값을 넘으면 페이지 범위별로 병렬 렌더링 후 병합 (0이면 사용 안 함)
+CHUNK_PAGES = int(os.environ.get('PDF_CHUNK_PAGES', 100))
+CHUNK_PREFIX = 'pdf-chunks'
+
+# OCR 완료 직후 미리 렌더링한 페이지별 PDF 조각 (최종 단계는 조각을 이어붙이기만 함)
+FRAGMENT_PREFIX = 'pdf-pages'
+PDF_PRODUCER = 'BookScan PDF Generator'
+
+# 선형화(Fast Web View) 출력 기본값 (실행 입력의 linearize로 실행별 변경 가능)
+DEFAULT_LINEARIZE = os.environ.get('PDF_LINEARIZE', 'false').lower() == 'true'
+# 선형화 전 문서를 기록할 임시 디렉터리 (Lambda 임시 스토리지)
+SPOOL_DIR = os.environ.get('PDF_SPOOL_DIR', tempfile.gettempdir())
 
 class PDFGenerationError(Exception):
     pass
@@ -96,8 +140,26 @@ def extract_processed_pages(items, input_bucket):
         if item.get('job_status') != 'COMPLETED':
             continue
             
+        if item.get('reused_page_index') is not None:
+            # 이전 실행에서 변경되지 않은 페이지는 이전 PDF의 페이지를 그대로 사용
+            # (OCR 키는 검색 색인 작성에만 사용)
+            reused_ocr = (item.get('job_output') or {}).get('ocr') or {}
+            processed_pages.append({
+                's3_key': None,
+                'is_cover': item.get('is_cover', False),
+                'original_key': item['image_key'],
+                'ocr_output_key': reused_ocr.get('ocr_output_key'),
+                'ocr_compact_key': reused_ocr.get('ocr_compact_key'),
+                'reused_page_index': item['reused_page_index'],
+                'source_etag': item.get('source_etag'),
+                'source_size': item.get('source_size'),
+                'job_output': item.get('job_output', {})
+            })
+            continue
+            
         output_path = None
         ocr_output_key = None # OCR 결과 S3 키 추가
+        ocr_compact_key = None
         try:
             if item.get('is_cover'):
                 output_path = item.get('image_key')
@@ -107,6 +169,7 @@ def extract_processed_pages(items, input_bucket):
                 ocr_data = job_output.get('ocr', {}) # OCR 데이터 추출
                 output_path = upscale_data.get('upscaled_image_key')
                 ocr_output_key = ocr_data.get('ocr_output_key') # OCR 결과 S3 키 저장
+                ocr_compact_key = ocr_data.get('ocr_compact_key') # 단어 열 배열 산출물 (없으면 JSON 사용)
         except (AttributeError, TypeError):
             logger.warning(f"잘못된 job_output 구조: {item.get('image_key')}")
             continue
@@ -116,7 +179,12 @@ def extract_processed_pages(items, input_bucket):
                 's3_key': output_path,
                 'is_cover': item.get('is_cover', False),
                 'original_key': item['image_key'],
-                'ocr_output_key': ocr_output_key # OCR 결과 S3 키 추가
+                'ocr_output_key': ocr_output_key, # OCR 결과 S3 키 추가
+                'ocr_compact_key': ocr_compact_key,
+                'pdf_fragment': item.get('pdf_fragment'),
+                'source_etag': item.get('source_etag'),
+                'source_size': item.get('source_size'),
+                'job_output': item.get('job_output', {})
             })
         else:
             logger.warning(f"항목 {item['image_key']}은(는) 완료되었지만 유효한 출력 경로가 없습니다.")
@@ -152,152 +220,791 @@ def arrange_final_page_order(processed_pages):
     
     return final_order
 
-def handler(event, context):
+class PDF(FPDF):
+    def header(self):
+        pass
+    def footer(self):
+        pass
+
+def create_pdf():
+    # 텍스트 레이어는 공유 글꼴로 직접 작성하므로 fpdf2에는 글꼴을 등록하지 않음 (페이지마다 TTF 파싱 방지)
+    return PDF(orientation='P', unit='pt')
+
+def text_font_metrics():
+    """
+    텍스트 레이어 글꼴 지표 (이미지/tmp 캐시 사용, 프로세스당 한 번 로드)
+    한글 폰트가 없으면 대체 폰트, 둘 다 없으면 None
+    """
+    font_path = FONT_PATH
+    if not os.path.exists(font_path):
+        logger.warning(f"폰트 파일이 없습니다: {FONT_PATH}. 한글 텍스트가 제대로 표시되지 않을 수 있습니다.")
+        font_path = FALLBACK_FONT_PATH
+        if not os.path.exists(font_path):
+            return None
+    metrics = load_font_metrics(font_path)
+    return metrics
+
+def new_text_font():
+    """작성기 하나(책/청크/조각)가 사용한 글자를 모으는 공유 글꼴"""
+    metrics = text_font_metrics()
+    return BookFont(metrics) if metrics is not None else None
+
+def log_font_stats(writer):
+    """공유 글꼴 지표 로드/부분 집합 생성 시간 기록"""
+    if writer.text_font is None or not writer.text_font.stats:
+        return
+    stats = writer.text_font.stats
+    logger.info(
+        f"텍스트 레이어 글꼴: 지표 {stats['metrics_source']} {stats['metrics_load_ms']}ms, "
+        f"부분 집합 {stats['glyphs']}글리프 {stats['font_bytes']}바이트 {stats['subset_ms']}ms"
+    )
+
+def usable_fragment(page_info, pdf_mode, output_profile=DEFAULT_OUTPUT_PROFILE):
+    """미리 렌더링한 페이지 조각이 현재 이미지/OCR 결과와 출력 모드/프로필에 맞으면 조각 정보 반환"""
+    fragment = page_info.get('pdf_fragment')
+    if not fragment or page_info['is_cover']:
+        return None
+    if (fragment.get('pdf_mode') != pdf_mode
+            or fragment.get('output_profile', 'archive') != output_profile
+            or fragment.get('source_key') != page_info['s3_key']
+            or fragment.get('ocr_key') != page_info.get('ocr_output_key')):
+        return None
+    return fragment
+
+def fetch_page_assets(page_info, input_bucket, pdf_mode=PDF_MODE_STANDARD, output_profile=DEFAULT_OUTPUT_PROFILE):
+    """
+    페이지 이미지와 OCR 결과를 S3에서 로드하고 출력 프로필로 재표본화 (선행 로드 스레드에서 실행)
+    사용할 수 있는 페이지 조각이 있으면 조각 PDF만 로드
+    """
+    fragment = usable_fragment(page_info, pdf_mode, output_profile)
+    if fragment:
+        try:
+            fragment_obj = s3_client.get_object(Bucket=TEMP_BUCKET, Key=fragment['fragment_key'])
+            return {'fragment': fragment_obj['Body'].read()}
+        except ClientError as e:
+            logger.warning(f"페이지 조각 로드 실패, 다시 렌더링 ({fragment['fragment_key']}): {e}")
+
+    bucket = TEMP_BUCKET if not page_info['is_cover'] else input_bucket
+    key = page_info['s3_key']
+
+    try:
+        img_obj = s3_client.get_object(Bucket=bucket, Key=key)
+        img_data = img_obj['Body'].read()
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        if error_code == 'NoSuchKey':
+            logger.error(f"S3 객체 누락: {bucket}/{key}")
+            raise PDFGenerationError(f"필수 이미지 파일 누락: {key}")
+        else:
+            raise PDFGenerationError(f"S3 접근 오류: {e}")
+
+    # 표지는 원본 스캔, 본문은 업스케일된 이미지이므로 메타데이터가 없을 때의 해상도가 다름
+    fallback_dpi = SCAN_DPI if page_info['is_cover'] else SCAN_DPI * UPSCALE_FACTOR
+    try:
+        prepared = prepare_page_image(img_data, output_profile, fallback_dpi)
+    except Exception as e:
+        logger.error(f"이미지 재표본화 오류 ({key}): {e}")
+        raise PDFGenerationError(f"이미지 재표본화 실패: {e}")
+
+    return {
+        'image': prepared['image'],
+        'source_size': prepared['source_size'],
+        'page_size': prepared['page_size'],
+        'resample': {
+            'resampled': prepared['resampled'],
+            'original_bytes': len(img_data),
+            'embedded_bytes': len(prepared['image']),
+            'resample_ms': prepared['resample_ms']
+        },
+        'words': None if page_info['is_cover'] else load_ocr_words(page_info)
+    }
+
+def load_ocr_words(page_info):
+    """
+    페이지 OCR 단어 열 배열 로드
+    압축 산출물을 우선 사용하고, 이전 실행의 결과처럼 없을 때만 전체 Vision JSON을 파싱
+    """
+    compact_key = page_info.get('ocr_compact_key')
+    if compact_key:
+        try:
+            ocr_obj = s3_client.get_object(Bucket=TEMP_BUCKET, Key=compact_key)
+            return decode_ocr_artifact(ocr_obj['Body'].read())
+        except (ClientError, ValueError) as e:
+            logger.warning(f"압축 OCR 산출물 로드 실패, JSON 사용 ({compact_key}): {e}")
+
+    ocr_key = page_info.get('ocr_output_key')
+    if not ocr_key:
+        return None
+    try:
+        ocr_obj = s3_client.get_object(Bucket=TEMP_BUCKET, Key=ocr_key)
+        return columns_from_annotation(json.loads(ocr_obj['Body'].read().decode('utf-8')))
+    except ClientError as e:
+        logger.warning(f"OCR 텍스트 파일 로드 실패 ({ocr_key}): {e}")
+    except ValueError as e:
+        logger.warning(f"OCR 텍스트 파일 파싱 실패 ({ocr_key}): {e}")
+    return None
+
+def render_page(pdf, page_info, assets, draw_image=True):
+    """이미지로 PDF 페이지 하나를 추가 (draw_image=False면 빈 페이지, 텍스트 레이어는 작성기가 덧붙임)"""
+    key = page_info['s3_key']
+    img_data = assets['image']
+
+    logger.info(f"{key}를 PDF에 추가.")
+
+    try:
+        # 페이지 크기는 물리 크기(pt)
+        page_width, page_height = assets['page_size']
+        pdf.add_page(format=(page_width, page_height))
+        if draw_image:
+            pdf.image(BytesIO(img_data), x=0, y=0, w=page_width, h=page_height)
+
+    except Exception as e:
+        logger.error(f"이미지 처리 오류 ({key}): {e}")
+        raise PDFGenerationError(f"이미지 처리 실패: {e}")
+
+def build_text_layer(page_info, assets):
+    """OCR 단어로 보이지 않는 텍스트 레이어 생성 (표지/단어 없음/글꼴 없음이면 None)"""
+    words = assets['words']
+    if not words or not words['text']:
+        return None
+    metrics = text_font_metrics()
+    if metrics is None:
+        return None
+
+    # OCR 좌표는 재표본화 전 원본 픽셀 기준
+    page_width, page_height = assets['page_size']
+    source_width, source_height = assets['source_size']
+    try:
+        return invisible_text_layer(
+            words['text'], words['boxes'], metrics, page_width, page_height, source_width, source_height
+        )
+    except Exception as e:
+        logger.warning(f"OCR 텍스트 레이어 추가 중 오류 발생 ({page_info['ocr_output_key']}): {e}")
+        return None
+
+def render_single_page(page_info, assets, pdf_mode=PDF_MODE_STANDARD):
+    """
+    페이지 하나를 독립 PDF로 렌더링하여 객체 단위로 파싱하고 (문서, 하위 레이어, 텍스트 레이어, MRC 통계) 반환
+    MRC 모드는 이미지 대신 MRC 하위 레이어와 인코딩 통계를 함께 반환
+    """
+    pdf = create_pdf()
+    text_layer = build_text_layer(page_info, assets)
+    if pdf_mode != PDF_MODE_MRC:
+        render_page(pdf, page_info, assets)
+        return PdfReader(bytes(pdf.output())), None, text_layer, None
+    
+    try:
+        layers = encode_mrc_page(assets['image'])
+    except Exception as e:
+        logger.error(f"MRC 인코딩 오류 ({page_info['s3_key']}): {e}")
+        raise PDFGenerationError(f"MRC 인코딩 실패: {e}")
+    
+    render_page(pdf, page_info, assets, draw_image=False)
+    stats = layers['stats']
+    logger.info(
+        f"MRC 인코딩: {page_info['original_key']}, 압축률 {stats['compression_ratio']:.1f}x, "
+        f"{stats['encode_ms']:.0f}ms"
+    )
+    underlay = mrc_underlay(layers, *assets['page_size'])
+    return PdfReader(bytes(pdf.output())), underlay, text_layer, stats
+
+def prefetch_pages(pages, input_bucket, pdf_mode=PDF_MODE_STANDARD, output_profile=DEFAULT_OUTPUT_PROFILE):
+    """다음 PREFETCH_DEPTH개 페이지 자원을 동시에 로드/재표본화하며 순서대로 반환"""
+    return prefetch(
+        pages,
+        lambda page_info: fetch_page_assets(page_info, input_bucket, pdf_mode, output_profile),
+        depth=PREFETCH_DEPTH,
+        max_workers=PREFETCH_WORKERS
+    )
+
+def write_pages(writer, pages, input_bucket, pdf_mode=PDF_MODE_STANDARD, output_profile=DEFAULT_OUTPUT_PROFILE):
+    """
+    페이지를 순서대로 작성기에 추가하고 MRC 통계 목록 반환
+    미리 렌더링한 조각이 있는 페이지는 조각 객체를 그대로 복사하고 나머지만 렌더링
+    """
+    mrc_stats = []
+    resample_stats = []
+    fragment_count = 0
+    for page_info, assets in prefetch_pages(pages, input_bucket, pdf_mode, output_profile):
+        if 'fragment' in assets:
+            writer.add_pages(PdfReader(assets['fragment']))
+            stats = fragment_stats(page_info['pdf_fragment'])
+            fragment_count += 1
+        else:
+            reader, underlay, text_layer, stats = render_single_page(page_info, assets, pdf_mode)
+            writer.add_pages(reader, underlay=underlay, text_layer=text_layer)
+            resample_stats.append(assets['resample'])
+        if stats:
+            mrc_stats.append(stats)
+    if fragment_count:
+        logger.info(f"미리 렌더링한 페이지 조각 사용: {fragment_count}/{len(pages)}페이지")
+    log_resample_stats(resample_stats, output_profile)
+    return mrc_stats
+
+def log_resample_stats(resample_stats, output_profile):
+    """출력 프로필 적용 결과 (재표본화 페이지 수, 이미지 바이트 변화) 기록"""
+    resampled = [stats for stats in resample_stats if stats['resampled']]
+    if not resampled:
+        return
+    original_bytes = sum(stats['original_bytes'] for stats in resampled)
+    embedded_bytes = sum(stats['embedded_bytes'] for stats in resampled)
+    logger.info(
+        f"출력 프로필 {output_profile}: {len(resampled)}/{len(resample_stats)}페이지 재표본화, "
+        f"이미지 {original_bytes} -> {embedded_bytes} 바이트, "
+        f"평균 {sum(stats['resample_ms'] for stats in resampled) / len(resampled):.0f}ms"
+    )
+
+def fragment_stats(fragment):
+    """상태 테이블에 저장된 조각의 MRC 통계 (Decimal -> 숫자)"""
+    stats = fragment.get('mrc_stats')
+    if not stats:
+        return None
+    return {
+        'original_bytes': int(stats['original_bytes']),
+        'encoded_bytes': int(stats['encoded_bytes']),
+        'compression_ratio': float(stats['compression_ratio']),
+        'encode_ms': float(stats['encode_ms'])
+    }
+
+def render_page_fragment(event):
+    """
+    OCR이 끝난 페이지 하나를 단일 페이지 PDF 조각으로 렌더링하여 임시 버킷에 저장
+    조각 정보는 상태 항목의 pdf_fragment에 기록하며, 최종 단계가 이미지/OCR 키를 비교하여 재사용 여부 결정
+    """
     run_id = event['run_id']
+    image_key = event['image_key']
+    pdf_mode = resolve_pdf_mode(event)
+    output_profile = resolve_output_profile(event)
+    ocr_result = event.get('ocr_result') or {}
+    
+    if not ocr_result.get('ocr_output_key') or not event.get('upscaled_image_key'):
+        logger.info(f"OCR 결과가 없어 페이지 조각 생략: {image_key}")
+        return {'image_key': image_key, 'fragment_key': None}
+    
+    page_info = {
+        's3_key': event['upscaled_image_key'],
+        'is_cover': False,
+        'original_key': image_key,
+        'ocr_output_key': ocr_result['ocr_output_key'],
+        'ocr_compact_key': ocr_result.get('ocr_compact_key')
+    }
+    assets = fetch_page_assets(page_info, None, output_profile=output_profile)
+    reader, underlay, text_layer, stats = render_single_page(page_info, assets, pdf_mode)
+    
+    buffer = BytesIO()
+    writer = StreamingPdfWriter(buffer, text_font=new_text_font())
+    writer.add_pages(reader, underlay=underlay, text_layer=text_layer)
+    writer.close()
     
-    logger.info(f"run_id: {run_id}에 대한 PDF 생성 시작.")
+    fragment_key = f"{FRAGMENT_PREFIX}/{run_id}/{image_key}.{pdf_mode}.{output_profile}.pdf"
+    s3_client.put_object(Bucket=TEMP_BUCKET, Key=fragment_key, Body=buffer.getvalue(), ContentType='application/pdf')
     
+    fragment = {
+        'fragment_key': fragment_key,
+        'pdf_mode': pdf_mode,
+        'output_profile': output_profile,
+        'source_key': page_info['s3_key'],
+        'ocr_key': page_info['ocr_output_key']
+    }
+    if stats:
+        fragment['mrc_stats'] = stats
+    
+    table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+    table.update_item(
+        Key={'run_id': run_id, 'image_key': image_key},
+        UpdateExpression="SET pdf_fragment = :f",
+        ConditionExpression="attribute_exists(run_id)",
+        ExpressionAttributeValues={':f': json.loads(json.dumps(fragment), parse_float=Decimal)}
+    )
+    logger.info(f"페이지 조각 저장: s3://{TEMP_BUCKET}/{fragment_key} ({len(buffer.getvalue())} 바이트)")
+    return {'image_key': image_key, 'fragment_key': fragment_key}
+
+def summarize_mrc_stats(mrc_stats):
+    """페이지별 MRC 통계를 실행 단위 요약으로 집계"""
+    if not mrc_stats:
+        return None
+    original_bytes = sum(stats['original_bytes'] for stats in mrc_stats)
+    encoded_bytes = sum(stats['encoded_bytes'] for stats in mrc_stats)
+    return {
+        'pages': len(mrc_stats),
+        'original_bytes': original_bytes,
+        'encoded_bytes': encoded_bytes,
+        'compression_ratio': round(original_bytes / encoded_bytes, 2) if encoded_bytes else 0.0,
+        'avg_encode_ms': round(sum(stats['encode_ms'] for stats in mrc_stats) / len(mrc_stats), 1),
+        'max_encode_ms': round(max(stats['encode_ms'] for stats in mrc_stats), 1)
+    }
+
+def combine_mrc_summaries(summaries):
+    """청크별 MRC 요약을 페이지 수 가중 평균으로 합산"""
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        return None
+    pages = sum(summary['pages'] for summary in summaries)
+    original_bytes = sum(summary['original_bytes'] for summary in summaries)
+    encoded_bytes = sum(summary['encoded_bytes'] for summary in summaries)
+    return {
+        'pages': pages,
+        'original_bytes': original_bytes,
+        'encoded_bytes': encoded_bytes,
+        'compression_ratio': round(original_bytes / encoded_bytes, 2) if encoded_bytes else 0.0,
+        'avg_encode_ms': round(sum(summary['avg_encode_ms'] * summary['pages'] for summary in summaries) / pages, 1),
+        'max_encode_ms': max(summary['max_encode_ms'] for summary in summaries)
+    }
+
+def stream_full_pdf(final_image_order, input_bucket, sink, pdf_mode=PDF_MODE_STANDARD,
+                    output_profile=DEFAULT_OUTPUT_PROFILE):
+    """
+    페이지를 하나씩 렌더링하여 바로 출력 스트림에 기록
+    문서 전체가 아닌 페이지 하나와 업로드 파트 하나만 메모리에 유지
+    """
+    writer = StreamingPdfWriter(sink, text_font=new_text_font())
+    mrc_stats = write_pages(writer, final_image_order, input_bucket, pdf_mode, output_profile)
+    total_bytes = writer.close(info={'Producer': PDF_PRODUCER})
+    log_font_stats(writer)
+    logger.info(f"PDF 스트리밍 완료: {writer.page_count}페이지, {total_bytes} 바이트")
+    return mrc_stats
+
+def build_incremental_pdf(final_image_order, input_bucket, base_pdf_key, pdf_mode=PDF_MODE_STANDARD,
+                          output_profile=DEFAULT_OUTPUT_PROFILE):
+    """
+    변경된 페이지만 렌더링하여 이전 PDF에 증분 업데이트 섹션으로 추가
+    재사용 페이지의 이미지/폰트 객체는 이전 PDF 바이트를 그대로 참조
+    """
     try:
-        all_items = atomic_state_query(run_id)
-        logger.info(f"DynamoDB에서 총 {len(all_items)}개의 항목을 조회했습니다.")
-        
-        completed_count, failed_count = validate_processing_state(all_items)
-        
-        processed_pages = extract_processed_pages(all_items, event['input_bucket'])
-        
-        final_image_order = arrange_final_page_order(processed_pages)
+        base_obj = s3_client.get_object(Bucket=OUTPUT_BUCKET, Key=base_pdf_key)
+        base = PdfReader(base_obj['Body'].read())
+    except ClientError as e:
+        raise PDFGenerationError(f"이전 PDF 로드 실패 ({base_pdf_key}): {e}")
+    except PdfObjectError as e:
+        raise PDFGenerationError(f"이전 PDF 구조 파싱 실패 ({base_pdf_key}): {e}")
+    
+    base_page_count = len(base.page_refs())
+    changed_pages = [page for page in final_image_order if page.get('reused_page_index') is None]
+    
+    fragment = None
+    mrc_stats = []
+    if changed_pages:
+        buffer = BytesIO()
+        writer = StreamingPdfWriter(buffer, text_font=new_text_font())
+        mrc_stats = write_pages(writer, changed_pages, input_bucket, pdf_mode, output_profile)
+        writer.close()
+        log_font_stats(writer)
+        fragment = PdfReader(buffer.getvalue())
+    
+    page_plan = []
+    fragment_index = 0
+    for page_info in final_image_order:
+        reused_index = page_info.get('reused_page_index')
+        if reused_index is not None:
+            if int(reused_index) >= base_page_count:
+                raise PDFGenerationError(f"이전 PDF에 없는 페이지 참조: {page_info['original_key']}")
+            page_plan.append(('base', None, int(reused_index)))
+        else:
+            page_plan.append(('fragment', fragment, fragment_index))
+            fragment_index += 1
+    
+    logger.info(f"증분 PDF 생성: 재사용 {len(final_image_order) - len(changed_pages)}페이지, 변경 {len(changed_pages)}페이지")
+    return incremental_update(base, page_plan), mrc_stats
+
+def write_manifest(workflow_item, run_id, pdf_output_key, final_image_order):
+    """다음 증분 실행이 비교할 페이지 매니페스트 기록"""
+    manifest_key = workflow_item.get('manifest_key')
+    if not manifest_key:
+        return
+    
+    pages = {}
+    for index, page_info in enumerate(final_image_order):
+        if not page_info.get('source_etag'):
+            continue
+        pages[page_info['original_key']] = {
+            'etag': page_info['source_etag'],
+            'size': int(page_info.get('source_size', 0)),
+            'pdf_page_index': index,
+            'job_output': page_info.get('job_output', {})
+        }
+    
+    manifest = {
+        'run_id': run_id,
+        'pdf_output_key': pdf_output_key,
+        'created_at': datetime.utcnow().isoformat(),
+        'pages': pages
+    }
+    try:
+        s3_client.put_object(
+            Bucket=OUTPUT_BUCKET,
+            Key=manifest_key,
+            Body=json.dumps(manifest, ensure_ascii=False, default=str).encode('utf-8'),
+            ContentType='application/json'
+        )
+        logger.info(f"페이지 매니페스트 기록: s3://{OUTPUT_BUCKET}/{manifest_key}")
+    except ClientError as e:
+        # 매니페스트가 없으면 다음 실행이 전체 처리로 동작할 뿐이므로 PDF 생성은 실패시키지 않음
+        logger.warning(f"매니페스트 기록 실패: {e}")
+
+def resolve_linearize(event):
+    """실행 입력의 linearize로 선형화 출력 여부 선택"""
+    value = (event.get('execution_input') or {}).get('linearize')
+    if value is None:
+        value = event.get('linearize')
+    if value is None:
+        return DEFAULT_LINEARIZE
+    return value is True or str(value).lower() == 'true'
+
+def page_index_key(pdf_output_key):
+    """PDF 옆에 두는 페이지 바이트 범위 색인 키 (final-pdfs/{run_id}.pages.json)"""
+    return os.path.splitext(pdf_output_key)[0] + '.pages.json'
+
+@contextmanager
+def open_pdf_output(pdf_output_key, linearize_output=False):
+    """
+    최종 PDF 출력 스트림
+    선형화하지 않으면 S3 멀티파트 업로드로 바로 기록하고,
+    선형화하면 임시 파일에 기록한 뒤 객체를 재배치하여 업로드하고 페이지 색인을 함께 기록
+    """
+    if not linearize_output:
+        with MultipartUploadSink(s3_client, OUTPUT_BUCKET, pdf_output_key, part_size=UPLOAD_PART_SIZE) as sink:
+            yield sink
+        return
+    
+    with tempfile.TemporaryFile(dir=SPOOL_DIR) as spool:
+        yield spool
+        spool.flush()
+        write_linearized_pdf(spool, pdf_output_key)
+
+def write_linearized_pdf(spool, pdf_output_key):
+    """임시 파일의 PDF를 선형화하여 업로드하고 페이지 바이트 범위 색인 기록"""
+    with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        reader = PdfReader(data)
+        with MultipartUploadSink(s3_client, OUTPUT_BUCKET, pdf_output_key, part_size=UPLOAD_PART_SIZE) as sink:
+            index = linearize(reader, sink)
+        del reader
+    
+    index['pdf_output_key'] = pdf_output_key
+    index_key = page_index_key(pdf_output_key)
+    s3_client.put_object(
+        Bucket=OUTPUT_BUCKET,
+        Key=index_key,
+        Body=json.dumps(index, separators=(',', ':')).encode('utf-8'),
+        ContentType='application/json'
+    )
+    logger.info(
+        f"선형화 PDF 업로드: {index['file_length']} 바이트, 첫 페이지 {index['first_page_end']} 바이트, "
+        f"색인 s3://{OUTPUT_BUCKET}/{index_key}"
+    )
+
+def search_index_key(pdf_output_key):
+    """PDF 옆에 두는 전문 검색 색인 키 (final-pdfs/{run_id}.search.idx)"""
+    return os.path.splitext(pdf_output_key)[0] + INDEX_EXTENSION
+
+def write_search_index(final_image_order, pdf_output_key):
+    """
+    페이지별 OCR 단어 열 배열로 책 단위 검색 색인을 만들어 PDF 옆에 기록
+    검색 색인은 부가 산출물이므로 실패해도 PDF 생성은 실패시키지 않음
+    """
+    def load_words(page_info):
+        if page_info['is_cover']:
+            return None
+        return load_ocr_words(page_info)
+    
+    index_key = search_index_key(pdf_output_key)
+    try:
+        pages = (
+            (page_index, columns)
+            for page_index, (page_info, columns) in enumerate(
+                prefetch(final_image_order, load_words, depth=PREFETCH_DEPTH, max_workers=PREFETCH_WORKERS)
+            )
+        )
+        index = build_search_index(pages, len(final_image_order))
+        s3_client.put_object(
+            Bucket=OUTPUT_BUCKET,
+            Key=index_key,
+            Body=index,
+            ContentType='application/octet-stream'
+        )
+        logger.info(f"검색 색인 기록: s3://{OUTPUT_BUCKET}/{index_key} ({len(index)} 바이트)")
+        return index_key
+    except Exception as e:
+        logger.warning(f"검색 색인 작성 실패: {e}")
+        return None
+
+def resolve_output_profile(event):
+    """실행 입력의 output_profile로 출력 해상도 프로필 선택 (screen | print | archive)"""
+    profile = (
+        (event.get('execution_input') or {}).get('output_profile')
+        or event.get('output_profile')
+        or DEFAULT_OUTPUT_PROFILE
+    )
+    if profile not in OUTPUT_PROFILES:
+        raise PDFGenerationError(f"지원하지 않는 출력 프로필: {profile}")
+    return profile
+
+def resolve_pdf_mode(event):
+    """실행 입력의 pdf_mode로 실행별 출력 방식 선택 (standard | mrc)"""
+    pdf_mode = (event.get('execution_input') or {}).get('pdf_mode') or event.get('pdf_mode') or DEFAULT_PDF_MODE
+    if pdf_mode not in PDF_MODES:
+        raise PDFGenerationError(f"지원하지 않는 PDF 모드: {pdf_mode}")
+    return pdf_mode
+
+def load_final_page_order(run_id, input_bucket):
+    """상태 테이블에서 최종 페이지 순서와 처리 결과 집계를 조회"""
+    all_items = atomic_state_query(run_id)
+    logger.info(f"DynamoDB에서 총 {len(all_items)}개의 항목을 조회했습니다.")
+    
+    completed_count, failed_count = validate_processing_state(all_items)
+    
+    processed_pages = extract_processed_pages(all_items, input_bucket)
+    
+    final_image_order = arrange_final_page_order(processed_pages)
+    
+    if not final_image_order:
+        raise PDFGenerationError("PDF에 포함할 유효한 페이지가 없습니다")
+    
+    logger.info(f"최종 PDF는 {len(final_image_order)} 페이지를 포함합니다.")
+    
+    workflow_item = next((item for item in all_items if item.get('image_key') == 'workflow_status'), {})
+    return final_image_order, completed_count, failed_count, workflow_item
+
+def build_result(pdf_output_key, final_image_order, completed_count, failed_count, pdf_mode, mrc_stats,
+                 linearized=False, output_profile=DEFAULT_OUTPUT_PROFILE):
+    """GenerateRunSummary가 읽는 PDF 생성 결과"""
+    result = {
+        "pdf_output_key": pdf_output_key,
+        "page_count": len(final_image_order),
+        "completed_images": completed_count,
+        "failed_images": failed_count,
+        "pdf_mode": pdf_mode,
+        "output_profile": output_profile
+    }
+    if linearized:
+        result["linearized"] = True
+        result["page_index_key"] = page_index_key(pdf_output_key)
+    mrc_summary = summarize_mrc_stats(mrc_stats)
+    if mrc_summary:
+        logger.info(f"MRC 압축 요약: {mrc_summary}")
+        result["mrc_stats"] = mrc_summary
+    return result
+
+def _json_default(value):
+    """DynamoDB Decimal을 JSON 숫자로 변환"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+def plan_chunks(page_count, chunk_pages=None):
+    """페이지 수를 chunk_pages 단위 [start, end) 범위로 분할"""
+    chunk_pages = chunk_pages or CHUNK_PAGES
+    return [
+        {'chunk_index': index, 'start': start, 'end': min(start + chunk_pages, page_count)}
+        for index, start in enumerate(range(0, page_count, chunk_pages))
+    ]
+
+def plan_pdf(event):
+    """
+    청크 모드 사용 여부 결정
+    청크 모드이면 최종 페이지 순서를 임시 버킷에 기록하여 청크/병합 단계가 같은 순서를 사용하도록 함
+    """
+    run_id = event['run_id']
+    pdf_mode = resolve_pdf_mode(event)
+    final_image_order, completed_count, failed_count, workflow_item = load_final_page_order(run_id, event['input_bucket'])
+    
+    # 재사용 페이지는 이전 PDF의 증분 업데이트로만 표현할 수 있으므로 단일 생성 경로 사용
+    has_reused = any(page.get('reused_page_index') is not None for page in final_image_order)
+    if CHUNK_PAGES <= 0 or len(final_image_order) <= CHUNK_PAGES or has_reused:
+        logger.info(f"단일 PDF 생성 경로 사용: {len(final_image_order)}페이지")
+        return {'chunked': False}
+    
+    plan_key = f"{CHUNK_PREFIX}/{run_id}/plan.json"
+    plan = {
+        'run_id': run_id,
+        'pdf_mode': pdf_mode,
+        'output_profile': resolve_output_profile(event),
+        'linearize': resolve_linearize(event),
+        'completed_images': completed_count,
+        'failed_images': failed_count,
+        'pages': final_image_order
+    }
+    s3_client.put_object(
+        Bucket=TEMP_BUCKET,
+        Key=plan_key,
+        Body=json.dumps(plan, ensure_ascii=False, default=_json_default).encode('utf-8'),
+        ContentType='application/json'
+    )
+    
+    chunks = plan_chunks(len(final_image_order))
+    logger.info(f"청크 모드 PDF 생성: {len(final_image_order)}페이지, {len(chunks)}개 청크")
+    return {'chunked': True, 'plan_key': plan_key, 'chunks': chunks}
+
+def load_plan(plan_key):
+    try:
+        response = s3_client.get_object(Bucket=TEMP_BUCKET, Key=plan_key)
+        return json.loads(response['Body'].read())
+    except ClientError as e:
+        raise PDFGenerationError(f"PDF 생성 계획 로드 실패 ({plan_key}): {e}")
+
+def render_chunk(event):
+    """페이지 범위 하나를 독립 PDF 조각으로 렌더링하여 임시 버킷에 업로드"""
+    run_id = event['run_id']
+    chunk = event['chunk']
+    plan = load_plan(event['plan_key'])
+    pages = plan['pages'][chunk['start']:chunk['end']]
+    chunk_key = f"{CHUNK_PREFIX}/{run_id}/{int(chunk['chunk_index']):05d}.pdf"
+    
+    logger.info(f"청크 {chunk['chunk_index']} 렌더링: 페이지 {chunk['start']}-{chunk['end'] - 1}")
+    with MultipartUploadSink(s3_client, TEMP_BUCKET, chunk_key, part_size=UPLOAD_PART_SIZE) as sink:
+        writer = StreamingPdfWriter(sink, text_font=new_text_font())
+        mrc_stats = write_pages(
+            writer, pages, event['input_bucket'], plan['pdf_mode'], plan.get('output_profile', DEFAULT_OUTPUT_PROFILE)
+        )
+        writer.close()
+    log_font_stats(writer)
+    
+    return {
+        'chunk_index': chunk['chunk_index'],
+        'start': chunk['start'],
+        'end': chunk['end'],
+        'chunk_key': chunk_key,
+        'page_count': len(pages),
+        # 페이지별 통계 대신 요약만 반환하여 Map 결과 크기를 청크 수에 비례하도록 유지
+        'mrc_stats': summarize_mrc_stats(mrc_stats)
+    }
+
+def merge_chunks(event):
+    """
+    청크 PDF를 순서대로 읽어 객체 번호를 다시 매기며 하나의 페이지 트리로 병합
+    이미지/폰트 스트림은 바이트 그대로 복사하므로 재인코딩 없음
+    """
+    run_id = event['run_id']
+    plan = load_plan(event['plan_key'])
+    chunks = sorted(event['chunks'], key=lambda chunk: chunk['chunk_index'])
+    final_image_order = plan['pages']
+    
+    if sum(chunk['page_count'] for chunk in chunks) != len(final_image_order):
+        raise PDFGenerationError("청크 페이지 수 합계가 계획된 페이지 수와 다릅니다")
+    
+    def fetch_chunk(chunk):
+        response = s3_client.get_object(Bucket=TEMP_BUCKET, Key=chunk['chunk_key'])
+        return PdfReader(response['Body'].read())
+    
+    pdf_output_key = f"final-pdfs/{run_id}.pdf"
+    outline = []
+    with open_pdf_output(pdf_output_key, plan.get('linearize', False)) as sink:
+        # 청크마다 들어 있는 공유 글꼴은 사용 글자를 합쳐 하나의 글꼴로 다시 만듦
+        writer = StreamingPdfWriter(sink, text_font=new_text_font())
+        # 청크 하나를 병합하는 동안 다음 청크만 미리 내려받아 메모리를 청크 2개 분량으로 제한
+        for chunk, reader in prefetch(chunks, fetch_chunk, depth=1, max_workers=1):
+            if len(reader.page_refs()) != chunk['page_count']:
+                raise PDFGenerationError(f"청크 {chunk['chunk_index']}의 페이지 수가 다릅니다")
+            outline.append((f"{chunk['start'] + 1}-{chunk['end']}쪽", writer.page_count))
+            writer.add_pages(reader)
+        total_bytes = writer.close(
+            info={
+                'Title': run_id,
+                'Producer': PDF_PRODUCER,
+                'CreationDate': datetime.utcnow().strftime("D:%Y%m%d%H%M%SZ")
+            },
+            outline=outline
+        )
+    log_font_stats(writer)
+    
+    logger.info(f"청크 병합 완료: {len(chunks)}개 청크, {writer.page_count}페이지, {total_bytes} 바이트")
+    return pdf_output_key, final_image_order, plan
+
+def render_page_message(message):
+    """
+    단계 큐 메시지로 페이지 조각 렌더링
+    조각은 최종 단계의 재사용용이므로 실패해도 재전달하지 않고 건너뜀 (최종 단계가 직접 렌더링)
+    """
+    job_output = message.get('job_output') or {}
+    try:
+        return render_page_fragment({
+            **message,
+            'upscaled_image_key': (job_output.get('upscale') or {}).get('upscaled_image_key'),
+            'ocr_result': job_output.get('ocr')
+        })
+    except Exception as e:
+        logger.warning(f"페이지 조각 렌더링 실패, 건너뜀: {message.get('image_key')} - {e}")
+        return None
+
+@profiled('pdf_generator')
+def handler(event, context):
+    if is_queue_event(event):
+        return consume(event, 'render_page', render_page_message)
+    
+    run_id = event['run_id']
+    # render_page 는 페이지별 조각, plan | render_chunk | merge 는 청크 모드 단계, 그 외에는 단일 생성 경로
+    action = event.get('action', 'generate')
+    
+    try:
+        if action == 'render_page':
+            return render_page_fragment(event)
         
-        if not final_image_order:
-            raise PDFGenerationError("PDF에 포함할 유효한 페이지가 없습니다")
+        if action == 'plan':
+            return plan_pdf(event)
         
-        logger.info(f"최종 PDF는 {len(final_image_order)} 페이지를 포함합니다.")
+        if action == 'render_chunk':
+            return render_chunk(event)
         
-        class PDF(FPDF):
-            def header(self):
-                pass
-            def footer(self):
-                pass
+        if action == 'merge':
+            pdf_output_key, final_image_order, plan = merge_chunks(event)
+            workflow_item = next(
+                (item for item in atomic_state_query(run_id) if item.get('image_key') == 'workflow_status'), {}
+            )
+            write_manifest(workflow_item, run_id, pdf_output_key, final_image_order)
+            index_key = write_search_index(final_image_order, pdf_output_key)
+            result = build_result(
+                pdf_output_key, final_image_order, plan['completed_images'], plan['failed_images'],
+                plan['pdf_mode'], None, linearized=plan.get('linearize', False),
+                output_profile=plan.get('output_profile', DEFAULT_OUTPUT_PROFILE)
+            )
+            mrc_summary = combine_mrc_summaries([chunk.get('mrc_stats') for chunk in event['chunks']])
+            if mrc_summary:
+                result["mrc_stats"] = mrc_summary
+            result["chunks"] = len(event['chunks'])
+            if index_key:
+                result["search_index_key"] = index_key
+            return result
         
-        pdf = PDF(orientation='P', unit='pt')
+        pdf_mode = resolve_pdf_mode(event)
+        output_profile = resolve_output_profile(event)
+        linearize_output = resolve_linearize(event)
+        logger.info(
+            f"run_id: {run_id}에 대한 PDF 생성 시작. "
+            f"(모드: {pdf_mode}, 출력 프로필: {output_profile}, 선형화: {linearize_output})"
+        )
         
-        # 한글 폰트 추가 (Lambda 레이어에 폰트 파일이 있어야 함)
-        if os.path.exists(FONT_PATH):
-            pdf.add_font('NotoSansKR', '', FONT_PATH)
-        else:
-            logger.warning(f"폰트 파일이 없습니다: {FONT_PATH}. 한글 텍스트가 제대로 표시되지 않을 수 있습니다.")
-            # 대체 폰트 또는 기본 폰트 사용
-            pdf.add_font('DejaVuSansCondensed', '', '/usr/share/fonts/truetype/dejavu/DejaVuSansCondensed.ttf') # 예시
-            pdf.set_font('DejaVuSansCondensed', '', 10)
-
-
-        for page_info in final_image_order:
-            bucket = TEMP_BUCKET if not page_info['is_cover'] else event['input_bucket']
-            key = page_info['s3_key']
-            ocr_key = page_info['ocr_output_key'] # OCR 결과 S3 키
-            
-            logger.info(f"버킷 {bucket}에서 {key}를 PDF에 추가.")
-            
-            try:
-                img_obj = s3_client.get_object(Bucket=bucket, Key=key)
-                img_data = img_obj['Body'].read()
-                
-                with Image.open(BytesIO(img_data)) as img:
-                    width, height = img.size
-                    pdf.add_page(format=(width, height))
-                    pdf.image(BytesIO(img_data), x=0, y=0, w=width, h=height)
-                    
-                    # OCR 텍스트 레이어 추가 (표지 파일 제외)
-                    if not page_info['is_cover'] and ocr_key:
-                        try:
-                            ocr_obj = s3_client.get_object(Bucket=TEMP_BUCKET, Key=ocr_key)
-                            ocr_json = json.loads(ocr_obj['Body'].read().decode('utf-8'))
-                            
-                            # Google Vision API 응답 구조에 따라 파싱
-                            # 여기서는 full_text_annotation의 pages[0]을 가정
-                            if 'fullTextAnnotation' in ocr_json and 'pages' in ocr_json['fullTextAnnotation'] and len(ocr_json['fullTextAnnotation']['pages']) > 0:
-                                page_annotation = ocr_json['fullTextAnnotation']['pages'][0]
-                                
-                                # 이미지 픽셀 좌표를 PDF 포인트 좌표로 변환하기 위한 스케일 팩터 계산
-                                # PDF 페이지 크기 (pt) / 이미지 픽셀 크기
-                                # fpdf2는 기본적으로 pt 단위를 사용하며, 1pt = 1/72인치
-                                # 이미지의 width, height는 픽셀 단위
-                                scale_x = pdf.w / width
-                                scale_y = pdf.h / height
-                                
-                                pdf.set_font('NotoSansKR', '', 10) # 폰트 설정
-                                pdf.set_text_color(0, 0, 0) # 텍스트 색상 (검정)
-                                pdf.set_alpha(0) # 투명도 0 (완전 투명)
-                                
-                                for block in page_annotation.get('blocks', []):
-                                    for paragraph in block.get('paragraphs', []):
-                                        for word in paragraph.get('words', []):
-                                            word_text = ''.join([symbol.get('text', '') for symbol in word.get('symbols', [])])
-                                            
-                                            if not word_text.strip():
-                                                continue
-                                                
-                                            # 바운딩 박스 좌표 추출 (x, y, width, height)
-                                            vertices = word['boundingBox']['vertices']
-                                            
-                                            # Google Vision API의 vertices는 [top_left, top_right, bottom_right, bottom_left] 순서
-                                            x_coords = [v['x'] for v in vertices]
-                                            y_coords = [v['y'] for v in vertices]
-                                            
-                                            min_x = min(x_coords)
-                                            max_x = max(x_coords)
-                                            min_y = min(y_coords)
-                                            max_y = max(y_coords)
-                                            
-                                            # 픽셀 좌표를 PDF 포인트 좌표로 변환
-                                            pdf_x = min_x * scale_x
-                                            pdf_y = min_y * scale_y
-                                            pdf_width = (max_x - min_x) * scale_x
-                                            pdf_height = (max_y - min_y) * scale_y
-                                            
-                                            # 텍스트를 바운딩 박스 위치에 정확히 그리기
-                                            # set_xy는 현재 위치를 설정하고, cell은 해당 위치에 텍스트를 그립니다.
-                                            # cell의 width와 height를 바운딩 박스 크기로 설정하여 텍스트가 해당 영역에만 그려지도록 합니다.
-                                            pdf.set_xy(pdf_x, pdf_y)
-                                            pdf.cell(w=pdf_width, h=pdf_height, text=word_text, border=0, align='C') # align='C'는 중앙 정렬
-                                
-                                pdf.set_alpha(1) # 투명도 원상 복구
-                                
-                        except ClientError as e:
-                            logger.warning(f"OCR 텍스트 파일 로드 실패 ({ocr_key}): {e}")
-                        except Exception as e:
-                            logger.warning(f"OCR 텍스트 레이어 추가 중 오류 발생 ({ocr_key}): {e}")
-                    
-            except ClientError as e:
-                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-                if error_code == 'NoSuchKey':
-                    logger.error(f"S3 객체 누락: {bucket}/{key}")
-                    raise PDFGenerationError(f"필수 이미지 파일 누락: {key}")
-                else:
-                    raise PDFGenerationError(f"S3 접근 오류: {e}")
-            except Exception as e:
-                logger.error(f"이미지 처리 오류 ({key}): {e}")
-                raise PDFGenerationError(f"이미지 처리 실패: {e}")
+        final_image_order, completed_count, failed_count, workflow_item = load_final_page_order(
+            run_id, event['input_bucket']
+        )
+        incremental_base = workflow_item.get('incremental_base')
         
-        # 6. PDF 출력 및 S3 업로드
+        # 6. PDF 출력 및 S3 업로드 (멀티파트 스트리밍)
         try:
             pdf_output_key = f"final-pdfs/{run_id}.pdf"
-            pdf_bytes = pdf.output(dest='S').encode('latin-1')
             
-            s3_client.put_object(
-                Bucket=OUTPUT_BUCKET,
-                Key=pdf_output_key,
-                Body=pdf_bytes,
-                ContentType='application/pdf'
-            )
+            with open_pdf_output(pdf_output_key, linearize_output) as sink:
+                if incremental_base and any(page.get('reused_page_index') is not None for page in final_image_order):
+                    pdf_bytes, mrc_stats = build_incremental_pdf(
+                        final_image_order, event['input_bucket'], incremental_base['pdf_output_key'], pdf_mode,
+                        output_profile
+                    )
+                    sink.write(pdf_bytes)
+                else:
+                    mrc_stats = stream_full_pdf(
+                        final_image_order, event['input_bucket'], sink, pdf_mode, output_profile
+                    )
             
             logger.info(f"PDF 생성 성공: s3://{OUTPUT_BUCKET}/{pdf_output_key}")
             
-            return {
-                "pdf_output_key": pdf_output_key,
-                "page_count": len(final_image_order),
-                "completed_images": completed_count,
-                "failed_images": failed_count
-            }
+            write_manifest(workflow_item, run_id, pdf_output_key, final_image_order)
+            index_key = write_search_index(final_image_order, pdf_output_key)
+            
+            result = build_result(
+                pdf_output_key, final_image_order, completed_count, failed_count, pdf_mode, mrc_stats,
+                linearized=linearize_output, output_profile=output_profile
+            )
+            if index_key:
+                result["search_index_key"] = index_key
+            return result
             
         except ClientError as e:
             logger.error(f"PDF S3 업로드 실패: {e}")
@@ -309,4 +1016,4 @@ def handler(event, context):
         
     except Exception as e:
         logger.error(f"예상치 못한 PDF 생성 오류: {e}", exc_info=True)
-        raise PDFGenerationError(f"예상치 못한 오류: {e}")
\ No newline at end of file
+        raise PDFGenerationError(f"예상치 못한 오류: {e}")
@@ -0,0 +1,133 @@
+"""
+MRC(Mixed Raster Content) 페이지 인코딩
+페이지를 전체 해상도 1비트 텍스트 마스크(CCITT G4), 축소 JPEG 배경, 단색 전경으로 분리
+"""
+import time
+from io import BytesIO
+
+from PIL import Image, ImageFilter, ImageStat
+
+# 배경 축소 비율과 JPEG 품질 (텍스트는 마스크가 담당하므로 배경은 낮은 품질로 충분)
+DEFAULT_BACKGROUND_SCALE = 1 / 3
+DEFAULT_BACKGROUND_QUALITY = 50
+
+def otsu_threshold(gray):
+    """그레이스케일 히스토그램으로 Otsu 임계값 계산"""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+
+    best_threshold, best_variance = 128, -1.0
+    background_weight, background_sum = 0, 0
+    for threshold, count in enumerate(histogram):
+        background_weight += count
+        if background_weight == 0:
+            continue
+        foreground_weight = total - background_weight
+        if foreground_weight == 0:
+            break
+        background_sum += threshold * count
+        background_mean = background_sum / background_weight
+        foreground_mean = (weighted_total - background_sum) / foreground_weight
+        variance = background_weight * foreground_weight * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+def text_mask(gray, threshold):
+    """
+    임계값 이하(Otsu의 어두운 쪽)를 1로 둔 텍스트 마스크
+    이미 이진화된 페이지는 글자 픽셀이 모두 임계값과 같은 값이므로 경계값을 텍스트에 포함
+    """
+    # 텍스트(어두운 픽셀)를 1로 두어 G4의 검정 런으로 인코딩
+    return gray.point(lambda v: 255 if v <= threshold else 0, '1')
+
+def encode_g4(mask):
+    """1비트 마스크를 CCITT G4로 압축하여 원시 스트림 반환 (TIFF 단일 스트립에서 추출)"""
+    buffer = BytesIO()
+    mask.save(buffer, 'TIFF', compression='group4', tiffinfo={278: mask.height})
+    data = buffer.getvalue()
+    with Image.open(BytesIO(data)) as tiff:
+        offsets = tiff.tag_v2[273]
+        counts = tiff.tag_v2[279]
+    return b''.join(data[offset:offset + count] for offset, count in zip(offsets, counts))
+
+def encode_mrc_page(img_data, background_scale=DEFAULT_BACKGROUND_SCALE, background_quality=DEFAULT_BACKGROUND_QUALITY):
+    """
+    페이지 이미지를 MRC 레이어로 분리
+    반환: 레이어 바이트와 페이지 크기, 압축 통계를 담은 dict
+    """
+    started = time.perf_counter()
+
+    with Image.open(BytesIO(img_data)) as source:
+        image = source.convert('RGB')
+    width, height = image.size
+    gray = image.convert('L')
+
+    threshold = otsu_threshold(gray)
+    mask = text_mask(gray, threshold)
+    background_mask = gray.point(lambda v: 255 if v > threshold else 0, 'L')
+
+    text_stat = ImageStat.Stat(image, mask.convert('L'))
+    background_stat = ImageStat.Stat(image, background_mask)
+    foreground_color = tuple(int(c) for c in text_stat.mean) if text_stat.count[0] else (0, 0, 0)
+    background_color = tuple(int(c) for c in background_stat.mean) if background_stat.count[0] else (255, 255, 255)
+
+    # 텍스트 픽셀을 주변 배경색으로 채운 뒤 축소 (글자 잔상이 배경 JPEG에 남지 않도록)
+    background = image.copy()
+    background.paste(background_color, mask=mask.filter(ImageFilter.MaxFilter(3)))
+    background_size = (max(1, int(width * background_scale)), max(1, int(height * background_scale)))
+    background = background.resize(background_size, Image.BILINEAR)
+
+    jpeg_buffer = BytesIO()
+    background.save(jpeg_buffer, 'JPEG', quality=background_quality, optimize=True)
+    background_jpeg = jpeg_buffer.getvalue()
+    mask_g4 = encode_g4(mask)
+
+    encoded_bytes = len(background_jpeg) + len(mask_g4)
+    return {
+        'width': width,
+        'height': height,
+        'mask_g4': mask_g4,
+        'background_jpeg': background_jpeg,
+        'background_size': background_size,
+        'foreground_color': foreground_color,
+        'stats': {
+            'original_bytes': len(img_data),
+            'encoded_bytes': encoded_bytes,
+            'compression_ratio': len(img_data) / encoded_bytes if encoded_bytes else 0.0,
+            'encode_ms': (time.perf_counter() - started) * 1000
+        }
+    }
+
+def mrc_underlay(layers, page_width, page_height):
+    """
+    MRC 레이어를 페이지 하위 레이어(XObject + 내용 스트림)로 변환
+    배경 JPEG를 페이지 전체로 늘린 뒤 텍스트 마스크를 전경색 스텐실로 덧칠
+    """
+    background_width, background_height = layers['background_size']
+    background = (
+        b'<<\n/Type /XObject\n/Subtype /Image\n/Width %d\n/Height %d\n'
+        b'/ColorSpace /DeviceRGB\n/BitsPerComponent 8\n/Filter /DCTDecode\n/Length %d\n>>'
+        % (background_width, background_height, len(layers['background_jpeg']))
+    )
+    mask = (
+        b'<<\n/Type /XObject\n/Subtype /Image\n/Width %d\n/Height %d\n'
+        b'/ImageMask true\n/BitsPerComponent 1\n/Filter /CCITTFaxDecode\n'
+        b'/DecodeParms <</K -1 /Columns %d /Rows %d /BlackIs1 false>>\n/Length %d\n>>'
+        % (layers['width'], layers['height'], layers['width'], layers['height'], len(layers['mask_g4']))
+    )
+
+    red, green, blue = (c / 255 for c in layers['foreground_color'])
+    content = (
+        b'q %.2f 0 0 %.2f 0 0 cm /MrcBg Do Q\n'
+        b'q %.3f %.3f %.3f rg %.2f 0 0 %.2f 0 0 cm /MrcFg Do Q\n'
+        % (page_width, page_height, red, green, blue, page_width, page_height)
+    )
+    return {
+        'xobjects': {
+            b'MrcBg': (background, layers['background_jpeg']),
+            b'MrcFg': (mask, layers['mask_g4'])
+        },
+        'content': content
+    }
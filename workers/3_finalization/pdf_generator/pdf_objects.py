@@ -0,0 +1,536 @@
+"""
+PDF 객체 수준 유틸리티
+fpdf2가 생성하는 PDF(클래식 xref 테이블, 직접 /Length)를 파싱하여
+객체 번호 재지정 복사와 증분 업데이트 섹션 작성을 지원
+"""
+import mmap
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+REF_PATTERN = re.compile(rb'(\d+) (\d+) R\b')
+OBJ_HEADER = re.compile(rb'(\d+) (\d+) obj\b')
+STREAM_START = re.compile(rb'>>\s*stream\r?\n')
+
+class PdfObjectError(Exception):
+    """PDF 구조 파싱 오류"""
+    pass
+
+def _dict_ref(dict_bytes: bytes, name: bytes) -> Optional[int]:
+    """사전에서 /Name N 0 R 참조 추출"""
+    match = re.search(rb'/' + name + rb'\s+(\d+)\s+\d+\s+R\b', dict_bytes)
+    return int(match.group(1)) if match else None
+
+def _dict_int(dict_bytes: bytes, name: bytes) -> Optional[int]:
+    """사전에서 /Name 정수 값 추출"""
+    match = re.search(rb'/' + name + rb'\s+(\d+)(?!\s+\d+\s+R)\b', dict_bytes)
+    return int(match.group(1)) if match else None
+
+class PdfReader:
+    """xref 테이블 기반 최소 PDF 판독기"""
+
+    def __init__(self, data: bytes):
+        # mmap은 복사하지 않고 그대로 사용 (임시 파일에 기록한 큰 문서)
+        self.data = data if isinstance(data, (bytes, mmap.mmap)) else bytes(data)
+        self.offsets: Dict[int, int] = {}
+        self.startxref = self._find_startxref()
+        self.trailer = self._read_xref_chain(self.startxref)
+        self.size = _dict_int(self.trailer, b'Size') or 0
+        self.root = _dict_ref(self.trailer, b'Root')
+        self.info = _dict_ref(self.trailer, b'Info')
+        if self.root is None:
+            raise PdfObjectError("트레일러에 /Root 없음")
+        self._pages_root: Optional[int] = None
+
+    def _find_startxref(self) -> int:
+        idx = self.data.rfind(b'startxref')
+        if idx < 0:
+            raise PdfObjectError("startxref 없음")
+        match = re.match(rb'startxref\s+(\d+)', self.data[idx:])
+        if not match:
+            raise PdfObjectError("startxref 값 파싱 실패")
+        return int(match.group(1))
+
+    def _read_xref_chain(self, offset: int) -> bytes:
+        """xref 섹션과 /Prev 체인을 읽고 최신 트레일러 반환"""
+        newest_trailer = None
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            trailer = self._read_xref_section(offset)
+            if newest_trailer is None:
+                newest_trailer = trailer
+            offset = _dict_int(trailer, b'Prev')
+        return newest_trailer or b''
+
+    def _read_xref_section(self, offset: int) -> bytes:
+        if self.data[offset:offset + 4] != b'xref':
+            raise PdfObjectError("xref 스트림은 지원하지 않음")
+        trailer_idx = self.data.find(b'trailer', offset)
+        if trailer_idx < 0:
+            raise PdfObjectError("trailer 없음")
+
+        lines = self.data[offset + 4:trailer_idx].split(b'\n')
+        current = 0
+        remaining = 0
+        for line in lines:
+            parts = line.strip().split()
+            if not parts:
+                continue
+            if remaining == 0 and len(parts) == 2:
+                current, remaining = int(parts[0]), int(parts[1])
+                continue
+            if len(parts) == 3:
+                # 최신 섹션을 먼저 읽으므로 이미 있는 번호는 덮어쓰지 않음
+                if parts[2] == b'n' and current not in self.offsets:
+                    self.offsets[current] = int(parts[0])
+                elif parts[2] == b'f':
+                    self.offsets.setdefault(current, -1)
+                current += 1
+                remaining -= 1
+
+        end = self.data.find(b'startxref', trailer_idx)
+        return self.data[trailer_idx:end if end > 0 else len(self.data)]
+
+    def raw_object(self, num: int) -> bytes:
+        """'N 0 obj' 과 'endobj' 사이의 원본 바이트"""
+        offset = self.offsets.get(num, -1)
+        if offset < 0:
+            raise PdfObjectError(f"객체 없음: {num}")
+        header = OBJ_HEADER.match(self.data, offset)
+        if not header or int(header.group(1)) != num:
+            raise PdfObjectError(f"객체 헤더 불일치: {num}")
+        body_start = header.end()
+
+        dict_part, stream = self.split_object(num, body_start)
+        if stream is not None:
+            return dict_part + b'\nstream\n' + stream + b'\nendstream'
+        return dict_part
+
+    def split_object(self, num: int, body_start: Optional[int] = None) -> Tuple[bytes, Optional[bytes]]:
+        """객체를 (사전/값 부분, 스트림 바이트 또는 None) 으로 분리"""
+        if body_start is None:
+            offset = self.offsets.get(num, -1)
+            header = OBJ_HEADER.match(self.data, offset) if offset >= 0 else None
+            if not header:
+                raise PdfObjectError(f"객체 없음: {num}")
+            body_start = header.end()
+
+        end = self.data.find(b'endobj', body_start)
+        if end < 0:
+            raise PdfObjectError(f"endobj 없음: {num}")
+
+        stream_match = STREAM_START.search(self.data, body_start, end)
+        if not stream_match:
+            return self.data[body_start:end].strip(), None
+
+        dict_part = self.data[body_start:stream_match.start() + 2].strip()
+        length = _dict_int(dict_part, b'Length')
+        if length is None:
+            length_ref = _dict_ref(dict_part, b'Length')
+            if length_ref is None:
+                raise PdfObjectError(f"스트림 길이 없음: {num}")
+            length = int(self.split_object(length_ref)[0])
+        stream_start = stream_match.end()
+        return dict_part, self.data[stream_start:stream_start + length]
+
+    def object_dict(self, num: int) -> bytes:
+        return self.split_object(num)[0]
+
+    @property
+    def pages_root(self) -> int:
+        if self._pages_root is None:
+            pages = _dict_ref(self.object_dict(self.root), b'Pages')
+            if pages is None:
+                raise PdfObjectError("카탈로그에 /Pages 없음")
+            self._pages_root = pages
+        return self._pages_root
+
+    def page_refs(self) -> List[int]:
+        """페이지 트리를 순회하여 문서 순서의 페이지 객체 번호 반환"""
+        pages: List[int] = []
+
+        def walk(num: int, depth: int = 0):
+            if depth > 32:
+                raise PdfObjectError("페이지 트리 깊이 초과")
+            node = self.object_dict(num)
+            if re.search(rb'/Type\s*/Pages\b', node):
+                kids = re.search(rb'/Kids\s*\[([^\]]*)\]', node)
+                for kid in REF_PATTERN.finditer(kids.group(1) if kids else b''):
+                    walk(int(kid.group(1)), depth + 1)
+            else:
+                pages.append(num)
+
+        walk(self.pages_root)
+        return pages
+
+    def page_parent(self, page_num: int) -> Optional[int]:
+        return _dict_ref(self.object_dict(page_num), b'Parent')
+
+def rewrite_refs(dict_bytes: bytes, mapping: Dict[int, int]) -> bytes:
+    """사전 부분의 간접 참조 번호를 mapping에 따라 변경"""
+    def replace(match):
+        old = int(match.group(1))
+        return b'%d 0 R' % mapping.get(old, old)
+    return REF_PATTERN.sub(replace, dict_bytes)
+
+def set_parent(dict_bytes: bytes, parent: int) -> bytes:
+    """페이지 사전의 /Parent 참조 교체"""
+    return re.sub(rb'/Parent\s+\d+\s+\d+\s+R', b'/Parent %d 0 R' % parent, dict_bytes, count=1)
+
+def serialize_object(num: int, dict_part: bytes, stream: Optional[bytes] = None) -> bytes:
+    body = b'%d 0 obj\n' % num + dict_part
+    if stream is not None:
+        body += b'\nstream\n' + stream + b'\nendstream'
+    return body + b'\nendobj\n'
+
+class ObjectImporter:
+    """다른 PDF의 페이지 객체 그래프를 새 번호로 복사 (이미지 재인코딩 없음)"""
+
+    def __init__(self, next_num: int, shared_object: Optional[Callable[[bytes], Optional[int]]] = None):
+        self.next_num = next_num
+        self.emitted: List[Tuple[int, bytes]] = []
+        # 원본 문서별 번호 매핑 유지 (폰트 등 공유 객체는 한 번만 복사)
+        self._mappings: Dict[int, Dict[int, int]] = {}
+        # 객체 사전을 받아 대상 문서의 기존 객체 번호를 돌려주면 복사하지 않고 그 번호로 참조
+        self.shared_object = shared_object
+
+    def import_pages(
+        self,
+        source: PdfReader,
+        page_nums: List[int],
+        parent: int,
+        underlay: Optional[Dict] = None,
+        overlay: Optional[Dict] = None
+    ) -> List[int]:
+        """
+        페이지와 하위 참조 객체를 복사하고 새 페이지 번호 목록 반환
+        underlay({'xobjects': {이름: (사전, 스트림)}, 'content': 바이트})가 있으면
+        해당 XObject와 내용 스트림을 페이지의 기존 내용 아래에 그리도록 추가 (단일 페이지 전용)
+        overlay({'fonts': {이름: 객체 번호}, 'content': 바이트})는 기존 내용 위에 그리며
+        글꼴은 대상 문서에 이미 있는(또는 예약한) 객체 번호로 참조
+        """
+        if (underlay or overlay) and len(page_nums) != 1:
+            raise PdfObjectError("하위/상위 레이어는 단일 페이지에만 추가할 수 있습니다")
+        mapping = self._mappings.setdefault(id(source), {})
+        order: List[int] = []
+        stack = list(reversed(page_nums))
+        page_set = set(page_nums)
+
+        while stack:
+            num = stack.pop()
+            if num in mapping:
+                continue
+            dict_part, _ = source.split_object(num)
+            if self.shared_object is not None:
+                shared = self.shared_object(dict_part)
+                if shared is not None:
+                    mapping[num] = shared
+                    continue
+            mapping[num] = self.next_num
+            self.next_num += 1
+            order.append(num)
+
+            if num in page_set:
+                # /Parent를 따라가면 원본 페이지 트리 전체가 복사되므로 제외
+                dict_part = re.sub(rb'/Parent\s+\d+\s+\d+\s+R', b'', dict_part)
+            for ref in REF_PATTERN.finditer(dict_part):
+                child = int(ref.group(1))
+                if child not in mapping:
+                    stack.append(child)
+
+        resources_num = None
+        underlay_content = None
+        overlay_content = None
+        xobject_refs = b''
+        font_refs = b''
+        if underlay or overlay:
+            page_dict = source.object_dict(page_nums[0])
+            resources_num = _dict_ref(page_dict, b'Resources')
+            if resources_num is None:
+                raise PdfObjectError("간접 /Resources 가 없는 페이지에는 하위/상위 레이어를 추가할 수 없습니다")
+        if underlay:
+            for name, (xobject_dict, xobject_stream) in underlay['xobjects'].items():
+                xobject_num = self.allocate()
+                self.add(xobject_num, xobject_dict, xobject_stream)
+                xobject_refs += b'/%s %d 0 R ' % (name, xobject_num)
+            underlay_content = self.allocate()
+            self.add(underlay_content, b'<<\n/Length %d\n>>' % len(underlay['content']), underlay['content'])
+        if overlay:
+            for name, font_num in overlay['fonts'].items():
+                font_refs += b'/%s %d 0 R ' % (name.encode('ascii'), font_num)
+            overlay_content = self.allocate()
+            self.add(overlay_content, b'<<\n/Length %d\n>>' % len(overlay['content']), overlay['content'])
+
+        for num in order:
+            dict_part, stream = source.split_object(num)
+            dict_part = rewrite_refs(dict_part, mapping)
+            if num in page_set:
+                dict_part = set_parent(dict_part, parent)
+                if underlay_content is not None:
+                    dict_part = _prepend_contents(dict_part, underlay_content)
+                if overlay_content is not None:
+                    dict_part = _append_contents(dict_part, overlay_content)
+            if num == resources_num:
+                if xobject_refs:
+                    dict_part = _add_resources(dict_part, b'XObject', xobject_refs)
+                if font_refs:
+                    dict_part = _add_resources(dict_part, b'Font', font_refs)
+            self.emitted.append((mapping[num], serialize_object(mapping[num], dict_part, stream)))
+
+        return [mapping[num] for num in page_nums]
+
+    def add(self, num: int, dict_part: bytes, stream: Optional[bytes] = None) -> None:
+        self.emitted.append((num, serialize_object(num, dict_part, stream)))
+
+    def allocate(self) -> int:
+        num = self.next_num
+        self.next_num += 1
+        return num
+
+def _prepend_contents(page_dict: bytes, content_num: int) -> bytes:
+    """페이지 /Contents 앞에 내용 스트림 추가"""
+    ref = b'%d 0 R' % content_num
+    single = re.search(rb'/Contents\s+(\d+\s+\d+\s+R)', page_dict)
+    if single:
+        return page_dict[:single.start()] + b'/Contents [' + ref + b' ' + single.group(1) + b']' + page_dict[single.end():]
+    array = re.search(rb'/Contents\s*\[', page_dict)
+    if array:
+        return page_dict[:array.end()] + ref + b' ' + page_dict[array.end():]
+    return page_dict.replace(b'<<', b'<<\n/Contents ' + ref, 1)
+
+def _append_contents(page_dict: bytes, content_num: int) -> bytes:
+    """페이지 /Contents 뒤에 내용 스트림 추가"""
+    ref = b'%d 0 R' % content_num
+    single = re.search(rb'/Contents\s+(\d+\s+\d+\s+R)', page_dict)
+    if single:
+        return page_dict[:single.start()] + b'/Contents [' + single.group(1) + b' ' + ref + b']' + page_dict[single.end():]
+    array = re.search(rb'/Contents\s*\[[^\]]*', page_dict)
+    if array:
+        return page_dict[:array.end()] + b' ' + ref + page_dict[array.end():]
+    return page_dict.replace(b'<<', b'<<\n/Contents ' + ref, 1)
+
+def _add_resources(resources_dict: bytes, category: bytes, refs: bytes) -> bytes:
+    """리소스 사전의 /XObject, /Font 등 하위 사전에 항목 추가"""
+    existing = re.search(rb'/' + category + rb'\s*<<', resources_dict)
+    if existing:
+        return resources_dict[:existing.end()] + refs + resources_dict[existing.end():]
+    return resources_dict.replace(b'<<', b'<<\n/' + category + b' <<' + refs + b'>>', 1)
+
+def pages_dict(kids: List[int], extra: bytes = b'') -> bytes:
+    kid_refs = b' '.join(b'%d 0 R' % k for k in kids)
+    return b'<<\n/Type /Pages\n/Count %d\n/Kids [%s]\n%s>>' % (len(kids), kid_refs, extra)
+
+def xref_table(entries: List[Tuple[int, int]], include_free_head: bool = False) -> bytes:
+    """(객체 번호, 오프셋) 목록으로 연속 구간별 xref 테이블 작성"""
+    entries = sorted(entries)
+    lines = [b'xref\n']
+    runs: List[List[Tuple[int, int]]] = []
+    if include_free_head:
+        runs.append([(0, -1)])
+    for num, offset in entries:
+        if runs and runs[-1][-1][0] + 1 == num:
+            runs[-1].append((num, offset))
+        else:
+            runs.append([(num, offset)])
+    for run in runs:
+        lines.append(b'%d %d\n' % (run[0][0], len(run)))
+        for num, offset in run:
+            if num == 0:
+                lines.append(b'0000000000 65535 f \n')
+            else:
+                lines.append(b'%010d 00000 n \n' % offset)
+    return b''.join(lines)
+
+def incremental_update(
+    base: PdfReader,
+    page_plan: List[Tuple[str, object, int]]
+) -> bytes:
+    """
+    기존 PDF 뒤에 증분 업데이트 섹션을 추가하여 페이지 교체/삽입/삭제
+    page_plan: 최종 순서의 ('base', None, 기존 페이지 인덱스) 또는 ('fragment', PdfReader, 페이지 인덱스)
+    기존 바이트는 그대로 두므로 변경 페이지 수에 비례하는 비용만 발생
+    """
+    pages_root = base.pages_root
+    base_pages = base.page_refs()
+    importer = ObjectImporter(base.size)
+    kids: List[int] = []
+
+    fragment_pages: Dict[int, List[int]] = {}
+    for source_type, source, index in page_plan:
+        if source_type == 'base':
+            page_num = base_pages[index]
+            if base.page_parent(page_num) != pages_root:
+                # 중첩 페이지 트리의 페이지는 루트 아래로 재배치
+                importer.add(page_num, set_parent(base.object_dict(page_num), pages_root))
+            kids.append(page_num)
+        else:
+            refs = fragment_pages.setdefault(id(source), source.page_refs())
+            kids.extend(importer.import_pages(source, [refs[index]], pages_root))
+
+    root_pages_dict = base.object_dict(pages_root)
+    media_box = re.search(rb'/MediaBox\s*\[[^\]]*\]', root_pages_dict)
+    importer.add(pages_root, pages_dict(kids, (media_box.group(0) + b'\n') if media_box else b''))
+
+    out = bytearray(base.data)
+    if not out.endswith(b'\n'):
+        out += b'\n'
+
+    entries = []
+    for num, body in importer.emitted:
+        entries.append((num, len(out)))
+        out += body
+
+    xref_offset = len(out)
+    out += xref_table(entries)
+    trailer = b'trailer\n<<\n/Size %d\n/Root %d 0 R\n' % (importer.next_num, base.root)
+    if base.info is not None:
+        trailer += b'/Info %d 0 R\n' % base.info
+    file_id = re.search(rb'/ID\s*\[[^\]]*\]', base.trailer)
+    if file_id:
+        trailer += file_id.group(0) + b'\n'
+    trailer += b'/Prev %d\n>>\n' % base.startxref
+    out += trailer + b'startxref\n%d\n%%%%EOF\n' % xref_offset
+    return bytes(out)
+
+class StreamingPdfWriter:
+    """
+    페이지 단위로 객체를 즉시 출력하는 PDF 작성기
+    페이지 트리/카탈로그/xref만 마지막에 기록하므로 최대 메모리는 페이지 하나 분량
+    """
+
+    PAGES_ROOT = 1
+    CATALOG = 2
+
+    def __init__(self, sink, text_font=None):
+        self.sink = sink
+        self.position = 0
+        self.offsets: Dict[int, int] = {}
+        self.kids: List[int] = []
+        self.next_num = 3
+        # 텍스트 레이어 공유 글꼴 (font_cache.BookFont), 객체 번호만 먼저 예약하고 닫을 때 기록
+        self.text_font = text_font
+        self.text_font_num = self._allocate() if text_font is not None else None
+        self._text_font_used = False
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data: bytes) -> None:
+        self.sink.write(data)
+        self.position += len(data)
+
+    def _write_object(self, num: int, body: bytes) -> None:
+        self.offsets[num] = self.position
+        self._write(body)
+
+    def _allocate(self) -> int:
+        num = self.next_num
+        self.next_num += 1
+        return num
+
+    def _shared_font(self, dict_part: bytes) -> Optional[int]:
+        """복사하는 문서의 공유 글꼴이 같은 글꼴 파일이면 이 문서의 공유 글꼴로 대체"""
+        if self.text_font is None or b'/BookScanFont' not in dict_part or not self.text_font.adopt(dict_part):
+            return None
+        self._text_font_used = True
+        return self.text_font_num
+
+    def add_pages(
+        self,
+        source: PdfReader,
+        underlay: Optional[Dict] = None,
+        text_layer: Optional[Dict] = None
+    ) -> List[int]:
+        """
+        단일/소수 페이지 PDF의 페이지를 새 번호로 복사하여 바로 출력
+        text_layer({'content': 바이트, 'codepoints': [...]})는 공유 글꼴로 페이지 위에 그림
+        """
+        overlay = None
+        if text_layer:
+            if self.text_font is None:
+                raise PdfObjectError("텍스트 레이어를 추가하려면 공유 글꼴이 필요합니다")
+            self.text_font.add_codepoints(text_layer['codepoints'])
+            self._text_font_used = True
+            overlay = {'fonts': {self.text_font.resource_name: self.text_font_num}, 'content': text_layer['content']}
+
+        importer = ObjectImporter(self.next_num, shared_object=self._shared_font)
+        new_pages = importer.import_pages(
+            source, source.page_refs(), self.PAGES_ROOT, underlay=underlay, overlay=overlay
+        )
+        for num, body in importer.emitted:
+            self._write_object(num, body)
+        self.next_num = importer.next_num
+        self.kids.extend(new_pages)
+        return new_pages
+
+    @property
+    def page_count(self) -> int:
+        return len(self.kids)
+
+    def close(
+        self,
+        info: Optional[Dict[str, str]] = None,
+        outline: Optional[List[Tuple[str, int]]] = None
+    ) -> int:
+        """
+        페이지 트리, 카탈로그, (선택) 목차, xref, 트레일러 기록 후 전체 바이트 수 반환
+        outline은 (제목, 0부터 시작하는 페이지 번호) 목록으로 한 단계 목차를 만듦
+        """
+        if self._text_font_used:
+            for num, dict_part, stream in self.text_font.pdf_objects(self.text_font_num, self._allocate):
+                self._write_object(num, serialize_object(num, dict_part, stream))
+        self._write_object(self.PAGES_ROOT, serialize_object(self.PAGES_ROOT, pages_dict(self.kids)))
+
+        catalog = b'<<\n/Type /Catalog\n/Pages %d 0 R\n' % self.PAGES_ROOT
+        outline_root = self._write_outline(outline or [])
+        if outline_root is not None:
+            catalog += b'/Outlines %d 0 R\n/PageMode /UseOutlines\n' % outline_root
+        self._write_object(self.CATALOG, serialize_object(self.CATALOG, catalog + b'>>'))
+
+        info_num = None
+        if info:
+            info_num = self.next_num
+            self.next_num += 1
+            entries = b''.join(
+                b'/%s (%s)\n' % (name.encode('ascii'), _pdf_string(value)) for name, value in info.items()
+            )
+            self._write_object(info_num, serialize_object(info_num, b'<<\n' + entries + b'>>'))
+
+        xref_offset = self.position
+        self._write(xref_table(sorted(self.offsets.items()), include_free_head=True))
+        trailer = b'trailer\n<<\n/Size %d\n/Root %d 0 R\n' % (self.next_num, self.CATALOG)
+        if info_num is not None:
+            trailer += b'/Info %d 0 R\n' % info_num
+        self._write(trailer + b'>>\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+        return self.position
+
+    def _write_outline(self, outline: List[Tuple[str, int]]) -> Optional[int]:
+        """목차 루트와 항목 객체를 기록하고 루트 객체 번호 반환"""
+        entries = [(title, index) for title, index in outline if 0 <= index < len(self.kids)]
+        if not entries:
+            return None
+
+        root = self.next_num
+        items = list(range(root + 1, root + 1 + len(entries)))
+        self.next_num = root + 1 + len(entries)
+
+        for position, (num, (title, index)) in enumerate(zip(items, entries)):
+            body = b'<<\n/Title (%s)\n/Parent %d 0 R\n' % (_pdf_string(title), root)
+            if position > 0:
+                body += b'/Prev %d 0 R\n' % items[position - 1]
+            if position < len(items) - 1:
+                body += b'/Next %d 0 R\n' % items[position + 1]
+            body += b'/Dest [%d 0 R /Fit]\n>>' % self.kids[index]
+            self._write_object(num, serialize_object(num, body))
+
+        self._write_object(root, serialize_object(root, (
+            b'<<\n/Type /Outlines\n/First %d 0 R\n/Last %d 0 R\n/Count %d\n>>'
+            % (items[0], items[-1], len(items))
+        )))
+        return root
+
+def _pdf_string(value: str) -> bytes:
+    """PDF 리터럴 문자열 (ASCII 외 문자는 UTF-16BE)"""
+    try:
+        raw = value.encode('ascii')
+    except UnicodeEncodeError:
+        raw = b'\xfe\xff' + value.encode('utf-16-be')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
@@ -0,0 +1,44 @@
+"""
+페이지 자원 선행 로드
+다음 K개 페이지의 이미지/OCR 결과를 스레드 풀에서 미리 가져와 레이아웃과 I/O를 겹침
+"""
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger()
+
+_SENTINEL = object()
+
+def prefetch(items, fetch, depth=4, max_workers=None):
+    """
+    items 순서대로 (item, fetch(item)) 를 생성
+    최대 depth개만 미리 요청하므로 메모리는 depth 페이지 분량으로 제한됨 (역압)
+    fetch에서 발생한 예외는 해당 항목 차례에 호출자 스레드로 전달
+    """
+    if depth < 1:
+        for item in items:
+            yield item, fetch(item)
+        return
+
+    iterator = iter(items)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers or depth, thread_name_prefix='prefetch') as executor:
+        try:
+            for item in iterator:
+                pending.append((item, executor.submit(fetch, item)))
+                if len(pending) >= depth:
+                    break
+
+            while pending:
+                item, future = pending.popleft()
+                result = future.result()
+                # 소비한 만큼만 다음 요청을 추가
+                next_item = next(iterator, _SENTINEL)
+                if next_item is not _SENTINEL:
+                    pending.append((next_item, executor.submit(fetch, next_item)))
+                yield item, result
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,82 @@
+"""
+출력 프로필별 페이지 이미지 재표본화
+페이지 크기는 원본 스캔의 물리 크기(인치)로 계산하고, 이미지는 프로필 해상도로 축소 후 재인코딩
+JPEG는 draft 모드로 DCT 단계에서 먼저 축소하여 디코딩 메모리와 시간을 줄임
+"""
+import time
+from io import BytesIO
+
+from PIL import Image
+
+POINTS_PER_INCH = 72.0
+
+# 프로필별 목표 해상도와 JPEG 품질 (dpi None은 원본 픽셀 유지)
+OUTPUT_PROFILES = {
+    'screen': {'dpi': 150, 'quality': 75},
+    'print': {'dpi': 300, 'quality': 85},
+    'archive': {'dpi': None, 'quality': None}
+}
+
+# 메타데이터의 72dpi는 대부분 기본값이므로 실제 해상도로 보지 않음
+MIN_TRUSTED_DPI = 100
+
+def source_dpi(image, fallback_dpi):
+    """이미지 메타데이터의 해상도, 없거나 신뢰할 수 없으면 fallback_dpi"""
+    dpi = image.info.get('dpi')
+    if dpi:
+        try:
+            value = float(dpi[0])
+        except (TypeError, ValueError, IndexError):
+            value = 0.0
+        if value >= MIN_TRUSTED_DPI:
+            return value
+    return float(fallback_dpi)
+
+def prepare_page_image(img_data, profile, fallback_dpi):
+    """
+    프로필에 맞게 페이지 이미지를 준비
+    반환: image(임베드할 바이트), pixel_size, source_size(OCR 좌표 기준 원본 픽셀 크기),
+          page_size(pt), dpi(원본 해상도), resampled, resample_ms
+    """
+    started = time.perf_counter()
+    settings = OUTPUT_PROFILES[profile]
+
+    with Image.open(BytesIO(img_data)) as image:
+        source_size = image.size
+        dpi = source_dpi(image, fallback_dpi)
+        page_size = (
+            source_size[0] / dpi * POINTS_PER_INCH,
+            source_size[1] / dpi * POINTS_PER_INCH
+        )
+
+        target_dpi = settings['dpi']
+        if target_dpi is None or target_dpi >= dpi:
+            return {
+                'image': img_data,
+                'pixel_size': source_size,
+                'source_size': source_size,
+                'page_size': page_size,
+                'dpi': dpi,
+                'resampled': False,
+                'resample_ms': (time.perf_counter() - started) * 1000
+            }
+
+        ratio = target_dpi / dpi
+        target_size = (max(1, round(source_size[0] * ratio)), max(1, round(source_size[1] * ratio)))
+        mode = 'L' if image.mode in ('1', 'L') else 'RGB'
+        if image.format == 'JPEG':
+            # 목표 크기 이상을 유지하는 가장 작은 DCT 축소 배율로 디코딩
+            image.draft(mode, target_size)
+        resized = image.convert(mode).resize(target_size, Image.LANCZOS)
+
+    buffer = BytesIO()
+    resized.save(buffer, 'JPEG', quality=settings['quality'], optimize=True, dpi=(target_dpi, target_dpi))
+    return {
+        'image': buffer.getvalue(),
+        'pixel_size': target_size,
+        'source_size': source_size,
+        'page_size': page_size,
+        'dpi': dpi,
+        'resampled': True,
+        'resample_ms': (time.perf_counter() - started) * 1000
+    }
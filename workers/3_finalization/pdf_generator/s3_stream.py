@@ -0,0 +1,104 @@
+"""
+S3 멀티파트 업로드 스트림
+PDF 작성기의 출력을 파트 크기 단위로 바로 업로드하여 전체 문서를 메모리에 두지 않음
+"""
+import logging
+
+logger = logging.getLogger()
+
+# S3 멀티파트 업로드의 최소 파트 크기 (마지막 파트 제외)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+
+class MultipartUploadSink:
+    """
+    쓰기 전용 파일형 S3 출력
+    파트 크기 미만의 작은 문서는 put_object 한 번으로 업로드
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=DEFAULT_PART_SIZE, content_type='application/pdf'):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"파트 크기는 최소 {MIN_PART_SIZE} 바이트여야 합니다")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def tell(self):
+        return self.bytes_written
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+            self.upload_id = response['UploadId']
+
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        logger.info(f"파트 {part_number} 업로드 완료: s3://{self.bucket}/{self.key} ({len(body)} 바이트)")
+
+    def complete(self):
+        if self.upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self.buffer),
+                ContentType=self.content_type
+            )
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+        self.buffer = bytearray()
+
+    def abort(self):
+        """미완료 업로드 파트 정리 (과금 방지)"""
+        if self.upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id
+                )
+            except Exception as e:
+                logger.warning(f"멀티파트 업로드 중단 실패 ({self.upload_id}): {e}")
+        self.buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.abort()
+        return False
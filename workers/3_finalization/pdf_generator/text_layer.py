@@ -0,0 +1,73 @@
+"""
+보이지 않는 OCR 텍스트 레이어
+단어 좌표를 NumPy로 한 번에 계산하고, 텍스트 렌더 모드 3과 단어별 가로 배율로
+페이지 내용 스트림을 직접 작성 (단어마다 fpdf2 셀/그래픽 상태를 만들지 않고 글꼴도 등록하지 않음)
+"""
+import numpy as np
+
+from font_cache import FONT_RESOURCE
+
+# 가로 배율 허용 범위 (%) - 비정상 박스로 인한 극단값 방지
+MIN_HORIZONTAL_SCALE = 1.0
+MAX_HORIZONTAL_SCALE = 1000.0
+
+def layout_words(texts, boxes, char_widths, page_height, scale_x, scale_y, descent):
+    """
+    단어별 텍스트 행렬 (가로 배율 적용 크기, 세로 크기, x, 기준선 y) 을 벡터 연산으로 계산
+    boxes: (N, 4) 이미지 픽셀 좌표 x0, y0, x1, y1
+    char_widths: 단어 문자들을 이어 붙인 순서의 글자 폭 (1/1000 em)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+
+    x = x0 * scale_x
+    box_width = (x1 - x0) * scale_x
+    font_size = np.maximum((y1 - y0) * scale_y, 1.0)
+    # PDF 좌표계는 아래쪽 원점이므로 박스 하단에서 하강부 높이만큼 올린 위치가 기준선
+    baseline = page_height - y1 * scale_y + font_size * (-descent / 1000.0)
+
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    em_width = np.add.reduceat(char_widths, offsets) / 1000.0
+    natural_width = np.maximum(em_width * font_size, 1e-6)
+
+    horizontal_scale = np.clip(box_width / natural_width * 100.0, MIN_HORIZONTAL_SCALE, MAX_HORIZONTAL_SCALE)
+    return font_size * horizontal_scale / 100.0, font_size, x, baseline
+
+def invisible_text_layer(texts, boxes, metrics, page_width, page_height, image_width, image_height):
+    """
+    보이지 않는 텍스트 레이어 내용 스트림과 사용한 코드포인트 반환 (단어가 없으면 None)
+    texts/boxes는 압축 OCR 산출물의 단어 열 배열, boxes는 image_width x image_height 픽셀 좌표
+    글꼴은 페이지 리소스 FONT_RESOURCE로 참조하고 글자는 원본 글리프 번호(Identity-H)로 기록하므로
+    글꼴 객체는 작성기가 책 단위로 한 번만 만듦
+    """
+    if not texts:
+        return None
+
+    all_chars = ''.join(texts)
+    codepoints = np.fromiter(map(ord, all_chars), dtype=np.int32, count=len(all_chars))
+    glyph_ids, char_widths = metrics.lookup(codepoints)
+
+    scale_x = page_width / image_width
+    scale_y = page_height / image_height
+    size_x, size_y, x, baseline = layout_words(
+        texts, boxes, char_widths, page_height, scale_x, scale_y, metrics.descent
+    )
+
+    # 글리프 번호를 2바이트 16진수로 한 번에 변환한 뒤 단어별로 잘라 사용
+    encoded = glyph_ids.astype('>u2').tobytes().hex().upper()
+
+    # 글꼴 크기 1로 고정하고 단어별 텍스트 행렬에 크기와 가로 배율을 함께 반영
+    operators = ['q', f'BT 3 Tr /{FONT_RESOURCE} 1 Tf']
+    position = 0
+    for text, a, d, e, f in zip(texts, size_x.tolist(), size_y.tolist(), x.tolist(), baseline.tolist()):
+        end = position + len(text)
+        operators.append(f"{a:.2f} 0 0 {d:.2f} {e:.2f} {f:.2f} Tm <{encoded[position * 4:end * 4]}> Tj")
+        position = end
+    operators.extend(['ET', 'Q'])
+
+    return {
+        'content': '\n'.join(operators).encode('ascii'),
+        'codepoints': np.unique(codepoints).tolist(),
+        'words': len(texts)
+    }
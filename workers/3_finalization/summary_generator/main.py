@@ -1,18 +1,25 @@
-import boto3
 import os
+import sys
 import json
 import logging
 from datetime import datetime
 
+# Lambda 레이어 경로 설정
+sys.path.append('/opt/python')
+
+from common.aws_clients import get_client, get_resource
+from common.profiling import profiled
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+s3_client = get_client('s3')
+dynamodb = get_resource('dynamodb')
 
 DYNAMODB_TABLE_NAME = os.environ['DYNAMODB_STATE_TABLE']
 OUTPUT_BUCKET = os.environ['OUTPUT_BUCKET']
 
+@profiled('summary')
 def handler(event, context):
     """
     Generates a final summary of the execution and saves it to S3.
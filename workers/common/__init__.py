@@ -7,14 +7,52 @@ __version__ = "1.3.0"
 __author__ = "BookScan Pipeline Team"
 
 # 주요 클래스 및 함수 익스포트
-from .state_manager import StateManager, get_state_manager, StateUpdateError
+from .state_manager import (
+    StateManager,
+    get_state_manager,
+    StateUpdateError,
+    InvalidStateTransitionError,
+    MaxAttemptsExceededError,
+    JobStatus
+)
 from .sagemaker_client import SageMakerOptimizedClient, get_sagemaker_client, SageMakerInferenceError
+from .rate_limiter import DistributedRateLimiter, get_rate_limiter, RateLimitExceededError
+from .stage_cache import StageCache, get_stage_cache
+from .ttl_cache import TTLCache
+from .aws_clients import get_client, get_resource, prewarm
+from .profiling import profiled
+from .run_progress import RunProgress, completion_decision
+from .stage_queue import send_to_stage, consume, StageQueueError
+from .run_scheduler import RunScheduler, get_run_scheduler
+from .hedging import HedgedCaller, get_hedger
 
 __all__ = [
     'StateManager',
     'get_state_manager', 
     'StateUpdateError',
+    'InvalidStateTransitionError',
+    'MaxAttemptsExceededError',
+    'JobStatus',
     'SageMakerOptimizedClient',
     'get_sagemaker_client',
-    'SageMakerInferenceError'
+    'SageMakerInferenceError',
+    'DistributedRateLimiter',
+    'get_rate_limiter',
+    'RateLimitExceededError',
+    'StageCache',
+    'get_stage_cache',
+    'TTLCache',
+    'get_client',
+    'get_resource',
+    'prewarm',
+    'profiled',
+    'RunProgress',
+    'completion_decision',
+    'send_to_stage',
+    'consume',
+    'StageQueueError',
+    'RunScheduler',
+    'get_run_scheduler',
+    'HedgedCaller',
+    'get_hedger'
 ]
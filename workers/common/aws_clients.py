@@ -0,0 +1,109 @@
+"""
+프로세스 전역 boto3 클라이언트 팩토리
+서비스별로 튜닝한 연결 풀 크기, TCP keepalive, 타임아웃, 재시도 모드를 적용한 클라이언트/리소스를
+한 번만 만들어 재사용하므로 호출마다 클라이언트 생성(엔드포인트/모델 로드)과 TLS 연결 수립이 없음
+botocore 클라이언트는 스레드 안전하므로 선행 로드 스레드와 백그라운드 갱신 스레드가 공유 가능
+
+모듈 수준에서 얻은 클라이언트는 Lambda 초기화 단계에서 생성되며,
+첫 호출 때 지연 생성되는 클라이언트는 prewarm()으로 초기화 단계에 미리 만들 수 있음
+(boto3 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import boto3
+from botocore.config import Config
+
+# 서비스별 기본 설정 (지정하지 않은 서비스는 DEFAULT_CLIENT_CONFIG)
+DEFAULT_CLIENT_CONFIG: Dict[str, Any] = {
+    'max_pool_connections': 10,
+    'connect_timeout': 5,
+    'read_timeout': 30,
+    'retries': {'max_attempts': 3, 'mode': 'standard'}
+}
+
+SERVICE_CLIENT_CONFIGS: Dict[str, Dict[str, Any]] = {
+    # 페이지 선행 로드/멀티파트 업로드가 동시에 여러 연결 사용
+    's3': {
+        'max_pool_connections': int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 32)),
+        'read_timeout': 60,
+        'retries': {'max_attempts': 5, 'mode': 'adaptive'}
+    },
+    # 상태 갱신은 짧은 요청이 많으므로 빠르게 실패하고 StateManager 백오프에 맡김
+    'dynamodb': {
+        'max_pool_connections': 25,
+        'connect_timeout': 2,
+        'read_timeout': 10
+    },
+    'cloudwatch': {
+        'max_pool_connections': 4,
+        'connect_timeout': 2,
+        'read_timeout': 5,
+        'retries': {'max_attempts': 2, 'mode': 'standard'}
+    },
+    'secretsmanager': {
+        'max_pool_connections': 2,
+        'connect_timeout': 2,
+        'read_timeout': 5
+    },
+    # 업스케일 추론은 수 분까지 걸릴 수 있음
+    'sagemaker-runtime': {
+        'connect_timeout': 60,
+        'read_timeout': 300,
+        'retries': {'max_attempts': 3, 'mode': 'adaptive'}
+    }
+}
+
+_lock = threading.Lock()
+_session = None
+_instances: Dict[Tuple, Any] = {}
+
+def client_config(service_name: str, **overrides) -> Config:
+    """서비스 기본값에 overrides를 덮어쓴 botocore Config (TCP keepalive 항상 사용)"""
+    options = dict(DEFAULT_CLIENT_CONFIG)
+    options.update(SERVICE_CLIENT_CONFIGS.get(service_name, {}))
+    options.update(overrides)
+    return Config(tcp_keepalive=True, **options)
+
+def _get_session() -> boto3.session.Session:
+    # boto3 기본 세션은 스레드 간 공유에 안전하지 않으므로 전용 세션을 잠금 아래에서 생성
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+def _get(kind: str, service_name: str, overrides: Dict[str, Any]) -> Any:
+    key = (kind, service_name, repr(sorted(overrides.items())))
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(key)
+        if instance is None:
+            factory = _get_session().client if kind == 'client' else _get_session().resource
+            instance = factory(service_name, config=client_config(service_name, **overrides))
+            _instances[key] = instance
+    return instance
+
+def get_client(service_name: str, **overrides) -> Any:
+    """프로세스 전역 캐시된 boto3 클라이언트 (overrides는 botocore Config 인자)"""
+    return _get('client', service_name, overrides)
+
+def get_resource(service_name: str, **overrides) -> Any:
+    """프로세스 전역 캐시된 boto3 리소스"""
+    return _get('resource', service_name, overrides)
+
+def prewarm(*service_names: str) -> None:
+    """지연 생성되는 클라이언트를 초기화 단계에서 미리 생성하고 자격 증명 확인"""
+    for service_name in service_names:
+        get_client(service_name)
+    with _lock:
+        _get_session().get_credentials()
+
+def reset_clients() -> None:
+    """캐시된 세션/클라이언트 폐기 (테스트, 자격 증명 환경 변경 시)"""
+    global _session
+    with _lock:
+        _instances.clear()
+        _session = None
@@ -0,0 +1,229 @@
+"""
+헤지 요청(hedged request)으로 외부 호출의 꼬리 지연 완화
+호출이 최근 지연 시간의 p95(HEDGE_QUANTILE)를 넘기면 같은 요청을 한 번 더 보내고 먼저 끝난 응답을 사용
+
+- 지연 분포: 대상별 최근 HEDGE_WINDOW개 성공 호출의 소요 시간, HEDGE_MIN_SAMPLES개가 모이기 전에는 헤지하지 않음
+- 헤지 예산: 호출마다 HEDGE_BUDGET(기본 0.05)만큼 토큰을 적립하고 헤지 한 번에 1개를 소모
+  따라서 추가 호출은 전체 호출의 5% 이하이며, 대상 전체가 느려져도 적립된 토큰 이상으로 부하를 늘리지 않음
+- 요청 제한: admit이 설정되면 헤지를 보내기 전에 호출하여 공용 요청 한도(DistributedRateLimiter) 토큰을 확보
+  토큰이 없으면 헤지를 생략하고 원 요청만 기다림 (HedgeSkipped)
+- 취소: 진 쪽 호출은 아직 시작 전이면 취소하고, 이미 진행 중이면 결과를 버림 (스레드는 강제 종료할 수 없으므로
+  해당 클라이언트의 타임아웃까지 백그라운드에서 끝남). 읽기 전용 추론/주석 호출처럼 멱등인 요청에만 사용
+
+헤지가 일어난 호출마다 HedgedRequests, HedgeWins, HedgeRate(%), HedgeLatencySaved(ms)를,
+요청 한도 때문에 생략한 헤지는 HedgeSkipped를 BookScan/Performance 네임스페이스에 기록. 절약 시간은 진 쪽 호출이 실제로 끝난 시점과의 차이
+(표준 라이브러리와 boto3 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .aws_clients import get_client
+except ImportError:
+    # 이미지 작업 루트에 단일 모듈로 복사된 경우
+    from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAMESPACE = 'BookScan/Performance'
+
+# 적립 가능한 최대 헤지 토큰 (동시에 느려진 호출이 한꺼번에 헤지되지 않도록 제한)
+MAX_HEDGE_TOKENS = 2.0
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+class LatencyTracker:
+    """최근 성공 호출 소요 시간의 분위수"""
+
+    def __init__(self, window: int, quantile: float, min_samples: int):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self) -> Optional[float]:
+        """표본이 부족하면 None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+def put_hedge_metrics(name: str, metrics: List[Dict[str, Any]]) -> None:
+    for metric in metrics:
+        metric['Dimensions'] = [{'Name': 'Target', 'Value': name}]
+    get_client('cloudwatch').put_metric_data(Namespace=METRIC_NAMESPACE, MetricData=metrics)
+
+class HedgedCaller:
+    """대상 하나(Vision API, SageMaker 엔드포인트)의 지연 분포, 헤지 예산, 통계"""
+
+    def __init__(self, name: str, budget: Optional[float] = None, quantile: Optional[float] = None,
+                 window: Optional[int] = None, min_samples: Optional[int] = None,
+                 max_workers: Optional[int] = None,
+                 admit: Optional[Callable[[], bool]] = None,
+                 publish: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None):
+        self.name = name
+        self.budget = min(max(budget if budget is not None else _env_float('HEDGE_BUDGET', 0.05), 0.0), 1.0)
+        self.latency = LatencyTracker(
+            window=int(window or _env_float('HEDGE_WINDOW', 200)),
+            quantile=quantile if quantile is not None else _env_float('HEDGE_QUANTILE', 0.95),
+            min_samples=int(min_samples if min_samples is not None else _env_float('HEDGE_MIN_SAMPLES', 20))
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(max_workers or _env_float('HEDGE_MAX_WORKERS', 32)),
+            thread_name_prefix=f"hedge-{name}"
+        )
+        self._publish = publish or put_hedge_metrics
+        # 헤지 전송 전 요청 한도 토큰 확보 (False면 헤지 생략)
+        self.admit = admit
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._stats = {'calls': 0, 'hedges': 0, 'hedges_skipped': 0, 'hedge_wins': 0, 'saved_seconds': 0.0}
+
+    def hedge_delay(self) -> Optional[float]:
+        """헤지 요청을 보낼 대기 시간 (비활성 또는 표본 부족이면 None)"""
+        if self.budget <= 0:
+            return None
+        return self.latency.percentile()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['hedge_rate'] = stats['hedges'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+    def call(self, fn: Callable[..., Any], *args: Any, max_delay: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        fn(*args, **kwargs) 호출, hedge_delay 안에 끝나지 않으면 예산 내에서 한 번 더 호출
+        max_delay: 헤지 대기 상한 (예: 호출 타임아웃보다 늦게 헤지하지 않도록)
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            self._tokens = min(MAX_HEDGE_TOKENS, self._tokens + self.budget)
+
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn, args, kwargs)[0]
+        if max_delay is not None:
+            delay = min(delay, max_delay)
+
+        primary = self._executor.submit(self._timed, fn, args, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            return primary.result()[0]
+        if not self._admitted():
+            self._record_skip()
+            return primary.result()[0]
+        with self._lock:
+            self._stats['hedges'] += 1
+
+        logger.info(f"헤지 요청 전송: {self.name} ({delay * 1000:.0f}ms 초과)")
+        hedge = self._executor.submit(self._timed, fn, args, kwargs)
+        return self._first(primary, hedge)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            # 부동소수 누적 오차로 예산 경계에서 토큰이 모자라지 않도록 여유를 둠
+            if self._tokens < 1.0 - 1e-9:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def _admitted(self) -> bool:
+        if self.admit is None:
+            return True
+        try:
+            return bool(self.admit())
+        except Exception as e:
+            logger.warning(f"헤지 요청 한도 확인 실패: {self.name} {e}")
+            return False
+
+    def _record_skip(self) -> None:
+        """요청 한도 때문에 헤지를 생략, 사용하지 않은 헤지 예산은 돌려줌"""
+        with self._lock:
+            self._tokens = min(MAX_HEDGE_TOKENS, self._tokens + 1.0)
+            self._stats['hedges_skipped'] += 1
+        logger.info(f"요청 한도 부족으로 헤지 생략: {self.name}")
+        try:
+            self._publish(self.name, [{'MetricName': 'HedgeSkipped', 'Value': 1, 'Unit': 'Count'}])
+        except Exception as e:
+            logger.warning(f"헤지 메트릭 기록 실패: {e}")
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        started = time.monotonic()
+        result = fn(*args, **kwargs)
+        finished = time.monotonic()
+        self.latency.record(finished - started)
+        return result, finished
+
+    def _first(self, primary: Future, hedge: Future) -> Any:
+        """먼저 성공한 응답 반환, 둘 다 실패하면 먼저 실패한 예외"""
+        pending = {primary, hedge}
+        errors: List[BaseException] = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f is hedge):
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                result, finished = future.result()
+                self._settle(hedge_won=future is hedge, finished=finished,
+                             loser=primary if future is hedge else hedge)
+                return result
+        self._record_hedge(hedge_won=False, saved_seconds=0.0)
+        raise errors[0]
+
+    def _settle(self, hedge_won: bool, finished: float, loser: Future) -> None:
+        loser.cancel()
+        if not hedge_won or loser.done():
+            self._record_hedge(hedge_won, 0.0)
+            return
+        # 원 요청이 실제로 끝난 시점까지를 절약 시간으로 기록
+        loser.add_done_callback(
+            lambda _: self._record_hedge(True, max(0.0, time.monotonic() - finished))
+        )
+
+    def _record_hedge(self, hedge_won: bool, saved_seconds: float) -> None:
+        with self._lock:
+            self._stats['hedge_wins'] += int(hedge_won)
+            self._stats['saved_seconds'] += saved_seconds
+            hedge_rate = self._stats['hedges'] / max(1, self._stats['calls'])
+        logger.info(f"헤지 결과: {self.name} 헤지 승리={hedge_won}, 절약={saved_seconds * 1000:.0f}ms, "
+                    f"헤지 비율={hedge_rate:.2%}")
+        try:
+            self._publish(self.name, [
+                {'MetricName': 'HedgedRequests', 'Value': 1, 'Unit': 'Count'},
+                {'MetricName': 'HedgeWins', 'Value': int(hedge_won), 'Unit': 'Count'},
+                {'MetricName': 'HedgeRate', 'Value': hedge_rate * 100, 'Unit': 'Percent'},
+                {'MetricName': 'HedgeLatencySaved', 'Value': saved_seconds * 1000, 'Unit': 'Milliseconds'}
+            ])
+        except Exception as e:
+            logger.warning(f"헤지 메트릭 기록 실패: {e}")
+
+_hedgers: Dict[str, HedgedCaller] = {}
+_hedgers_lock = threading.Lock()
+
+def get_hedger(name: str, admit: Optional[Callable[[], bool]] = None) -> HedgedCaller:
+    """
+    대상별 공유 HedgedCaller (클라이언트가 TTL 캐시로 재생성되어도 지연 분포 유지)
+    admit: 헤지 전 요청 한도 확인 (예: lambda: rate_limiter.try_acquire('vision')), 주어지면 교체
+    """
+    with _hedgers_lock:
+        if name not in _hedgers:
+            _hedgers[name] = HedgedCaller(name)
+        if admit is not None:
+            _hedgers[name].admit = admit
+        return _hedgers[name]
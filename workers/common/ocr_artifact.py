@@ -0,0 +1,100 @@
+"""
+압축 OCR 산출물
+Vision 응답 전체 대신 단어 단위 열 배열(텍스트, 박스, 신뢰도, 줄/블록 번호)만 .npz로 저장
+PDF 생성과 검색 색인이 전체 JSON을 파싱하지 않고 바로 사용
+(numpy 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+from io import BytesIO
+
+import numpy as np
+
+ARTIFACT_VERSION = 1
+ARTIFACT_EXTENSION = '.words.npz'
+
+# 단어 뒤에 오면 줄이 바뀌는 Vision 구분자 종류
+LINE_BREAKS = ('LINE_BREAK', 'EOL_SURE_SPACE')
+
+def _break_type(symbol):
+    detected = (symbol.get('property') or {}).get('detectedBreak') or {}
+    return detected.get('type') or detected.get('type_')
+
+def columns_from_annotation(response):
+    """AnnotateImageResponse JSON(dict)을 단어 단위 열 배열로 변환"""
+    texts, boxes, confidence, line_ids, block_ids = [], [], [], [], []
+    width = height = 0
+
+    annotation = response.get('fullTextAnnotation') or {}
+    pages = annotation.get('pages') or []
+    if pages:
+        page = pages[0]
+        width, height = int(page.get('width', 0) or 0), int(page.get('height', 0) or 0)
+        line_id = 0
+        line_ended = True
+        for block_id, block in enumerate(page.get('blocks', [])):
+            for paragraph in block.get('paragraphs', []):
+                for word in paragraph.get('words', []):
+                    symbols = word.get('symbols', [])
+                    text = ''.join(symbol.get('text', '') for symbol in symbols)
+                    vertices = (word.get('boundingBox') or {}).get('vertices', [])
+                    if text.strip() and len(vertices) == 4:
+                        # Vision은 0인 좌표를 생략하므로 누락 값은 0
+                        xs = [v.get('x', 0) for v in vertices]
+                        ys = [v.get('y', 0) for v in vertices]
+                        texts.append(text)
+                        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+                        confidence.append(word.get('confidence', 0.0))
+                        line_ids.append(line_id)
+                        block_ids.append(block_id)
+                    line_ended = bool(symbols) and _break_type(symbols[-1]) in LINE_BREAKS
+                    if line_ended:
+                        line_id += 1
+                # 문단 경계도 줄 경계로 취급
+                if not line_ended:
+                    line_id += 1
+
+    return {
+        'text': texts,
+        'boxes': np.asarray(boxes, dtype=np.int32).reshape(-1, 4),
+        'confidence': np.asarray(confidence, dtype=np.float32),
+        'line_id': np.asarray(line_ids, dtype=np.int32),
+        'block_id': np.asarray(block_ids, dtype=np.int32),
+        'width': width,
+        'height': height
+    }
+
+def encode_ocr_artifact(columns):
+    """열 배열을 압축 .npz 바이트로 직렬화 (텍스트는 UTF-8 연결 버퍼 + 문자 오프셋)"""
+    joined = ''.join(columns['text'])
+    lengths = np.fromiter((len(text) for text in columns['text']), dtype=np.int32, count=len(columns['text']))
+    buffer = BytesIO()
+    np.savez_compressed(
+        buffer,
+        version=np.int32(ARTIFACT_VERSION),
+        text_data=np.frombuffer(joined.encode('utf-8'), dtype=np.uint8),
+        text_offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int32),
+        boxes=columns['boxes'],
+        confidence=columns['confidence'],
+        line_id=columns['line_id'],
+        block_id=columns['block_id'],
+        page_size=np.asarray([columns['width'], columns['height']], dtype=np.int32)
+    )
+    return buffer.getvalue()
+
+def decode_ocr_artifact(data):
+    """encode_ocr_artifact 결과를 열 배열 dict로 복원"""
+    with np.load(BytesIO(data), allow_pickle=False) as archive:
+        version = int(archive['version'])
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"지원하지 않는 OCR 산출물 버전: {version}")
+        joined = archive['text_data'].tobytes().decode('utf-8')
+        offsets = archive['text_offsets'].tolist()
+        width, height = archive['page_size'].tolist()
+        return {
+            'text': [joined[start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+            'boxes': archive['boxes'],
+            'confidence': archive['confidence'],
+            'line_id': archive['line_id'],
+            'block_id': archive['block_id'],
+            'width': width,
+            'height': height
+        }
@@ -0,0 +1,193 @@
+"""
+옵트인 핸들러 프로파일링
+PROFILE_SAMPLE_RATE(0~1, 기본 0)가 설정되면 해당 비율의 호출만 CPU 프로파일러와 tracemalloc으로 측정하여
+S3 {PROFILE_BUCKET}/profiles/{run_id}/{stage}/ 아래에 결과를 기록
+환경 변수는 호출마다 읽으므로 함수 설정만 바꿔 재배포 없이 운영 환경에서 켜고 끌 수 있음
+
+PROFILER
+- cprofile: 결정적 프로파일 (.prof, pstats/snakeviz로 열기) + 누적 시간 상위 함수 요약 (.txt)
+- sampling: 별도 스레드가 주기적으로 호출 스택을 수집 (.collapsed, flamegraph.pl/speedscope 입력 형식)
+  오버헤드가 작아 처리 시간이 긴 단계에 적합
+메모리 보고서(.memory.txt)에는 tracemalloc 최대 사용량과 종료 시점 할당 상위 위치를 기록
+"""
+import cProfile
+import functools
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .aws_clients import get_client
+except ImportError:
+    # 이미지 작업 루트에 단일 모듈로 복사된 경우
+    from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PREFIX = 'profiles'
+SAMPLING_INTERVAL = float(os.environ.get('PROFILE_SAMPLING_INTERVAL', '0.005'))
+TRACEMALLOC_FRAMES = 16
+TOP_ENTRIES = 40
+
+def sample_rate() -> float:
+    try:
+        return min(max(float(os.environ.get('PROFILE_SAMPLE_RATE', '0')), 0.0), 1.0)
+    except ValueError:
+        return 0.0
+
+def should_profile() -> bool:
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+class SamplingProfiler:
+    """대상 스레드의 호출 스택을 주기적으로 수집하여 collapsed stack 형식으로 집계"""
+
+    def __init__(self, interval: float = SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def report(self) -> bytes:
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return '\n'.join(lines).encode('utf-8')
+
+class ProfileSession:
+    """한 번의 호출에 대한 CPU/메모리 프로파일"""
+
+    def __init__(self, stage: str, run_id: str, mode: Optional[str] = None):
+        self.stage = stage
+        self.run_id = run_id
+        self.mode = mode or os.environ.get('PROFILER', 'cprofile')
+        self._cpu = None
+        self._started_tracemalloc = False
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        if self.mode == 'sampling':
+            self._cpu = SamplingProfiler()
+            self._cpu.start()
+        else:
+            self._cpu = cProfile.Profile()
+            self._cpu.enable()
+        self._started = time.perf_counter()
+
+    def stop(self) -> Dict[str, bytes]:
+        """프로파일을 멈추고 {파일 확장자: 내용} 반환"""
+        self.elapsed = time.perf_counter() - self._started
+        reports: Dict[str, bytes] = {}
+        if isinstance(self._cpu, SamplingProfiler):
+            self._cpu.stop()
+            reports['collapsed'] = self._cpu.report()
+        else:
+            self._cpu.disable()
+            self._cpu.create_stats()
+            reports['prof'] = marshal.dumps(self._cpu.stats)
+            summary = io.StringIO()
+            pstats.Stats(self._cpu, stream=summary).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+            reports['txt'] = summary.getvalue().encode('utf-8')
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ))
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        lines = [
+            f"stage: {self.stage}",
+            f"run_id: {self.run_id}",
+            f"elapsed_seconds: {self.elapsed:.3f}",
+            f"peak_traced_bytes: {peak}",
+            f"current_traced_bytes: {current}",
+            "",
+            f"top {TOP_ENTRIES} allocation sites at exit:"
+        ]
+        for stat in snapshot.statistics('traceback')[:TOP_ENTRIES]:
+            lines.append(f"{stat.size} bytes in {stat.count} blocks")
+            lines.extend(f"    {line}" for line in stat.traceback.format(limit=5))
+        reports['memory.txt'] = '\n'.join(lines).encode('utf-8')
+        return reports
+
+def profile_key(run_id: str, stage: str, invocation_id: str, extension: str, timestamp: str) -> str:
+    return f"{PROFILE_PREFIX}/{run_id}/{stage}/{timestamp}-{invocation_id}.{extension}"
+
+def _invocation_info(args: tuple) -> Dict[str, Any]:
+    """Lambda (event, context) 또는 Fargate 환경 변수에서 run_id, 버킷, 요청 ID 추출"""
+    event = args[0] if args and isinstance(args[0], dict) else {}
+    context = args[1] if len(args) > 1 else None
+    return {
+        'run_id': str(event.get('run_id') or event.get('execution_id') or os.environ.get('RUN_ID') or 'unknown'),
+        'bucket': os.environ.get('PROFILE_BUCKET') or event.get('temp_bucket') or os.environ.get('TEMP_BUCKET'),
+        'invocation_id': getattr(context, 'aws_request_id', None) or uuid.uuid4().hex[:12]
+    }
+
+def write_profile(session: ProfileSession, reports: Dict[str, bytes], bucket: Optional[str],
+                  invocation_id: str) -> None:
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    for extension, body in reports.items():
+        key = profile_key(session.run_id, session.stage, invocation_id, extension, timestamp)
+        if bucket:
+            get_client('s3').put_object(Bucket=bucket, Key=key, Body=body)
+        else:
+            path = os.path.join('/tmp', key.replace('/', '_'))
+            with open(path, 'wb') as f:
+                f.write(body)
+            key = path
+        logger.info(f"프로파일 기록: {key}")
+
+def profiled(stage: str) -> Callable:
+    """PROFILE_SAMPLE_RATE 비율로 핸들러(또는 Fargate main)를 프로파일링하는 데코레이터"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not should_profile():
+                return func(*args, **kwargs)
+
+            info = _invocation_info(args)
+            session = ProfileSession(stage, info['run_id'])
+            session.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # 프로파일 기록 실패가 처리 결과에 영향을 주지 않도록 함
+                try:
+                    write_profile(session, session.stop(), info['bucket'], info['invocation_id'])
+                except Exception as e:
+                    logger.warning(f"프로파일 기록 실패: {e}")
+        return wrapper
+    return decorator
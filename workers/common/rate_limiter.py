@@ -0,0 +1,211 @@
+import os
+import time
+import threading
+from decimal import Decimal
+from typing import Optional, Dict, Any, Tuple
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from .aws_clients import get_resource
+
+logger = Logger(service="rate-limiter")
+
+# 상태 테이블의 workflow_status 항목과 같은 방식으로 예약 키 사용
+RATE_LIMITER_PARTITION = '__rate_limiter__'
+
+# 의존성별 기본 버킷 설정: (초당 토큰 보충량, 버킷 최대 용량)
+DEFAULT_BUCKETS: Dict[str, Tuple[float, float]] = {
+    'vision': (20.0, 40.0),
+    'sagemaker': (8.0, 16.0)
+}
+
+class RateLimitExceededError(Exception):
+    """요청 한도 초과 예외"""
+    pass
+
+class _LocalLease:
+    """프로세스 로컬에 미리 확보한 토큰"""
+
+    def __init__(self):
+        self.tokens = 0.0
+        self.expires_at = 0.0
+
+class DistributedRateLimiter:
+    """DynamoDB 기반 분산 토큰 버킷 요청 제한기"""
+
+    def __init__(
+        self,
+        table_name: str,
+        buckets: Optional[Dict[str, Tuple[float, float]]] = None,
+        lease_size: int = 5,
+        lease_ttl: float = 2.0,
+        max_wait: float = 20.0,
+        max_conflicts: int = 5
+    ):
+        self.table_name = table_name
+        self.table = get_resource('dynamodb').Table(table_name)
+        self.buckets = dict(buckets or self._buckets_from_env())
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self.max_wait = max_wait
+        self.max_conflicts = max_conflicts
+
+        self._leases: Dict[str, _LocalLease] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    @staticmethod
+    def _buckets_from_env() -> Dict[str, Tuple[float, float]]:
+        """환경 변수(RATE_LIMIT_<DEP>_RPS / _BURST)로 기본 설정 덮어쓰기"""
+        buckets = {}
+        for dependency, (rate, capacity) in DEFAULT_BUCKETS.items():
+            prefix = f"RATE_LIMIT_{dependency.upper()}"
+            rate = float(os.environ.get(f"{prefix}_RPS", rate))
+            capacity = float(os.environ.get(f"{prefix}_BURST", capacity))
+            buckets[dependency] = (rate, capacity)
+        return buckets
+
+    def _bucket_config(self, dependency: str) -> Tuple[float, float]:
+        if dependency not in self.buckets:
+            raise ValueError(f"알 수 없는 의존성: {dependency}")
+        return self.buckets[dependency]
+
+    def _take_local(self, dependency: str, tokens: float) -> bool:
+        """로컬 임대 토큰 소비 시도"""
+        lease = self._leases.get(dependency)
+        if lease is None or time.time() > lease.expires_at:
+            return False
+        if lease.tokens >= tokens:
+            lease.tokens -= tokens
+            return True
+        return False
+
+    def _load_bucket(self, dependency: str, capacity: float) -> Dict[str, Any]:
+        """버킷 항목 조회, 없으면 가득 찬 상태로 생성"""
+        response = self.table.get_item(
+            Key={'run_id': RATE_LIMITER_PARTITION, 'image_key': dependency},
+            ConsistentRead=True
+        )
+        self.round_trips += 1
+        item = response.get('Item')
+        if item:
+            return item
+
+        now = Decimal(str(round(time.time(), 3)))
+        item = {
+            'run_id': RATE_LIMITER_PARTITION,
+            'image_key': dependency,
+            'tokens': Decimal(str(capacity)),
+            'last_refill': now
+        }
+        try:
+            self.table.put_item(
+                Item=item,
+                ConditionExpression="attribute_not_exists(run_id)"
+            )
+            self.round_trips += 1
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            return self._load_bucket(dependency, capacity)
+        return item
+
+    def _try_lease(self, dependency: str, wanted: float) -> Tuple[float, float]:
+        """
+        버킷에서 최대 wanted개 토큰을 조건부 업데이트로 확보
+        (확보한 토큰 수, 부족분 보충까지 대기 시간) 반환
+        """
+        rate, capacity = self._bucket_config(dependency)
+
+        for _ in range(self.max_conflicts):
+            item = self._load_bucket(dependency, capacity)
+            last_refill = item['last_refill']
+            now = time.time()
+            available = min(capacity, float(item['tokens']) + max(0.0, now - float(last_refill)) * rate)
+
+            if available < 1:
+                return 0.0, (1 - available) / rate
+
+            granted = min(wanted, float(int(available)))
+            try:
+                self.table.update_item(
+                    Key={'run_id': RATE_LIMITER_PARTITION, 'image_key': dependency},
+                    UpdateExpression="SET tokens = :t, last_refill = :now",
+                    ConditionExpression="last_refill = :prev",
+                    ExpressionAttributeValues={
+                        ':t': Decimal(str(round(available - granted, 3))),
+                        ':now': Decimal(str(round(now, 3))),
+                        ':prev': last_refill
+                    }
+                )
+                self.round_trips += 1
+                return granted, 0.0
+            except ClientError as e:
+                self.round_trips += 1
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                logger.debug(f"토큰 버킷 경합, 재시도: {dependency}")
+
+        return 0.0, 1.0 / rate
+
+    def _store_lease(self, dependency: str, granted: float, tokens: float) -> None:
+        lease = self._leases.setdefault(dependency, _LocalLease())
+        lease.tokens = granted - tokens
+        lease.expires_at = time.time() + self.lease_ttl
+
+    def _dependency_lock(self, dependency: str) -> threading.Lock:
+        """의존성별 잠금 (한 의존성의 대기가 다른 의존성 확보를 막지 않도록)"""
+        with self._lock:
+            return self._locks.setdefault(dependency, threading.Lock())
+
+    def acquire(self, dependency: str, tokens: int = 1) -> None:
+        """
+        외부 호출 전 용량 확보
+        lease_size 단위로 미리 임대하여 호출당 DynamoDB 왕복을 1회 미만으로 유지
+        """
+        deadline = time.time() + self.max_wait
+        lock = self._dependency_lock(dependency)
+
+        while True:
+            with lock:
+                if self._take_local(dependency, tokens):
+                    return
+
+                wanted = max(tokens, self.lease_size)
+                granted, wait = self._try_lease(dependency, wanted)
+
+                if granted >= tokens:
+                    self._store_lease(dependency, granted, tokens)
+                    return
+
+            if time.time() + wait > deadline:
+                logger.warning(f"요청 한도 대기 시간 초과: {dependency}")
+                raise RateLimitExceededError(f"요청 한도 초과: {dependency}")
+
+            # 보충을 기다리는 동안에는 잠금을 놓아 같은 의존성의 try_acquire(헤지 확인)도 바로 응답
+            time.sleep(wait)
+
+    def try_acquire(self, dependency: str, tokens: int = 1) -> bool:
+        """
+        대기 없이 용량 확보 시도 (헤지 요청처럼 생략 가능한 추가 호출용)
+        버킷에 토큰이 없으면 False
+        """
+        with self._dependency_lock(dependency):
+            if self._take_local(dependency, tokens):
+                return True
+            granted, _ = self._try_lease(dependency, max(tokens, self.lease_size))
+            if granted < tokens:
+                return False
+            self._store_lease(dependency, granted, tokens)
+            return True
+
+_rate_limiter = None
+
+def get_rate_limiter(table_name: Optional[str] = None) -> DistributedRateLimiter:
+    """싱글톤 요청 제한기 반환"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        table_name = table_name or os.environ.get('RATE_LIMIT_TABLE') or os.environ['DYNAMODB_STATE_TABLE']
+        _rate_limiter = DistributedRateLimiter(table_name)
+    return _rate_limiter
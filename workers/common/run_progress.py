@@ -0,0 +1,213 @@
+"""
+실행 진행 상황 증분 집계 (DynamoDB Streams)
+상태 테이블 스트림의 페이지 항목 변경(이전/새 이미지)에서 완료/영구 실패/처리 중 페이지 수 변화를 계산하여
+workflow_status 항목의 카운터에 ADD로 반영하고, 완료 대기 중인 Step Functions 실행을
+작업 토큰(waitForTaskToken)으로 즉시 재개
+
+- pages_done: 마지막 단계(ocr)까지 완료되었거나 이전 실행 결과를 재사용하는 페이지
+- pages_failed: 영구 실패 페이지
+- pages_in_flight: 배정되어 처리 중인 페이지 (단계 사이의 COMPLETED, 단계 큐 재전달을 기다리는 FAILED_RETRYABLE 포함)
+"""
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from .aws_clients import get_client, get_resource
+from .state_manager import JobStatus
+
+logger = Logger(service="run-progress")
+
+WORKFLOW_STATUS_KEY = 'workflow_status'
+FINAL_STAGE = 'ocr'
+PROGRESS_FIELDS = ('pages_done', 'pages_failed', 'pages_in_flight')
+
+# 페이지가 아닌 예약 파티션 (단계 캐시, 요청 제한기, 실행 스케줄러)
+RESERVED_PARTITIONS = frozenset({'__stage_cache__', '__rate_limiter__', '__scheduler__'})
+
+_deserializer = TypeDeserializer()
+
+def _from_stream_image(image: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not image:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in image.items()}
+
+def is_page_item(item: Optional[Dict[str, Any]]) -> bool:
+    return bool(item) and item.get('run_id') not in RESERVED_PARTITIONS \
+        and item.get('image_key') != WORKFLOW_STATUS_KEY and 'job_status' in item and not item.get('is_cover', False)
+
+def page_state(item: Optional[Dict[str, Any]]) -> Tuple[int, int, int]:
+    """(완료, 영구 실패, 처리 중) 여부를 0/1로 반환"""
+    if not is_page_item(item):
+        return 0, 0, 0
+    status = item.get('job_status')
+    if status == JobStatus.FAILED_PERMANENT:
+        return 0, 1, 0
+    final = ((item.get('stages') or {}).get(FINAL_STAGE) or {}).get('status') == JobStatus.COMPLETED
+    if status == JobStatus.COMPLETED and (final or item.get('reused_page_index') is not None):
+        return 1, 0, 0
+    if status in (JobStatus.PROCESSING, JobStatus.COMPLETED, JobStatus.FAILED_RETRYABLE):
+        return 0, 0, 1
+    return 0, 0, 0
+
+def record_deltas(record: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, int]]]:
+    """스트림 레코드 하나의 (run_id, 카운터 변화량), 변화가 없으면 None"""
+    change = record.get('dynamodb') or {}
+    old = _from_stream_image(change.get('OldImage'))
+    new = _from_stream_image(change.get('NewImage'))
+    before, after = page_state(old), page_state(new)
+    if before == after:
+        return None
+    run_id = (new or old)['run_id']
+    return run_id, {field: a - b for field, a, b in zip(PROGRESS_FIELDS, after, before)}
+
+def completion_decision(item: Dict[str, Any], require_progress: bool = False,
+                        in_flight_floor: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    대기 중인 실행을 재개할 결과 (아직 기다려야 하면 None)
+    모든 페이지가 완료되면 is_work_done=True,
+    처리 중인 페이지가 스케줄러가 정한 보충 기준(refill_below, 기본 0) 이하로 줄면 다음 배정을 위해 False
+    require_progress: 빈 배치 뒤처럼 스트림 반영을 기다려야 할 때는 완료 시에만 재개
+    in_flight_floor: 스트림에 아직 반영되지 않은 배정 페이지 수 (처리 중 카운터의 하한)
+    """
+    expected = int(item.get('total_images', 0)) - int(item.get('skipped_images', 0))
+    done, failed, in_flight = (int(item.get(field, 0)) for field in PROGRESS_FIELDS)
+    in_flight = max(in_flight, in_flight_floor)
+    result = {
+        'run_id': item.get('run_id'),
+        'pages_expected': expected,
+        'pages_done': done,
+        'pages_failed': failed,
+        'pages_in_flight': in_flight
+    }
+    if expected > 0 and done >= expected:
+        return {**result, 'is_work_done': True}
+    if in_flight <= int(item.get('refill_below', 0)) and not require_progress:
+        return {**result, 'is_work_done': False}
+    return None
+
+class RunProgress:
+    """workflow_status 진행 카운터 갱신과 완료 대기 토큰 관리"""
+
+    def __init__(self, table_name: str, sfn_client=None,
+                 on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.table = get_resource('dynamodb').Table(table_name)
+        self.sfn = sfn_client or get_client('stepfunctions')
+        # on_progress(run_id, 갱신된 workflow_status): 처리 중 페이지 수 등 메트릭 기록용
+        self._on_progress = on_progress
+
+    def apply(self, run_id: str, deltas: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """카운터 변화량 반영 후 갱신된 workflow_status 반환 (상태 항목이 없으면 None)"""
+        try:
+            response = self.table.update_item(
+                Key={'run_id': run_id, 'image_key': WORKFLOW_STATUS_KEY},
+                UpdateExpression='ADD ' + ', '.join(f"{field} :{field}" for field in PROGRESS_FIELDS),
+                ConditionExpression='attribute_exists(run_id)',
+                ExpressionAttributeValues={f":{field}": deltas.get(field, 0) for field in PROGRESS_FIELDS},
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"워크플로우 상태 없음, 진행 집계 생략: {run_id}")
+                return None
+            raise
+        return response['Attributes']
+
+    def register_waiter(self, run_id: str, task_token: str, batch_size: int) -> Dict[str, Any]:
+        """
+        완료 대기 토큰 등록
+        스트림이 이미 따라잡았으면 즉시 재개하고, 아니면 이후 스트림 레코드가 재개
+        """
+        response = self.table.update_item(
+            Key={'run_id': run_id, 'image_key': WORKFLOW_STATUS_KEY},
+            UpdateExpression='SET completion_token = :token, completion_wait_started = :ts',
+            ConditionExpression='attribute_exists(run_id)',
+            ExpressionAttributeValues={':token': task_token, ':ts': datetime.utcnow().isoformat()},
+            ReturnValues='ALL_NEW'
+        )
+        item = response['Attributes']
+        decision = completion_decision(item, require_progress=batch_size == 0,
+                                       in_flight_floor=self.unreflected_dispatch(item, batch_size))
+        if decision is not None:
+            self.resume(run_id, task_token, decision)
+        return {'run_id': run_id, 'resolved': decision is not None}
+
+    @staticmethod
+    def unreflected_dispatch(item: Dict[str, Any], batch_size: int) -> int:
+        """
+        방금 배정한 페이지 중 스트림이 아직 처리 중으로 집계하지 않았을 수 있는 수
+        배정 시점의 완료+실패 수(settled_at_dispatch) 이후 끝난 페이지를 빼서 추정
+        (스트림 지연으로 보충 기준을 잘못 만족하여 곧바로 재개되는 것을 막음)
+        """
+        if batch_size <= 0 or 'settled_at_dispatch' not in item:
+            return 0
+        settled = int(item.get('pages_done', 0)) + int(item.get('pages_failed', 0))
+        return max(0, batch_size - (settled - int(item['settled_at_dispatch'])))
+
+    def resume(self, run_id: str, task_token: str, decision: Dict[str, Any]) -> bool:
+        """대기 중인 실행 재개 후 토큰 제거 (이미 재개/만료된 토큰이면 제거만)"""
+        try:
+            self.sfn.send_task_success(taskToken=task_token, output=json.dumps(decision, default=int))
+            logger.info(f"완료 대기 재개: {run_id}, 완료={decision['is_work_done']}")
+            resumed = True
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('TaskTimedOut', 'InvalidToken', 'TaskDoesNotExist'):
+                raise
+            logger.info(f"이미 재개되었거나 만료된 토큰: {run_id}")
+            resumed = False
+        try:
+            self.table.update_item(
+                Key={'run_id': run_id, 'image_key': WORKFLOW_STATUS_KEY},
+                UpdateExpression='REMOVE completion_token',
+                ConditionExpression='completion_token = :token',
+                ExpressionAttributeValues={':token': task_token}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        return resumed
+
+    def handle_stream_records(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        스트림 배치 처리
+        같은 run_id의 연속 레코드를 한 번의 ADD로 묶고, 실패 시 해당 구간 첫 레코드부터 재시도되도록 보고
+        (앞 구간은 이미 반영되었으므로 중복 집계 없음)
+        """
+        segments: List[Tuple[str, str, Dict[str, int]]] = []
+        for record in records:
+            sequence = record['dynamodb']['SequenceNumber']
+            change = record_deltas(record)
+            if change is None:
+                continue
+            run_id, deltas = change
+            if segments and segments[-1][0] == run_id:
+                for field, value in deltas.items():
+                    segments[-1][2][field] += value
+            else:
+                segments.append((run_id, sequence, dict(deltas)))
+
+        for run_id, first_sequence, deltas in segments:
+            if not any(deltas.values()):
+                continue
+            try:
+                item = self.apply(run_id, deltas)
+            except Exception as e:
+                logger.error(f"진행 집계 실패, 재시도 예정: {run_id} - {e}")
+                return {'batchItemFailures': [{'itemIdentifier': first_sequence}]}
+            if item and self._on_progress:
+                try:
+                    self._on_progress(run_id, item)
+                except Exception as e:
+                    logger.warning(f"진행 메트릭 기록 실패: {run_id} - {e}")
+            if item and item.get('completion_token'):
+                decision = completion_decision(item)
+                if decision is not None:
+                    try:
+                        self.resume(run_id, item['completion_token'], decision)
+                    except Exception as e:
+                        # 집계는 이미 반영됨: 다음 레코드나 대기 상태 시간 초과가 재개를 이어받음
+                        logger.error(f"완료 대기 재개 실패: {run_id} - {e}")
+        return {'batchItemFailures': []}
@@ -0,0 +1,222 @@
+"""
+실행 간 가중 공정 스케줄링
+동시에 진행 중인 실행들이 공유 처리 용량(SageMaker 엔드포인트, Vision 할당량)을 나눠 쓰도록
+실행별로 동시에 처리 중일 수 있는 페이지 수(할당량)를 계산
+
+- priority: 실행 우선순위 등급 (페이지 priority와 같이 작을수록 먼저, urgent=0 / normal=1 / bulk=2)
+  높은 등급의 수요를 먼저 채우고 남은 용량을 다음 등급에 배분
+- weight: 같은 등급 안의 가중치, 가중 max-min 공정 분배(water-filling)
+  수요보다 큰 몫은 다른 실행에 재분배하므로 작은 실행은 필요한 만큼 바로 받고 남는 용량은 큰 실행이 사용
+- 수요가 있는 실행은 등급과 무관하게 최소 1페이지를 받아 완전히 멈추지 않음
+
+활성 실행 목록은 상태 테이블 예약 파티션(__scheduler__)에 실행별 항목으로 기록하고,
+수요와 처리 중 페이지 수는 각 실행의 workflow_status 진행 카운터에서 읽음
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+from aws_lambda_powertools import Logger
+
+from .aws_clients import get_resource
+
+logger = Logger(service="run-scheduler")
+
+SCHEDULER_PARTITION = '__scheduler__'
+WORKFLOW_STATUS_KEY = 'workflow_status'
+
+PRIORITY_CLASSES = {'urgent': 0, 'normal': 1, 'bulk': 2}
+DEFAULT_PRIORITY = PRIORITY_CLASSES['normal']
+DEFAULT_WEIGHT = 1.0
+
+BATCH_GET_LIMIT = 100
+
+def parse_priority(value: Union[str, int, None]) -> int:
+    """실행 입력의 priority (등급 이름 또는 정수) 해석"""
+    if value is None or value == '':
+        return DEFAULT_PRIORITY
+    if isinstance(value, str) and value.lower() in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[value.lower()]
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"알 수 없는 실행 우선순위: {value}")
+
+def parse_weight(value: Union[str, float, None]) -> float:
+    if value is None or value == '':
+        return DEFAULT_WEIGHT
+    weight = float(value)
+    if weight <= 0:
+        raise ValueError(f"실행 가중치는 0보다 커야 합니다: {value}")
+    return weight
+
+def run_demand(status: Dict[str, Any]) -> int:
+    """아직 끝나지 않은 페이지 수 (처리 대기 + 처리 중)"""
+    expected = int(status.get('total_images', 0)) - int(status.get('skipped_images', 0))
+    return max(0, expected - int(status.get('pages_done', 0)) - int(status.get('pages_failed', 0)))
+
+def _water_fill(capacity: int, runs: List[Dict[str, Any]], allocation: Dict[str, int]) -> int:
+    """가중치 비율로 용량을 나누고 수요를 넘는 몫은 나머지 실행에 재분배, 남은 용량 반환"""
+    remaining = capacity
+    active = [run for run in runs if allocation[run['run_id']] < run['demand']]
+    while remaining > 0 and active:
+        total_weight = sum(run['weight'] for run in active)
+        granted = 0
+        for run in active:
+            share = int(remaining * run['weight'] / total_weight)
+            grant = min(share, run['demand'] - allocation[run['run_id']])
+            allocation[run['run_id']] += grant
+            granted += grant
+        if granted == 0:
+            # 정수 몫이 모두 0이면 가중치가 큰 실행부터 한 페이지씩
+            for run in sorted(active, key=lambda r: -r['weight']):
+                if granted >= remaining:
+                    break
+                allocation[run['run_id']] += 1
+                granted += 1
+        remaining -= granted
+        active = [run for run in active if allocation[run['run_id']] < run['demand']]
+    return remaining
+
+def allocate(capacity: int, runs: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    실행별 할당량 계산
+    runs: [{'run_id', 'priority', 'weight', 'demand'}], 합계는 min(용량, 전체 수요)
+    """
+    allocation = {run['run_id']: 0 for run in runs}
+    waiting = sorted((run for run in runs if run['demand'] > 0), key=lambda r: (r['priority'], r['run_id']))
+    remaining = capacity
+    # 최소 보장: 수요가 있는 실행마다 1페이지 (우선순위 순)
+    for run in waiting:
+        if remaining <= 0:
+            break
+        allocation[run['run_id']] = 1
+        remaining -= 1
+    for priority in sorted({run['priority'] for run in waiting}):
+        if remaining <= 0:
+            break
+        remaining = _water_fill(remaining, [run for run in waiting if run['priority'] == priority], allocation)
+    return allocation
+
+class RunScheduler:
+    """활성 실행 등록과 공유 용량 할당"""
+
+    def __init__(self, table_name: str, capacity: Optional[int] = None, stale_seconds: Optional[float] = None):
+        self.table = get_resource('dynamodb').Table(table_name)
+        self.table_name = table_name
+        self.capacity = int(capacity if capacity is not None else os.environ.get('SCHEDULER_CAPACITY', '200'))
+        # 오케스트레이터가 이 시간 동안 호출되지 않은 실행(중단된 실행)은 할당에서 제외
+        self.stale_seconds = float(
+            stale_seconds if stale_seconds is not None else os.environ.get('SCHEDULER_STALE_SECONDS', '900')
+        )
+
+    def register(self, run_id: str, priority: int = DEFAULT_PRIORITY, weight: float = DEFAULT_WEIGHT) -> None:
+        self.table.put_item(Item={
+            'run_id': SCHEDULER_PARTITION,
+            'image_key': run_id,
+            'priority': priority,
+            'weight': Decimal(str(weight)),
+            'last_seen': Decimal(str(time.time())),
+            'registered_at': datetime.utcnow().isoformat(),
+            'expires_at': int((datetime.utcnow() + timedelta(days=7)).timestamp())
+        })
+
+    def deregister(self, run_id: str) -> None:
+        self.table.delete_item(Key={'run_id': SCHEDULER_PARTITION, 'image_key': run_id})
+
+    def heartbeat(self, run_id: str) -> None:
+        self.table.update_item(
+            Key={'run_id': SCHEDULER_PARTITION, 'image_key': run_id},
+            UpdateExpression='SET last_seen = :now',
+            ConditionExpression='attribute_exists(run_id)',
+            ExpressionAttributeValues={':now': Decimal(str(time.time()))}
+        )
+
+    def _registered(self) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        kwargs: Dict[str, Any] = {
+            'KeyConditionExpression': 'run_id = :partition',
+            'ExpressionAttributeValues': {':partition': SCHEDULER_PARTITION}
+        }
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _workflow_statuses(self, run_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        dynamodb = get_resource('dynamodb')
+        statuses: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(run_ids), BATCH_GET_LIMIT):
+            keys = [{'run_id': run_id, 'image_key': WORKFLOW_STATUS_KEY} for run_id in run_ids[start:start + BATCH_GET_LIMIT]]
+            request = {self.table_name: {'Keys': keys}}
+            while request:
+                response = dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    statuses[item['run_id']] = item
+                request = response.get('UnprocessedKeys') or None
+        return statuses
+
+    def active_runs(self, current: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        할당 대상 실행 목록 [{'run_id', 'priority', 'weight', 'demand', 'in_flight'}]
+        current: 호출한 실행의 최신 workflow_status (다시 읽지 않음)
+        """
+        now = time.time()
+        registered = [
+            item for item in self._registered()
+            if now - float(item.get('last_seen', 0)) <= self.stale_seconds
+            or (current and item['image_key'] == current.get('run_id'))
+        ]
+        run_ids = [item['image_key'] for item in registered if not current or item['image_key'] != current.get('run_id')]
+        statuses = self._workflow_statuses(run_ids)
+        if current:
+            statuses[current['run_id']] = current
+
+        runs = []
+        for item in registered:
+            status = statuses.get(item['image_key'])
+            if not status:
+                continue
+            runs.append({
+                'run_id': item['image_key'],
+                'priority': int(item.get('priority', DEFAULT_PRIORITY)),
+                'weight': float(item.get('weight', DEFAULT_WEIGHT)),
+                'demand': run_demand(status),
+                'in_flight': max(0, int(status.get('pages_in_flight', 0)))
+            })
+        return runs
+
+    def quota(self, run_id: str, workflow_status: Dict[str, Any]) -> Dict[str, int]:
+        """
+        호출한 실행이 지금 새로 배정할 수 있는 페이지 수
+        (할당량 - 처리 중 페이지 수, 다른 실행의 처리 중 페이지는 끝나는 대로 재분배됨)
+        등록되지 않은 실행(스케줄러 도입 이전 실행)은 기본 등급으로 등록
+        """
+        try:
+            self.heartbeat(run_id)
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            self.register(run_id, parse_priority(workflow_status.get('priority')),
+                          parse_weight(workflow_status.get('weight')))
+        runs = self.active_runs(current={**workflow_status, 'run_id': run_id})
+        allocation = allocate(self.capacity, runs).get(run_id, 0)
+        in_flight = next((run['in_flight'] for run in runs if run['run_id'] == run_id), 0)
+        logger.info(f"실행 할당: {run_id} 할당량={allocation}, 처리 중={in_flight}, 활성 실행={len(runs)}")
+        return {
+            'allocation': allocation,
+            'in_flight': in_flight,
+            'quota': max(0, allocation - in_flight),
+            'active_runs': len(runs)
+        }
+
+run_scheduler = None
+
+def get_run_scheduler(table_name: str) -> RunScheduler:
+    """싱글톤 스케줄러 반환"""
+    global run_scheduler
+    if run_scheduler is None:
+        run_scheduler = RunScheduler(table_name)
+    return run_scheduler
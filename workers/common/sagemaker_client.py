@@ -1,33 +1,40 @@
-import boto3
 import time
 import os
 from typing import Optional, Dict, Any
 from botocore.exceptions import ClientError
-from botocore.config import Config
 from aws_lambda_powertools import Logger
 import backoff
 
+from .aws_clients import get_client
+from .hedging import get_hedger
+from .ttl_cache import TTLCache
+
 logger = Logger(service="sagemaker-client")
 
 class SageMakerInferenceError(Exception):
     """SageMaker 추론 관련 예외"""
     pass
 
+def hedger_name(endpoint_name: str) -> str:
+    """엔드포인트별 헤지 대상 이름 (get_hedger 키)"""
+    return f"sagemaker:{endpoint_name}"
+
 class SageMakerOptimizedClient:
     """최적화된 SageMaker 클라이언트"""
+
+    # 워밍업은 엔드포인트 상태이므로 클라이언트가 갱신되어도 유지
+    _endpoint_warm_times: Dict[str, float] = {}
     
     def __init__(self, endpoint_name: str):
         self.endpoint_name = endpoint_name
-        self.client = boto3.client('sagemaker-runtime', config=Config(
-            retries={'max_attempts': 3, 'mode': 'adaptive'},
-            read_timeout=300,
-            connect_timeout=60
-        ))
-        self.cloudwatch = boto3.client('cloudwatch')
+        self.client = get_client('sagemaker-runtime')
+        self.cloudwatch = get_client('cloudwatch')
         
-        self._warmed = False
-        self._last_warm_time = 0
+        self._last_warm_time = self._endpoint_warm_times.get(endpoint_name, 0)
+        self._warmed = self._last_warm_time > 0
         self._warm_interval = 300
+        # 추론은 멱등이므로 엔드포인트 p95를 넘기면 헤지 요청 (지연 분포는 클라이언트 재생성 후에도 유지)
+        self._hedger = get_hedger(hedger_name(endpoint_name))
     
     def _calculate_timeout(self, content_size: int) -> int:
         """콘텐츠 크기 기반 동적 타임아웃 계산"""
@@ -35,6 +42,11 @@ class SageMakerOptimizedClient:
         size_factor = min(content_size / (1024 * 1024) * 30, 180)
         return int(base_timeout + size_factor)
     
+    def _invoke(self, invoke_params: Dict[str, Any]) -> bytes:
+        """응답 본문 읽기까지 한 번의 호출 (헤지 시 지연 비교 단위)"""
+        response = self.client.invoke_endpoint(**invoke_params)
+        return response['Body'].read()
+    
     def _is_warm_needed(self) -> bool:
         """워밍업 필요 여부 확인"""
         current_time = time.time()
@@ -82,6 +94,7 @@ class SageMakerOptimizedClient:
             warmup_time = (time.time() - start_time) * 1000
             self._warmed = True
             self._last_warm_time = time.time()
+            self._endpoint_warm_times[self.endpoint_name] = self._last_warm_time
             
             self.cloudwatch.put_metric_data(
                 Namespace='BookScan/Performance',
@@ -139,8 +152,7 @@ class SageMakerOptimizedClient:
         start_time = time.time()
         
         try:
-            response = self.client.invoke_endpoint(**invoke_params)
-            result = response['Body'].read()
+            result = self._hedger.call(self._invoke, invoke_params, max_delay=timeout)
             
             processing_time = (time.time() - start_time) * 1000
             
@@ -183,6 +195,7 @@ class SageMakerOptimizedClient:
             if error_code in ['ModelError', 'ModelNotReadyException', 'ServiceUnavailable']:
                 logger.warning(f"SageMaker 재시도 가능 오류: {error_code}")
                 self._warmed = False
+                self._endpoint_warm_times.pop(self.endpoint_name, None)
                 raise SageMakerInferenceError(f"재시도 가능: {error_code}")
             elif error_code in ['ThrottlingException', 'TooManyRequestsException']:
                 logger.warning(f"SageMaker 스로틀링: {error_code}")
@@ -191,12 +204,8 @@ class SageMakerOptimizedClient:
                 logger.error(f"SageMaker 치명적 오류: {error_code}")
                 raise SageMakerInferenceError(f"치명적 오류: {error_code}")
 
-_sagemaker_client = None
+_sagemaker_clients = TTLCache(SageMakerOptimizedClient, max_size=4, name='sagemaker-client')
 
 def get_sagemaker_client(endpoint_name: Optional[str] = None) -> SageMakerOptimizedClient:
-    """싱글톤 SageMaker 클라이언트 반환"""
-    global _sagemaker_client
-    if _sagemaker_client is None:
-        endpoint_name = endpoint_name or os.environ['SAGEMAKER_ENDPOINT_NAME']
-        _sagemaker_client = SageMakerOptimizedClient(endpoint_name)
-    return _sagemaker_client
+    """엔드포인트별 캐시된 SageMaker 클라이언트 반환 (TTL 만료 시 백그라운드 재생성)"""
+    return _sagemaker_clients.get(endpoint_name or os.environ['SAGEMAKER_ENDPOINT_NAME'])
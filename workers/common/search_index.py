@@ -0,0 +1,257 @@
+"""
+책 단위 전문 검색 색인
+OCR 단어 열 배열로 역색인(토큰 -> 단어 번호 -> 페이지/박스)을 만들어 PDF 옆에 저장
+파일은 고정 헤더 + 정렬된 numpy 배열 구역으로 구성되어 mmap으로 바로 조회 가능
+(numpy 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+
+한글/한자는 어절에 조사가 붙으므로 음절 단위 1-gram + 2-gram으로 색인하고,
+조회 시 후보 단어의 정규화 텍스트에 검색어가 포함되는지 다시 확인
+"""
+import mmap
+import re
+import struct
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_MAGIC = b'BKSI'
+INDEX_VERSION = 1
+INDEX_EXTENSION = '.search.idx'
+
+# magic, version, 페이지 수, 단어 수, 토큰 수, 포스팅 수, 단어 텍스트 바이트, 토큰 텍스트 바이트
+HEADER = struct.Struct('<4s7I')
+
+# 음절 단위로 색인하는 문자 (한글 음절/자모, CJK 한자)
+SYLLABIC = '가-힣ㄱ-ㆎ一-鿿㐀-䶿'
+TOKEN_PATTERN = re.compile(f'([{SYLLABIC}]+)|([^\\W_{SYLLABIC}]+)')
+
+def normalize(text: str) -> str:
+    """전각/호환 문자 통일 (NFKC) 및 소문자화"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+def _runs(text: str) -> List[Tuple[str, bool]]:
+    """정규화된 텍스트를 (연속 구간, 음절 문자 여부) 목록으로 분리 (문장 부호 제거)"""
+    return [(match.group(0), match.group(1) is not None) for match in TOKEN_PATTERN.finditer(text)]
+
+def tokenize(text: str) -> List[str]:
+    """
+    색인/조회 토큰
+    한글/한자 구간은 음절 1-gram과 2-gram, 그 외 영문/숫자 구간은 구간 전체
+    """
+    tokens = []
+    for run, syllabic in _runs(normalize(text)):
+        if syllabic:
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+def match_key(text: str) -> str:
+    """검색어 포함 여부 확인용 텍스트 (정규화 후 문장 부호 제거)"""
+    return ''.join(run for run, _ in _runs(normalize(text)))
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _layout(counts: Tuple[int, ...]) -> Dict[str, Tuple[int, np.dtype, Tuple[int, ...]]]:
+    """헤더 값으로 각 구역의 (오프셋, dtype, shape) 계산"""
+    n_pages, n_words, n_terms, n_postings, word_text_bytes, term_bytes = counts
+    sections = [
+        ('page_size', np.int32, (n_pages, 2)),
+        ('word_page', np.int32, (n_words,)),
+        ('word_boxes', np.int32, (n_words, 4)),
+        ('word_text_offsets', np.uint32, (n_words + 1,)),
+        ('word_text', np.uint8, (word_text_bytes,)),
+        ('term_offsets', np.uint32, (n_terms + 1,)),
+        ('term_text', np.uint8, (term_bytes,)),
+        ('posting_offsets', np.uint32, (n_terms + 1,)),
+        ('postings', np.int32, (n_postings,))
+    ]
+    layout = {}
+    offset = _align(HEADER.size)
+    for name, dtype, shape in sections:
+        layout[name] = (offset, np.dtype(dtype), shape)
+        offset = _align(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return layout
+
+def build_search_index(pages: Iterable[Tuple[int, Optional[dict]]], page_count: int) -> bytes:
+    """
+    (PDF 페이지 번호, OCR 단어 열 배열 또는 None) 목록으로 색인 바이트 생성
+    박스 좌표는 OCR 이미지 픽셀 기준이며 페이지별 이미지 크기를 함께 저장
+    """
+    page_size = np.zeros((page_count, 2), dtype=np.int32)
+    word_pages: List[np.ndarray] = []
+    word_boxes: List[np.ndarray] = []
+    texts: List[str] = []
+    postings: Dict[str, List[int]] = defaultdict(list)
+    # 책 안에서 같은 단어가 반복되므로 단어별 토큰화 결과 재사용
+    token_cache: Dict[str, set] = {}
+
+    for page_index, columns in pages:
+        if not columns or not columns['text']:
+            continue
+        page_size[page_index] = (columns['width'], columns['height'])
+        first = len(texts)
+        for offset, text in enumerate(columns['text']):
+            tokens = token_cache.get(text)
+            if tokens is None:
+                tokens = token_cache[text] = set(tokenize(text))
+            for token in tokens:
+                postings[token].append(first + offset)
+        texts.extend(columns['text'])
+        word_pages.append(np.full(len(columns['text']), page_index, dtype=np.int32))
+        word_boxes.append(np.asarray(columns['boxes'], dtype=np.int32).reshape(-1, 4))
+
+    encoded_words = [text.encode('utf-8') for text in texts]
+    word_text = b''.join(encoded_words)
+    word_text_offsets = np.concatenate(([0], np.cumsum([len(word) for word in encoded_words], dtype=np.int64)))
+
+    # UTF-8 바이트 순서로 정렬하여 조회 시 이진 탐색
+    terms = sorted((token.encode('utf-8'), token) for token in postings)
+    term_text = b''.join(encoded for encoded, _ in terms)
+    term_offsets = np.concatenate(([0], np.cumsum([len(encoded) for encoded, _ in terms], dtype=np.int64)))
+    posting_lists = [postings[token] for _, token in terms]
+    posting_offsets = np.concatenate(([0], np.cumsum([len(ids) for ids in posting_lists], dtype=np.int64)))
+    flat_postings = np.fromiter(
+        (word_id for ids in posting_lists for word_id in ids), dtype=np.int32, count=int(posting_offsets[-1])
+    )
+
+    counts = (page_count, len(texts), len(terms), len(flat_postings), len(word_text), len(term_text))
+    arrays = {
+        'page_size': page_size,
+        'word_page': np.concatenate(word_pages) if word_pages else np.zeros(0, dtype=np.int32),
+        'word_boxes': np.concatenate(word_boxes) if word_boxes else np.zeros((0, 4), dtype=np.int32),
+        'word_text_offsets': word_text_offsets,
+        'word_text': np.frombuffer(word_text, dtype=np.uint8),
+        'term_offsets': term_offsets,
+        'term_text': np.frombuffer(term_text, dtype=np.uint8),
+        'posting_offsets': posting_offsets,
+        'postings': flat_postings
+    }
+
+    layout = _layout(counts)
+    out = bytearray(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, *counts))
+    for name, (offset, dtype, shape) in layout.items():
+        out.extend(b'\0' * (offset - len(out)))
+        out.extend(np.ascontiguousarray(arrays[name], dtype=dtype).reshape(shape).tobytes())
+    out.extend(b'\0' * (_align(len(out)) - len(out)))
+    return bytes(out)
+
+class SearchIndex:
+    """검색 색인 조회 (bytes 또는 mmap 위에서 복사 없이 동작)"""
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise ValueError("검색 색인 헤더 없음")
+        magic, version, *counts = HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError("검색 색인 파일이 아님")
+        if version != INDEX_VERSION:
+            raise ValueError(f"지원하지 않는 검색 색인 버전: {version}")
+
+        self._data = data
+        self._mmap: Optional[mmap.mmap] = None
+        self.page_count, self.word_count, self.term_count = counts[0], counts[1], counts[2]
+        for name, (offset, dtype, shape) in _layout(tuple(counts)).items():
+            count = int(np.prod(shape))
+            setattr(self, name, np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape))
+
+    @classmethod
+    def open(cls, path: str) -> 'SearchIndex':
+        """색인 파일을 mmap으로 열기 (필요한 구역만 페이지 단위로 읽음)"""
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        index = cls(mapped)
+        index._mmap = mapped
+        return index
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            for name in _layout((0,) * 6):
+                setattr(self, name, None)
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _term(self, position: int) -> bytes:
+        start, end = self.term_offsets[position], self.term_offsets[position + 1]
+        return self.term_text[start:end].tobytes()
+
+    def postings_for(self, token: str) -> np.ndarray:
+        """토큰이 나타나는 단어 번호 배열 (오름차순), 없으면 빈 배열"""
+        target = token.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.term_count and self._term(lo) == target:
+            return self.postings[self.posting_offsets[lo]:self.posting_offsets[lo + 1]]
+        return np.zeros(0, dtype=np.int32)
+
+    def word_text_at(self, word_id: int) -> str:
+        start, end = self.word_text_offsets[word_id], self.word_text_offsets[word_id + 1]
+        return self.word_text[start:end].tobytes().decode('utf-8')
+
+    def _matching_words(self, query_word: str) -> np.ndarray:
+        """검색어 하나를 포함하는 단어 번호"""
+        key = match_key(query_word)
+        tokens = tokenize(key)
+        if not tokens:
+            return np.zeros(0, dtype=np.int32)
+
+        # 포스팅이 짧은 토큰부터 교집합
+        candidates = None
+        for postings in sorted((self.postings_for(token) for token in set(tokens)), key=len):
+            candidates = postings if candidates is None else np.intersect1d(candidates, postings, assume_unique=True)
+            if not len(candidates):
+                return candidates
+
+        # 2-gram 교집합은 순서를 보장하지 않으므로 실제 포함 여부 확인
+        return np.asarray(
+            [word_id for word_id in candidates.tolist() if key in match_key(self.word_text_at(word_id))],
+            dtype=np.int32
+        )
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        """
+        공백으로 구분한 모든 검색어를 포함하는 페이지와 일치 단어 박스 반환
+        [{'page_index', 'width', 'height', 'boxes': [[x0, y0, x1, y1], ...], 'words': [...]}]
+        """
+        query_words = [word for word in query.split() if match_key(word)]
+        if not query_words:
+            return []
+
+        matches = [self._matching_words(word) for word in query_words]
+        pages = None
+        for word_ids in matches:
+            word_pages = set(self.word_page[word_ids].tolist())
+            pages = word_pages if pages is None else pages & word_pages
+        if not pages:
+            return []
+
+        word_ids = np.unique(np.concatenate(matches))
+        word_ids = word_ids[np.isin(self.word_page[word_ids], list(pages))]
+
+        hits = []
+        for page_index in sorted(pages)[:limit]:
+            on_page = word_ids[self.word_page[word_ids] == page_index]
+            width, height = self.page_size[page_index].tolist()
+            hits.append({
+                'page_index': page_index,
+                'width': width,
+                'height': height,
+                'boxes': self.word_boxes[on_page].tolist(),
+                'words': [self.word_text_at(word_id) for word_id in on_page.tolist()]
+            })
+        return hits
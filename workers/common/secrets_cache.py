@@ -1,6 +1,4 @@
 import json
-import boto3
-from functools import lru_cache
 from typing import Optional, Dict, Any
 from aws_lambda_powertools.utilities import parameters
 from aws_lambda_powertools.utilities.parameters import SecretsProvider
@@ -8,9 +6,12 @@ from aws_lambda_powertools import Logger
 from botocore.exceptions import ClientError
 import backoff
 
+from .aws_clients import get_client
+from .ttl_cache import TTLCache
+
 logger = Logger(service="secrets-cache")
 
-secrets_provider = SecretsProvider()
+secrets_provider = SecretsProvider(boto3_client=get_client('secretsmanager'))
 
 class SecretsRetrievalError(Exception):
     """자격증명 검색 관련 예외"""
@@ -20,7 +21,6 @@ class SecretsValidationError(Exception):
     """자격증명 검증 관련 예외"""
     pass
 
-@lru_cache(maxsize=8)
 @backoff.on_exception(
     backoff.expo,
     (ClientError, SecretsRetrievalError),
@@ -29,13 +29,10 @@ class SecretsValidationError(Exception):
     max_value=30,
     logger=logger
 )
-def get_cached_secret(secret_name: str) -> Optional[Dict[str, Any]]:
-    """
-    AWS Secrets Manager에서 자격 증명 캐시 로드
-    Lambda 실행 컨텍스트 동안 메모리에 캐시됨
-    """
+def load_secret(secret_name: str) -> Optional[Dict[str, Any]]:
+    """AWS Secrets Manager에서 자격 증명 로드 및 검증 (캐시 없음)"""
     try:
-        secret_value = secrets_provider.get(secret_name, transform='json')
+        secret_value = secrets_provider.get(secret_name, transform='json', force_fetch=True)
         
         if not secret_value:
             raise SecretsValidationError(f"빈 자격증명: {secret_name}")
@@ -77,7 +74,21 @@ def get_cached_secret(secret_name: str) -> Optional[Dict[str, Any]]:
         logger.error(f"예상치 못한 자격증명 오류: {secret_name} - {e}")
         raise SecretsRetrievalError(f"예상치 못한 오류: {e}")
 
+# TTL 만료 후에는 기존 값을 반환하면서 백그라운드에서 갱신하므로 교체(rotation)가 요청 경로를 막지 않음
+_secret_cache = TTLCache(load_secret, max_size=8, name='secrets')
+
+def get_cached_secret(secret_name: str) -> Optional[Dict[str, Any]]:
+    """
+    AWS Secrets Manager에서 자격 증명 캐시 로드
+    Lambda 실행 컨텍스트 동안 TTL(CACHE_TTL_SECONDS) 기준으로 캐시됨
+    """
+    return _secret_cache.get(secret_name)
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """자격증명별 캐시 적중/미스/갱신 횟수"""
+    return _secret_cache.stats()
+
 def clear_cache():
     """캐시 무효화"""
-    get_cached_secret.cache_clear()
+    _secret_cache.clear()
     secrets_provider.clear_cache()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Optional, Dict, Any
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from .aws_clients import get_client, get_resource
+from .state_manager import _to_dynamo
+
+logger = Logger(service="stage-cache")
+
+# 상태 테이블의 예약 파티션에 캐시 인덱스 저장
+STAGE_CACHE_PARTITION = '__stage_cache__'
+
+# 캐시 키 형식 변경 시 증가
+CACHE_VERSION = 1
+
+# 단계별 산출물 S3 접두사 (기존 임시 버킷 레이아웃 유지)
+STAGE_PREFIXES = {
+    'skew_correction': 'corrected',
+    'upscale': 'upscaled',
+    'ocr': 'ocr-results'
+}
+
+def _from_dynamo(value: Any) -> Any:
+    """DynamoDB Decimal 값을 int/float로 변환"""
+    def convert(d):
+        return int(d) if d == d.to_integral_value() else float(d)
+    return json.loads(json.dumps(value, default=convert))
+
+class StageCache:
+    """입력 내용 기반 단계 결과 캐시 (S3 산출물 + DynamoDB 인덱스)"""
+
+    def __init__(self, table_name: str, ttl_days: Optional[float] = None):
+        self.table_name = table_name
+        self.table = get_resource('dynamodb').Table(table_name)
+        self.cloudwatch = get_client('cloudwatch')
+        # 임시 버킷 수명 주기(7일)보다 짧게 유지하여 인덱스가 삭제된 산출물을 가리키지 않도록 함
+        self.ttl_seconds = int(float(ttl_days or os.environ.get('STAGE_CACHE_TTL_DAYS', 6)) * 86400)
+
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def fingerprint(s3_response: Dict[str, Any]) -> str:
+        """S3 응답의 ETag를 입력 지문으로 사용 (본문을 읽기 전에 확인 가능)"""
+        return s3_response.get('ETag', '').strip('"')
+
+    @staticmethod
+    def fingerprint_bytes(content: bytes) -> str:
+        """ETag가 없을 때 입력 바이트 해시 사용"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def cache_key(stage: str, input_hash: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """단계, 입력 지문, 단계 파라미터로 캐시 키 생성"""
+        material = json.dumps({
+            'version': CACHE_VERSION,
+            'stage': stage,
+            'input': input_hash,
+            'params': params or {}
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def artifact_key(stage: str, cache_key: str, extension: str) -> str:
+        """캐시 키 기반 산출물 S3 키 (실행 간 basename 충돌 없음)"""
+        return f"{STAGE_PREFIXES[stage]}/{cache_key}{extension}"
+
+    def lookup(
+        self,
+        stage: str,
+        input_hash: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """캐시 조회, 적중 시 {'cache_key', 'result', 'artifact_key'} 반환"""
+        cache_key = self.cache_key(stage, input_hash, params)
+        entry = None
+
+        if input_hash:
+            try:
+                item = self.table.get_item(
+                    Key={'run_id': STAGE_CACHE_PARTITION, 'image_key': cache_key}
+                ).get('Item')
+                # DynamoDB TTL 삭제는 지연될 수 있으므로 만료 시간 직접 확인
+                if item and int(item.get('expires_at', 0)) > time.time():
+                    entry = {
+                        'cache_key': cache_key,
+                        'result': _from_dynamo(item.get('result', {})),
+                        'artifact_key': item.get('artifact_key', '')
+                    }
+            except ClientError as e:
+                logger.warning(f"단계 캐시 조회 실패, 캐시 미적중으로 처리: {e}")
+
+        self._record(stage, entry is not None)
+        return entry
+
+    def store(
+        self,
+        stage: str,
+        input_hash: str,
+        params: Optional[Dict[str, Any]],
+        result: Dict[str, Any],
+        artifact_key: str = ''
+    ) -> None:
+        """단계 결과를 캐시 인덱스에 기록 (실패해도 단계 처리에는 영향 없음)"""
+        if not input_hash:
+            return
+
+        cache_key = self.cache_key(stage, input_hash, params)
+        try:
+            self.table.put_item(Item={
+                'run_id': STAGE_CACHE_PARTITION,
+                'image_key': cache_key,
+                'stage': stage,
+                'input_hash': input_hash,
+                'params': _to_dynamo(params or {}),
+                'result': _to_dynamo(result),
+                'artifact_key': artifact_key,
+                'created_at': int(time.time()),
+                'expires_at': int(time.time()) + self.ttl_seconds
+            })
+        except ClientError as e:
+            logger.warning(f"단계 캐시 기록 실패: {stage} - {e}")
+
+    def hit_rate(self, stage: str) -> float:
+        """프로세스 내 단계별 캐시 적중률"""
+        total = self.hits[stage] + self.misses[stage]
+        return self.hits[stage] / total if total else 0.0
+
+    def _record(self, stage: str, hit: bool) -> None:
+        """적중/미적중 카운트 및 메트릭 발행 (평균값이 적중률)"""
+        if hit:
+            self.hits[stage] += 1
+        else:
+            self.misses[stage] += 1
+
+        logger.info(f"단계 캐시 {'적중' if hit else '미적중'}: {stage}, 적중률 {self.hit_rate(stage):.2f}")
+
+        try:
+            self.cloudwatch.put_metric_data(
+                Namespace='BookScan/Performance',
+                MetricData=[{
+                    'MetricName': 'StageCacheHit',
+                    'Dimensions': [{'Name': 'Stage', 'Value': stage}],
+                    'Value': 1 if hit else 0,
+                    'Unit': 'Count'
+                }]
+            )
+        except Exception as e:
+            logger.warning(f"캐시 메트릭 발행 실패: {e}")
+
+_stage_cache = None
+
+def get_stage_cache(table_name: Optional[str] = None) -> StageCache:
+    """싱글톤 단계 캐시 반환"""
+    global _stage_cache
+    if _stage_cache is None:
+        table_name = table_name or os.environ.get('STAGE_CACHE_TABLE') or os.environ['DYNAMODB_STATE_TABLE']
+        _stage_cache = StageCache(table_name)
+    return _stage_cache
@@ -0,0 +1,135 @@
+"""
+단계별 작업 큐 (SQS)
+페이지 처리 단계마다 전용 큐를 두어 단계별 동시성과 배치 크기를 독립적으로 조정
+각 단계는 자기 큐에서 페이지 메시지를 받아 처리하고, 결과를 job_output에 담아 다음 단계 큐로 넘김
+처리 실패 메시지는 가시성 제한 시간 후 다시 전달되고, 최대 수신 횟수를 넘으면 DLQ로 이동
+
+큐 URL은 환경 변수 {STAGE}_QUEUE_URL (예: DETECT_SKEW_QUEUE_URL)
+메시지: {"run_id", "image_key", "input_bucket", "temp_bucket", "output_bucket", "execution_input",
+         "stage": 처리할 단계, "job_output": {완료된 단계: 결과}}
+(boto3 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+import json
+import logging
+import os
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .aws_clients import get_client
+except ImportError:
+    # 이미지 작업 루트에 단일 모듈로 복사된 경우
+    from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# 페이지 처리 단계 순서 (render_page는 PDF 조각 사전 렌더링, 큐가 없으면 생략)
+PIPELINE = ('detect_skew', 'skew_correction', 'upscale', 'ocr', 'render_page')
+
+SEND_BATCH_LIMIT = 10
+PERMANENT_FAILURE = 'FAILED_PERMANENT'
+
+class StageQueueError(Exception):
+    pass
+
+def queue_url(stage: str) -> Optional[str]:
+    return os.environ.get(f"{stage.upper()}_QUEUE_URL")
+
+def next_stage(stage: str) -> Optional[str]:
+    index = PIPELINE.index(stage)
+    return PIPELINE[index + 1] if index + 1 < len(PIPELINE) else None
+
+def _json_default(value: Any) -> Any:
+    # 상태 테이블에서 읽은 단계 결과(Decimal) 직렬화
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"직렬화할 수 없는 값: {type(value).__name__}")
+
+def send_to_stage(stage: str, messages: List[Dict[str, Any]]) -> int:
+    """페이지 메시지를 단계 큐에 10개씩 묶어 전송 (부분 실패는 한 번 재전송)"""
+    url = queue_url(stage)
+    if not url:
+        raise StageQueueError(f"{stage} 큐 URL이 설정되지 않았습니다")
+    client = get_client('sqs')
+    for start in range(0, len(messages), SEND_BATCH_LIMIT):
+        entries = [
+            {'Id': str(i), 'MessageBody': json.dumps({**message, 'stage': stage}, default=_json_default)}
+            for i, message in enumerate(messages[start:start + SEND_BATCH_LIMIT])
+        ]
+        for attempt in range(2):
+            failed = client.send_message_batch(QueueUrl=url, Entries=entries).get('Failed', [])
+            if not failed:
+                break
+            failed_ids = {entry['Id'] for entry in failed}
+            entries = [entry for entry in entries if entry['Id'] in failed_ids]
+        else:
+            raise StageQueueError(f"{stage} 큐 전송 실패: {len(entries)}개 메시지")
+    return len(messages)
+
+def hand_off(message: Dict[str, Any], stage: str, output: Dict[str, Any]) -> Optional[str]:
+    """단계 결과를 job_output에 추가하여 다음 단계 큐로 전달, 전달한 단계 반환"""
+    following = next_stage(stage)
+    if following is None or not queue_url(following):
+        return None
+    job_output = dict(message.get('job_output') or {})
+    job_output[stage] = output
+    send_to_stage(following, [{**message, 'job_output': job_output}])
+    return following
+
+def process_message(message: Dict[str, Any], stage: str, process: Callable[[Dict[str, Any]], Any]) -> Optional[str]:
+    """메시지 하나 처리 후 다음 단계로 전달 (영구 실패나 결과 없음이면 전달하지 않음)"""
+    result = process(message)
+    if not isinstance(result, dict) or result.get('status') == PERMANENT_FAILURE:
+        return None
+    return hand_off(message, stage, result)
+
+def is_queue_event(event: Dict[str, Any]) -> bool:
+    records = event.get('Records') or []
+    return bool(records) and records[0].get('eventSource') == 'aws:sqs'
+
+def consume(event: Dict[str, Any], stage: str, process: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+    """
+    Lambda SQS 이벤트 소스 매핑 배치 처리
+    실패한 메시지만 batchItemFailures로 보고하여 성공한 메시지는 다시 처리하지 않음
+    """
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            process_message(json.loads(record['body']), stage, process)
+        except Exception as e:
+            logger.warning(f"{stage} 메시지 처리 실패, 재전달 예정: {record.get('messageId')} - {e}")
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
+
+def poll(stage: str, process: Callable[[Dict[str, Any]], Any], max_messages: int = 1, wait_seconds: int = 20,
+         idle_exit_seconds: Optional[float] = None, should_stop: Callable[[], bool] = lambda: False) -> int:
+    """
+    장기 실행 작업자(Fargate)용 큐 폴링 루프, 처리한 메시지 수 반환
+    idle_exit_seconds 동안 메시지가 없거나 should_stop()이 참이면 종료
+    """
+    client = get_client('sqs')
+    url = queue_url(stage)
+    if not url:
+        raise StageQueueError(f"{stage} 큐 URL이 설정되지 않았습니다")
+    processed = 0
+    idle_since = time.monotonic()
+    while not should_stop():
+        messages = client.receive_message(
+            QueueUrl=url, MaxNumberOfMessages=max_messages, WaitTimeSeconds=wait_seconds
+        ).get('Messages', [])
+        if not messages:
+            if idle_exit_seconds is not None and time.monotonic() - idle_since >= idle_exit_seconds:
+                break
+            continue
+        for message in messages:
+            try:
+                process_message(json.loads(message['Body']), stage, process)
+            except Exception as e:
+                # 삭제하지 않으면 가시성 제한 시간 후 다시 전달
+                logger.warning(f"{stage} 메시지 처리 실패, 재전달 예정: {e}")
+                continue
+            client.delete_message(QueueUrl=url, ReceiptHandle=message['ReceiptHandle'])
+            processed += 1
+        idle_since = time.monotonic()
+    return processed
@@ -1,24 +1,84 @@
-import boto3
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from typing import Dict, Any, Optional, FrozenSet
 from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
 from aws_lambda_powertools import Logger
 import backoff
 
+from .aws_clients import get_resource
+
 logger = Logger(service="state-manager")
 
 class StateUpdateError(Exception):
     """상태 업데이트 관련 예외"""
     pass
 
+class InvalidStateTransitionError(StateUpdateError):
+    """허용되지 않은 상태 전이 예외"""
+    pass
+
+class MaxAttemptsExceededError(StateUpdateError):
+    """최대 재시도 횟수 초과 예외"""
+    pass
+
+class JobStatus:
+    """작업 상태 값"""
+    INITIALIZED = 'INITIALIZED'
+    PROCESSING = 'PROCESSING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+    FAILED_RETRYABLE = 'FAILED_RETRYABLE'
+    FAILED_PERMANENT = 'FAILED_PERMANENT'
+
+# 목표 상태 -> 허용되는 이전 상태
+# COMPLETED -> PROCESSING 은 다음 단계 시작, PROCESSING -> PROCESSING 은 오케스트레이터 배정 후 단계 시작
+TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    JobStatus.PROCESSING: frozenset({
+        JobStatus.INITIALIZED,
+        JobStatus.PROCESSING,
+        JobStatus.COMPLETED,
+        JobStatus.FAILED,
+        JobStatus.FAILED_RETRYABLE
+    }),
+    JobStatus.COMPLETED: frozenset({JobStatus.PROCESSING}),
+    JobStatus.FAILED_RETRYABLE: frozenset({JobStatus.PROCESSING, JobStatus.FAILED_RETRYABLE}),
+    JobStatus.FAILED_PERMANENT: frozenset({
+        JobStatus.INITIALIZED,
+        JobStatus.PROCESSING,
+        JobStatus.FAILED,
+        JobStatus.FAILED_RETRYABLE
+    })
+}
+
+def is_valid_transition(current: Optional[str], target: str) -> bool:
+    """상태 전이 허용 여부"""
+    return current in TRANSITIONS.get(target, frozenset())
+
+def _to_dynamo(value: Any) -> Any:
+    """float 값을 DynamoDB가 허용하는 Decimal로 변환"""
+    return json.loads(json.dumps(value), parse_float=Decimal)
+
+# 페이지 처리 단계 순서 (job_output / stages 키와 동일)
+STAGE_ORDER = ('detect_skew', 'skew_correction', 'upscale', 'ocr')
+
+def first_incomplete_stage(item: Dict[str, Any]) -> Optional[str]:
+    """완료 기록이 없는 첫 단계 반환, 모두 완료면 None"""
+    stages = item.get('stages') or {}
+    for stage in STAGE_ORDER:
+        record = stages.get(stage) or {}
+        if record.get('status') != JobStatus.COMPLETED:
+            return stage
+    return None
+
 class StateManager:
     """DynamoDB 상태 관리 통합 클래스"""
     
     def __init__(self, table_name: str, max_retries: int = 3):
         self.table_name = table_name
         self.max_retries = max_retries
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_resource('dynamodb')
         self.table = self.dynamodb.Table(table_name)
     
     @backoff.on_exception(
@@ -84,6 +144,179 @@ class StateManager:
                 logger.error(f"DynamoDB 업데이트 실패 [{error_code}]: {image_key}")
                 raise StateUpdateError(f"상태 업데이트 실패: {error_code}")
     
+    @backoff.on_exception(
+        backoff.expo,
+        ClientError,
+        max_tries=3,
+        base=2,
+        max_value=30,
+        logger=logger
+    )
+    def transition(
+        self,
+        run_id: str,
+        image_key: str,
+        status: str,
+        output: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        increment_attempts: bool = False,
+        stage: Optional[str] = None,
+        check_attempts: bool = False,
+        stage_record: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        전이 테이블 기반 조건부 상태 변경
+        현재 상태와 재시도 예산을 단일 UpdateItem 조건으로 검사하고 변경된 항목 반환
+        """
+        allowed = TRANSITIONS.get(status)
+        if allowed is None:
+            raise InvalidStateTransitionError(f"알 수 없는 목표 상태: {status}")
+
+        update_expression = "SET job_status = :s, last_updated = :ts"
+        expression_values: Dict[str, Any] = {
+            ':s': status,
+            ':ts': datetime.utcnow().isoformat()
+        }
+
+        if stage:
+            update_expression += ", current_stage = :stage"
+            expression_values[':stage'] = stage
+
+        if output and stage:
+            update_expression += f", job_output.{stage} = :o"
+            expression_values[':o'] = _to_dynamo(output)
+        elif output:
+            update_expression += ", job_output = :o"
+            expression_values[':o'] = _to_dynamo(output)
+
+        if stage_record and stage:
+            update_expression += f", stages.{stage} = :sr"
+            expression_values[':sr'] = _to_dynamo(stage_record)
+
+        if error:
+            update_expression += ", error_message = :e"
+            expression_values[':e'] = str(error)[:1000]
+
+        if increment_attempts:
+            update_expression += " ADD attempts :inc"
+            expression_values[':inc'] = 1
+
+        source_placeholders = []
+        for i, source in enumerate(sorted(allowed)):
+            expression_values[f':from{i}'] = source
+            source_placeholders.append(f':from{i}')
+
+        condition = f"attribute_exists(run_id) AND job_status IN ({', '.join(source_placeholders)})"
+        if check_attempts:
+            condition += " AND (attribute_not_exists(attempts) OR attempts < :max_attempts)"
+            expression_values[':max_attempts'] = self.max_retries
+
+        try:
+            response = self.table.update_item(
+                Key={'run_id': run_id, 'image_key': image_key},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=expression_values,
+                ConditionExpression=condition,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            logger.info(f"상태 전이 성공: {image_key} -> {status}")
+            return response.get('Attributes', {})
+
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+
+            if error_code == 'ConditionalCheckFailedException':
+                current = self._deserialize(e.response.get('Item', {}))
+                if not current:
+                    logger.warning(f"상태 전이 대상 항목 없음: {image_key}")
+                    raise StateUpdateError(f"항목 없음: {image_key}")
+                if check_attempts and current.get('attempts', 0) >= self.max_retries:
+                    raise MaxAttemptsExceededError(f"최대 재시도 횟수 도달: {image_key}")
+                current_status = current.get('job_status')
+                logger.warning(f"허용되지 않은 상태 전이: {image_key} {current_status} -> {status}")
+                raise InvalidStateTransitionError(f"허용되지 않은 전이: {current_status} -> {status}")
+            elif error_code in ['ThrottlingException', 'ProvisionedThroughputExceededException']:
+                logger.warning(f"DynamoDB 스로틀링: {image_key}")
+                raise
+            else:
+                logger.error(f"DynamoDB 상태 전이 실패 [{error_code}]: {image_key}")
+                raise StateUpdateError(f"상태 전이 실패: {error_code}")
+
+    @staticmethod
+    def _deserialize(item: Dict[str, Any]) -> Dict[str, Any]:
+        """저수준 DynamoDB 항목을 파이썬 값으로 변환"""
+        deserializer = TypeDeserializer()
+        return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+    def begin_stage(self, run_id: str, image_key: str, stage: str) -> Dict[str, Any]:
+        """
+        단계 시작: 재시도 예산 확인과 PROCESSING 전이를 한 번의 요청으로 처리
+        예산 초과 시 영구 실패로 표시 후 MaxAttemptsExceededError 발생
+        """
+        try:
+            return self.transition(
+                run_id=run_id,
+                image_key=image_key,
+                status=JobStatus.PROCESSING,
+                stage=stage,
+                check_attempts=True
+            )
+        except MaxAttemptsExceededError:
+            logger.warning(f"최대 재시도 횟수 초과: {image_key}")
+            self.mark_permanent_failure(run_id, image_key, "최대 재시도 횟수 도달")
+            raise
+
+    def complete_stage(
+        self,
+        run_id: str,
+        image_key: str,
+        stage: str,
+        output: Dict[str, Any],
+        artifact_key: Optional[str] = None,
+        input_checksum: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        단계 완료 전이
+        재시도 시 완료된 단계를 건너뛸 수 있도록 stages.{stage}에 단계 기록 저장
+        """
+        stage_record = {
+            'status': JobStatus.COMPLETED,
+            'artifact_key': artifact_key or '',
+            'input_checksum': input_checksum or '',
+            'params': params or {},
+            'output': output,
+            'completed_at': datetime.utcnow().isoformat()
+        }
+
+        return self.transition(
+            run_id=run_id,
+            image_key=image_key,
+            status=JobStatus.COMPLETED,
+            output=output,
+            stage=stage,
+            stage_record=stage_record
+        )
+
+    def fail_stage(
+        self,
+        run_id: str,
+        image_key: str,
+        stage: str,
+        error: str,
+        permanent: bool = False
+    ) -> Dict[str, Any]:
+        """단계 실패 전이 (재시도 가능 실패는 시도 횟수 증가)"""
+        return self.transition(
+            run_id=run_id,
+            image_key=image_key,
+            status=JobStatus.FAILED_PERMANENT if permanent else JobStatus.FAILED_RETRYABLE,
+            error=error,
+            increment_attempts=not permanent,
+            stage=stage
+        )
+
     def get_item_status(self, run_id: str, image_key: str) -> Dict[str, Any]:
         """항목 상태 조회"""
         try:
@@ -107,7 +340,7 @@ class StateManager:
         self.update_job_status(
             run_id=run_id,
             image_key=image_key,
-            status='FAILED_PERMANENT',
+            status=JobStatus.FAILED_PERMANENT,
             error=f"최대 재시도 도달: {error}"
         )
 
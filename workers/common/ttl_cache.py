@@ -0,0 +1,164 @@
+"""
+TTL + stale-while-revalidate 캐시
+자격증명, API 클라이언트처럼 만들기 비싸고 가끔 바뀌는 값을 실행 컨텍스트 동안 재사용
+
+- ttl 이내: 캐시 값 그대로 반환 (hit)
+- ttl 경과 후 stale_ttl 이내: 기존 값을 즉시 반환하고 백그라운드 스레드에서 갱신 (stale hit)
+- 그 이후 또는 최초 호출: 호출 스레드에서 동기 로드 (miss)
+따라서 자격증명 교체(rotation)나 TTL 만료가 요청 처리 경로를 막지 않음
+
+Lambda는 호출 사이에 실행 환경을 멈추므로 백그라운드 갱신이 다음 호출에서 이어서 끝날 수 있음
+(표준 라이브러리 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 기본 신선 기간과 만료 후 stale 값을 계속 제공할 기간 (초)
+DEFAULT_TTL = float(os.environ.get('CACHE_TTL_SECONDS', '900'))
+DEFAULT_STALE_TTL = float(os.environ.get('CACHE_STALE_SECONDS', '3600'))
+
+# 백그라운드 갱신 실패 후 다음 갱신 시도까지 대기 (초)
+REFRESH_RETRY_INTERVAL = 30.0
+
+STAT_FIELDS = ('hits', 'stale_hits', 'misses', 'refreshes', 'refresh_errors', 'evictions')
+
+class _Entry:
+    __slots__ = ('value', 'loaded_at', 'refreshing', 'retry_at')
+
+    def __init__(self, value: Any, loaded_at: float):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.refreshing = False
+        self.retry_at = 0.0
+
+class TTLCache:
+    """키별 TTL, 최대 크기(LRU 제거), stale-while-revalidate, 키별 적중 통계"""
+
+    def __init__(self, loader: Callable[[Hashable], Any], ttl: Optional[float] = None,
+                 stale_ttl: Optional[float] = None, max_size: int = 32, name: str = 'cache',
+                 on_load: Optional[Callable[[Hashable, float, bool], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self.ttl = DEFAULT_TTL if ttl is None else ttl
+        self.stale_ttl = DEFAULT_STALE_TTL if stale_ttl is None else stale_ttl
+        self.max_size = max_size
+        self.name = name
+        # on_load(key, 로드 소요 초, 백그라운드 여부): 메트릭 기록용
+        self._on_load = on_load
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._load_locks: Dict[Hashable, threading.Lock] = {}
+        self._threads: Dict[Hashable, threading.Thread] = {}
+        self._stats: Dict[Hashable, Dict[str, int]] = {}
+
+    def get(self, key: Hashable = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.loaded_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._count(key, 'hits')
+                    return entry.value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._count(key, 'stale_hits')
+                    if not entry.refreshing and now >= entry.retry_at:
+                        entry.refreshing = True
+                        self._start_refresh(key)
+                    return entry.value
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 같은 키의 동시 미스는 한 번만 로드
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._clock() - entry.loaded_at < self.ttl + self.stale_ttl:
+                    self._count(key, 'hits')
+                    return entry.value
+                self._count(key, 'misses')
+            value = self._load(key, background=False)
+            with self._lock:
+                self._store(key, value)
+            return value
+
+    def _load(self, key: Hashable, background: bool) -> Any:
+        started = time.perf_counter()
+        value = self._loader(key)
+        if self._on_load:
+            try:
+                self._on_load(key, time.perf_counter() - started, background)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 로드 콜백 실패: {e}")
+        return value
+
+    def _start_refresh(self, key: Hashable) -> None:
+        thread = threading.Thread(target=self._refresh, args=(key,), name=f"{self.name}-refresh", daemon=True)
+        self._threads[key] = thread
+        thread.start()
+
+    def _refresh(self, key: Hashable) -> None:
+        try:
+            value = self._load(key, background=True)
+        except Exception as e:
+            logger.warning(f"[{self.name}] 백그라운드 갱신 실패, 기존 값 유지: {e}")
+            with self._lock:
+                self._count(key, 'refresh_errors')
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                    entry.retry_at = self._clock() + REFRESH_RETRY_INTERVAL
+            return
+        with self._lock:
+            self._count(key, 'refreshes')
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = _Entry(value, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._load_locks.pop(evicted, None)
+            self._count(evicted, 'evictions')
+
+    def _count(self, key: Hashable, field: str) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = dict.fromkeys(STAT_FIELDS, 0)
+        stats[field] += 1
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        """진행 중인 백그라운드 갱신 완료 대기 (테스트, 종료 처리용)"""
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            for key, thread in list(self._threads.items()):
+                if not thread.is_alive():
+                    del self._threads[key]
+
+    def invalidate(self, key: Hashable = None) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._load_locks.clear()
+
+    def stats(self) -> Dict[Hashable, Dict[str, int]]:
+        """키별 적중/미스/갱신 횟수 사본"""
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,243 @@
+"""
+경량 Google Vision REST 클라이언트
+google-cloud-vision(gRPC/protobuf) 대신 images:annotate REST 엔드포인트를 직접 호출하여
+콜드 스타트 임포트 시간과 패키지 크기를 줄임 (urllib3는 botocore 의존성으로 이미 포함)
+서비스 계정 키로 자체 서명한 JWT를 Bearer 토큰으로 사용하므로 OAuth 토큰 교환 왕복도 없음
+
+응답은 gRPC 클라이언트의 AnnotateImageResponse.to_json 결과와 같은 camelCase dict
+images:annotate는 멱등이므로 p95를 넘긴 호출은 헤지 요청으로 한 번 더 보냄 (common/hedging.py, 대상 'vision')
+(urllib3, cryptography, hedging 외 의존성이 없어야 다른 이미지에 단일 모듈로 복사 가능)
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import urllib3
+
+try:
+    from .hedging import get_hedger
+except ImportError:
+    # 이미지 작업 루트에 단일 모듈로 복사된 경우
+    from hedging import get_hedger
+
+logger = logging.getLogger(__name__)
+
+VISION_ENDPOINT = 'https://vision.googleapis.com/v1/images:annotate'
+VISION_AUDIENCE = 'https://vision.googleapis.com/'
+
+# 클라이언트 구현 선택: rest(기본) | grpc(google-cloud-vision)
+VISION_BACKEND = os.environ.get('VISION_CLIENT', 'rest')
+
+# 자체 서명 JWT 유효 시간과 만료 전 갱신 여유 (초)
+TOKEN_LIFETIME = 3600
+TOKEN_REFRESH_MARGIN = 300
+
+# images:annotate 요청 하나에 담을 수 있는 최대 이미지 수
+MAX_BATCH_SIZE = 16
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+class VisionApiError(Exception):
+    """Vision API 호출/응답 오류"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+class ServiceAccountJwt:
+    """서비스 계정 자체 서명 JWT (RS256), 만료 직전까지 재사용"""
+
+    def __init__(self, credentials_info: Dict[str, Any], audience: str = VISION_AUDIENCE,
+                 lifetime: int = TOKEN_LIFETIME):
+        from cryptography.hazmat.primitives import serialization
+
+        self._key = serialization.load_pem_private_key(credentials_info['private_key'].encode('utf-8'), password=None)
+        self._email = credentials_info['client_email']
+        self._key_id = credentials_info.get('private_key_id')
+        self._audience = audience
+        self._lifetime = lifetime
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expiry = 0.0
+
+    def token(self, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._token is None or now >= self._expiry - TOKEN_REFRESH_MARGIN:
+                self._token = self._sign(now)
+                self._expiry = now + self._lifetime
+            return self._token
+
+    def _sign(self, now: float) -> str:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        header = {'alg': 'RS256', 'typ': 'JWT'}
+        if self._key_id:
+            header['kid'] = self._key_id
+        issued = int(now)
+        payload = {
+            'iss': self._email,
+            'sub': self._email,
+            'aud': self._audience,
+            'iat': issued,
+            'exp': issued + self._lifetime
+        }
+        signing_input = '.'.join(
+            _b64url(json.dumps(part, separators=(',', ':')).encode('utf-8')) for part in (header, payload)
+        )
+        signature = self._key.sign(signing_input.encode('ascii'), padding.PKCS1v15(), hashes.SHA256())
+        return f"{signing_input}.{_b64url(signature)}"
+
+def _fill_vertices(element: Dict[str, Any]) -> None:
+    for vertex in (element.get('boundingBox') or {}).get('vertices', []):
+        vertex.setdefault('x', 0)
+        vertex.setdefault('y', 0)
+
+def normalize_response(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """REST 응답은 0인 좌표를 생략하므로 gRPC to_json 결과처럼 x/y를 채움"""
+    for text in raw.get('textAnnotations', []):
+        _fill_vertices(text)
+    annotation = raw.get('fullTextAnnotation') or {}
+    for page in annotation.get('pages', []):
+        for block in page.get('blocks', []):
+            _fill_vertices(block)
+            for paragraph in block.get('paragraphs', []):
+                _fill_vertices(paragraph)
+                for word in paragraph.get('words', []):
+                    _fill_vertices(word)
+                    for symbol in word.get('symbols', []):
+                        _fill_vertices(symbol)
+    return raw
+
+def response_error(response: Dict[str, Any]) -> Optional[str]:
+    """이미지별 응답의 오류 메시지 (없으면 None)"""
+    return (response.get('error') or {}).get('message') or None
+
+def word_vertices(response: Dict[str, Any]) -> Iterator[List[Dict[str, int]]]:
+    """fullTextAnnotation의 단어별 경계 상자 꼭짓점"""
+    annotation = response.get('fullTextAnnotation') or {}
+    for page in annotation.get('pages', []):
+        for block in page.get('blocks', []):
+            for paragraph in block.get('paragraphs', []):
+                for word in paragraph.get('words', []):
+                    yield (word.get('boundingBox') or {}).get('vertices', [])
+
+def _document_request(content: bytes) -> Dict[str, Any]:
+    return {
+        'image': {'content': base64.b64encode(content).decode('ascii')},
+        'features': [{'type': 'DOCUMENT_TEXT_DETECTION'}]
+    }
+
+class VisionRestClient:
+    """images:annotate REST 클라이언트 (연결 풀 재사용, 일시 오류 재시도)"""
+
+    def __init__(self, credentials_info: Dict[str, Any], pool_size: int = 4, timeout: float = 60.0,
+                 max_attempts: int = 3):
+        self._jwt = ServiceAccountJwt(credentials_info)
+        self._http = urllib3.PoolManager(
+            maxsize=pool_size,
+            retries=False,
+            timeout=urllib3.Timeout(connect=5.0, read=timeout)
+        )
+        self._max_attempts = max_attempts
+        self._hedger = get_hedger('vision')
+
+    def annotate(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """AnnotateImageRequest 목록을 MAX_BATCH_SIZE 단위로 나눠 호출하고 요청 순서대로 응답 반환"""
+        responses: List[Dict[str, Any]] = []
+        for start in range(0, len(requests), MAX_BATCH_SIZE):
+            batch = requests[start:start + MAX_BATCH_SIZE]
+            payload = self._post(json.dumps({'requests': batch}).encode('utf-8'))
+            batch_responses = payload.get('responses', [])
+            if len(batch_responses) != len(batch):
+                raise VisionApiError(f"Vision API 응답 수 불일치: 요청 {len(batch)}, 응답 {len(batch_responses)}")
+            responses.extend(normalize_response(response) for response in batch_responses)
+        return responses
+
+    def document_text_detection(self, content: bytes) -> Dict[str, Any]:
+        return self.annotate([_document_request(content)])[0]
+
+    def batch_document_text_detection(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        return self.annotate([_document_request(content) for content in contents])
+
+    def _post(self, body: bytes) -> Dict[str, Any]:
+        """일시 오류(연결 오류, 429, 5xx)는 지수 백오프로 재시도, 시도마다 느리면 헤지"""
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                response = self._hedger.call(
+                    self._http.request, 'POST', VISION_ENDPOINT, body=body,
+                    headers={
+                        'Authorization': f"Bearer {self._jwt.token()}",
+                        'Content-Type': 'application/json; charset=utf-8'
+                    }
+                )
+            except urllib3.exceptions.HTTPError as e:
+                error = VisionApiError(f"Vision API 연결 오류: {e}", retryable=True)
+            else:
+                if response.status == 200:
+                    return json.loads(response.data)
+                error = VisionApiError(
+                    f"Vision API 오류 ({response.status}): {self._error_message(response.data)}",
+                    status=response.status,
+                    retryable=response.status in RETRYABLE_STATUS
+                )
+
+            if not error.retryable or attempt == self._max_attempts:
+                raise error
+            delay = min(0.5 * 2 ** (attempt - 1), 8.0)
+            logger.warning(f"{error} - {delay:.1f}초 후 재시도 ({attempt}/{self._max_attempts})")
+            time.sleep(delay)
+
+    @staticmethod
+    def _error_message(data: bytes) -> str:
+        try:
+            return json.loads(data)['error']['message']
+        except (ValueError, KeyError, TypeError):
+            return data[:200].decode('utf-8', 'replace')
+
+class GrpcVisionClient:
+    """기존 google-cloud-vision gRPC 클라이언트 래퍼 (응답을 REST와 같은 dict로 변환)"""
+
+    def __init__(self, credentials_info: Dict[str, Any]):
+        from google.cloud import vision
+        from google.oauth2 import service_account
+
+        self._vision = vision
+        credentials = service_account.Credentials.from_service_account_info(credentials_info)
+        self._client = vision.ImageAnnotatorClient(credentials=credentials)
+        self._hedger = get_hedger('vision')
+
+    def _to_dict(self, response) -> Dict[str, Any]:
+        return json.loads(self._vision.AnnotateImageResponse.to_json(response))
+
+    def document_text_detection(self, content: bytes) -> Dict[str, Any]:
+        response = self._hedger.call(self._client.document_text_detection, image=self._vision.Image(content=content))
+        return self._to_dict(response)
+
+    def batch_document_text_detection(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        feature = {'type_': self._vision.Feature.Type.DOCUMENT_TEXT_DETECTION}
+        responses = []
+        for start in range(0, len(contents), MAX_BATCH_SIZE):
+            result = self._hedger.call(self._client.batch_annotate_images, requests=[
+                {'image': {'content': content}, 'features': [feature]}
+                for content in contents[start:start + MAX_BATCH_SIZE]
+            ])
+            responses.extend(self._to_dict(response) for response in result.responses)
+        return responses
+
+def create_vision_client(credentials_info: Dict[str, Any], backend: Optional[str] = None):
+    """VISION_CLIENT 설정에 따라 REST 또는 gRPC 클라이언트 생성"""
+    backend = backend or VISION_BACKEND
+    if backend == 'rest':
+        return VisionRestClient(credentials_info)
+    if backend == 'grpc':
+        return GrpcVisionClient(credentials_info)
+    raise ValueError(f"지원하지 않는 Vision 클라이언트: {backend}")
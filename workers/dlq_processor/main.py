@@ -1,21 +1,30 @@
 import json
-import boto3
 import os
+import sys
 import logging
 from typing import Dict, List, Any
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
+# Lambda 레이어 경로 설정
+sys.path.append('/opt/python')
+
+from common.aws_clients import get_client
+from common.profiling import profiled
+from common.state_manager import get_state_manager
+
 logger = Logger(service="dlq-processor")
 tracer = Tracer(service="dlq-processor")
 
-sns_client = boto3.client('sns')
-cloudwatch = boto3.client('cloudwatch')
+sns_client = get_client('sns')
+cloudwatch = get_client('cloudwatch')
 
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_STATE_TABLE')
 
 @tracer.capture_lambda_handler
 @logger.inject_lambda_context
+@profiled('dlq_processor')
 def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
     """DLQ 메시지 처리 및 알림"""
     
@@ -42,6 +51,9 @@ def process_dlq_message(record: Dict[str, Any]):
     """개별 DLQ 메시지 처리"""
     message_body = json.loads(record['body'])
     
+    if is_stage_message(message_body):
+        fail_stage_message(message_body)
+    
     error_details = extract_error_details(message_body)
     
     if SNS_TOPIC_ARN:
@@ -49,10 +61,28 @@ def process_dlq_message(record: Dict[str, Any]):
     
     logger.error(f"DLQ 메시지 처리됨", extra=error_details)
 
+def is_stage_message(message: Dict[str, Any]) -> bool:
+    return all(key in message for key in ('stage', 'run_id', 'image_key'))
+
+def fail_stage_message(message: Dict[str, Any]):
+    """
+    최대 수신 횟수를 넘긴 단계 큐 메시지의 페이지를 영구 실패로 표시
+    (진행 카운터가 처리 중에서 실패로 옮겨져 실행이 완료 판정을 받을 수 있음)
+    """
+    if not DYNAMODB_TABLE_NAME:
+        logger.warning("DYNAMODB_STATE_TABLE 미설정, 페이지 상태 갱신 생략")
+        return
+    if message['stage'] == 'render_page':
+        # 페이지 조각은 선택 사항이며 OCR까지 끝난 페이지이므로 상태를 바꾸지 않음
+        return
+    get_state_manager(DYNAMODB_TABLE_NAME).mark_permanent_failure(
+        message['run_id'], message['image_key'], f"{message['stage']} 단계 큐 최대 수신 횟수 초과"
+    )
+
 def extract_error_details(message: Dict[str, Any]) -> Dict[str, Any]:
     """메시지에서 오류 정보 추출"""
     return {
-        'function_name': message.get('functionName', 'unknown'),
+        'function_name': message.get('functionName') or message.get('stage', 'unknown'),
         'error_message': message.get('errorMessage', 'no error message'),
         'error_type': message.get('errorType', 'unknown'),
         'request_id': message.get('requestId', 'unknown'),